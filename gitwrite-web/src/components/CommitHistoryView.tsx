@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useCallback, useEffect, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { GitWriteClient, type CommitDetail } from 'gitwrite-sdk';
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table';
@@ -8,6 +8,8 @@ import { Alert, AlertDescription, AlertTitle } from '@/components/ui/alert';
 import { Skeleton } from '@/components/ui/skeleton';
 import { ArrowLeft } from 'lucide-react';
 
+const COMMIT_PAGE_SIZE = 50;
+
 interface CommitHistoryViewParams extends Record<string, string | undefined> {
   repoName: string;
   '*': string; // Splat for branch and potential path, though we only use branch for now
@@ -18,12 +20,33 @@ const CommitHistoryView: React.FC = () => {
   const navigate = useNavigate();
   const [commits, setCommits] = useState<CommitDetail[]>([]);
   const [isLoading, setIsLoading] = useState(true);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [error, setError] = useState<string | null>(null);
 
   // For now, assume the splatPath is the branch name.
   // This might need to be more sophisticated if the path includes subdirectories.
   const branchName = splatPath || 'main'; // Default to 'main' if no branch in splat
 
+  const fetchCommitPage = useCallback(async (cursor?: string) => {
+    const token = localStorage.getItem('jwtToken');
+    if (!token) {
+      navigate('/login');
+      return null;
+    }
+    const client = new GitWriteClient(import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000');
+    client.setToken(token);
+    // Pages are newest first; next_cursor continues with older commits.
+    return client.listCommits(repoName!, { branchName: branchName, limit: COMMIT_PAGE_SIZE, cursor });
+  }, [repoName, branchName, navigate]);
+
+  const handleRequestError = (err: any) => {
+    setError(err.message || 'An unexpected error occurred.');
+    if (err.response?.status === 401) {
+      navigate('/login');
+    }
+  };
+
   useEffect(() => {
     if (!repoName) {
       setError("Repository name is missing.");
@@ -31,37 +54,48 @@ const CommitHistoryView: React.FC = () => {
       return;
     }
 
-    const fetchCommits = async () => {
+    const fetchFirstPage = async () => {
       setIsLoading(true);
       setError(null);
+      setCommits([]);
+      setNextCursor(null);
       try {
-        const token = localStorage.getItem('jwtToken');
-        if (!token) {
-          navigate('/login');
-          return;
-        }
-        const client = new GitWriteClient(import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000');
-        client.setToken(token);
-
-        // Use the updated SDK method that requires repository name
-        const response = await client.listCommits(repoName, { branchName: branchName, maxCount: 100 });
+        const response = await fetchCommitPage();
+        if (!response) return;
         if (response.status === 'success' || response.status === 'no_commits') {
           setCommits(response.commits || []);
+          setNextCursor(response.next_cursor ?? null);
         } else {
           setError(response.message || 'Failed to fetch commits.');
         }
       } catch (err: any) {
-        setError(err.message || 'An unexpected error occurred.');
-        if (err.response?.status === 401) {
-          navigate('/login');
-        }
+        handleRequestError(err);
       } finally {
         setIsLoading(false);
       }
     };
 
-    fetchCommits();
-  }, [repoName, branchName, navigate]);
+    fetchFirstPage();
+  }, [repoName, fetchCommitPage]);
+
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    try {
+      const response = await fetchCommitPage(nextCursor);
+      if (!response) return;
+      if (response.status === 'success' || response.status === 'no_commits') {
+        setCommits((previous) => [...previous, ...(response.commits || [])]);
+        setNextCursor(response.next_cursor ?? null);
+      } else {
+        setError(response.message || 'Failed to fetch more commits.');
+      }
+    } catch (err: any) {
+      handleRequestError(err);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
 
   const handleCommitSelect = (commitSha: string) => {
     // Navigate to the repository browser tree view, using the commit SHA as the ref.
@@ -150,6 +184,13 @@ const CommitHistoryView: React.FC = () => {
             </TableBody>
           </Table>
         )}
+        {nextCursor && (
+          <div className="flex justify-center mt-4">
+            <Button variant="outline" onClick={handleLoadMore} disabled={isLoadingMore}>
+              {isLoadingMore ? 'Loading...' : 'Load older commits'}
+            </Button>
+          </div>
+        )}
       </CardContent>
     </Card>
   );
@@ -51,12 +51,12 @@ const FileContentViewer: React.FC<FileContentViewerProps> = ({ repoName, filePat
       // Fetch file content
       const filePromise = client.getFileContent(repoName, filePath, commitSha);
       // Fetch annotations
-      const annotationsPromise = client.listAnnotations(repoName, feedbackBranch);
+      const annotationsPromise = client.listAnnotations(repoName, feedbackBranch, { file_path: filePath });
 
       const [fileResponse, annotationResponse] = await Promise.all([filePromise, annotationsPromise]);
 
       setFileContent(fileResponse);
-      // No need to filter annotations here, AnnotationSidebar will do it based on its currentFilePath prop (filePath)
+      // Only this file's annotations are fetched; AnnotationSidebar still filters by its currentFilePath prop
       setAnnotations(annotationResponse.annotations);
 
     } catch (err: any) {
@@ -104,7 +104,7 @@ const FileContentViewer: React.FC<FileContentViewerProps> = ({ repoName, filePat
       });
 
       // Refresh annotations after update by re-fetching all for the branch
-      const refreshedAnnotationResponse = await client.listAnnotations(repoName, feedbackBranch);
+      const refreshedAnnotationResponse = await client.listAnnotations(repoName, feedbackBranch, { file_path: filePath });
       setAnnotations(refreshedAnnotationResponse.annotations);
 
     } catch (err: any) {
@@ -1,11 +1,11 @@
-import React from 'react';
-import { type StructuredDiffFile, type WordDiffHunk, type WordDiffLine, type WordDiffSegment } from 'gitwrite-sdk';
+import React, { useMemo } from 'react';
+import { decodeCompactWordDiff, isCompactWordDiff, type CompactWordDiff, type StructuredDiffFile, type WordDiffHunk, type WordDiffLine, type WordDiffSegment } from 'gitwrite-sdk';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Alert, AlertDescription, AlertTitle } from '@/components/ui/alert';
 import { Skeleton } from '@/components/ui/skeleton';
 
 interface WordDiffDisplayProps {
-  diffData: StructuredDiffFile[] | null;
+  diffData: StructuredDiffFile[] | CompactWordDiff | null; // Compact diffs (word_format=compact) are decoded here
   isLoading: boolean;
   error: string | null;
   repoName?: string;
@@ -32,7 +32,19 @@ const renderWordSegments = (segments: WordDiffSegment[]): JSX.Element[] => {
   });
 };
 
-const WordDiffDisplay: React.FC<WordDiffDisplayProps> = ({ diffData, isLoading, error, repoName, ref1, ref2 }) => {
+// "old new" gutter text, e.g. "12 13" for context or "12   " for a deletion.
+const renderLineNumbers = (line: WordDiffLine): string => {
+  const oldNumber = line.old_lineno !== undefined ? String(line.old_lineno) : '';
+  const newNumber = line.new_lineno !== undefined ? String(line.new_lineno) : '';
+  return `${oldNumber.padStart(4)} ${newNumber.padStart(4)}`;
+};
+
+const WordDiffDisplay: React.FC<WordDiffDisplayProps> = ({ diffData: rawDiffData, isLoading, error, repoName, ref1, ref2 }) => {
+  const diffData = useMemo(
+    () => (isCompactWordDiff(rawDiffData) ? decodeCompactWordDiff(rawDiffData) : rawDiffData),
+    [rawDiffData]
+  );
+
   if (isLoading) {
     return (
       <Card>
@@ -66,6 +78,11 @@ const WordDiffDisplay: React.FC<WordDiffDisplayProps> = ({ diffData, isLoading,
     );
   }
 
+  // Diffs built from patch text (older servers) carry no line numbers.
+  const hasLineNumbers = diffData.some((fileDiff) =>
+    fileDiff.hunks.some((hunk) => hunk.lines.some((line) => line.old_lineno !== undefined || line.new_lineno !== undefined))
+  );
+
   return (
     <div className="space-y-6">
       {diffData.map((fileDiff, fileIndex) => (
@@ -98,7 +115,9 @@ const WordDiffDisplay: React.FC<WordDiffDisplayProps> = ({ diffData, isLoading,
               <div className="space-y-1 font-mono text-sm overflow-x-auto">
                 {fileDiff.hunks.map((hunk, hunkIndex) => (
                   <div key={hunkIndex} className="border-t border-border pt-2 mt-2 first:mt-0 first:border-t-0">
-                    {/* Could add hunk header info here if available and desired */}
+                    {hunk.header && (
+                      <div className="text-xs text-muted-foreground select-none">{hunk.header}</div>
+                    )}
                     {hunk.lines.map((line, lineIndex) => {
                       let lineClass = 'whitespace-pre-wrap break-all ';
                       let prefix = '';
@@ -118,6 +137,11 @@ const WordDiffDisplay: React.FC<WordDiffDisplayProps> = ({ diffData, isLoading,
 
                       return (
                         <div key={lineIndex} className={lineClass}>
+                          {hasLineNumbers && (
+                            <span className="inline-block w-20 select-none text-right pr-2 text-xs text-muted-foreground">
+                              {renderLineNumbers(line)}
+                            </span>
+                          )}
                           <span className="select-none">{prefix}</span>
                           {line.words && (line.type === 'addition' || line.type === 'deletion')
                             ? renderWordSegments(line.words)
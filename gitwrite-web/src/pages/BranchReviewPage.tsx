@@ -204,10 +204,19 @@ const BranchReviewPage: React.FC = () => {
               </Button>
               <CardTitle>Review & Cherry-Pick Commits</CardTitle>
             </div>
-            <Button variant="outline" size="sm" onClick={() => fetchReviewCommits(true)} disabled={isLoading}>
-              {isLoading && !cherryPickStatus.loading ? <Loader2 className="mr-2 h-4 w-4 animate-spin" /> : <RefreshCw className="mr-2 h-4 w-4" />}
-              Refresh List
-            </Button>
+            <div className="flex items-center space-x-2">
+              {branchName && (
+                <Button variant="outline" size="sm" asChild>
+                  <Link to={`/repository/${repoName}/compare/${encodeURIComponent(currentWorkingBranch)}/${encodeURIComponent(branchName)}?merge_base=true`}>
+                    <Eye className="mr-2 h-4 w-4" /> Changes Since Branching
+                  </Link>
+                </Button>
+              )}
+              <Button variant="outline" size="sm" onClick={() => fetchReviewCommits(true)} disabled={isLoading}>
+                {isLoading && !cherryPickStatus.loading ? <Loader2 className="mr-2 h-4 w-4 animate-spin" /> : <RefreshCw className="mr-2 h-4 w-4" />}
+                Refresh List
+              </Button>
+            </div>
           </div>
           <CardDescription>
             Reviewing commits from branch <span className="font-semibold">{branchName}</span> for integration into <span className="font-semibold">{currentWorkingBranch}</span>.
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
-import { useParams, useNavigate } from 'react-router-dom';
-import { GitWriteClient, type StructuredDiffFile, type CompareRefsResponse } from 'gitwrite-sdk';
+import { useParams, useNavigate, useSearchParams } from 'react-router-dom';
+import { GitWriteClient, type StructuredDiffFile, type CompactWordDiff, type CompareRefsResponse } from 'gitwrite-sdk';
 import WordDiffDisplay from '@/components/WordDiffDisplay';
 import { Button } from '@/components/ui/button';
 import { ArrowLeft } from 'lucide-react';
@@ -15,7 +15,10 @@ interface WordDiffViewerPageParams extends Record<string, string | undefined> {
 const WordDiffViewerPage: React.FC = () => {
   const { repoName, ref1, ref2 } = useParams<WordDiffViewerPageParams>();
   const navigate = useNavigate();
-  const [diffData, setDiffData] = useState<StructuredDiffFile[] | null>(null);
+  const [searchParams] = useSearchParams();
+  // ?merge_base=true shows only what ref2 changed since it branched from ref1
+  const mergeBase = searchParams.get('merge_base') === 'true';
+  const [diffData, setDiffData] = useState<StructuredDiffFile[] | CompactWordDiff | null>(null);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -39,7 +42,8 @@ const WordDiffViewerPage: React.FC = () => {
         client.setToken(token);
 
         // Assuming the API and SDK handle repoName contextually or it's part of baseURL setup
-        const response = await client.compareRefs({ ref1, ref2, diff_mode: 'word' });
+        // The compact encoding is several times smaller; WordDiffDisplay decodes it.
+        const response = await client.compareRefs({ ref1, ref2, diff_mode: 'word', word_format: 'compact', ...(mergeBase ? { merge_base: true } : {}) });
 
         // The CompareRefsResponse.patch_data can be string | StructuredDiffFile[]
         // We need to assert or check the type when diff_mode is 'word'
@@ -62,7 +66,7 @@ const WordDiffViewerPage: React.FC = () => {
     };
 
     fetchDiff();
-  }, [repoName, ref1, ref2, navigate]);
+  }, [repoName, ref1, ref2, mergeBase, navigate]);
 
   return (
     <div className="container mx-auto p-4">
@@ -80,7 +84,7 @@ const WordDiffViewerPage: React.FC = () => {
         <CardContent>
             <div className="mb-4 p-2 border rounded-md bg-muted">
                 <p className="text-sm text-muted-foreground">Comparing:</p>
-                <p className="font-mono text-xs">Base (Old): {ref1}</p>
+                <p className="font-mono text-xs">Base (Old): {mergeBase ? `merge base of ${ref1} and ${ref2}` : ref1}</p>
                 <p className="font-mono text-xs">Changed (New): {ref2}</p>
             </div>
             <WordDiffDisplay
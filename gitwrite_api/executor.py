@@ -0,0 +1,201 @@
+"""
+Bounded execution layer for blocking core calls.
+
+The routers are ``async def`` but the core functions block on libgit2,
+pandoc or git subprocesses. Calling them inline stalls the event loop, so
+routes dispatch them to one of two thread pools instead:
+
+* ``io``  - repository reads/writes (history walks, tree listing, commits).
+* ``cpu`` - heavy work such as exports and word-level diffs.
+
+Each pool caps the number of in-flight calls (running + queued); once the cap
+is reached new calls are rejected with 503 rather than piling up. Calls that
+exceed the pool timeout are answered with 504 (the worker thread itself cannot
+be interrupted and finishes in the background). Pool sizes, queue depths and
+timeouts are read from the environment:
+
+    GITWRITE_IO_WORKERS, GITWRITE_IO_QUEUE_DEPTH, GITWRITE_IO_TIMEOUT
+    GITWRITE_CPU_WORKERS, GITWRITE_CPU_QUEUE_DEPTH, GITWRITE_CPU_TIMEOUT
+
+Long exports can instead be submitted as background jobs
+(`get_export_job_queue`), sized by GITWRITE_EXPORT_WORKERS and
+GITWRITE_EXPORT_QUEUE_DEPTH. GITWRITE_EXPORT_LEASE_TIMEOUT sets how long
+another API worker waits before adopting the jobs of a stopped one.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from fastapi import HTTPException
+
+from gitwrite_core.cache_utils import float_from_env, int_from_env
+from gitwrite_core.exceptions import RepositoryLockTimeoutError
+from gitwrite_core.export_cache import ExportArtifactCache
+from gitwrite_core.export_jobs import (
+    DEFAULT_EXPORT_QUEUE_DEPTH,
+    DEFAULT_EXPORT_WORKERS,
+    DEFAULT_LEASE_TIMEOUT,
+    ExportJobQueue,
+)
+
+T = TypeVar("T")
+
+
+class BoundedExecutor:
+    """A thread pool with an in-flight cap, a per-call timeout and counters."""
+
+    def __init__(self, name: str, max_workers: int, max_queue_depth: int, timeout: Optional[float]):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "max_in_flight": 0,
+            "queue_wait_seconds_total": 0.0,
+            "run_seconds_total": 0.0,
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=f"gitwrite-{self.name}"
+                )
+            return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Runs `func(*args, **kwargs)` on the pool and awaits its result.
+
+        Raises:
+            HTTPException: 503 if the pool is saturated or a repository lock could
+                not be acquired in time, 504 if the call exceeds the pool timeout.
+            Exception: Whatever `func` raises is re-raised unchanged.
+        """
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue_depth:
+                self._metrics["rejected"] += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Server is busy ({self.name} pool saturated). Please retry shortly.",
+                )
+            self._in_flight += 1
+            self._metrics["submitted"] += 1
+            self._metrics["max_in_flight"] = max(self._metrics["max_in_flight"], self._in_flight)
+
+        enqueued_at = time.monotonic()
+
+        def _call() -> T:
+            started_at = time.monotonic()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                finished_at = time.monotonic()
+                with self._lock:
+                    self._metrics["queue_wait_seconds_total"] += started_at - enqueued_at
+                    self._metrics["run_seconds_total"] += finished_at - started_at
+
+        future = self._get_executor().submit(_call)
+        future.add_done_callback(self._on_done)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()  # Only succeeds if the call has not started yet
+            with self._lock:
+                self._metrics["timed_out"] += 1
+            raise HTTPException(
+                status_code=504,
+                detail=f"Operation timed out after {self.timeout} seconds.",
+            )
+        except RepositoryLockTimeoutError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
+    def _on_done(self, future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._metrics["failed"] += 1
+            else:
+                self._metrics["completed"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self._metrics,
+                in_flight=self._in_flight,
+                max_workers=self.max_workers,
+                max_queue_depth=self.max_queue_depth,
+            )
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_cpu_count = os.cpu_count() or 1
+
+io_executor = BoundedExecutor(
+    "io",
+    max_workers=int_from_env("GITWRITE_IO_WORKERS", min(32, _cpu_count + 4)),
+    max_queue_depth=int_from_env("GITWRITE_IO_QUEUE_DEPTH", 256),
+    timeout=float_from_env("GITWRITE_IO_TIMEOUT", 60.0),
+)
+
+cpu_executor = BoundedExecutor(
+    "cpu",
+    max_workers=int_from_env("GITWRITE_CPU_WORKERS", _cpu_count),
+    max_queue_depth=int_from_env("GITWRITE_CPU_QUEUE_DEPTH", 32),
+    timeout=float_from_env("GITWRITE_CPU_TIMEOUT", 300.0),
+)
+
+
+async def run_io(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs a blocking repository operation on the I/O pool."""
+    return await io_executor.run(func, *args, **kwargs)
+
+
+async def run_cpu(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs a CPU-heavy operation (exports, word diffs) on the CPU pool."""
+    return await cpu_executor.run(func, *args, **kwargs)
+
+
+def get_executor_metrics() -> Dict[str, Dict[str, Any]]:
+    return {"io": io_executor.metrics(), "cpu": cpu_executor.metrics()}
+
+
+_export_job_queues: Dict[str, ExportJobQueue] = {}
+_export_job_queues_lock = threading.Lock()
+
+
+def get_export_job_queue(store_path: str, artifact_cache: Optional[ExportArtifactCache] = None) -> ExportJobQueue:
+    """Returns the export job queue persisted at `store_path`, starting it on first use.
+
+    Starting the queue resumes any jobs whose owning process stopped.
+    `artifact_cache` is used by the queue's exports; it only applies when the
+    queue is first created.
+    """
+    with _export_job_queues_lock:
+        queue = _export_job_queues.get(store_path)
+        if queue is None:
+            queue = ExportJobQueue(
+                store_path,
+                max_workers=int_from_env("GITWRITE_EXPORT_WORKERS", DEFAULT_EXPORT_WORKERS),
+                max_queue_depth=int_from_env("GITWRITE_EXPORT_QUEUE_DEPTH", DEFAULT_EXPORT_QUEUE_DEPTH),
+                artifact_cache=artifact_cache,
+                lease_timeout=float_from_env("GITWRITE_EXPORT_LEASE_TIMEOUT", DEFAULT_LEASE_TIMEOUT),
+            )
+            _export_job_queues[store_path] = queue
+        return queue
+
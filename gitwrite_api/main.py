@@ -1,6 +1,43 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import Message, Receive, Scope, Send
 from .routers import auth, repository, uploads, annotations # Import the auth, repository, uploads and annotations routers
+from .executor import get_executor_metrics
+from gitwrite_core.locking import get_lock_metrics
+from gitwrite_core.diff_cache import get_diff_cache
+
+# Streamed responses must reach the client event by event; gzip would hold them
+# back until the stream ends (GZipResponder never flushes its GzipFile).
+STREAMED_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+class _StreamingSafeGZipResponder(GZipResponder):
+    """GZipResponder that passes streamed media types through uncompressed."""
+
+    passthrough = False
+
+    async def send_with_gzip(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            media_type = Headers(raw=message["headers"]).get("content-type", "").split(";")[0].strip()
+            self.passthrough = media_type in STREAMED_MEDIA_TYPES
+        if self.passthrough:
+            await self.send(message)
+        else:
+            await super().send_with_gzip(message)
+
+
+class StreamingSafeGZipMiddleware(GZipMiddleware):
+    """Compresses responses for clients that accept gzip, except server-sent events and NDJSON streams."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _StreamingSafeGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
 
 app = FastAPI(
     title="GitWrite API",
@@ -23,6 +60,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (diffs, file lists) for clients that send Accept-Encoding: gzip
+app.add_middleware(StreamingSafeGZipMiddleware, minimum_size=1024)
+
 # Include the authentication router
 app.include_router(auth.router)
 # Include the repository router
@@ -56,7 +96,10 @@ async def health_check():
             "api": "ok",
             "storage": "ok",
             "dependencies": "ok"
-        }
+        },
+        "executors": get_executor_metrics(),
+        "repository_locks": get_lock_metrics(),
+        "diff_cache": get_diff_cache().stats()
     }
     
     try:
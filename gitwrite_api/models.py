@@ -1,8 +1,8 @@
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Literal
 from enum import Enum
 from datetime import datetime
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class UserRole(str, Enum):
@@ -105,6 +105,7 @@ class EPUBExportResponse(BaseModel):
     message: str = Field(..., description="Detailed message about the export outcome.")
     # Initially, we'll return a server path. A download URL or job ID could be future enhancements.
     server_file_path: Optional[str] = Field(None, description="Server-side path to the generated EPUB file, present on success.")
+    cached: bool = Field(False, description="True when the EPUB was served from the export cache instead of being regenerated.")
     # download_url: Optional[str] = Field(None, description="A direct download URL for the EPUB file, if applicable.")
     # export_job_id: Optional[str] = Field(None, description="An ID for tracking an asynchronous export job, if applicable.")
 
@@ -122,6 +123,7 @@ class PDFExportResponse(BaseModel):
     status: str = Field(..., description="Outcome of the PDF export operation (e.g., 'success', 'error').")
     message: str = Field(..., description="Detailed message about the export outcome.")
     server_file_path: Optional[str] = Field(None, description="Server-side path to the generated PDF file, present on success.")
+    cached: bool = Field(False, description="True when the PDF was served from the export cache instead of being regenerated.")
 
 
 # Models for DOCX Export API Endpoints
@@ -135,6 +137,39 @@ class DOCXExportResponse(BaseModel):
     status: str = Field(..., description="Outcome of the DOCX export operation (e.g., 'success', 'error').")
     message: str = Field(..., description="Detailed message about the export outcome.")
     server_file_path: Optional[str] = Field(None, description="Server-side path to the generated DOCX file, present on success.")
+    cached: bool = Field(False, description="True when the DOCX was served from the export cache instead of being regenerated.")
+
+
+# Models for asynchronous export jobs
+
+class ExportJobRequest(BaseModel):
+    format: Optional[str] = Field(default=None, pattern=r"^(epub|pdf|docx)$", description="Export format: 'epub', 'pdf' or 'docx'. Give either this or 'formats'.")
+    formats: Optional[List[Literal["epub", "pdf", "docx"]]] = Field(default=None, min_length=1, description="Several formats to export in one job from a single assembly of the source. Give either this or 'format'.")
+    commit_ish: str = Field(default="HEAD", description="The commit-ish (e.g., commit hash, branch name, tag) to export from. Defaults to 'HEAD'.")
+    file_list: List[str] = Field(..., min_length=1, description="A list of paths to markdown files (relative to repo root) to include.")
+    output_filename: Optional[str] = Field(default=None, min_length=1, pattern=r"^[a-zA-Z0-9_.-]+$", description="Desired filename, which must end with the format's extension. Defaults to 'export.<format>'. With 'formats', its stem names every file.")
+    pdf_engine: Optional[str] = Field(default=None, description="PDF engine to use for format 'pdf' (e.g., 'pdflatex', 'xelatex'). Defaults to 'pdflatex'.")
+
+    @model_validator(mode="after")
+    def _one_of_format_or_formats(self) -> "ExportJobRequest":
+        if (self.format is None) == (self.formats is None):
+            raise ValueError("Give exactly one of 'format' and 'formats'.")
+        if self.formats is not None and len(set(self.formats)) != len(self.formats):
+            raise ValueError("'formats' must not repeat a format.")
+        return self
+
+class ExportJobResponse(BaseModel):
+    job_id: str = Field(..., description="ID of the export job, used to poll or cancel it.")
+    format: str = Field(..., description="Export format of the job.")
+    status: str = Field(..., description="Job state: 'queued', 'running', 'done', 'failed' or 'cancelled'.")
+    progress: float = Field(..., description="Progress between 0 and 1.")
+    message: Optional[str] = Field(None, description="Latest status message.")
+    error: Optional[str] = Field(None, description="Error message if the job failed.")
+    server_file_path: Optional[str] = Field(None, description="Server-side path to the generated file (the output directory for multi-format jobs), present once the job is done.")
+    server_file_paths: Optional[Dict[str, str]] = Field(None, description="Server-side path of each generated file by format, present once a multi-format job is done; for a failed job, the formats that were still written.")
+    created_at: float = Field(..., description="Submission time (Unix seconds).")
+    started_at: Optional[float] = Field(None, description="Time the export started (Unix seconds).")
+    finished_at: Optional[float] = Field(None, description="Time the job finished (Unix seconds).")
 
 
 # Models for Annotation Handling
@@ -189,6 +224,37 @@ class UpdateAnnotationStatusResponse(BaseModel):
     annotation: Annotation = Field(..., description="The full annotation object with its updated status.")
     message: str = Field(..., description="A message indicating the outcome of the status update.")
 
+MAX_ANNOTATION_BATCH_SIZE = 500
+
+class NewAnnotation(BaseModel):
+    file_path: str = Field(..., description="The relative path of the file in the repository that this annotation refers to.")
+    highlighted_text: str = Field(..., description="The specific text that was highlighted for annotation.")
+    start_line: int = Field(..., ge=0, description="The 0-indexed starting line number of the highlighted text.")
+    end_line: int = Field(..., ge=0, description="The 0-indexed ending line number of the highlighted text.")
+    comment: str = Field(..., description="The comment or note provided by the annotator.")
+    author: str = Field(..., description="The author of the annotation (e.g., username or email).")
+
+class BatchCreateAnnotationsRequest(BaseModel):
+    feedback_branch: str = Field(..., description="The name of the feedback branch where the annotations will be stored.")
+    annotations: List[NewAnnotation] = Field(..., min_length=1, max_length=MAX_ANNOTATION_BATCH_SIZE, description="The annotations to create, recorded in this order.")
+
+class BatchCreateAnnotationsResponse(BaseModel):
+    annotations: List[AnnotationResponse] = Field(..., description="The created annotations, in request order.")
+    count: int = Field(..., description="The number of annotations created.")
+
+class AnnotationStatusChange(BaseModel):
+    annotation_id: str = Field(..., description="The commit ID (SHA) of the original annotation to update.")
+    new_status: AnnotationStatus = Field(..., description="The new status for the annotation.")
+
+class BatchUpdateAnnotationStatusRequest(BaseModel):
+    feedback_branch: str = Field(..., description="The name of the feedback branch where the annotations exist.")
+    updates: List[AnnotationStatusChange] = Field(..., min_length=1, max_length=MAX_ANNOTATION_BATCH_SIZE, description="The status changes, applied in this order.")
+
+class BatchUpdateAnnotationStatusResponse(BaseModel):
+    commit_ids: List[str] = Field(..., description="The SHAs of the status update commits, in request order.")
+    annotations: List[Annotation] = Field(..., description="The current state of each updated annotation.")
+    message: str = Field(..., description="A message indicating the outcome of the status updates.")
+
 
 # --- API Request/Response Models for File Content ---
 
@@ -5,14 +5,20 @@ from gitwrite_api.models import (
     User, UserRole,
     CreateAnnotationRequest, AnnotationResponse, AnnotationListResponse,
     UpdateAnnotationStatusRequest, UpdateAnnotationStatusResponse, Annotation,
-    AnnotationStatus # Added AnnotationStatus
+    AnnotationStatus, # Added AnnotationStatus
+    BatchCreateAnnotationsRequest, BatchCreateAnnotationsResponse,
+    BatchUpdateAnnotationStatusRequest, BatchUpdateAnnotationStatusResponse,
 )
 from gitwrite_api.security import require_role, get_current_active_user
+from gitwrite_api.executor import run_io
 
 from gitwrite_core.annotations import (
     create_annotation_commit as core_create_annotation_commit,
+    create_annotation_commits as core_create_annotation_commits,
+    get_annotation as core_get_annotation,
     list_annotations as core_list_annotations,
-    update_annotation_status as core_update_annotation_status
+    update_annotation_status as core_update_annotation_status,
+    update_annotation_statuses as core_update_annotation_statuses,
     # get_annotation_by_original_id was assumed and is handled by a local helper _get_annotation_by_original_id_from_list
 )
 from gitwrite_core.exceptions import (
@@ -92,7 +98,7 @@ async def create_annotation(
             status=AnnotationStatus.NEW # Core will use this
         )
 
-        commit_sha = core_create_annotation_commit(
+        commit_sha = await run_io(core_create_annotation_commit,
             repo_path=repo_path, # Corrected: repo_path_str to repo_path
             feedback_branch=request_data.feedback_branch, # Corrected: feedback_branch_name to feedback_branch
             annotation_data=temp_annotation_obj # Corrected: annotation_obj to annotation_data
@@ -111,6 +117,8 @@ async def create_annotation(
         raise HTTPException(status_code=500, detail=f"Repository operation error: {str(e)}")
     except AnnotationError as e: # Generic annotation error from core
         raise HTTPException(status_code=400, detail=f"Annotation creation error: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         # Log this exception for debugging
         # logger.error(f"Unexpected error in create_annotation: {str(e)}", exc_info=True)
@@ -120,17 +128,35 @@ async def create_annotation(
 @router.get("", response_model=AnnotationListResponse)
 async def list_annotations(
     feedback_branch: str = Query(..., description="The name of the feedback branch from which to list annotations."),
+    file_path: Optional[str] = Query(None, description="Only return annotations on this file."),
+    status: Optional[AnnotationStatus] = Query(None, description="Only return annotations with this status."),
+    author: Optional[str] = Query(None, description="Only return annotations by this author."),
+    start_line: Optional[int] = Query(None, ge=0, description="Only return annotations ending at or after this line."),
+    end_line: Optional[int] = Query(None, ge=0, description="Only return annotations starting at or before this line."),
     current_user: User = Depends(require_role([UserRole.OWNER, UserRole.EDITOR, UserRole.WRITER, UserRole.BETA_READER]))
 ):
     """
-    Lists all annotations from a specified feedback branch.
+    Lists the annotations from a specified feedback branch.
+
+    The optional filters are combined; `start_line`/`end_line` select the
+    annotations overlapping that line range (e.g. the lines visible in an editor).
     """
     repo_path = PLACEHOLDER_REPO_PATH
 
+    if start_line is not None and end_line is not None and start_line > end_line:
+        raise HTTPException(status_code=400, detail="start_line must not be greater than end_line.")
+    filters = {
+        name: value for name, value in (
+            ("file_path", file_path), ("status", status), ("author", author),
+            ("start_line", start_line), ("end_line", end_line),
+        ) if value is not None
+    }
+
     try:
-        annotations_list = core_list_annotations(
+        annotations_list = await run_io(core_list_annotations,
             repo_path=repo_path, # Corrected: repo_path_str to repo_path
-            feedback_branch=feedback_branch # Corrected: feedback_branch_name to feedback_branch
+            feedback_branch=feedback_branch, # Corrected: feedback_branch_name to feedback_branch
+            **filters
         )
         # core_list_annotations returns List[Annotation]
 
@@ -148,6 +174,8 @@ async def list_annotations(
         raise HTTPException(status_code=500, detail=f"Repository operation error: {str(e)}")
     except AnnotationError as e: # Generic annotation error from core during listing
         raise HTTPException(status_code=500, detail=f"Annotation listing error: {str(e)}") # Potentially some malformed data
+    except HTTPException:
+        raise
     except Exception as e:
         # Log this exception
         # logger.error(f"Unexpected error in list_annotations: {str(e)}", exc_info=True)
@@ -158,16 +186,9 @@ async def _get_annotation_by_original_id_from_list(
     repo_path: str, feedback_branch: str, original_annotation_id: str
 ) -> Optional[Annotation]:
     """
-    Helper to find a specific annotation by its original ID after an update.
-    This simulates a more direct core.get_annotation_by_original_id if not available.
+    Helper to fetch a specific annotation by its original ID after an update.
     """
-    annotations = core_list_annotations(repo_path, feedback_branch)
-    for ann in annotations:
-        # The 'id' of an annotation is its original creation commit SHA.
-        # 'commit_id' is the SHA of the commit defining its current state.
-        if ann.id == original_annotation_id:
-            return ann
-    return None
+    return await run_io(core_get_annotation, repo_path, feedback_branch, original_annotation_id)
 
 
 @router.put("/{annotation_commit_id}", response_model=UpdateAnnotationStatusResponse)
@@ -184,7 +205,7 @@ async def update_annotation_status(
 
     try:
         # Core function returns the SHA of the status update commit.
-        update_commit_sha = core_update_annotation_status(
+        update_commit_sha = await run_io(core_update_annotation_status,
             repo_path=repo_path, # Corrected: repo_path_str to repo_path
             feedback_branch=request_data.feedback_branch, # Corrected: feedback_branch_name to feedback_branch
             annotation_commit_id=annotation_commit_id,
@@ -205,7 +226,7 @@ async def update_annotation_status(
 
         if not updated_annotation:
             # This case should ideally not happen if core_update_annotation_status succeeded
-            # and core_list_annotations is consistent.
+            # and the annotation index is consistent.
             # It might indicate an issue or a race condition if the annotation was deleted post-update but pre-fetch.
             raise HTTPException(
                 status_code=500, # This implies inconsistency
@@ -237,3 +258,96 @@ async def update_annotation_status(
         # Log this exception
         # logger.error(f"Unexpected error in update_annotation_status: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+
+@router.post("/batch", response_model=BatchCreateAnnotationsResponse, status_code=201)
+async def create_annotations_batch(
+    request_data: BatchCreateAnnotationsRequest,
+    current_user: User = Depends(require_role([UserRole.OWNER, UserRole.EDITOR, UserRole.WRITER, UserRole.BETA_READER]))
+):
+    """
+    Creates several annotations on a feedback branch in one request.
+
+    Each annotation gets its own commit, but the branch is updated once:
+    either all annotations are recorded or none is.
+    """
+    repo_path = PLACEHOLDER_REPO_PATH
+    annotations = [Annotation(**item.model_dump(), status=AnnotationStatus.NEW) for item in request_data.annotations]
+
+    try:
+        await run_io(core_create_annotation_commits,
+            repo_path=repo_path,
+            feedback_branch=request_data.feedback_branch,
+            annotations=annotations
+        )
+        # The core function sets id and commit_id on each annotation.
+        return BatchCreateAnnotationsResponse(
+            annotations=[AnnotationResponse(**annotation.model_dump()) for annotation in annotations],
+            count=len(annotations)
+        )
+
+    except RepositoryNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"Repository not found: {str(e)}")
+    except RepositoryOperationError as e:
+        raise HTTPException(status_code=500, detail=f"Repository operation error: {str(e)}")
+    except AnnotationError as e:
+        raise HTTPException(status_code=400, detail=f"Annotation creation error: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+
+@router.post("/batch/status", response_model=BatchUpdateAnnotationStatusResponse)
+async def update_annotation_statuses_batch(
+    request_data: BatchUpdateAnnotationStatusRequest,
+    current_user: User = Depends(require_role([UserRole.OWNER, UserRole.EDITOR]))
+):
+    """
+    Updates the status of several annotations with a single update of the feedback branch.
+
+    If any referenced annotation cannot be found, nothing is recorded.
+    """
+    repo_path = PLACEHOLDER_REPO_PATH
+    updates = [(change.annotation_id, change.new_status) for change in request_data.updates]
+
+    try:
+        commit_ids = await run_io(core_update_annotation_statuses,
+            repo_path=repo_path,
+            feedback_branch=request_data.feedback_branch,
+            updates=updates
+        )
+
+        # One listing (served from the annotation index) gives the new state of all updated annotations.
+        current = {
+            annotation.id: annotation for annotation in await run_io(core_list_annotations,
+                repo_path=repo_path,
+                feedback_branch=request_data.feedback_branch
+            )
+        }
+        updated_ids = list(dict.fromkeys(annotation_id for annotation_id, _ in updates))
+        missing = [annotation_id for annotation_id in updated_ids if annotation_id not in current]
+        if missing:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Annotations {', '.join(missing)} not found after status update."
+            )
+
+        return BatchUpdateAnnotationStatusResponse(
+            commit_ids=commit_ids,
+            annotations=[current[annotation_id] for annotation_id in updated_ids],
+            message=f"Updated the status of {len(updated_ids)} annotations in {len(commit_ids)} commits."
+        )
+
+    except HTTPException:
+        raise
+    except RepositoryNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"Repository not found: {str(e)}")
+    except RepositoryOperationError as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Repository operation error during status update: {str(e)}")
+    except AnnotationError as e:
+        raise HTTPException(status_code=400, detail=f"Annotation status update error: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
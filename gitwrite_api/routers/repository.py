@@ -1,13 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
+import asyncio
+from fastapi.responses import StreamingResponse
 from typing import Any, Dict, Optional, List, Union
 from pydantic import BaseModel, Field
 import datetime # For commit date serialization
+import json
 import pygit2 # Moved import to top
 from http import HTTPStatus # Moved to top
 
 # TODO: Make this configurable or dynamically determined per user/request
 PLACEHOLDER_REPO_PATH = "/tmp/gitwrite_repos_api"
 
+# Commit history pagination
+DEFAULT_COMMIT_PAGE_SIZE = 50
+MAX_COMMIT_PAGE_SIZE = 500
+
 # Import core functions
 from gitwrite_core.repository import (
     list_branches, list_tags, list_commits, save_and_commit_file,
@@ -18,11 +25,14 @@ from gitwrite_core.repository import (
     get_repository_metadata as core_get_repository_metadata,
     list_repository_tree as core_list_repository_tree
 )
+from gitwrite_core.commit_index import search_commits as core_search_commits
 from gitwrite_core.versioning import (
     get_branch_review_commits as core_get_branch_review_commits,
     cherry_pick_commit as core_cherry_pick_commit
 )
 
+from ..executor import run_io, run_cpu
+
 # Import security dependency (assuming path based on project structure)
 from ..security import get_current_active_user, require_role # Actual import
 from ..models import User, UserRole, FileContentResponse # Import the canonical User model and UserRole
@@ -45,10 +55,18 @@ from gitwrite_core.exceptions import (
     RemoteNotFoundError as CoreRemoteNotFoundError,
     FetchError as CoreFetchError,
     PushError as CorePushError,
-    FileNotFoundInCommitError as CoreFileNotFoundInCommitError
+    FileNotFoundInCommitError as CoreFileNotFoundInCommitError,
+    InvalidCursorError as CoreInvalidCursorError
 )
 from gitwrite_core.branching import merge_branch_into_current
-from gitwrite_core.versioning import get_diff as core_get_diff, get_word_level_diff as core_get_word_level_diff
+from gitwrite_core.versioning import get_diff as core_get_diff
+from gitwrite_core.versioning import (
+    list_diff_files as core_list_diff_files,
+    get_diff_stats as core_get_diff_stats,
+    get_file_diff as core_get_file_diff,
+    stream_diff_files as core_stream_diff_files
+)
+from gitwrite_core.versioning import get_file_history as core_get_file_history
 from gitwrite_core.tagging import create_tag as core_create_tag
 from gitwrite_core.exceptions import TagAlreadyExistsError as CoreTagAlreadyExistsError
 
@@ -70,6 +88,15 @@ from ..models import EPUBExportRequest, EPUBExportResponse
 # Models for PDF and DOCX Export APIs
 from ..models import PDFExportRequest, PDFExportResponse, DOCXExportRequest, DOCXExportResponse
 
+# Asynchronous export jobs
+from ..models import ExportJobRequest, ExportJobResponse
+from ..executor import get_export_job_queue
+from gitwrite_core.cache_utils import int_from_env
+from gitwrite_core.export_cache import DEFAULT_EXPORT_DIRS_MAX_BYTES, get_export_artifact_cache, prune_export_dirs
+from gitwrite_core.export_jobs import (
+    FINAL_JOB_STATES, JOB_DONE, ExportJobNotFoundError, ExportQueueFullError,
+)
+
 
 router = APIRouter(
     prefix="/repository",
@@ -104,6 +131,24 @@ class CommitListResponse(BaseModel):
     status: str
     commits: List[CommitDetail]
     message: str
+    next_cursor: Optional[str] = None
+
+class CommitSearchResponse(BaseModel):
+    status: str
+    commits: List[CommitDetail]
+    message: str
+    next_offset: Optional[int] = None
+    source: Optional[str] = None
+
+class FileHistoryCommit(CommitDetail):
+    path: str = Field(..., description="Path of the file at this commit.")
+    change_type: str = Field(..., description="'added', 'modified', 'deleted', 'renamed' or 'type_changed'.")
+    old_path: Optional[str] = Field(None, description="Previous path when the file was renamed in this commit.")
+
+class FileHistoryResponse(BaseModel):
+    file_path: str
+    commits: List[FileHistoryCommit]
+    next_cursor: Optional[str] = None
 
 class BranchCreateRequest(BaseModel):
     branch_name: str = Field(..., min_length=1, description="Name of the branch to create.")
@@ -135,7 +180,51 @@ class CompareRefsResponse(BaseModel):
     ref2_oid: str = Field(..., description="Resolved OID of the second reference.")
     ref1_display_name: str = Field(..., description="Display name for the first reference.")
     ref2_display_name: str = Field(..., description="Display name for the second reference.")
-    patch_text: Union[str, List[Dict[str, Any]]] = Field(..., description="The diff/patch output, either as a raw string or a structured list of dictionaries for word-level diff.")
+    patch_text: Union[str, List[Dict[str, Any]], Dict[str, Any]] = Field(..., description="The diff/patch output, either as a raw string or a structured list of dictionaries for word-level diff (an object with word_format=compact).")
+
+class CompareFileSummary(BaseModel):
+    file_path: str
+    change_type: str = Field(..., description="'added', 'deleted', 'modified', 'renamed' or 'copied'.")
+    old_file_path: Optional[str] = None
+    new_file_path: Optional[str] = None
+    is_binary: bool = False
+    lines_added: int
+    lines_deleted: int
+    words_added: int
+    words_deleted: int
+
+class CompareTotals(BaseModel):
+    files_changed: int
+    lines_added: int
+    lines_deleted: int
+    words_added: int
+    words_deleted: int
+
+class CompareFilesResponse(BaseModel):
+    ref1_oid: str
+    ref2_oid: str
+    ref1_display_name: str
+    ref2_display_name: str
+    files: List[CompareFileSummary]
+    totals: CompareTotals
+
+class CompareStatsResponse(BaseModel):
+    ref1_oid: str
+    ref2_oid: str
+    ref1_display_name: str
+    ref2_display_name: str
+    totals: CompareTotals
+
+class CompareFileDiff(CompareFileSummary):
+    patch_text: Optional[str] = Field(None, description="Patch text of the file (text mode).")
+    word_diff: Optional[Dict[str, Any]] = Field(None, description="Structured word diff of the file (word mode).")
+
+class CompareFileResponse(BaseModel):
+    ref1_oid: str
+    ref2_oid: str
+    ref1_display_name: str
+    ref2_display_name: str
+    file: CompareFileDiff
 
 class RevertCommitRequest(BaseModel):
     commit_ish: str = Field(..., min_length=1, description="The commit reference (hash, branch, tag) to revert.")
@@ -226,31 +315,100 @@ async def api_list_branches(
 ):
     # Resolve repo_name to the actual repository path
     repo_path = str(Path(PLACEHOLDER_REPO_PATH) / "gitwrite_user_repos" / repo_name)
-    result = list_branches(repo_path_str=repo_path)
+    result = await run_io(list_branches, repo_path_str=repo_path)
     return handle_core_response(result)
 
 @router.get("/tags", response_model=TagListResponse)
 async def api_list_tags(current_user: User = Depends(get_current_active_user)):
     repo_path = PLACEHOLDER_REPO_PATH
-    result = list_tags(repo_path_str=repo_path)
+    result = await run_io(list_tags, repo_path_str=repo_path)
     return handle_core_response(result)
 
 @router.get("/{repo_name}/commits", response_model=CommitListResponse)
 async def api_list_commits(
     repo_name: str,
     branch_name: Optional[str] = Query(None, description="Name of the branch to list commits from. Defaults to current HEAD."),
-    max_count: Optional[int] = Query(None, description="Maximum number of commits to return.", gt=0),
+    max_count: Optional[int] = Query(None, description="Maximum number of commits to return. Superseded by 'limit'.", gt=0),
+    cursor: Optional[str] = Query(None, description="Opaque 'next_cursor' from a previous page to continue from."),
+    limit: Optional[int] = Query(None, description="Page size (newest commits first).", gt=0, le=MAX_COMMIT_PAGE_SIZE),
     current_user: User = Depends(get_current_active_user)
 ):
     # Resolve repo_name to the actual repository path
     repo_path = str(Path(PLACEHOLDER_REPO_PATH) / "gitwrite_user_repos" / repo_name)
-    result = list_commits(
+    page_size = limit or max_count
+    if page_size is None and cursor:
+        page_size = DEFAULT_COMMIT_PAGE_SIZE
+    result = await run_io(list_commits,
+        repo_path_str=repo_path,
+        branch_name=branch_name,
+        max_count=page_size,
+        cursor=cursor
+    )
+    return handle_core_response(result)
+
+def _to_unix_seconds(value: Optional[datetime.datetime]) -> Optional[int]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return int(value.timestamp())
+
+@router.get("/{repo_name}/commits/search", response_model=CommitSearchResponse)
+async def api_search_commits(
+    repo_name: str,
+    branch_name: Optional[str] = Query(None, description="Branch to search. Defaults to current HEAD."),
+    author: Optional[str] = Query(None, description="Case-insensitive substring of the author name or email."),
+    since: Optional[datetime.datetime] = Query(None, description="Only commits authored at or after this time."),
+    until: Optional[datetime.datetime] = Query(None, description="Only commits authored at or before this time."),
+    q: Optional[str] = Query(None, description="Case-insensitive text to find in the commit message."),
+    path: Optional[str] = Query(None, description="Only commits that changed this file or directory."),
+    limit: int = Query(DEFAULT_COMMIT_PAGE_SIZE, description="Page size (newest commits first).", gt=0, le=MAX_COMMIT_PAGE_SIZE),
+    offset: int = Query(0, description="Number of matching commits to skip ('next_offset' of the previous page).", ge=0),
+    current_user: User = Depends(get_current_active_user)
+):
+    repo_path = str(Path(PLACEHOLDER_REPO_PATH) / "gitwrite_user_repos" / repo_name)
+    result = await run_io(core_search_commits,
         repo_path_str=repo_path,
         branch_name=branch_name,
-        max_count=max_count
+        author=author,
+        since=_to_unix_seconds(since),
+        until=_to_unix_seconds(until),
+        message_contains=q,
+        path=path,
+        limit=limit,
+        offset=offset
     )
     return handle_core_response(result)
 
+@router.get("/{repo_name}/file-history", response_model=FileHistoryResponse)
+async def api_get_file_history(
+    repo_name: str,
+    file_path: str = Query(..., description="Repository-relative path of the file."),
+    cursor: Optional[str] = Query(None, description="Opaque 'next_cursor' from a previous page to continue from."),
+    limit: int = Query(DEFAULT_COMMIT_PAGE_SIZE, description="Page size (newest commits first).", gt=0, le=MAX_COMMIT_PAGE_SIZE),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Lists the commits that changed a file, newest first, following renames."""
+    repo_path = str(Path(PLACEHOLDER_REPO_PATH) / "gitwrite_user_repos" / repo_name)
+    try:
+        history = await run_io(core_get_file_history,
+            repo_path_str=repo_path,
+            file_path=file_path,
+            limit=limit,
+            cursor=cursor
+        )
+        return FileHistoryResponse(**history)
+    except CoreInvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CoreRepositoryNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CoreGitWriteError as e:
+        raise HTTPException(status_code=500, detail=f"File history failed: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred during file history: {str(e)}")
+
 @router.post("/{repo_name}/save", response_model=SaveFileResponse)
 async def api_save_file(
     repo_name: str,
@@ -261,7 +419,7 @@ async def api_save_file(
     repo_path = str(Path(PLACEHOLDER_REPO_PATH) / "gitwrite_user_repos" / repo_name)
     user_email = current_user.email if hasattr(current_user, 'email') else "defaultuser@example.com"
     user_name = current_user.username if hasattr(current_user, 'username') else "Default User"
-    result = save_and_commit_file(
+    result = await run_io(save_and_commit_file,
         repo_path_str=repo_path,
         file_path=save_request.file_path,
         content=save_request.content,
@@ -297,7 +455,7 @@ async def api_create_branch(
     # Resolve repo_name to the actual repository path
     repo_path = str(Path(PLACEHOLDER_REPO_PATH) / "gitwrite_user_repos" / repo_name)
     try:
-        result = create_and_switch_branch(
+        result = await run_io(create_and_switch_branch,
             repo_path_str=repo_path,
             branch_name=request_data.branch_name
         )
@@ -315,6 +473,8 @@ async def api_create_branch(
         raise HTTPException(status_code=500, detail="Repository configuration error.")
     except CoreGitWriteError as e:
         raise HTTPException(status_code=500, detail=f"Failed to create branch: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
@@ -327,7 +487,7 @@ async def api_switch_branch(
     # Resolve repo_name to the actual repository path
     repo_path = str(Path(PLACEHOLDER_REPO_PATH) / "gitwrite_user_repos" / repo_name)
     try:
-        result = switch_to_branch(
+        result = await run_io(switch_to_branch,
             repo_path_str=repo_path,
             branch_name=request_data.branch_name
         )
@@ -356,6 +516,8 @@ async def api_switch_branch(
         if "local changes overwrite" in str(e).lower() or "unstaged changes" in str(e).lower():
             raise HTTPException(status_code=409, detail=f"Switch failed: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Failed to switch branch: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
@@ -368,7 +530,7 @@ async def api_merge_branch(
     # Resolve repo_name to the actual repository path
     repo_path = str(Path(PLACEHOLDER_REPO_PATH) / "gitwrite_user_repos" / repo_name)
     try:
-        result = merge_branch_into_current(
+        result = await run_io(merge_branch_into_current,
             repo_path_str=repo_path,
             branch_to_merge_name=request_data.source_branch
         )
@@ -411,30 +573,123 @@ async def api_merge_branch(
             raise HTTPException(status_code=409, detail=cleaned_detail_payload)
         else:
             raise HTTPException(status_code=400, detail=f"Merge operation failed: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during merge: {str(e)}")
 
-@router.get("/compare", response_model=CompareRefsResponse)
+def _compare_error(e: Exception) -> HTTPException:
+    """Maps core compare errors to HTTP errors."""
+    if isinstance(e, (CoreCommitNotFoundError, CoreFileNotFoundInCommitError)):
+        return HTTPException(status_code=404, detail=str(e))
+    if isinstance(e, (CoreNotEnoughHistoryError, ValueError)):
+        return HTTPException(status_code=400, detail=str(e))
+    if isinstance(e, CoreRepositoryNotFoundError):
+        return HTTPException(status_code=500, detail="Repository configuration error.")
+    if isinstance(e, CoreGitWriteError):
+        return HTTPException(status_code=500, detail=f"Compare operation failed: {str(e)}")
+    return HTTPException(status_code=500, detail=f"An unexpected error occurred during compare: {str(e)}")
+
+
+def _encode_compare_event(event: str, data: Dict[str, Any], stream_format: str) -> str:
+    payload = json.dumps(data, separators=(",", ":"))
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return json.dumps({"event": event, "data": data}, separators=(",", ":")) + "\n"
+
+
+async def _stream_compare(refs: Dict[str, str], files, stream_format: str, word_mode: bool):
+    """Emits 'meta', then one 'file' event per changed file as it is diffed, then 'end' (or 'error')."""
+    run = run_cpu if word_mode else run_io
+    yield _encode_compare_event("meta", refs, stream_format)
+    count = 0
+    try:
+        while True:
+            file_diff = await run(next, files, None)
+            if file_diff is None:
+                break
+            count += 1
+            yield _encode_compare_event("file", file_diff, stream_format)
+    except HTTPException as e:
+        yield _encode_compare_event("error", {"message": str(e.detail), "files_sent": count}, stream_format)
+        return
+    except Exception as e:
+        yield _encode_compare_event("error", {"message": _compare_error(e).detail, "files_sent": count}, stream_format)
+        return
+    yield _encode_compare_event("end", {"files_sent": count}, stream_format)
+
+
+@router.get("/compare", response_model=Union[CompareRefsResponse, CompareFilesResponse, CompareStatsResponse])
 async def api_compare_refs(
     ref1: Optional[str] = Query(None, description="The first reference (e.g., commit hash, branch, tag). Defaults to HEAD~1."),
     ref2: Optional[str] = Query(None, description="The second reference (e.g., commit hash, branch, tag). Defaults to HEAD."),
     diff_mode: Optional[str] = Query(None, description="Set to 'word' for word-level diff."),
+    mode: Optional[str] = Query(None, description="'full' (default) returns the whole diff; 'files' returns the changed files with line/word counts (fetch each file from /compare/file); 'stats' returns only the totals; 'stream' streams the diff file by file."),
+    stream_format: str = Query("ndjson", description="Format of mode=stream: 'ndjson' or 'sse'."),
+    path: Optional[List[str]] = Query(None, description="Restrict the comparison to these files, directories or globs (repeatable)."),
+    merge_base: bool = Query(False, description="Compare from the merge base of ref1 and ref2 ('three-dot' compare): only the changes made on ref2 since it branched from ref1."),
+    word_format: str = Query("full", description="Encoding of the word diff in mode=full: 'full' (nested objects) or 'compact' (columnar, several times smaller)."),
     current_user: User = Depends(get_current_active_user)
 ):
     repo_path = PLACEHOLDER_REPO_PATH
+    scope: Dict[str, Any] = {"paths": path} if path else {}
+    if merge_base:
+        scope["merge_base"] = True
+    mode = mode or "full"
+    if mode not in ("full", "files", "stats", "stream"):
+        raise HTTPException(status_code=400, detail=f"Invalid compare mode '{mode}'. Use 'full', 'files', 'stats' or 'stream'.")
+    if stream_format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail=f"Invalid stream format '{stream_format}'. Use 'ndjson' or 'sse'.")
+    if word_format not in ("full", "compact"):
+        raise HTTPException(status_code=400, detail=f"Invalid word format '{word_format}'. Use 'full' or 'compact'.")
     try:
-        diff_result = core_get_diff(
-            repo_path_str=repo_path,
-            ref1_str=ref1,
-            ref2_str=ref2
-        )
+        if mode == "files":
+            return CompareFilesResponse(**await run_io(core_list_diff_files,
+                repo_path_str=repo_path,
+                ref1_str=ref1,
+                ref2_str=ref2,
+                **scope
+            ))
+        if mode == "stats":
+            stats = await run_io(core_get_diff_stats,
+                repo_path_str=repo_path,
+                ref1_str=ref1,
+                ref2_str=ref2,
+                **scope
+            )
+            return CompareStatsResponse(**{k: v for k, v in stats.items() if k != "files"})
+        if mode == "stream":
+            refs, files = await run_io(core_stream_diff_files,
+                repo_path_str=repo_path,
+                ref1_str=ref1,
+                ref2_str=ref2,
+                include_word_diff=diff_mode == 'word',
+                **scope
+            )
+            return StreamingResponse(
+                _stream_compare(refs, files, stream_format, diff_mode == 'word'),
+                media_type="text/event-stream" if stream_format == "sse" else "application/x-ndjson",
+            )
+
         diff_output: Union[str, List[Dict[str, Any]]]
         if diff_mode == 'word':
-            if diff_result["patch_text"]:
-                diff_output = core_get_word_level_diff(diff_result["patch_text"])
-            else:
-                diff_output = []
+            # Word diffs are CPU bound on a cache miss; cached results return immediately.
+            diff_result = await run_cpu(core_get_diff,
+                repo_path_str=repo_path,
+                ref1_str=ref1,
+                ref2_str=ref2,
+                include_word_diff=True,
+                **scope,
+                **({"compact_word_diff": True} if word_format == "compact" else {})
+            )
+            diff_output = diff_result["word_diff"]
         else:
+            diff_result = await run_io(core_get_diff,
+                repo_path_str=repo_path,
+                ref1_str=ref1,
+                ref2_str=ref2,
+                **scope
+            )
             diff_output = diff_result["patch_text"]
         return CompareRefsResponse(
             ref1_oid=diff_result["ref1_oid"],
@@ -443,18 +698,37 @@ async def api_compare_refs(
             ref2_display_name=diff_result["ref2_display_name"],
             patch_text=diff_output
         )
-    except CoreCommitNotFoundError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except CoreNotEnoughHistoryError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except CoreRepositoryNotFoundError:
-        raise HTTPException(status_code=500, detail="Repository configuration error.")
-    except CoreGitWriteError as e:
-        raise HTTPException(status_code=500, detail=f"Compare operation failed: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred during compare: {str(e)}")
+        raise _compare_error(e)
+
+@router.get("/compare/file", response_model=CompareFileResponse)
+async def api_compare_file(
+    path: str = Query(..., min_length=1, description="Repository-relative path of a changed file."),
+    ref1: Optional[str] = Query(None, description="The first reference. Defaults to HEAD~1."),
+    ref2: Optional[str] = Query(None, description="The second reference. Defaults to HEAD."),
+    diff_mode: Optional[str] = Query(None, description="Set to 'word' for word-level diff."),
+    merge_base: bool = Query(False, description="Compare from the merge base of ref1 and ref2, as for /compare."),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Returns the diff of one file, e.g. one listed by /compare?mode=files."""
+    repo_path = PLACEHOLDER_REPO_PATH
+    run = run_cpu if diff_mode == 'word' else run_io
+    scope = {"merge_base": True} if merge_base else {}
+    try:
+        return CompareFileResponse(**await run(core_get_file_diff,
+            repo_path_str=repo_path,
+            file_path=path,
+            ref1_str=ref1,
+            ref2_str=ref2,
+            include_word_diff=diff_mode == 'word',
+            **scope
+        ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _compare_error(e)
 
 @router.post("/revert", response_model=RevertCommitResponse)
 async def api_revert_commit(
@@ -463,7 +737,7 @@ async def api_revert_commit(
 ):
     repo_path = PLACEHOLDER_REPO_PATH
     try:
-        result = core_revert_commit(
+        result = await run_io(core_revert_commit,
             repo_path_str=repo_path,
             commit_ish_to_revert=request_data.commit_ish
         )
@@ -487,6 +761,8 @@ async def api_revert_commit(
         if "Cannot revert commit" in str(e) and "no parents" in str(e):
              raise HTTPException(status_code=400, detail=str(e))
         raise HTTPException(status_code=400, detail=f"Revert operation failed: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during revert: {str(e)}")
 
@@ -497,7 +773,7 @@ async def api_sync_repository(
 ):
     repo_path = PLACEHOLDER_REPO_PATH
     try:
-        result = core_sync_repository(
+        result = await run_io(core_sync_repository,
             repo_path_str=repo_path,
             remote_name=request_data.remote_name,
             branch_name_opt=request_data.branch_name,
@@ -538,6 +814,8 @@ async def api_sync_repository(
         raise HTTPException(status_code=503, detail=f"Push operation failed: {str(e)}")
     except CoreGitWriteError as e:
         raise HTTPException(status_code=400, detail=f"Sync operation failed: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during sync: {str(e)}")
 
@@ -562,7 +840,7 @@ async def api_create_tag(
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Unexpected error creating tagger signature: {str(e)}")
     try:
-        result = core_create_tag(
+        result = await run_io(core_create_tag,
             repo_path_str=repo_path,
             tag_name=request_data.tag_name,
             target_commit_ish=request_data.commit_ish,
@@ -585,6 +863,8 @@ async def api_create_tag(
         raise HTTPException(status_code=500, detail="Repository configuration error.")
     except CoreGitWriteError as e:
         raise HTTPException(status_code=400, detail=f"Tag creation failed: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during tag creation: {str(e)}")
 
@@ -592,7 +872,7 @@ async def api_create_tag(
 async def api_list_ignore_patterns(current_user: User = Depends(get_current_active_user)):
     repo_path = PLACEHOLDER_REPO_PATH
     try:
-        result = core_list_gitignore_patterns(repo_path_str=repo_path)
+        result = await run_io(core_list_gitignore_patterns, repo_path_str=repo_path)
         if not isinstance(result, dict):
             raise ValueError(f"Core function core_list_gitignore_patterns returned non-dict: {type(result)}")
         if 'status' not in result:
@@ -629,7 +909,7 @@ async def api_list_repositories(
         for item_name in os.listdir(user_repos_base_dir):
             item_path = user_repos_base_dir / item_name
             if item_path.is_dir():
-                metadata_dict = core_get_repository_metadata(item_path)
+                metadata_dict = await run_io(core_get_repository_metadata, item_path)
                 if metadata_dict:
                     try:
                         repo_list_item = RepositoryListItem(**metadata_dict)
@@ -638,6 +918,8 @@ async def api_list_repositories(
                         pass
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"Error accessing repository storage: {e}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected server error occurred while listing repositories: {e}")
     return RepositoriesListResponse(repositories=repo_items, count=len(repo_items))
@@ -655,7 +937,7 @@ async def api_get_file_content(
     repo_path = PLACEHOLDER_REPO_PATH
     try:
         # Core function now returns a dict on success, or raises specific exceptions on failure.
-        content_details = core_get_file_content_at_commit(
+        content_details = await run_io(core_get_file_content_at_commit,
             repo_path_str=repo_path,
             file_path=file_path,
             commit_sha_str=commit_sha
@@ -681,11 +963,23 @@ async def api_get_file_content(
         raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e))
     except CoreGitWriteError as e: # Catch other specific core errors
         raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         # Fallback for any other unexpected errors not caught above.
         # Log this error for review: logger.error(f"Unexpected error in api_get_file_content: {e}", exc_info=True)
         raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=f"An unexpected server error occurred: {str(e)}")
 
+def _export_artifact_cache():
+    return get_export_artifact_cache(str(Path(PLACEHOLDER_REPO_PATH) / "exports" / "artifacts"))
+
+
+def _prune_export_dirs():
+    """Keeps the per-request exports/<uuid> directories within GITWRITE_EXPORT_DIRS_MAX_BYTES."""
+    prune_export_dirs(str(Path(PLACEHOLDER_REPO_PATH) / "exports"),
+                      int_from_env("GITWRITE_EXPORT_DIRS_MAX_BYTES", DEFAULT_EXPORT_DIRS_MAX_BYTES))
+
+
 @router.post("/export/epub", response_model=EPUBExportResponse)
 async def api_export_to_epub(
     request_data: EPUBExportRequest,
@@ -703,22 +997,25 @@ async def api_export_to_epub(
         job_export_dir.mkdir(exist_ok=True)
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"Could not create unique export job directory: {str(e)}")
+    await run_io(_prune_export_dirs)
     actual_output_filename = request_data.output_filename if request_data.output_filename else "export.epub"
     output_epub_server_path = job_export_dir / actual_output_filename
     from gitwrite_core.export import export_to_epub
     from gitwrite_core.exceptions import PandocError, FileNotFoundInCommitError
     try:
-        result = export_to_epub(
+        result = await run_cpu(export_to_epub,
             repo_path_str=repo_path_str,
             commit_ish_str=request_data.commit_ish,
             file_list=request_data.file_list,
-            output_epub_path_str=str(output_epub_server_path.resolve())
+            output_epub_path_str=str(output_epub_server_path.resolve()),
+            artifact_cache=_export_artifact_cache()
         )
         if result["status"] == "success":
             return EPUBExportResponse(
                 status="success",
                 message=result["message"],
-                server_file_path=str(output_epub_server_path.resolve())
+                server_file_path=str(output_epub_server_path.resolve()),
+                cached=result.get("cached", False)
             )
         else:
             raise HTTPException(status_code=500, detail=result.get("message", "EPUB export failed due to an unknown core error."))
@@ -735,6 +1032,8 @@ async def api_export_to_epub(
             raise HTTPException(status_code=400, detail=f"EPUB conversion failed: {str(e)}")
     except CoreGitWriteError as e:
         raise HTTPException(status_code=400, detail=f"EPUB export failed due to a GitWrite core error: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected server error occurred during EPUB export: {str(e)}")
 
@@ -755,6 +1054,7 @@ async def api_export_to_pdf(
         job_export_dir.mkdir(exist_ok=True)
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"Could not create unique export job directory: {str(e)}")
+    await run_io(_prune_export_dirs)
     actual_output_filename = request_data.output_filename if request_data.output_filename else "export.pdf"
     output_pdf_server_path = job_export_dir / actual_output_filename
     from gitwrite_core.export import export_to_pdf
@@ -765,18 +1065,20 @@ async def api_export_to_pdf(
         if request_data.pdf_engine:
             pandoc_options['extra_args'] = ['--standalone', f'--pdf-engine={request_data.pdf_engine}']
         
-        result = export_to_pdf(
+        result = await run_cpu(export_to_pdf,
             repo_path_str=repo_path_str,
             commit_ish_str=request_data.commit_ish,
             file_list=request_data.file_list,
             output_pdf_path_str=str(output_pdf_server_path.resolve()),
+            artifact_cache=_export_artifact_cache(),
             **pandoc_options
         )
         if result["status"] == "success":
             return PDFExportResponse(
                 status="success",
                 message=result["message"],
-                server_file_path=str(output_pdf_server_path.resolve())
+                server_file_path=str(output_pdf_server_path.resolve()),
+                cached=result.get("cached", False)
             )
         else:
             raise HTTPException(status_code=500, detail=result.get("message", "PDF export failed due to an unknown core error."))
@@ -795,6 +1097,8 @@ async def api_export_to_pdf(
             raise HTTPException(status_code=400, detail=f"PDF conversion failed: {str(e)}")
     except CoreGitWriteError as e:
         raise HTTPException(status_code=400, detail=f"PDF export failed due to a GitWrite core error: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected server error occurred during PDF export: {str(e)}")
 
@@ -815,22 +1119,25 @@ async def api_export_to_docx(
         job_export_dir.mkdir(exist_ok=True)
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"Could not create unique export job directory: {str(e)}")
+    await run_io(_prune_export_dirs)
     actual_output_filename = request_data.output_filename if request_data.output_filename else "export.docx"
     output_docx_server_path = job_export_dir / actual_output_filename
     from gitwrite_core.export import export_to_docx
     from gitwrite_core.exceptions import PandocError, FileNotFoundInCommitError
     try:
-        result = export_to_docx(
+        result = await run_cpu(export_to_docx,
             repo_path_str=repo_path_str,
             commit_ish_str=request_data.commit_ish,
             file_list=request_data.file_list,
-            output_docx_path_str=str(output_docx_server_path.resolve())
+            output_docx_path_str=str(output_docx_server_path.resolve()),
+            artifact_cache=_export_artifact_cache()
         )
         if result["status"] == "success":
             return DOCXExportResponse(
                 status="success",
                 message=result["message"],
-                server_file_path=str(output_docx_server_path.resolve())
+                server_file_path=str(output_docx_server_path.resolve()),
+                cached=result.get("cached", False)
             )
         else:
             raise HTTPException(status_code=500, detail=result.get("message", "DOCX export failed due to an unknown core error."))
@@ -847,9 +1154,167 @@ async def api_export_to_docx(
             raise HTTPException(status_code=400, detail=f"DOCX conversion failed: {str(e)}")
     except CoreGitWriteError as e:
         raise HTTPException(status_code=400, detail=f"DOCX export failed due to a GitWrite core error: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected server error occurred during DOCX export: {str(e)}")
 
+EXPORT_JOB_POLL_INTERVAL = 0.5  # Seconds between job state checks in the events stream
+
+
+def _export_job_queue():
+    return get_export_job_queue(str(Path(PLACEHOLDER_REPO_PATH) / "exports" / "export-jobs.sqlite3"),
+                                artifact_cache=_export_artifact_cache())
+
+
+def _get_permitted_export_job(queue, job_id: str, user: User) -> Dict[str, Any]:
+    """Returns the job if `user` requested it or is an owner or editor.
+
+    Raises ExportJobNotFoundError otherwise, so other users' job IDs cannot be probed.
+    """
+    job = queue.get(job_id)
+    if job["requested_by"] != user.username and not {UserRole.OWNER, UserRole.EDITOR} & set(user.roles or []):
+        raise ExportJobNotFoundError(f"Export job '{job_id}' not found.")
+    return job
+
+
+def _export_job_response(job: Dict[str, Any]) -> ExportJobResponse:
+    return ExportJobResponse(
+        job_id=job["id"],
+        format=job["format"],
+        status=job["status"],
+        progress=job["progress"],
+        message=job["message"],
+        error=job["error"],
+        server_file_path=job["output_path"] if job["status"] == JOB_DONE else None,
+        server_file_paths=job["params"].get("outputs" if job["status"] == JOB_DONE else "written_outputs"),
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+    )
+
+
+@router.post("/export/jobs", response_model=ExportJobResponse, status_code=202)
+async def api_submit_export_job(
+    request_data: ExportJobRequest,
+    current_user: User = Depends(require_role([UserRole.OWNER, UserRole.EDITOR, UserRole.WRITER, UserRole.BETA_READER]))
+):
+    """
+    Queues an EPUB, PDF or DOCX export and returns the job at once.
+
+    With 'formats' instead of 'format', one job produces every listed format
+    from a single assembly of the source, converting them concurrently.
+
+    Poll GET /repository/export/jobs/{job_id} (or subscribe to its /events
+    stream) until the job is 'done', then use its server_file_path (or
+    server_file_paths for several formats).
+    """
+    pdf_options: Dict[str, Any] = {}
+    if request_data.pdf_engine:
+        pdf_options["extra_args"] = ["--standalone", f"--pdf-engine={request_data.pdf_engine}"]
+    if request_data.format is not None:
+        output_filename = request_data.output_filename or f"export.{request_data.format}"
+        if not output_filename.endswith(f".{request_data.format}"):
+            raise HTTPException(status_code=400, detail=f"output_filename must end with '.{request_data.format}'.")
+
+    job_export_dir = Path(PLACEHOLDER_REPO_PATH) / "exports" / str(uuid.uuid4())
+    try:
+        job_export_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Could not create export job directory: {str(e)}")
+    await run_io(_prune_export_dirs)
+    try:
+        queue = await run_io(_export_job_queue)
+        if request_data.formats is not None:
+            stem = Path(request_data.output_filename).stem if request_data.output_filename else "export"
+            job = await run_io(queue.submit_formats,
+                outputs={export_format: str((job_export_dir / f"{stem}.{export_format}").resolve())
+                         for export_format in request_data.formats},
+                repo_path=PLACEHOLDER_REPO_PATH,
+                commit_ish=request_data.commit_ish,
+                file_list=request_data.file_list,
+                output_dir=str(job_export_dir.resolve()),
+                options={"pdf": pdf_options} if pdf_options and "pdf" in request_data.formats else {},
+                requested_by=current_user.username
+            )
+        else:
+            job = await run_io(queue.submit,
+                export_format=request_data.format,
+                repo_path=PLACEHOLDER_REPO_PATH,
+                commit_ish=request_data.commit_ish,
+                file_list=request_data.file_list,
+                output_path=str((job_export_dir / output_filename).resolve()),
+                options=pdf_options if request_data.format == "pdf" else {},
+                requested_by=current_user.username
+            )
+    except ExportQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except CoreGitWriteError as e:
+        raise HTTPException(status_code=500, detail=f"Could not queue export job: {str(e)}")
+    return _export_job_response(job)
+
+
+@router.get("/export/jobs/{job_id}", response_model=ExportJobResponse)
+async def api_get_export_job(
+    job_id: str,
+    current_user: User = Depends(require_role([UserRole.OWNER, UserRole.EDITOR, UserRole.WRITER, UserRole.BETA_READER]))
+):
+    """Returns the state and progress of an export job.
+
+    Only the user who submitted the job, owners and editors can see it; others get a 404.
+    """
+    try:
+        queue = await run_io(_export_job_queue)
+        return _export_job_response(await run_io(_get_permitted_export_job, queue, job_id, current_user))
+    except ExportJobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+async def _stream_export_job(queue, job: Dict[str, Any]):
+    """Emits a 'job' event whenever the job's state changes, until it finishes."""
+    last = None
+    while True:
+        event = _export_job_response(job).model_dump()
+        if event != last:
+            yield _encode_compare_event("job", event, "sse")
+            last = event
+        if job["status"] in FINAL_JOB_STATES:
+            return
+        await asyncio.sleep(EXPORT_JOB_POLL_INTERVAL)
+        job = await run_io(queue.get, job["id"])
+
+
+@router.get("/export/jobs/{job_id}/events")
+async def api_export_job_events(
+    job_id: str,
+    current_user: User = Depends(require_role([UserRole.OWNER, UserRole.EDITOR, UserRole.WRITER, UserRole.BETA_READER]))
+):
+    """Server-sent events with the job's state, sent on every change until it finishes."""
+    try:
+        queue = await run_io(_export_job_queue)
+        job = await run_io(_get_permitted_export_job, queue, job_id, current_user)
+    except ExportJobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return StreamingResponse(_stream_export_job(queue, job), media_type="text/event-stream")
+
+
+@router.delete("/export/jobs/{job_id}", response_model=ExportJobResponse)
+async def api_cancel_export_job(
+    job_id: str,
+    current_user: User = Depends(require_role([UserRole.OWNER, UserRole.EDITOR, UserRole.WRITER, UserRole.BETA_READER]))
+):
+    """Cancels an export job. Finished jobs are returned unchanged.
+
+    Only the user who submitted the job, owners and editors can cancel it; others get a 404.
+    """
+    try:
+        queue = await run_io(_export_job_queue)
+        await run_io(_get_permitted_export_job, queue, job_id, current_user)
+        return _export_job_response(await run_io(queue.cancel, job_id))
+    except ExportJobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.get("/review/{branch_name}", response_model=BranchReviewResponse)
 async def api_review_branch_commits(
     branch_name: str,
@@ -858,7 +1323,7 @@ async def api_review_branch_commits(
 ):
     repo_path = PLACEHOLDER_REPO_PATH
     try:
-        commits_list_core = core_get_branch_review_commits(
+        commits_list_core = await run_io(core_get_branch_review_commits,
             repo_path_str=repo_path,
             branch_name_to_review=branch_name,
             limit=limit
@@ -879,6 +1344,8 @@ async def api_review_branch_commits(
         if "HEAD is unborn" in str(e):
             raise HTTPException(status_code=400, detail=f"Cannot review branch: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to review branch commits: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
@@ -889,7 +1356,7 @@ async def api_cherry_pick_commit(
 ):
     repo_path = PLACEHOLDER_REPO_PATH
     try:
-        result = core_cherry_pick_commit(
+        result = await run_io(core_cherry_pick_commit,
             repo_path_str=repo_path,
             commit_oid_to_pick=request_data.commit_id,
             mainline=request_data.mainline
@@ -918,6 +1385,8 @@ async def api_cherry_pick_commit(
            "bare repository" in error_detail:
             raise HTTPException(status_code=400, detail=error_detail)
         raise HTTPException(status_code=400, detail=f"Cherry-pick operation failed: {error_detail}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during cherry-pick: {str(e)}")
 
@@ -942,7 +1411,7 @@ async def api_initialize_repository(
         raise HTTPException(status_code=500, detail=f"Could not create base repository directory: {e}")
     core_project_name_arg = request_data.project_name if request_data.project_name else None
     core_path_str_arg = str(repo_base_path) if request_data.project_name else str(repo_path_to_initialize_at)
-    result = core_initialize_repository(
+    result = await run_io(core_initialize_repository,
         path_str=core_path_str_arg,
         project_name=core_project_name_arg
     )
@@ -975,7 +1444,7 @@ async def api_add_ignore_pattern(
     if not pattern:
         raise HTTPException(status_code=400, detail="Pattern cannot be empty.")
     try:
-        result = core_add_pattern_to_gitignore(
+        result = await run_io(core_add_pattern_to_gitignore,
             repo_path_str=repo_path,
             pattern=pattern
         )
@@ -1021,7 +1490,7 @@ async def api_list_repository_tree(
     repo_path = str(Path(PLACEHOLDER_REPO_PATH) / "gitwrite_user_repos" / repo_name)
     
     try:
-        result = core_list_repository_tree(
+        result = await run_io(core_list_repository_tree,
             repo_path_str=repo_path,
             ref=ref,
             path=path
@@ -1045,5 +1514,7 @@ async def api_list_repository_tree(
             
     except CoreRepositoryNotFoundError as e:
         raise HTTPException(status_code=500, detail=f"Repository configuration error: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
@@ -15,6 +15,8 @@ from ..models import (
     User  # Assuming User model is needed for auth
 )
 
+from ..executor import run_io
+
 # Import security dependency (adjust path if necessary)
 from ..security import get_current_user # Placeholder for actual current user dependency
 
@@ -149,6 +151,14 @@ async def initiate_file_upload(
     )
 
 
+def _write_upload_to_disk(uploaded_file: UploadFile, temp_file_path: Path):
+    """Streams an uploaded file to disk, returning its resolved path and size."""
+    with open(temp_file_path, "wb") as buffer:
+        shutil.copyfileobj(uploaded_file.file, buffer)
+    saved_path = temp_file_path.resolve()
+    return saved_path, saved_path.stat().st_size
+
+
 @session_upload_router.put("/upload-session/{upload_id}")
 async def handle_file_upload(
     upload_id: str,
@@ -197,13 +207,12 @@ async def handle_file_upload(
     temp_file_path_obj = Path(TEMP_UPLOAD_DIR) / temp_file_name # Use Path object for operations
 
     try:
-        with open(temp_file_path_obj, "wb") as buffer:
-            shutil.copyfileobj(uploaded_file.file, buffer)
-
-        # Resolve the path and get its size after successful save
-        saved_temp_file_abs_path = temp_file_path_obj.resolve()
-        uploaded_size = saved_temp_file_abs_path.stat().st_size
+        saved_temp_file_abs_path, uploaded_size = await run_io(
+            _write_upload_to_disk, uploaded_file, temp_file_path_obj
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
         # Clean up partial file if error occurs
         if temp_file_path_obj.exists(): # Use Path object here
@@ -334,7 +343,7 @@ async def complete_file_upload(
     # core_save_files is now imported at the top of the module.
     # from gitwrite_core.exceptions import RepositoryNotFoundError as CoreRepositoryNotFoundError # if specific handling needed
 
-    core_result = core_save_files(
+    core_result = await run_io(core_save_files,
         repo_path_str=repo_path_str,
         files_to_commit=files_to_commit_map,
         commit_message=commit_message,
@@ -12,6 +12,7 @@ from gitwrite_core.repository import initialize_repository, add_pattern_to_gitig
 from gitwrite_core.tagging import create_tag
 from gitwrite_core.repository import sync_repository # Added for sync
 from gitwrite_core.versioning import get_commit_history, get_diff, revert_commit, save_changes # Added save_changes
+from gitwrite_core.versioning import get_file_history
 from gitwrite_core.branching import ( # Updated for merge
     create_and_switch_branch,
     list_branches,
@@ -37,6 +38,7 @@ from gitwrite_core.exceptions import (
     BranchNotFoundError as CoreBranchNotFoundError, # Added for review command
     CommitNotFoundError, # Added for cherry-pick
     PandocError, # Added for EPUB export
+    PartialExportError,
     FileNotFoundInCommitError # Added for EPUB export
 )
 from gitwrite_core.versioning import get_commit_history, get_diff, revert_commit, save_changes, get_branch_review_commits, cherry_pick_commit # Added get_branch_review_commits and cherry_pick_commit
@@ -171,18 +173,23 @@ def save(message, include_paths):
 
 # ... (rest of the file remains unchanged) ...
 @cli.command()
+@click.argument("file_path", required=False, default=None)
 @click.option("-n", "--number", "count", type=int, default=None, help="Number of saves to show (default: all).")
-def history(count):
+def history(file_path, count):
     """View your writing journey - all the saves you've made.
     
     Examples:
       gitwrite history              # Show all your progress
       gitwrite history -n 10        # Show last 10 saves
+      gitwrite history chapter-03.md  # Show only saves that touched one file
     
     This shows:
       - When you saved each version
       - What you were working on (your save messages)
       - Who made the changes (useful for collaboration)
+
+    With a file, renames are followed so earlier saves under the file's old
+    name are included too.
     """
     try:
         # Discover repository path first
@@ -191,6 +198,10 @@ def history(count):
             click.echo("Error: Not a Git repository (or any of the parent directories).", err=True)
             return
 
+        if file_path:
+            _show_file_history(repo_path_str, file_path, count)
+            return
+
         # Call the core function
         commits = get_commit_history(repo_path_str, count)
 
@@ -234,6 +245,43 @@ def history(count):
     except Exception as e:
         click.echo(f"An unexpected error occurred during history: {e}", err=True)
 
+def _show_file_history(repo_path_str: str, file_path: str, count):
+    """Prints the saves that touched `file_path` (relative to the current directory)."""
+    from datetime import datetime
+    from rich.table import Table
+    from rich.text import Text
+
+    workdir = pygit2.Repository(repo_path_str).workdir
+    if workdir is None:
+        click.echo("Error: Cannot show file history in a bare repository.", err=True)
+        return
+    relative_path = Path(os.path.relpath(Path(file_path).absolute(), workdir)).as_posix()
+    if relative_path.startswith("../"):
+        click.echo(f"Error: '{file_path}' is outside the repository.", err=True)
+        return
+
+    result = get_file_history(repo_path_str, relative_path, limit=count)
+    if not result["commits"]:
+        click.echo(f"No history found for '{relative_path}'.")
+        return
+
+    table = Table(title=f"History of {relative_path}")
+    table.add_column("Commit", style="cyan", no_wrap=True)
+    table.add_column("Author", style="magenta")
+    table.add_column("Date", style="green")
+    table.add_column("Change", style="yellow")
+    table.add_column("Message", style="white")
+    for commit_data in result["commits"]:
+        date_str = datetime.fromtimestamp(commit_data["author_date"]).astimezone().strftime('%Y-%m-%d %H:%M:%S %z')
+        change = commit_data["change_type"]
+        if change == "renamed":
+            change = f"renamed from {commit_data['old_path']}"
+        message_short = commit_data["message"].splitlines()[0] if commit_data["message"] else ""
+        table.add_row(commit_data["sha"][:7], commit_data["author_name"], date_str, change,
+                      Text(message_short, overflow="ellipsis"))
+    Console().print(table)
+
+
 @cli.command()
 def status():
     """Show what's happening in your writing project right now.
@@ -604,7 +652,10 @@ def merge_command(branch_name):
 @cli.command()
 @click.argument("ref1_str", metavar="VERSION1", required=False, default=None)
 @click.argument("ref2_str", metavar="VERSION2", required=False, default=None)
-def compare(ref1_str, ref2_str):
+@click.option("-p", "--path", "paths", multiple=True, help="Only compare this file, directory or glob (repeatable).")
+@click.option("--since-branch", "since_branch", default=None, metavar="BRANCH",
+              help="Show only what changed since the version branched off BRANCH.")
+def compare(ref1_str, ref2_str, paths, since_branch):
     """See what changed between different versions of your work.
     
     Examples:
@@ -612,6 +663,10 @@ def compare(ref1_str, ref2_str):
       gitwrite compare main alternate-ending  # Compare two versions
       gitwrite compare HEAD~2 HEAD           # Compare with 2 saves ago
       gitwrite compare v1.0 v2.0             # Compare tagged versions
+      gitwrite compare v1.0 v2.0 -p chapter3.md  # Only one chapter
+      gitwrite compare -p drafts/ -p '*.txt'  # Only some files
+      gitwrite compare --since-branch main    # What this branch changed since leaving main
+      gitwrite compare --since-branch main alternate-ending
     
     This shows:
       - Lines that were added (in green)
@@ -646,7 +701,14 @@ def compare(ref1_str, ref2_str):
         #     click.echo("Error: Cannot compare in a bare repository.", err=True)
         #     return
 
-        diff_data = get_diff(repo_path_str, ref1_str, ref2_str)
+        if since_branch:
+            if ref2_str is not None:
+                click.echo("Error: --since-branch takes at most one version to compare.", err=True)
+                return
+            # Diff from the merge base of BRANCH and VERSION1 (default: HEAD) to VERSION1
+            diff_data = get_diff(repo_path_str, since_branch, ref1_str, paths=list(paths) or None, merge_base=True)
+        else:
+            diff_data = get_diff(repo_path_str, ref1_str, ref2_str, paths=list(paths) or None)
 
         patch_text = diff_data["patch_text"]
         display_ref1 = diff_data["ref1_display_name"]
@@ -1676,5 +1738,96 @@ def export_docx(ctx, output_path_str: str, commit_ish: str, repo_path: str, file
         ctx.exit(1)
 
 
+
+@export.command("all")
+@click.option("-o", "--output-dir", "output_dir_str", type=click.Path(file_okay=False, writable=True), required=True, help="Directory to save the exported files in.")
+@click.option("-n", "--name", "base_name", default="export", show_default=True, help="File name (without extension) for every format.")
+@click.option("-f", "--format", "formats", type=click.Choice(["epub", "pdf", "docx"]), multiple=True, help="Format to produce; repeat for several. Defaults to EPUB, PDF and DOCX.")
+@click.option("-c", "--commit", "commit_ish", default="HEAD", help="Commit-ish (commit, branch, tag) to export from. Defaults to HEAD.")
+@click.option("--pdf-engine", default="pdflatex", help="PDF engine to use (pdflatex, xelatex, lualatex). Defaults to pdflatex.")
+@click.argument("repo_path", type=click.Path(exists=True, file_okay=False, dir_okay=True, readable=True))
+@click.argument("files", nargs=-1, type=click.Path(exists=False, dir_okay=False), required=True)
+@click.pass_context
+def export_all(ctx, output_dir_str: str, base_name: str, formats: tuple[str, ...], commit_ish: str, pdf_engine: str,
+               repo_path: str, files: tuple[str, ...]):
+    """Create EPUB, PDF and DOCX versions of your work in one go.
+    
+    Examples:
+      gitwrite export all -o release . chapter1.md chapter2.md
+      gitwrite export all -o release -n MyNovel --commit v1.0 . drafts/*.md
+      gitwrite export all -o release -f epub -f docx . novel/*.md
+    
+    Your files are read and combined once and the formats are then
+    converted side by side, so this is faster than exporting each
+    format separately. Files are saved as NAME.epub, NAME.pdf and
+    NAME.docx in the output directory.
+    
+    Requirements:
+      - Pandoc must be installed on your system
+      - A LaTeX distribution for the PDF (see 'gitwrite export pdf')
+    
+    FILES arguments are paths to markdown files relative to the repository root.
+    """
+    if not files:
+        click.echo("Error: At least one markdown file must be specified for export.", err=True)
+        ctx.exit(1)
+        return
+
+    selected_formats = list(dict.fromkeys(formats)) or ["epub", "pdf", "docx"]
+    output_dir = Path(output_dir_str)
+    outputs = {export_format: str(output_dir / f"{base_name}.{export_format}") for export_format in selected_formats}
+
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        from gitwrite_core.export import export_formats
+
+        pandoc_options = {}
+        if pdf_engine:
+            pandoc_options['pdf'] = {'extra_args': ['--standalone', f'--pdf-engine={pdf_engine}']}
+
+        result = export_formats(
+            repo_path_str=repo_path,
+            commit_ish_str=commit_ish,
+            file_list=list(files),
+            outputs=outputs,
+            pandoc_options=pandoc_options
+        )
+
+        for format_result in result["results"].values():
+            click.echo(click.style(format_result["message"], fg="green"))
+        click.echo(f"Finished in {result['metrics']['total_seconds']:.1f}s.")
+
+    except RepositoryNotFoundError as e:
+        click.echo(f"Error: Not a Git repository (or any of the parent directories): {e}", err=True)
+        ctx.exit(1)
+    except CommitNotFoundError as e:
+        click.echo(f"Error: Commit '{commit_ish}' not found: {e}", err=True)
+        ctx.exit(1)
+    except FileNotFoundInCommitError as e:
+        click.echo(f"Error: File not found in commit '{commit_ish}': {e}", err=True)
+        ctx.exit(1)
+    except PandocError as e:
+        if isinstance(e, PartialExportError):
+            for format_result in e.results.values():
+                if format_result["status"] == "success":
+                    click.echo(click.style(format_result["message"], fg="green"))
+        click.echo(f"Error during export: {e}", err=True)
+        if "Pandoc not found" in str(e):
+            click.echo("Hint: Please ensure Pandoc is installed and accessible in your system's PATH.", err=True)
+        elif "pdflatex not found" in str(e) or "LaTeX" in str(e):
+            click.echo(f"Hint: Please ensure a LaTeX distribution is installed for the '{pdf_engine}' engine.", err=True)
+        ctx.exit(1)
+    except GitWriteError as e:
+        click.echo(f"Error during export: {e}", err=True)
+        ctx.exit(1)
+    except OSError as e:
+        click.echo(f"Error creating output directory '{output_dir_str}': {e}", err=True)
+        ctx.exit(1)
+    except Exception as e:
+        click.echo(f"An unexpected error occurred during export: {e}", err=True)
+        ctx.exit(1)
+
+
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,339 @@
+"""Persistent index of the annotations recorded on feedback branches.
+
+Annotations live as commits on a feedback branch (see `gitwrite_core.annotations`),
+and a status update is a later commit pointing back at the annotation it
+changes. Reading the current state therefore means folding the whole branch
+history. This index keeps the folded state in a SQLite database at
+``<gitdir>/gitwrite/annotation-index.sqlite3``: one row per annotation and
+feedback branch, plus the branch tip the rows were last brought up to date
+with.
+
+Like the commit index, it is maintained incrementally: when a feedback branch
+has moved forward only the commits after the last indexed tip are read and
+folded in. If the branch was rewritten so that the old tip is no longer an
+ancestor, its rows are dropped and rebuilt from the full history. A missing,
+corrupt or outdated database file is recreated. When the index cannot be used
+(read-only gitdir, database locked by another writer), callers can fold the
+history into an in-memory index instead (``db_path=MEMORY_DB_PATH``).
+
+For filtered queries, `AnnotationIntervalIndex` indexes the current state of
+a branch per file by line range; built indexes are kept in a small LRU keyed
+by the branch tip (`get_interval_index_cache`).
+"""
+import bisect
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+import pygit2
+
+from .exceptions import GitWriteError
+
+INDEX_DIR_NAME = "gitwrite"
+INDEX_FILE_NAME = "annotation-index.sqlite3"
+MEMORY_DB_PATH = ":memory:"
+SCHEMA_VERSION = 1
+_CONNECT_TIMEOUT = 5.0  # Seconds to wait for another writer before giving up
+DEFAULT_INTERVAL_INDEX_CACHE_SIZE = 32  # Feedback branch states (per repository and tip)
+
+# Annotation fields stored as columns, in addition to the bookkeeping ones.
+ANNOTATION_FIELDS = ("file_path", "highlighted_text", "start_line", "end_line", "comment", "author", "status")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS branches (
+    name TEXT PRIMARY KEY,
+    tip TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS annotations (
+    branch TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    commit_id TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    highlighted_text TEXT NOT NULL,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    comment TEXT NOT NULL,
+    author TEXT NOT NULL,
+    status TEXT NOT NULL,
+    original_annotation_id TEXT,
+    PRIMARY KEY (branch, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS annotations_by_position ON annotations (branch, position);
+"""
+
+_COLUMNS = ("id", "commit_id") + ANNOTATION_FIELDS + ("original_annotation_id",)
+_INSERT = (
+    f"INSERT INTO annotations (branch, position, {', '.join(_COLUMNS)}) "
+    f"VALUES (?, ?, {', '.join('?' for _ in _COLUMNS)})"
+)
+# A status update replaces the state of its annotation but keeps its place in the listing.
+_UPSERT = _INSERT + " ON CONFLICT (branch, id) DO UPDATE SET " + ", ".join(
+    f"{column} = excluded.{column}" for column in _COLUMNS[1:]
+)
+_INSERT_IF_NEW = _INSERT + " ON CONFLICT (branch, id) DO NOTHING"
+
+# Only one thread per process rebuilds a given index at a time; SQLite's own
+# locking serialises writers from other processes.
+_rebuild_guard = threading.Lock()
+
+# Reads the annotation data from a commit message; returns None for commits
+# that are not (valid) annotations.
+MessageParser = Callable[[str], Optional[Dict[str, Any]]]
+
+
+class AnnotationIndexUnavailableError(GitWriteError):
+    """Raised when the on-disk annotation index cannot be opened or updated."""
+    pass
+
+
+def annotation_index_path_for(repo: pygit2.Repository) -> str:
+    """Returns the location of the annotation index database for `repo`."""
+    return os.path.join(repo.path, INDEX_DIR_NAME, INDEX_FILE_NAME)
+
+
+class AnnotationIndex:
+    """A handle on one repository's annotation index database.
+
+    `parse_message` turns an annotation commit message into a dict with the
+    `ANNOTATION_FIELDS` and an optional 'original_annotation_id' (set on
+    status updates), or None if the commit is not an annotation.
+    """
+
+    def __init__(self, repo: pygit2.Repository, parse_message: MessageParser, db_path: Optional[str] = None):
+        self.repo = repo
+        self.parse_message = parse_message
+        self.db_path = db_path or annotation_index_path_for(repo)
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.db_path == MEMORY_DB_PATH:
+            return self._open_checked()
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = self._open_checked()
+        except sqlite3.OperationalError as e:  # Locked or read-only; the file itself is fine
+            raise AnnotationIndexUnavailableError(f"Cannot open annotation index '{self.db_path}': {e}") from e
+        except sqlite3.DatabaseError:
+            # Corrupt file or one written by an incompatible version: start over.
+            with _rebuild_guard:
+                self._remove_database()
+                try:
+                    conn = self._open_checked()
+                except sqlite3.Error as e:
+                    raise AnnotationIndexUnavailableError(f"Cannot open annotation index '{self.db_path}': {e}") from e
+        except OSError as e:
+            raise AnnotationIndexUnavailableError(f"Cannot create annotation index '{self.db_path}': {e}") from e
+        return conn
+
+    def _open_checked(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=_CONNECT_TIMEOUT, isolation_level=None)
+        try:
+            conn.row_factory = sqlite3.Row
+            if self.db_path != MEMORY_DB_PATH:
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is None:
+                conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+            elif row['value'] != str(SCHEMA_VERSION):
+                raise sqlite3.DatabaseError(f"Unsupported annotation index schema version {row['value']}.")
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    def _remove_database(self) -> None:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(self.db_path + suffix)
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "AnnotationIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def indexed_tip(self, ref_name: str) -> Optional[str]:
+        row = self._conn.execute("SELECT tip FROM branches WHERE name = ?", (ref_name,)).fetchone()
+        return row['tip'] if row else None
+
+    def refresh(self, ref_name: str, tip: pygit2.Oid) -> int:
+        """Brings `ref_name` up to date with `tip`; returns the number of commits newly read.
+
+        Raises:
+            AnnotationIndexUnavailableError: If the database is locked or read-only.
+        """
+        tip_hex = str(tip)
+        if self.indexed_tip(ref_name) == tip_hex:
+            return 0
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                read = self._refresh_locked(ref_name, tip, tip_hex)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            raise AnnotationIndexUnavailableError(f"Cannot update annotation index for '{ref_name}': {e}") from e
+        return read
+
+    def _refresh_locked(self, ref_name: str, tip: pygit2.Oid, tip_hex: str) -> int:
+        old_tip = self.indexed_tip(ref_name)  # Re-read: another writer may have refreshed it meanwhile
+        if old_tip == tip_hex:
+            return 0
+
+        walker = self.repo.walk(tip, pygit2.GIT_SORT_TOPOLOGICAL | pygit2.GIT_SORT_REVERSE)
+        if old_tip is not None:
+            old_oid = pygit2.Oid(hex=old_tip)
+            if old_oid in self.repo and self.repo.descendant_of(tip, old_oid):
+                walker.hide(old_oid)  # Fast-forward: only the new commits are folded in
+            else:
+                self._conn.execute("DELETE FROM annotations WHERE branch = ?", (ref_name,))
+
+        row = self._conn.execute("SELECT MAX(position) FROM annotations WHERE branch = ?", (ref_name,)).fetchone()
+        position = (row[0] or 0)
+        read = 0
+        for commit in walker:  # Oldest first, so updates are applied after what they update
+            read += 1
+            data = self.parse_message(commit.message)
+            if data is None:
+                continue
+            commit_sha = str(commit.id)
+            original_id = data.get("original_annotation_id") or None
+            position += 1
+            values = (ref_name, position, original_id or commit_sha, commit_sha,
+                      *(data[field] for field in ANNOTATION_FIELDS), original_id)
+            # An original annotation never overrides an update of it that was already seen.
+            self._conn.execute(_UPSERT if original_id else _INSERT_IF_NEW, values)
+
+        self._conn.execute("INSERT OR REPLACE INTO branches (name, tip) VALUES (?, ?)", (ref_name, tip_hex))
+        return read
+
+    def annotations(self, ref_name: str) -> List[Dict[str, Any]]:
+        """Returns the current state of every annotation on `ref_name`, oldest first.
+
+        The branch must have been refreshed first.
+        """
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM annotations WHERE branch = ? ORDER BY position"
+        try:
+            return [dict(row) for row in self._conn.execute(sql, (ref_name,))]
+        except sqlite3.Error as e:
+            raise AnnotationIndexUnavailableError(f"Cannot query annotation index: {e}") from e
+
+    def annotation(self, ref_name: str, annotation_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the current state of one annotation on `ref_name`, or None."""
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM annotations WHERE branch = ? AND id = ?"
+        try:
+            row = self._conn.execute(sql, (ref_name, annotation_id)).fetchone()
+        except sqlite3.Error as e:
+            raise AnnotationIndexUnavailableError(f"Cannot query annotation index: {e}") from e
+        return dict(row) if row else None
+
+
+T = TypeVar("T")
+
+
+class AnnotationIntervalIndex(Generic[T]):
+    """Static per-file interval index over annotations' `start_line`/`end_line`.
+
+    Each file's annotations are sorted by start line, alongside the running
+    maximum of their end lines. A query for lines ``[start, end]`` only scans
+    the annotations between the first one whose running maximum reaches
+    `start` and the last one starting at or before `end`.
+    """
+
+    def __init__(self, annotations: Sequence[T]):
+        self.annotations = list(annotations)
+        self._files: Dict[str, Tuple[List[int], List[int], List[Tuple[int, int]]]] = {}
+        grouped: Dict[str, List[Tuple[int, int, int]]] = {}
+        for position, annotation in enumerate(self.annotations):
+            start, end = annotation.start_line, annotation.end_line
+            grouped.setdefault(annotation.file_path, []).append((start, max(start, end), position))
+        for file_path, intervals in grouped.items():
+            intervals.sort()
+            starts = [start for start, _, _ in intervals]
+            max_ends: List[int] = []
+            for _, end, _ in intervals:
+                max_ends.append(max(end, max_ends[-1]) if max_ends else end)
+            self._files[file_path] = (starts, max_ends, [(end, position) for _, end, position in intervals])
+
+    def overlapping(self, file_path: Optional[str] = None, start_line: Optional[int] = None,
+                    end_line: Optional[int] = None) -> List[T]:
+        """Returns the annotations on `file_path` (all files if None) overlapping the line range.
+
+        Either bound may be omitted. Results keep the order of the annotations
+        the index was built from.
+        """
+        files = [file_path] if file_path is not None else list(self._files)
+        positions: List[int] = []
+        for name in files:
+            entry = self._files.get(name)
+            if entry is None:
+                continue
+            starts, max_ends, ends = entry
+            first = 0 if start_line is None else bisect.bisect_left(max_ends, start_line)
+            last = len(starts) if end_line is None else bisect.bisect_right(starts, end_line)
+            positions.extend(position for end, position in ends[first:last]
+                             if start_line is None or end >= start_line)
+        return [self.annotations[position] for position in sorted(positions)]
+
+
+class IntervalIndexCache:
+    """Thread-safe LRU of (repository path, branch ref, tip oid) -> AnnotationIntervalIndex.
+
+    A branch's annotations are fully determined by its tip, so entries never
+    go stale; the cache is only bounded in size.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_INTERVAL_INDEX_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], AnnotationIntervalIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[AnnotationIntervalIndex]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple[str, str, str], index: AnnotationIntervalIndex) -> None:
+        with self._lock:
+            self._entries[key] = index
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_interval_index_cache = IntervalIndexCache()
+
+
+def get_interval_index_cache() -> IntervalIndexCache:
+    return _interval_index_cache
@@ -0,0 +1,54 @@
+"""Encoding of the annotation data stored in annotation commit bodies.
+
+New annotation commits carry their data as a single line of compact JSON
+with a format marker::
+
+    {"format":"gitwrite-annotation","version":1,"file_path":...,"status":"new"}
+
+Older commits hold the same fields as a YAML mapping. Readers accept both:
+a body is decoded as JSON when it is a marked JSON object, and as YAML
+otherwise (using LibYAML's loader when PyYAML was built with it). Since JSON
+is also valid YAML, older readers can still load new bodies; they see the two
+extra marker keys.
+"""
+import json
+from typing import Any, Dict
+
+import yaml
+
+ANNOTATION_PAYLOAD_FORMAT = "gitwrite-annotation"
+ANNOTATION_PAYLOAD_VERSION = 1
+
+# The pure-Python SafeLoader is much slower; only legacy bodies need YAML at all.
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def encode_annotation_payload(data: Dict[str, Any]) -> str:
+    """Encodes annotation fields as a marked, compact JSON commit body."""
+    payload = {"format": ANNOTATION_PAYLOAD_FORMAT, "version": ANNOTATION_PAYLOAD_VERSION, **data}
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def decode_annotation_payload(body: str) -> Any:
+    """Decodes an annotation commit body written in either format.
+
+    Returns the decoded value without the format marker. Legacy YAML bodies
+    may decode to something other than a dict; callers validate the result.
+
+    Raises:
+        ValueError: If the body cannot be parsed or uses an unknown payload version.
+    """
+    stripped = body.strip()
+    if stripped.startswith("{"):
+        try:
+            data = json.loads(stripped)
+        except ValueError:
+            data = None  # Not JSON; may still be a YAML flow mapping
+        if isinstance(data, dict) and data.get("format") == ANNOTATION_PAYLOAD_FORMAT:
+            if data.get("version") != ANNOTATION_PAYLOAD_VERSION:
+                raise ValueError(f"Unsupported annotation payload version {data.get('version')!r}.")
+            return {key: value for key, value in data.items() if key not in ("format", "version")}
+    try:
+        return yaml.load(body, Loader=_YAML_LOADER)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid annotation data: {e}") from e
@@ -9,7 +9,10 @@ from .exceptions import ( # Ensure all are imported, including BranchNotFoundErr
     MergeConflictError, # Added for merge function
     GitWriteError
 )
+from .repository_cache import discover_repository, open_repository
+from .locking import repository_lock
 
+@repository_lock(exclusive=True)
 def create_and_switch_branch(repo_path_str: str, branch_name: str) -> Dict[str, Any]: # Updated return type
     """
     Creates a new branch from the current HEAD and switches to it.
@@ -29,11 +32,11 @@ def create_and_switch_branch(repo_path_str: str, branch_name: str) -> Dict[str,
         GitWriteError: For other git-related issues or if operating on a bare repository.
     """
     try:
-        discovered_repo_path = pygit2.discover_repository(repo_path_str)
+        discovered_repo_path = discover_repository(repo_path_str)
         if discovered_repo_path is None:
             raise RepositoryNotFoundError(f"Repository not found at or above '{repo_path_str}'.")
 
-        repo = pygit2.Repository(discovered_repo_path)
+        repo = open_repository(discovered_repo_path)
 
         if repo.is_bare:
             raise GitWriteError("Operation not supported in bare repositories.")
@@ -79,6 +82,7 @@ def create_and_switch_branch(repo_path_str: str, branch_name: str) -> Dict[str,
     # Custom exceptions (RepositoryNotFoundError, RepositoryEmptyError, BranchAlreadyExistsError, GitWriteError from checks)
     # will propagate up as they are already GitWriteError subclasses or GitWriteError itself.
 
+@repository_lock(exclusive=False)
 def list_branches(repo_path_str: str) -> List[Dict[str, Any]]:
     """
     Lists all local branches in the repository.
@@ -96,11 +100,11 @@ def list_branches(repo_path_str: str) -> List[Dict[str, Any]]:
         GitWriteError: For other git-related issues like bare repo.
     """
     try:
-        discovered_repo_path = pygit2.discover_repository(repo_path_str)
+        discovered_repo_path = discover_repository(repo_path_str)
         if discovered_repo_path is None:
             raise RepositoryNotFoundError(f"Repository not found at or above '{repo_path_str}'.")
 
-        repo = pygit2.Repository(discovered_repo_path)
+        repo = open_repository(discovered_repo_path)
 
         if repo.is_bare:
             raise GitWriteError("Operation not supported in bare repositories.")
@@ -141,6 +145,7 @@ def list_branches(repo_path_str: str) -> List[Dict[str, Any]]:
     # Custom exceptions like RepositoryNotFoundError, GitWriteError from specific checks,
     # will propagate up.
 
+@repository_lock(exclusive=True)
 def switch_to_branch(repo_path_str: str, branch_name: str) -> Dict[str, Any]:
     """
     Switches to an existing local or remote-tracking branch.
@@ -164,11 +169,11 @@ def switch_to_branch(repo_path_str: str, branch_name: str) -> Dict[str, Any]:
         GitWriteError: For other git-related issues like bare repo or checkout failures.
     """
     try:
-        discovered_repo_path = pygit2.discover_repository(repo_path_str)
+        discovered_repo_path = discover_repository(repo_path_str)
         if discovered_repo_path is None:
             raise RepositoryNotFoundError(f"Repository not found at or above '{repo_path_str}'.")
 
-        repo = pygit2.Repository(discovered_repo_path)
+        repo = open_repository(discovered_repo_path)
 
         if repo.is_bare:
             raise GitWriteError("Operation not supported in bare repositories.")
@@ -268,6 +273,7 @@ def switch_to_branch(repo_path_str: str, branch_name: str) -> Dict[str, Any]:
         raise GitWriteError(f"Git operation failed during switch to branch '{branch_name}': {e}")
     # Custom exceptions (RepositoryNotFoundError, BranchNotFoundError, etc.) will propagate.
 
+@repository_lock(exclusive=True)
 def merge_branch_into_current(repo_path_str: str, branch_to_merge_name: str) -> Dict[str, Any]:
     """
     Merges the specified branch into the current branch.
@@ -287,11 +293,11 @@ def merge_branch_into_current(repo_path_str: str, branch_to_merge_name: str) ->
         GitWriteError: For other issues (e.g., bare repo, detached HEAD, user not configured).
     """
     try:
-        discovered_repo_path = pygit2.discover_repository(repo_path_str)
+        discovered_repo_path = discover_repository(repo_path_str)
         if discovered_repo_path is None:
             raise RepositoryNotFoundError(f"Repository not found at or above '{repo_path_str}'.")
 
-        repo = pygit2.Repository(discovered_repo_path)
+        repo = open_repository(discovered_repo_path)
 
         if repo.is_bare:
             raise GitWriteError("Cannot merge in a bare repository.")
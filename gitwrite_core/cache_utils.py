@@ -0,0 +1,58 @@
+"""Helpers shared by the on-disk caches and the tunables read from the environment.
+
+The diff cache, the pandoc AST cache and the export artifact cache all keep
+files in a directory bounded by a byte budget, evicting the least recently
+used files first. They refresh a file's modification time whenever it is
+read, so modification time order is use order and `prune_lru_files` can
+enforce every budget.
+"""
+import os
+from typing import Callable, Optional
+
+
+def int_from_env(name: str, default: int) -> int:
+    """Returns the integer environment variable `name`, or `default` if it is unset or invalid."""
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def float_from_env(name: str, default: float) -> float:
+    """Returns the float environment variable `name`, or `default` if it is unset or invalid."""
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def prune_lru_files(directory: str, max_bytes: int, select: Optional[Callable[[str], bool]] = None) -> int:
+    """Deletes least recently modified files under `directory` until they fit in `max_bytes`.
+
+    Only files whose name passes `select` (all files if None) are counted and
+    deleted. Files that vanish or cannot be removed are skipped. Returns the
+    number of files deleted.
+    """
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if select is not None and not select(name):
+                continue
+            path = os.path.join(root, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            files.append((info.st_mtime, info.st_size, path))
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+    return removed
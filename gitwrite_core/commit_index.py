@@ -0,0 +1,469 @@
+"""Persistent commit metadata index for fast history queries.
+
+Each repository gets a SQLite database at ``<gitdir>/gitwrite/commit-index.sqlite3``
+holding one row per commit (parents, author, committer, timestamps, message)
+plus the paths each commit changed relative to its first parent. For every
+ref that has been queried the index remembers the tip it was last brought up
+to date with and which commits are reachable from it.
+
+The index is maintained incrementally: when a ref has moved forward only the
+commits between the last indexed tip and the new tip are read. If the ref was
+rewritten (amend, reset, force push) so that the old tip is no longer an
+ancestor, the ref's membership is rebuilt and commits no longer reachable from
+any indexed ref are pruned. A missing, corrupt or outdated database file is
+recreated. When the index cannot be brought up to date (read-only gitdir,
+database locked by another writer), queries fall back to walking history.
+"""
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pygit2
+
+from .exceptions import BranchNotFoundError, GitWriteError, RepositoryEmptyError, RepositoryNotFoundError
+from .history import CommitWalker, changed_paths
+from .locking import repository_lock
+from .repository_cache import discover_repository, open_repository
+
+INDEX_DIR_NAME = "gitwrite"
+INDEX_FILE_NAME = "commit-index.sqlite3"
+SCHEMA_VERSION = 1
+DEFAULT_SEARCH_LIMIT = 50
+_CONNECT_TIMEOUT = 5.0  # Seconds to wait for another writer before falling back to a walk
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commits (
+    oid TEXT PRIMARY KEY,
+    parents TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    author_name TEXT NOT NULL,
+    author_email TEXT NOT NULL,
+    author_time INTEGER NOT NULL,
+    committer_name TEXT NOT NULL,
+    committer_email TEXT NOT NULL,
+    committer_time INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS commits_by_author_time ON commits (author_time);
+CREATE TABLE IF NOT EXISTS commit_paths (
+    oid TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (oid, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS commit_paths_by_path ON commit_paths (path);
+CREATE TABLE IF NOT EXISTS refs (
+    name TEXT PRIMARY KEY,
+    tip TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ref_commits (
+    ref TEXT NOT NULL,
+    oid TEXT NOT NULL,
+    PRIMARY KEY (ref, oid)
+) WITHOUT ROWID;
+"""
+
+# Only one thread per process rebuilds a given index at a time; SQLite's own
+# locking serialises writers from other processes.
+_rebuild_guard = threading.Lock()
+
+
+class CommitIndexUnavailableError(GitWriteError):
+    """Raised when the on-disk index cannot be opened or updated."""
+    pass
+
+
+def index_path_for(repo: pygit2.Repository) -> str:
+    """Returns the location of the commit index database for `repo`."""
+    return os.path.join(repo.path, INDEX_DIR_NAME, INDEX_FILE_NAME)
+
+
+def commit_changed_paths(repo: pygit2.Repository, commit: pygit2.Commit) -> List[str]:
+    """Returns the sorted paths `commit` changed relative to its first parent.
+
+    Root commits report every path in their tree. Both sides of a rename are
+    included, so a query for either name finds the commit.
+    """
+    return sorted(changed_paths(repo, commit))
+
+
+def _like_pattern(text: str, prefix: str = "%", suffix: str = "%") -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{prefix}{escaped}{suffix}"
+
+
+def _row_to_commit(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        'sha': row['oid'],
+        'message': row['message'],
+        'author_name': row['author_name'],
+        'author_email': row['author_email'],
+        'author_date': row['author_time'],
+        'committer_name': row['committer_name'],
+        'committer_email': row['committer_email'],
+        'committer_date': row['committer_time'],
+        'parents': row['parents'].split() if row['parents'] else [],
+    }
+
+
+def _commit_to_dict(commit: pygit2.Commit) -> Dict[str, Any]:
+    return {
+        'sha': str(commit.id),
+        'message': commit.message.strip(),
+        'author_name': commit.author.name,
+        'author_email': commit.author.email,
+        'author_date': commit.author.time,
+        'committer_name': commit.committer.name,
+        'committer_email': commit.committer.email,
+        'committer_date': commit.committer.time,
+        'parents': [str(p) for p in commit.parent_ids],
+    }
+
+
+class CommitIndex:
+    """A handle on one repository's commit index database."""
+
+    def __init__(self, repo: pygit2.Repository, db_path: Optional[str] = None):
+        self.repo = repo
+        self.db_path = db_path or index_path_for(repo)
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = self._open_checked()
+        except sqlite3.OperationalError as e:  # Locked or read-only; the file itself is fine
+            raise CommitIndexUnavailableError(f"Cannot open commit index '{self.db_path}': {e}") from e
+        except sqlite3.DatabaseError:
+            # Corrupt file or one written by an incompatible version: start over.
+            with _rebuild_guard:
+                self._remove_database()
+                try:
+                    conn = self._open_checked()
+                except sqlite3.Error as e:
+                    raise CommitIndexUnavailableError(f"Cannot open commit index '{self.db_path}': {e}") from e
+        except OSError as e:
+            raise CommitIndexUnavailableError(f"Cannot create commit index '{self.db_path}': {e}") from e
+        return conn
+
+    def _open_checked(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=_CONNECT_TIMEOUT, isolation_level=None)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is None:
+                conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+            elif row['value'] != str(SCHEMA_VERSION):
+                raise sqlite3.DatabaseError(f"Unsupported commit index schema version {row['value']}.")
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    def _remove_database(self) -> None:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(self.db_path + suffix)
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "CommitIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def indexed_tip(self, ref_name: str) -> Optional[str]:
+        row = self._conn.execute("SELECT tip FROM refs WHERE name = ?", (ref_name,)).fetchone()
+        return row['tip'] if row else None
+
+    def refresh(self, ref_name: str, tip: pygit2.Oid) -> int:
+        """Brings `ref_name` up to date with `tip`; returns the number of commits newly read.
+
+        Raises:
+            CommitIndexUnavailableError: If the database is locked or read-only.
+        """
+        tip_hex = str(tip)
+        if self.indexed_tip(ref_name) == tip_hex:
+            return 0
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                added = self._refresh_locked(ref_name, tip, tip_hex)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            raise CommitIndexUnavailableError(f"Cannot update commit index for '{ref_name}': {e}") from e
+        return added
+
+    def _refresh_locked(self, ref_name: str, tip: pygit2.Oid, tip_hex: str) -> int:
+        old_tip = self.indexed_tip(ref_name)  # Re-read: another writer may have refreshed it meanwhile
+        if old_tip == tip_hex:
+            return 0
+
+        walker = self.repo.walk(tip, pygit2.GIT_SORT_TOPOLOGICAL | pygit2.GIT_SORT_REVERSE)
+        rewritten = False
+        if old_tip is not None:
+            old_oid = pygit2.Oid(hex=old_tip)
+            if old_oid in self.repo and self.repo.descendant_of(tip, old_oid):
+                walker.hide(old_oid)  # Fast-forward: only the new commits are walked
+            else:
+                rewritten = True
+                self._conn.execute("DELETE FROM ref_commits WHERE ref = ?", (ref_name,))
+
+        generations: Dict[str, int] = {}
+        commit_rows: List[Tuple] = []
+        path_rows: List[Tuple[str, str]] = []
+        member_rows: List[Tuple[str, str]] = []
+        for commit in walker:  # Oldest first, so parents are seen before their children
+            oid_hex = str(commit.id)
+            member_rows.append((ref_name, oid_hex))
+            if self._generation(oid_hex, generations) is not None:
+                continue
+            parent_ids = [str(p) for p in commit.parent_ids]
+            parent_generations = [self._generation(p, generations) or 0 for p in parent_ids]
+            generations[oid_hex] = 1 + max(parent_generations, default=0)
+            message = commit.message.strip()
+            commit_rows.append((
+                oid_hex, " ".join(parent_ids), generations[oid_hex],
+                commit.author.name, commit.author.email, commit.author.time,
+                commit.committer.name, commit.committer.email, commit.committer.time,
+                message.split("\n", 1)[0], message,
+            ))
+            path_rows.extend((oid_hex, path) for path in commit_changed_paths(self.repo, commit))
+
+        self._conn.executemany("INSERT OR IGNORE INTO commits VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", commit_rows)
+        self._conn.executemany("INSERT OR IGNORE INTO commit_paths (oid, path) VALUES (?, ?)", path_rows)
+        self._conn.executemany("INSERT OR IGNORE INTO ref_commits (ref, oid) VALUES (?, ?)", member_rows)
+        self._conn.execute("INSERT OR REPLACE INTO refs (name, tip) VALUES (?, ?)", (ref_name, tip_hex))
+        if rewritten:
+            self._prune()
+        return len(commit_rows)
+
+    def _generation(self, oid_hex: str, pending: Dict[str, int]) -> Optional[int]:
+        if oid_hex in pending:
+            return pending[oid_hex]
+        row = self._conn.execute("SELECT generation FROM commits WHERE oid = ?", (oid_hex,)).fetchone()
+        return row['generation'] if row else None
+
+    def _prune(self) -> None:
+        """Drops commits that are no longer reachable from any indexed ref."""
+        self._conn.execute("DELETE FROM commits WHERE oid NOT IN (SELECT oid FROM ref_commits)")
+        self._conn.execute("DELETE FROM commit_paths WHERE oid NOT IN (SELECT oid FROM commits)")
+
+    def forget_missing_refs(self, live_refs: Iterable[str]) -> None:
+        """Removes refs that no longer exist (e.g. deleted branches) and their commits."""
+        live = set(live_refs)
+        stale = [row['name'] for row in self._conn.execute("SELECT name FROM refs") if row['name'] not in live]
+        if not stale:
+            return
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for name in stale:
+                    self._conn.execute("DELETE FROM ref_commits WHERE ref = ?", (name,))
+                    self._conn.execute("DELETE FROM refs WHERE name = ?", (name,))
+                self._prune()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            raise CommitIndexUnavailableError(f"Cannot update commit index: {e}") from e
+
+    def query(self, ref_name: str, author: Optional[str] = None, since: Optional[int] = None,
+              until: Optional[int] = None, message_contains: Optional[str] = None, path: Optional[str] = None,
+              limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Returns matching commits reachable from `ref_name`, newest first.
+
+        Matching is case-insensitive substring for `author` (name or email) and
+        `message_contains`; `since`/`until` bound the author time (Unix
+        seconds, inclusive); `path` matches a file or everything below a
+        directory. The ref must have been refreshed first.
+        """
+        clauses = ["r.ref = ?"]
+        params: List[Any] = [ref_name]
+        if author:
+            clauses.append("(c.author_name LIKE ? ESCAPE '\\' OR c.author_email LIKE ? ESCAPE '\\')")
+            params.extend([_like_pattern(author)] * 2)
+        if since is not None:
+            clauses.append("c.author_time >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("c.author_time <= ?")
+            params.append(until)
+        if message_contains:
+            clauses.append("c.message LIKE ? ESCAPE '\\'")
+            params.append(_like_pattern(message_contains))
+        if path:
+            normalized = path.strip("/")
+            clauses.append(
+                "EXISTS (SELECT 1 FROM commit_paths p WHERE p.oid = c.oid AND (p.path = ? OR p.path LIKE ? ESCAPE '\\'))"
+            )
+            params.extend([normalized, _like_pattern(normalized, prefix="", suffix="/%")])
+        sql = (
+            "SELECT c.* FROM ref_commits r JOIN commits c ON c.oid = r.oid WHERE " + " AND ".join(clauses)
+            + " ORDER BY c.committer_time DESC, c.generation DESC LIMIT ? OFFSET ?"
+        )
+        params.extend([-1 if limit is None else limit, offset])
+        try:
+            return [_row_to_commit(row) for row in self._conn.execute(sql, params)]
+        except sqlite3.Error as e:
+            raise CommitIndexUnavailableError(f"Cannot query commit index: {e}") from e
+
+
+def _resolve_ref(repo: pygit2.Repository, branch_name: Optional[str]) -> Tuple[str, pygit2.Oid]:
+    """Maps a branch name (or the current HEAD) to the ref name and tip to index."""
+    if branch_name:
+        for ref_name in (f"refs/heads/{branch_name}", f"refs/remotes/origin/{branch_name}"):
+            reference = repo.references.get(ref_name)
+            if reference is not None:
+                return ref_name, reference.resolve().target
+        raise BranchNotFoundError(f"Branch '{branch_name}' not found.")
+    if repo.is_empty or repo.head_is_unborn:
+        raise RepositoryEmptyError("Repository is empty or HEAD is unborn, and no branch specified.")
+    if repo.head_is_detached:
+        return "HEAD", repo.head.target
+    return repo.head.name, repo.head.target
+
+
+def _walk_matches(repo: pygit2.Repository, tip: pygit2.Oid, author: Optional[str], since: Optional[int],
+                  until: Optional[int], message_contains: Optional[str], path: Optional[str]):
+    """Yields commits matching the query by walking history (used when the index is unavailable)."""
+    author_lower = author.lower() if author else None
+    message_lower = message_contains.lower() if message_contains else None
+    normalized = path.strip("/") if path else None
+    for commit in CommitWalker(repo, [tip]):
+        if author_lower and author_lower not in commit.author.name.lower() and author_lower not in commit.author.email.lower():
+            continue
+        if since is not None and commit.author.time < since:
+            continue
+        if until is not None and commit.author.time > until:
+            continue
+        if message_lower and message_lower not in commit.message.lower():
+            continue
+        if normalized and not any(p == normalized or p.startswith(normalized + "/")
+                                  for p in commit_changed_paths(repo, commit)):
+            continue
+        yield commit
+
+
+def _open(repo_path_str: str) -> pygit2.Repository:
+    repo_path = discover_repository(repo_path_str)
+    if repo_path is None:
+        raise RepositoryNotFoundError(f"No Git repository found at or above '{repo_path_str}'.")
+    return open_repository(repo_path)
+
+
+@repository_lock(exclusive=False)
+def update_commit_index(repo_path_str: str, branch_names: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Brings the commit index up to date with the given branches (all local branches by default).
+
+    Args:
+        repo_path_str: Path to the repository.
+        branch_names: Optional branch names to refresh.
+
+    Returns:
+        A dictionary with 'status', 'message' and 'indexed' (new commits read per ref).
+
+    Raises:
+        RepositoryNotFoundError: If the repository cannot be found.
+        BranchNotFoundError: If a named branch does not exist.
+    """
+    repo = _open(repo_path_str)
+    names = list(branch_names) if branch_names is not None else list(repo.branches.local)
+    indexed: Dict[str, int] = {}
+    try:
+        with CommitIndex(repo) as index:
+            if branch_names is None:
+                index.forget_missing_refs(f"refs/heads/{name}" for name in names)
+            for name in names:
+                ref_name, tip = _resolve_ref(repo, name)
+                indexed[ref_name] = index.refresh(ref_name, tip)
+    except CommitIndexUnavailableError as e:
+        return {'status': 'unavailable', 'message': str(e), 'indexed': indexed}
+    return {'status': 'success', 'message': f"Indexed {sum(indexed.values())} new commits.", 'indexed': indexed}
+
+
+@repository_lock(exclusive=False)
+def search_commits(repo_path_str: str, branch_name: Optional[str] = None, author: Optional[str] = None,
+                   since: Optional[int] = None, until: Optional[int] = None, message_contains: Optional[str] = None,
+                   path: Optional[str] = None, limit: Optional[int] = DEFAULT_SEARCH_LIMIT, offset: int = 0) -> Dict[str, Any]:
+    """
+    Finds commits on a branch by author, author date range, message text and/or changed path.
+
+    Queries are answered from the persistent commit index, which is first
+    brought up to date with the branch tip. If the index cannot be used the
+    history is walked instead; the results are the same apart from the order
+    of commits with identical timestamps.
+
+    Args:
+        repo_path_str: Path to the repository.
+        branch_name: Optional branch to search. Defaults to the current HEAD.
+        author: Case-insensitive substring of the author name or email.
+        since: Earliest author time to include (Unix seconds).
+        until: Latest author time to include (Unix seconds).
+        message_contains: Case-insensitive substring of the commit message.
+        path: File or directory path the commit must have changed.
+        limit: Maximum number of commits to return (None for all).
+        offset: Number of matching commits to skip.
+
+    Returns:
+        A dictionary with 'status', 'commits' (in the `list_commits` shape),
+        'message', 'next_offset' (None when there are no more matches) and
+        'source' ('index' or 'walk').
+    """
+    try:
+        repo = _open(repo_path_str)
+        ref_name, tip = _resolve_ref(repo, branch_name)
+    except RepositoryNotFoundError as e:
+        return {'status': 'error', 'commits': [], 'message': str(e)}
+    except BranchNotFoundError as e:
+        return {'status': 'not_found', 'commits': [], 'message': str(e)}
+    except RepositoryEmptyError as e:
+        return {'status': 'empty_repo', 'commits': [], 'message': str(e)}
+
+    fetch = None if limit is None else limit + 1  # One extra row tells whether another page exists
+    try:
+        with CommitIndex(repo) as index:
+            index.refresh(ref_name, tip)
+            commits = index.query(ref_name, author=author, since=since, until=until,
+                                  message_contains=message_contains, path=path, limit=fetch, offset=offset)
+        source = 'index'
+    except CommitIndexUnavailableError:
+        matches = _walk_matches(repo, tip, author, since, until, message_contains, path)
+        commits = []
+        for position, commit in enumerate(matches):
+            if position < offset:
+                continue
+            commits.append(_commit_to_dict(commit))
+            if fetch is not None and len(commits) >= fetch:
+                break
+        source = 'walk'
+    except pygit2.GitError as e:
+        return {'status': 'error', 'commits': [], 'message': f"Git error: {e}"}
+
+    next_offset = None
+    if limit is not None and len(commits) > limit:
+        commits = commits[:limit]
+        next_offset = offset + limit
+    return {
+        'status': 'success',
+        'commits': commits,
+        'message': f"Found {len(commits)} matching commits.",
+        'next_offset': next_offset,
+        'source': source,
+    }
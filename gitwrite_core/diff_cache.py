@@ -0,0 +1,167 @@
+"""Cache of diff results keyed by the trees being compared.
+
+The diff between two trees never changes, so patch text and structured word
+diffs are cached under ``(tree1 oid, tree2 oid, diff options, mode)``. Tree
+oids identify content, which makes entries valid across repositories and
+unaffected by branch moves or new commits.
+
+There are two tiers: an in-memory LRU bounded by a byte budget, and an
+optional on-disk store (enabled by setting ``GITWRITE_DIFF_CACHE_DIR``) that
+survives restarts and is shared by worker processes. Values must be JSON
+serialisable; cached values are shared between callers and must not be
+modified.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from .cache_utils import int_from_env, prune_lru_files
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_MAX_BYTES = 512 * 1024 * 1024
+_DISK_SUFFIX = ".json"
+
+
+def diff_cache_key(tree1_oid: Any, tree2_oid: Any, options: Mapping[str, Any], mode: str) -> str:
+    """Builds the cache key for a diff of two trees computed with `options` in `mode`."""
+    option_str = ",".join(f"{name}={options[name]}" for name in sorted(options))
+    return f"{tree1_oid}:{tree2_oid}:{option_str}:{mode}"
+
+
+class DiffCache:
+    """Two-tier (memory, optional disk) cache of diff results."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._disk_written_since_prune = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry[0]
+        value, size = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._store_memory(key, value, size)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        encoded = json.dumps(value, separators=(",", ":")) if self.disk_dir else None
+        size = len(encoded) if encoded is not None else _estimate_size(value)
+        with self._lock:
+            self._store_memory(key, value, size)
+        if encoded is not None:
+            self._write_disk(key, encoded)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Returns the cached value for `key`, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Empties the memory tier (the disk tier is left alone) and resets statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._bytes,
+                        max_bytes=self.max_bytes, disk_enabled=self.disk_dir is not None)
+
+    def _store_memory(self, key: str, value: Any, size: int) -> None:
+        if size > self.max_bytes:
+            return  # Would evict everything else; such diffs are served from disk or recomputed
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._stats["evictions"] += 1
+
+    def _disk_path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, digest[:2], digest + _DISK_SUFFIX)
+
+    def _read_disk(self, key: str) -> Tuple[Optional[Any], int]:
+        if not self.disk_dir:
+            return None, 0
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                encoded = f.read()
+            stored_key, value = json.loads(encoded)
+        except (OSError, ValueError):
+            return None, 0
+        if stored_key != key:  # Hash collision or foreign file
+            return None, 0
+        try:
+            os.utime(path)  # Keeps recently used entries when the store is pruned
+        except OSError:
+            pass
+        return value, len(encoded)
+
+    def _write_disk(self, key: str, encoded_value: str) -> None:
+        path = self._disk_path(key)
+        payload = f"[{json.dumps(key)},{encoded_value}]"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            return  # The disk tier is best effort
+        with self._lock:
+            self._disk_written_since_prune += len(payload)
+            should_prune = self._disk_written_since_prune > self.disk_max_bytes // 10
+            if should_prune:
+                self._disk_written_since_prune = 0
+        if should_prune:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Deletes least recently used files until the store fits its budget."""
+        prune_lru_files(self.disk_dir, self.disk_max_bytes, lambda name: name.endswith(_DISK_SUFFIX))
+
+
+def _estimate_size(value: Any) -> int:
+    if isinstance(value, str):
+        return len(value)
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+_diff_cache = DiffCache(
+    max_bytes=int_from_env("GITWRITE_DIFF_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+    disk_dir=os.environ.get("GITWRITE_DIFF_CACHE_DIR") or None,
+    disk_max_bytes=int_from_env("GITWRITE_DIFF_CACHE_DISK_MAX_BYTES", DEFAULT_DISK_MAX_BYTES),
+)
+
+
+def get_diff_cache() -> DiffCache:
+    return _diff_cache
@@ -83,6 +83,13 @@ class PandocError(GitWriteError):
     """Raised for errors related to Pandoc execution or availability."""
     pass
 
+class PartialExportError(PandocError):
+    """Raised when some formats of a multi-format export failed while the others were written."""
+    def __init__(self, message: str, results: dict | None = None):
+        super().__init__(message)
+        self.message = message
+        self.results = results if results is not None else {}  # Per-format results, as from export_formats
+
 class FileNotFoundInCommitError(GitWriteError):
     """Raised when a specified file is not found in the given commit."""
     pass
@@ -94,3 +101,11 @@ class RepositoryOperationError(GitWriteError):
 class AnnotationError(GitWriteError):
     """Raised for errors specific to annotation processing."""
     pass
+
+class RepositoryLockTimeoutError(GitWriteError):
+    """Raised when a repository lock could not be acquired within the timeout."""
+    pass
+
+class InvalidCursorError(GitWriteError):
+    """Raised when a pagination cursor is malformed or no longer matches the repository."""
+    pass
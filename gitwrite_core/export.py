@@ -1,8 +1,36 @@
 # This module will contain functions for exporting repository content to various formats.
-
+"""
+Every export runs through one staged pipeline, `run_export_pipeline`:
+
+1. resolve  - check pandoc, open the repository and resolve the commit-ish;
+2. collect  - look up the files' blobs, serve a cached artifact if there is
+              one, otherwise read and decode the chapters;
+3. assemble - parse each chapter to a pandoc AST (reusing cached ASTs) and
+              join them into one document;
+4. convert  - run the format's writer on the document;
+5. finalize - store the artifact in the export cache and measure it.
+
+Only resolve and collect read the repository, so only they run under its
+shared lock. Assembly and conversion work on the chapter text already read
+(pandoc, and LaTeX for PDF, can take minutes), and writers are not kept
+waiting for them.
+
+Formats are `FormatWriter` objects registered by name, so a new format only
+needs a writer. The result of an export includes the wall time of each stage
+and the sizes it handled, under 'metrics'.
+
+`export_formats` runs the same stages for several formats at once: the first
+three run once and the conversions run concurrently. When only some of the
+conversions fail, the formats that succeeded are still finalized and kept;
+the failure reports them (`PartialExportError`).
+"""
+
+import contextlib
+import os
 import pathlib
-import tempfile
-from typing import Dict, List, Union
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import pygit2
 import pypandoc
@@ -13,36 +41,111 @@ from gitwrite_core.exceptions import (
     CommitNotFoundError,
     FileNotFoundInCommitError,
     PandocError,
+    PartialExportError,
 )
+from gitwrite_core.repository_cache import open_repository
+from gitwrite_core.locking import get_lock_manager
+from gitwrite_core.export_cache import ExportArtifactCache, export_cache_key, get_pandoc_version
+from gitwrite_core.pandoc_ast import assemble_document, ast_dir_for, parse_chapters
 
+class FormatWriter:
+    """Writes the assembled pandoc document in one output format.
 
-def export_to_epub(
-    repo_path_str: str,
-    commit_ish_str: str,
-    file_list: List[str],
-    output_epub_path_str: str,
-) -> Dict[str, str]:
+    `name` is both the format's key and pandoc's writer name; `label` is used
+    in messages. Subclasses can override `write` to post-process the output
+    and `conversion_error` to explain format-specific pandoc failures.
     """
-    Exports specified markdown files from a Git repository at a given commit-ish
-    to an EPUB file.
 
-    Args:
-        repo_path_str: Path to the Git repository.
-        commit_ish_str: The commit hash, branch name, or tag to export from.
-        file_list: A list of paths to markdown files (relative to repo root) to include in the EPUB.
-        output_epub_path_str: The full path where the EPUB file will be saved.
+    def __init__(self, name: str, label: str, default_extra_args: List[str],
+                 failure_prefix: str = "Pandoc conversion failed"):
+        self.name = name
+        self.label = label
+        self.default_extra_args = default_extra_args
+        self.failure_prefix = failure_prefix
+
+    def extra_args(self, pandoc_options: Dict[str, Union[str, List[str]]]) -> List[str]:
+        """Returns the pandoc arguments for an export, honouring an 'extra_args' option."""
+        extra_args = pandoc_options.get('extra_args', self.default_extra_args)
+        if isinstance(extra_args, str):
+            extra_args = [extra_args]
+        return list(extra_args)
+
+    def write(self, document: str, output_path: str, extra_args: List[str]) -> None:
+        pypandoc.convert_text(
+            source=document,
+            to=self.name,
+            format='json',
+            outputfile=output_path,
+            extra_args=extra_args
+        )
 
-    Returns:
-        A dictionary with 'status': 'success' and 'message' on successful EPUB generation.
+    def conversion_error(self, e: RuntimeError) -> PandocError:
+        if "pandoc document conversion failed" in str(e) and "No such file or directory" in str(e):
+            return PandocError(f"Pandoc execution failed. It might indicate Pandoc is not installed correctly or missing dependencies: {e}")
+        return PandocError(f"{self.failure_prefix}: {e}")
+
+
+class PDFWriter(FormatWriter):
+    """PDF needs a LaTeX engine besides pandoc, which is the usual reason it fails."""
+
+    def conversion_error(self, e: RuntimeError) -> PandocError:
+        if "pandoc document conversion failed" in str(e):
+            if "pdflatex not found" in str(e) or "No such file or directory" in str(e):
+                return PandocError(
+                    f"PDF generation failed. Ensure that Pandoc and a LaTeX engine (like pdflatex) are installed: {e}"
+                )
+            return PandocError(f"Pandoc PDF conversion failed: {e}")
+        return PandocError(f"Pandoc conversion failed: {e}")
+
+
+_format_writers: Dict[str, FormatWriter] = {}
+
+
+def register_format_writer(writer: FormatWriter) -> None:
+    """Makes `writer` available to `run_export_pipeline` under `writer.name`."""
+    _format_writers[writer.name] = writer
+
+
+def get_format_writer(export_format: str) -> FormatWriter:
+    """Returns the writer registered for `export_format`.
 
     Raises:
-        RepositoryNotFoundError: If the repository path is invalid or not a Git repository.
-        CommitNotFoundError: If the commit_ish cannot be resolved to a valid commit.
-        FileNotFoundInCommitError: If a file in file_list is not found in the commit or is not a file.
-        PandocError: If Pandoc is not found or if there's an error during EPUB conversion.
-        GitWriteError: For other generic errors (e.g., empty file list, non-UTF-8 content, empty repo).
+        GitWriteError: If no writer is registered for the format.
     """
-    # Ensure pandoc is available first
+    try:
+        return _format_writers[export_format]
+    except KeyError:
+        raise GitWriteError(f"Unsupported export format '{export_format}'.")
+
+
+register_format_writer(FormatWriter('epub', 'EPUB', ['--standalone']))
+register_format_writer(PDFWriter('pdf', 'PDF', ['--standalone', '--pdf-engine=pdflatex']))
+register_format_writer(FormatWriter('docx', 'DOCX', ['--standalone'], failure_prefix="Pandoc DOCX conversion failed"))
+
+
+class ExportMetrics:
+    """Wall time and sizes recorded for each stage of one export."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, Any]]:
+        """Times the enclosed block as stage `name`; the yielded dict takes extra figures."""
+        record: Dict[str, Any] = {}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            self.stages[name] = record
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"stages": self.stages, "total_seconds": time.perf_counter() - self._started}
+
+
+def _ensure_pandoc() -> None:
     try:
         pypandoc.get_pandoc_path()
     except OSError:
@@ -50,13 +153,15 @@ def export_to_epub(
             "Pandoc not found. Please ensure pandoc is installed and in your PATH."
         )
 
+
+def _open_export_repository(repo_path_str: str) -> pygit2.Repository:
     repo_path = pathlib.Path(repo_path_str)
     if not repo_path.is_dir():
         raise RepositoryNotFoundError(f"Repository directory not found: {repo_path_str}")
 
     try:
         abs_repo_path = str(repo_path.resolve())
-        repo = pygit2.Repository(abs_repo_path)
+        repo = open_repository(abs_repo_path)
     except pygit2.GitError as e:
         raise RepositoryNotFoundError(f"Not a valid Git repository: {abs_repo_path} - {e}")
     except Exception as e:
@@ -64,9 +169,10 @@ def export_to_epub(
 
     if repo.is_empty:
         raise GitWriteError(f"Repository at {repo_path_str} is empty and has no commits to export from.")
+    return repo
 
-    commit: pygit2.Commit
 
+def _resolve_commit(repo: pygit2.Repository, commit_ish_str: str) -> pygit2.Commit:
     try:
         resolved_object = repo.revparse_single(commit_ish_str)
         if resolved_object is None:
@@ -76,9 +182,9 @@ def export_to_epub(
             target_object = repo.get(resolved_object.target)
             if target_object is None or not isinstance(target_object, pygit2.Commit):
                 raise CommitNotFoundError(f"Tag '{commit_ish_str}' does not point to a valid commit.")
-            commit = target_object
+            return target_object
         elif resolved_object.type == pygit2.GIT_OBJECT_COMMIT:
-            commit = resolved_object
+            return resolved_object
         else:
             object_type_display_str = "unknown"
             if hasattr(resolved_object, 'type_str'):
@@ -97,33 +203,47 @@ def export_to_epub(
     except Exception as e:
         raise CommitNotFoundError(f"Error resolving commit-ish '{commit_ish_str}': {e}")
 
-    tree = commit.tree
-    markdown_content_parts = []
-
-    if not file_list:
-        raise GitWriteError("File list cannot be empty for EPUB export.")
 
+def _blob_ids_for(tree: pygit2.Tree, commit: pygit2.Commit, file_list: List[str]) -> List[pygit2.Oid]:
+    """Returns the blob IDs of `file_list` in `tree`, in order, without reading the blobs."""
+    blob_ids = []
     for file_path_str in file_list:
         try:
             entry = tree[file_path_str]
-            if entry.type_str != 'blob':
-                raise FileNotFoundInCommitError(
-                    f"Entry '{file_path_str}' is not a file (blob) in commit '{commit.short_id}'. It is a '{entry.type_str}'."
-                )
-            blob = repo[entry.id]
-            content_bytes = blob.data
-            try:
-                markdown_content_parts.append(content_bytes.decode('utf-8'))
-            except UnicodeDecodeError:
-                raise GitWriteError(
-                    f"File '{file_path_str}' in commit '{commit.short_id}' is not UTF-8 encoded, which is required for EPUB conversion."
-                )
         except KeyError:
             raise FileNotFoundInCommitError(
                 f"File '{file_path_str}' not found in commit '{commit.short_id}' (tree ID: {tree.id})."
             )
-        except pygit2.GitError as e:
+        if entry.type_str != 'blob':
+            raise FileNotFoundInCommitError(
+                f"Entry '{file_path_str}' is not a file (blob) in commit '{commit.short_id}'. It is a '{entry.type_str}'."
+            )
+        blob_ids.append(entry.id)
+    return blob_ids
+
+
+def _read_chapters(
+    repo: pygit2.Repository,
+    commit: pygit2.Commit,
+    file_list: List[str],
+    blob_ids: List[pygit2.Oid],
+    label: str,
+) -> Tuple[List[str], int]:
+    """Reads and decodes the chapter blobs; returns their text and total size in bytes."""
+    markdown_content_parts = []
+    total_bytes = 0
+    for file_path_str, blob_id in zip(file_list, blob_ids):
+        try:
+            content_bytes = repo[blob_id].data
+        except (KeyError, pygit2.GitError) as e:
             raise GitWriteError(f"Error accessing file '{file_path_str}' in commit '{commit.short_id}': {e}")
+        try:
+            markdown_content_parts.append(content_bytes.decode('utf-8'))
+        except UnicodeDecodeError:
+            raise GitWriteError(
+                f"File '{file_path_str}' in commit '{commit.short_id}' is not UTF-8 encoded, which is required for {label} conversion."
+            )
+        total_bytes += len(content_bytes)
 
     if not markdown_content_parts:
         raise GitWriteError("No content found: All specified files were missing or could not be read from the commit.")
@@ -131,193 +251,341 @@ def export_to_epub(
     meaningful_content_exists = any(part.strip() for part in markdown_content_parts)
     if not meaningful_content_exists:
         raise GitWriteError("No content found to export: All specified files are empty or contain only whitespace.")
+    return markdown_content_parts, total_bytes
+
 
-    full_markdown_content = "\n\n---\n\n".join(markdown_content_parts)
+def _artifact_cache_key(
+    artifact_cache: Optional[ExportArtifactCache],
+    blob_ids: List[pygit2.Oid],
+    export_format: str,
+    extra_args: List[str],
+) -> Optional[str]:
+    """Returns the export cache key, or None when there is no cache or the pandoc version is unknown."""
+    if artifact_cache is None:
+        return None
+    pandoc_version = get_pandoc_version()
+    if pandoc_version is None:
+        return None
+    return export_cache_key(blob_ids, export_format, extra_args, pandoc_version)
 
-    output_path = pathlib.Path(output_epub_path_str)
+
+def _ensure_output_dir(output_path: pathlib.Path) -> None:
     try:
         output_path.parent.mkdir(parents=True, exist_ok=True)
     except OSError as e:
         raise GitWriteError(f"Could not create output directory '{output_path.parent}': {e}")
 
+
+def _convert(writer: FormatWriter, step, *args):
+    """Runs a pandoc step, turning its failures into `PandocError`s explained by `writer`."""
     try:
-        pypandoc.convert_text(
-            source=full_markdown_content,
-            to='epub',
-            format='md',
-            outputfile=str(output_path.resolve()),
-            extra_args=['--standalone']
-        )
+        return step(*args)
+    except RuntimeError as e:
+        raise writer.conversion_error(e)
+    except Exception as e:
+        raise PandocError(f"An unexpected error occurred during {writer.label} conversion: {e}")
+
+
+def _assemble(repo: pygit2.Repository, blob_ids: List[pygit2.Oid], markdown_parts: List[str]) -> Tuple[str, int]:
+    """Parses each chapter (reusing cached ASTs); returns the book as a pandoc JSON document
+    and the number of chapters that had to be parsed.
+
+    Parsing is shared by every output format, so its failures are reported
+    without reference to any of them.
+    """
+    try:
+        chapter_asts, parsed = parse_chapters(list(zip(blob_ids, markdown_parts)), get_pandoc_version(),
+                                              disk_dir=ast_dir_for(repo.path))
+        return assemble_document(chapter_asts), parsed
+    except RuntimeError as e:
+        raise PandocError(f"Pandoc could not parse the markdown files: {e}")
+    except Exception as e:
+        raise PandocError(f"An unexpected error occurred while parsing the markdown files: {e}")
+
+
+class _ExportTarget:
+    """One output of a pipeline run and what happened to it."""
+
+    def __init__(self, writer: FormatWriter, output_path_str: str, pandoc_options: Dict[str, Union[str, List[str]]]):
+        self.writer = writer
+        self.output_path_str = output_path_str
+        self.output_path = pathlib.Path(output_path_str)
+        self.extra_args = writer.extra_args(pandoc_options)
+        self.cache_key: Optional[str] = None
+        self.cached = False
+        self.seconds: Optional[float] = None
+        self.bytes: Optional[int] = None
+        self.error: Optional[PandocError] = None
+
+    def result(self) -> Dict[str, Any]:
+        if self.error is not None:
+            return {"status": "error", "message": str(self.error), "cached": False, "output_path": self.output_path_str}
+        source = " (from the export cache)" if self.cached else ""
         return {
             "status": "success",
-            "message": f"EPUB successfully generated at '{output_epub_path_str}'.",
+            "message": f"{self.writer.label} successfully generated at '{self.output_path_str}'{source}.",
+            "cached": self.cached,
+            "output_path": self.output_path_str,
         }
-    except RuntimeError as e:
-        if "pandoc document conversion failed" in str(e) and "No such file or directory" in str(e):
-            raise PandocError(f"Pandoc execution failed. It might indicate Pandoc is not installed correctly or missing dependencies: {e}")
-        raise PandocError(f"Pandoc conversion failed: {e}")
-    except Exception as e:
-        raise PandocError(f"An unexpected error occurred during EPUB conversion: {e}")
 
-# End of function.
+
+def _run_pipeline(
+    repo_path_str: str,
+    commit_ish_str: str,
+    file_list: List[str],
+    targets: List[_ExportTarget],
+    artifact_cache: Optional[ExportArtifactCache],
+    metrics: ExportMetrics,
+) -> None:
+    """Runs the export stages once for all `targets`, recording the outcome on each.
+
+    The source is resolved, read and assembled once however many targets there
+    are; only the targets missing from `artifact_cache` are converted, each by
+    its own pandoc process, concurrently. The repository's shared lock is held
+    while it is read (resolve and collect) and released before assembly.
+    """
+    label = ", ".join(target.writer.label for target in targets)
+
+    with get_lock_manager().shared(repo_path_str):
+        with metrics.stage("resolve"):
+            _ensure_pandoc()
+            repo = _open_export_repository(repo_path_str)
+            commit = _resolve_commit(repo, commit_ish_str)
+
+        with metrics.stage("collect") as stage:
+            if not file_list:
+                raise GitWriteError(f"File list cannot be empty for {label} export.")
+            blob_ids = _blob_ids_for(commit.tree, commit, file_list)
+            stage["files"] = len(blob_ids)
+            for target in targets:
+                _ensure_output_dir(target.output_path)
+                target.cache_key = _artifact_cache_key(artifact_cache, blob_ids, target.writer.name, target.extra_args)
+                target.cached = target.cache_key is not None and artifact_cache.fetch(
+                    target.cache_key, target.writer.name, str(target.output_path.resolve()))
+            pending = [target for target in targets if not target.cached]
+            if pending:
+                markdown_content_parts, stage["bytes"] = _read_chapters(
+                    repo, commit, file_list, blob_ids, ", ".join(target.writer.label for target in pending))
+
+    if pending:
+        with metrics.stage("assemble") as stage:
+            document, stage["chapters_parsed"] = _assemble(repo, blob_ids, markdown_content_parts)
+            stage["bytes"] = len(document)
+
+        with metrics.stage("convert") as stage:
+            _convert_targets(document, pending)
+            stage["formats"] = {target.writer.name: target.seconds for target in pending}
+
+    written = [target for target in targets if target.error is None]
+    with metrics.stage("finalize") as stage:
+        for target in written:
+            if not target.cached and target.cache_key is not None:
+                artifact_cache.store(target.cache_key, target.writer.name, str(target.output_path.resolve()))
+            try:
+                target.bytes = os.path.getsize(target.output_path)
+            except OSError:
+                target.bytes = None
+        stage["bytes"] = {target.writer.name: target.bytes for target in written}
+
+    failed = [target for target in targets if target.error is not None]
+    if failed and not written:
+        raise failed[0].error
+    if failed:
+        raise PartialExportError(
+            f"{', '.join(target.writer.label for target in failed)} export failed "
+            f"({', '.join(target.writer.label for target in written)} written): {failed[0].error}",
+            results={target.writer.name: target.result() for target in targets},
+        )
 
 
-def export_to_pdf(
+def _convert_targets(document: str, targets: List[_ExportTarget]) -> None:
+    """Writes `document` for every target; several targets are converted concurrently.
+
+    Each conversion is a separate pandoc process, so threads are enough to run
+    them in parallel. A failed conversion is recorded on its target (`error`)
+    and does not stop the others.
+    """
+    def convert(target: _ExportTarget) -> None:
+        start = time.perf_counter()
+        try:
+            _convert(target.writer, target.writer.write, document, str(target.output_path.resolve()),
+                     target.extra_args)
+        except PandocError as e:
+            target.error = e
+        finally:
+            target.seconds = time.perf_counter() - start
+
+    if len(targets) == 1:
+        convert(targets[0])
+        return
+    with ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix="gitwrite-convert") as executor:
+        futures = [executor.submit(convert, target) for target in targets]
+    for future in futures:
+        future.result()
+
+
+def run_export_pipeline(
     repo_path_str: str,
     commit_ish_str: str,
     file_list: List[str],
-    output_pdf_path_str: str,
-    **pandoc_options: Dict[str, Union[str, List[str]]],
-) -> Dict[str, str]:
+    output_path_str: str,
+    export_format: str,
+    artifact_cache: Optional[ExportArtifactCache] = None,
+    pandoc_options: Optional[Dict[str, Union[str, List[str]]]] = None,
+) -> Dict[str, Any]:
     """
-    Exports specified markdown files from a Git repository at a given commit-ish
-    to a PDF file.
+    Exports markdown files from a Git repository at a given commit-ish in any
+    registered format.
 
     Args:
         repo_path_str: Path to the Git repository.
         commit_ish_str: The commit hash, branch name, or tag to export from.
-        file_list: A list of paths to markdown files (relative to repo root) to include in the PDF.
-        output_pdf_path_str: The full path where the PDF file will be saved.
-        **pandoc_options: Additional pandoc options for PDF generation.
+        file_list: Paths of the markdown files (relative to repo root) to include, in order.
+        output_path_str: The full path where the exported file will be saved.
+        export_format: Name of a registered `FormatWriter` ('epub', 'pdf', 'docx').
+        artifact_cache: Optional cache of finished exports. On a hit the cached file is
+            copied to the output path without reading the files or running pandoc.
+        pandoc_options: Additional pandoc options; 'extra_args' replaces the writer's defaults.
 
     Returns:
-        A dictionary with 'status': 'success' and 'message' on successful PDF generation.
+        A dictionary with 'status': 'success', 'message', 'cached' (True when the file
+        came from `artifact_cache`) and 'metrics' (per-stage 'seconds' and sizes).
 
     Raises:
         RepositoryNotFoundError: If the repository path is invalid or not a Git repository.
         CommitNotFoundError: If the commit_ish cannot be resolved to a valid commit.
         FileNotFoundInCommitError: If a file in file_list is not found in the commit or is not a file.
-        PandocError: If Pandoc is not found or if there's an error during PDF conversion.
-        GitWriteError: For other generic errors (e.g., empty file list, non-UTF-8 content, empty repo).
+        PandocError: If Pandoc is not found or if there's an error during conversion.
+        GitWriteError: For other generic errors (e.g., unknown format, empty file list,
+            non-UTF-8 content, empty repo).
     """
-    # Ensure pandoc is available first
-    try:
-        pypandoc.get_pandoc_path()
-    except OSError:
-        raise PandocError(
-            "Pandoc not found. Please ensure pandoc is installed and in your PATH."
-        )
+    target = _ExportTarget(get_format_writer(export_format), output_path_str, pandoc_options or {})
+    metrics = ExportMetrics()
+    _run_pipeline(repo_path_str, commit_ish_str, file_list, [target], artifact_cache, metrics)
+    result = target.result()
+    del result["output_path"]
+    result["metrics"] = metrics.as_dict()
+    return result
 
-    repo_path = pathlib.Path(repo_path_str)
-    if not repo_path.is_dir():
-        raise RepositoryNotFoundError(f"Repository directory not found: {repo_path_str}")
 
-    try:
-        abs_repo_path = str(repo_path.resolve())
-        repo = pygit2.Repository(abs_repo_path)
-    except pygit2.GitError as e:
-        raise RepositoryNotFoundError(f"Not a valid Git repository: {abs_repo_path} - {e}")
-    except Exception as e:
-        raise RepositoryNotFoundError(f"Invalid repository path: {repo_path_str} - {e}")
+def export_formats(
+    repo_path_str: str,
+    commit_ish_str: str,
+    file_list: List[str],
+    outputs: Dict[str, str],
+    artifact_cache: Optional[ExportArtifactCache] = None,
+    pandoc_options: Optional[Dict[str, Dict[str, Union[str, List[str]]]]] = None,
+) -> Dict[str, Any]:
+    """
+    Exports markdown files from a Git repository at a given commit-ish in
+    several formats at once.
 
-    if repo.is_empty:
-        raise GitWriteError(f"Repository at {repo_path_str} is empty and has no commits to export from.")
+    The commit is resolved, the files are read and the document is assembled
+    once; the format conversions then run concurrently, so the export takes
+    about as long as the slowest format rather than the sum of all of them.
 
-    commit: pygit2.Commit
+    Args:
+        repo_path_str: Path to the Git repository.
+        commit_ish_str: The commit hash, branch name, or tag to export from.
+        file_list: Paths of the markdown files (relative to repo root) to include, in order.
+        outputs: Output path for each format, e.g. {'epub': '/out/book.epub', 'pdf': '/out/book.pdf'}.
+        artifact_cache: Optional cache of finished exports, consulted per format.
+        pandoc_options: Optional pandoc options per format, e.g. {'pdf': {'extra_args': [...]}}.
 
-    try:
-        resolved_object = repo.revparse_single(commit_ish_str)
-        if resolved_object is None:
-            raise CommitNotFoundError(f"Commit-ish '{commit_ish_str}' could not be resolved.")
+    Returns:
+        A dictionary with 'status': 'success', 'message', 'results' (per format:
+        'status', 'message', 'cached' and 'output_path') and the shared 'metrics'.
 
-        if resolved_object.type == pygit2.GIT_OBJECT_TAG:
-            target_object = repo.get(resolved_object.target)
-            if target_object is None or not isinstance(target_object, pygit2.Commit):
-                raise CommitNotFoundError(f"Tag '{commit_ish_str}' does not point to a valid commit.")
-            commit = target_object
-        elif resolved_object.type == pygit2.GIT_OBJECT_COMMIT:
-            commit = resolved_object
-        else:
-            object_type_display_str = "unknown"
-            if hasattr(resolved_object, 'type_str'):
-                object_type_display_str = resolved_object.type_str
-            elif hasattr(resolved_object, 'type'):
-                type_map = {
-                    pygit2.GIT_OBJECT_BLOB: "blob",
-                    pygit2.GIT_OBJECT_TREE: "tree",
-                }
-                object_type_display_str = type_map.get(resolved_object.type, f"unknown_type_int_{resolved_object.type}")
-            raise CommitNotFoundError(
-                f"Commit-ish '{commit_ish_str}' resolved to an object of type '{object_type_display_str}' which is not a commit or a tag pointing to a commit."
-            )
-    except (KeyError, pygit2.GitError) as e:
-        raise CommitNotFoundError(f"Commit-ish '{commit_ish_str}' not found or invalid in repository: {e}")
-    except Exception as e:
-        raise CommitNotFoundError(f"Error resolving commit-ish '{commit_ish_str}': {e}")
+    Raises:
+        PartialExportError: If some conversions failed. The other formats were
+            still written and stored in `artifact_cache`; the error's 'results'
+            holds every format's result, with 'status': 'error' for the failures.
+        The same errors as `run_export_pipeline` otherwise; if every conversion
+        fails, the first failure is raised.
+    """
+    if not outputs:
+        raise GitWriteError("At least one export format must be specified.")
+    pandoc_options = pandoc_options or {}
+    targets = [
+        _ExportTarget(get_format_writer(export_format), output_path_str, pandoc_options.get(export_format, {}))
+        for export_format, output_path_str in outputs.items()
+    ]
+    metrics = ExportMetrics()
+    _run_pipeline(repo_path_str, commit_ish_str, file_list, targets, artifact_cache, metrics)
+    return {
+        "status": "success",
+        "message": f"Generated {', '.join(target.writer.label for target in targets)} from '{commit_ish_str}'.",
+        "results": {target.writer.name: target.result() for target in targets},
+        "metrics": metrics.as_dict(),
+    }
 
-    tree = commit.tree
-    markdown_content_parts = []
 
-    if not file_list:
-        raise GitWriteError("File list cannot be empty for PDF export.")
+def export_to_epub(
+    repo_path_str: str,
+    commit_ish_str: str,
+    file_list: List[str],
+    output_epub_path_str: str,
+    artifact_cache: Optional[ExportArtifactCache] = None,
+) -> Dict[str, Any]:
+    """
+    Exports specified markdown files from a Git repository at a given commit-ish
+    to an EPUB file.
+
+    Args:
+        repo_path_str: Path to the Git repository.
+        commit_ish_str: The commit hash, branch name, or tag to export from.
+        file_list: A list of paths to markdown files (relative to repo root) to include in the EPUB.
+        output_epub_path_str: The full path where the EPUB file will be saved.
+        artifact_cache: Optional cache of finished exports. On a hit the cached EPUB is
+            copied to the output path without reading the files or running pandoc.
 
-    for file_path_str in file_list:
-        try:
-            entry = tree[file_path_str]
-            if entry.type_str != 'blob':
-                raise FileNotFoundInCommitError(
-                    f"Entry '{file_path_str}' is not a file (blob) in commit '{commit.short_id}'. It is a '{entry.type_str}'."
-                )
-            blob = repo[entry.id]
-            content_bytes = blob.data
-            try:
-                markdown_content_parts.append(content_bytes.decode('utf-8'))
-            except UnicodeDecodeError:
-                raise GitWriteError(
-                    f"File '{file_path_str}' in commit '{commit.short_id}' is not UTF-8 encoded, which is required for PDF conversion."
-                )
-        except KeyError:
-            raise FileNotFoundInCommitError(
-                f"File '{file_path_str}' not found in commit '{commit.short_id}' (tree ID: {tree.id})."
-            )
-        except pygit2.GitError as e:
-            raise GitWriteError(f"Error accessing file '{file_path_str}' in commit '{commit.short_id}': {e}")
+    Returns:
+        The `run_export_pipeline` result: 'status': 'success', 'message', 'cached' and 'metrics'.
 
-    if not markdown_content_parts:
-        raise GitWriteError("No content found: All specified files were missing or could not be read from the commit.")
+    Raises:
+        RepositoryNotFoundError: If the repository path is invalid or not a Git repository.
+        CommitNotFoundError: If the commit_ish cannot be resolved to a valid commit.
+        FileNotFoundInCommitError: If a file in file_list is not found in the commit or is not a file.
+        PandocError: If Pandoc is not found or if there's an error during EPUB conversion.
+        GitWriteError: For other generic errors (e.g., empty file list, non-UTF-8 content, empty repo).
+    """
+    return run_export_pipeline(repo_path_str, commit_ish_str, file_list, output_epub_path_str, 'epub',
+                               artifact_cache=artifact_cache)
 
-    meaningful_content_exists = any(part.strip() for part in markdown_content_parts)
-    if not meaningful_content_exists:
-        raise GitWriteError("No content found to export: All specified files are empty or contain only whitespace.")
 
-    full_markdown_content = "\n\n---\n\n".join(markdown_content_parts)
+def export_to_pdf(
+    repo_path_str: str,
+    commit_ish_str: str,
+    file_list: List[str],
+    output_pdf_path_str: str,
+    artifact_cache: Optional[ExportArtifactCache] = None,
+    **pandoc_options: Dict[str, Union[str, List[str]]],
+) -> Dict[str, Any]:
+    """
+    Exports specified markdown files from a Git repository at a given commit-ish
+    to a PDF file.
+
+    Args:
+        repo_path_str: Path to the Git repository.
+        commit_ish_str: The commit hash, branch name, or tag to export from.
+        file_list: A list of paths to markdown files (relative to repo root) to include in the PDF.
+        output_pdf_path_str: The full path where the PDF file will be saved.
+        artifact_cache: Optional cache of finished exports. On a hit the cached PDF is
+            copied to the output path without reading the files or running pandoc.
+        **pandoc_options: Additional pandoc options for PDF generation.
 
-    output_path = pathlib.Path(output_pdf_path_str)
-    try:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-    except OSError as e:
-        raise GitWriteError(f"Could not create output directory '{output_path.parent}': {e}")
+    Returns:
+        The `run_export_pipeline` result: 'status': 'success', 'message', 'cached' and 'metrics'.
 
-    # Set up default PDF options
-    default_extra_args = ['--standalone', '--pdf-engine=pdflatex']
-    
-    # Allow customization via pandoc_options
-    extra_args = pandoc_options.get('extra_args', default_extra_args)
-    if isinstance(extra_args, str):
-        extra_args = [extra_args]
-    
-    try:
-        pypandoc.convert_text(
-            source=full_markdown_content,
-            to='pdf',
-            format='md',
-            outputfile=str(output_path.resolve()),
-            extra_args=extra_args
-        )
-        return {
-            "status": "success",
-            "message": f"PDF successfully generated at '{output_pdf_path_str}'.",
-        }
-    except RuntimeError as e:
-        if "pandoc document conversion failed" in str(e):
-            if "pdflatex not found" in str(e) or "No such file or directory" in str(e):
-                raise PandocError(
-                    f"PDF generation failed. Ensure that Pandoc and a LaTeX engine (like pdflatex) are installed: {e}"
-                )
-            raise PandocError(f"Pandoc PDF conversion failed: {e}")
-        raise PandocError(f"Pandoc conversion failed: {e}")
-    except Exception as e:
-        raise PandocError(f"An unexpected error occurred during PDF conversion: {e}")
+    Raises:
+        RepositoryNotFoundError: If the repository path is invalid or not a Git repository.
+        CommitNotFoundError: If the commit_ish cannot be resolved to a valid commit.
+        FileNotFoundInCommitError: If a file in file_list is not found in the commit or is not a file.
+        PandocError: If Pandoc is not found or if there's an error during PDF conversion.
+        GitWriteError: For other generic errors (e.g., empty file list, non-UTF-8 content, empty repo).
+    """
+    return run_export_pipeline(repo_path_str, commit_ish_str, file_list, output_pdf_path_str, 'pdf',
+                               artifact_cache=artifact_cache, pandoc_options=pandoc_options)
 
 
 def export_to_docx(
@@ -325,8 +593,9 @@ def export_to_docx(
     commit_ish_str: str,
     file_list: List[str],
     output_docx_path_str: str,
+    artifact_cache: Optional[ExportArtifactCache] = None,
     **pandoc_options: Dict[str, Union[str, List[str]]],
-) -> Dict[str, str]:
+) -> Dict[str, Any]:
     """
     Exports specified markdown files from a Git repository at a given commit-ish
     to a DOCX file.
@@ -336,10 +605,12 @@ def export_to_docx(
         commit_ish_str: The commit hash, branch name, or tag to export from.
         file_list: A list of paths to markdown files (relative to repo root) to include in the DOCX.
         output_docx_path_str: The full path where the DOCX file will be saved.
+        artifact_cache: Optional cache of finished exports. On a hit the cached DOCX is
+            copied to the output path without reading the files or running pandoc.
         **pandoc_options: Additional pandoc options for DOCX generation.
 
     Returns:
-        A dictionary with 'status': 'success' and 'message' on successful DOCX generation.
+        The `run_export_pipeline` result: 'status': 'success', 'message', 'cached' and 'metrics'.
 
     Raises:
         RepositoryNotFoundError: If the repository path is invalid or not a Git repository.
@@ -348,127 +619,5 @@ def export_to_docx(
         PandocError: If Pandoc is not found or if there's an error during DOCX conversion.
         GitWriteError: For other generic errors (e.g., empty file list, non-UTF-8 content, empty repo).
     """
-    # Ensure pandoc is available first
-    try:
-        pypandoc.get_pandoc_path()
-    except OSError:
-        raise PandocError(
-            "Pandoc not found. Please ensure pandoc is installed and in your PATH."
-        )
-
-    repo_path = pathlib.Path(repo_path_str)
-    if not repo_path.is_dir():
-        raise RepositoryNotFoundError(f"Repository directory not found: {repo_path_str}")
-
-    try:
-        abs_repo_path = str(repo_path.resolve())
-        repo = pygit2.Repository(abs_repo_path)
-    except pygit2.GitError as e:
-        raise RepositoryNotFoundError(f"Not a valid Git repository: {abs_repo_path} - {e}")
-    except Exception as e:
-        raise RepositoryNotFoundError(f"Invalid repository path: {repo_path_str} - {e}")
-
-    if repo.is_empty:
-        raise GitWriteError(f"Repository at {repo_path_str} is empty and has no commits to export from.")
-
-    commit: pygit2.Commit
-
-    try:
-        resolved_object = repo.revparse_single(commit_ish_str)
-        if resolved_object is None:
-            raise CommitNotFoundError(f"Commit-ish '{commit_ish_str}' could not be resolved.")
-
-        if resolved_object.type == pygit2.GIT_OBJECT_TAG:
-            target_object = repo.get(resolved_object.target)
-            if target_object is None or not isinstance(target_object, pygit2.Commit):
-                raise CommitNotFoundError(f"Tag '{commit_ish_str}' does not point to a valid commit.")
-            commit = target_object
-        elif resolved_object.type == pygit2.GIT_OBJECT_COMMIT:
-            commit = resolved_object
-        else:
-            object_type_display_str = "unknown"
-            if hasattr(resolved_object, 'type_str'):
-                object_type_display_str = resolved_object.type_str
-            elif hasattr(resolved_object, 'type'):
-                type_map = {
-                    pygit2.GIT_OBJECT_BLOB: "blob",
-                    pygit2.GIT_OBJECT_TREE: "tree",
-                }
-                object_type_display_str = type_map.get(resolved_object.type, f"unknown_type_int_{resolved_object.type}")
-            raise CommitNotFoundError(
-                f"Commit-ish '{commit_ish_str}' resolved to an object of type '{object_type_display_str}' which is not a commit or a tag pointing to a commit."
-            )
-    except (KeyError, pygit2.GitError) as e:
-        raise CommitNotFoundError(f"Commit-ish '{commit_ish_str}' not found or invalid in repository: {e}")
-    except Exception as e:
-        raise CommitNotFoundError(f"Error resolving commit-ish '{commit_ish_str}': {e}")
-
-    tree = commit.tree
-    markdown_content_parts = []
-
-    if not file_list:
-        raise GitWriteError("File list cannot be empty for DOCX export.")
-
-    for file_path_str in file_list:
-        try:
-            entry = tree[file_path_str]
-            if entry.type_str != 'blob':
-                raise FileNotFoundInCommitError(
-                    f"Entry '{file_path_str}' is not a file (blob) in commit '{commit.short_id}'. It is a '{entry.type_str}'."
-                )
-            blob = repo[entry.id]
-            content_bytes = blob.data
-            try:
-                markdown_content_parts.append(content_bytes.decode('utf-8'))
-            except UnicodeDecodeError:
-                raise GitWriteError(
-                    f"File '{file_path_str}' in commit '{commit.short_id}' is not UTF-8 encoded, which is required for DOCX conversion."
-                )
-        except KeyError:
-            raise FileNotFoundInCommitError(
-                f"File '{file_path_str}' not found in commit '{commit.short_id}' (tree ID: {tree.id})."
-            )
-        except pygit2.GitError as e:
-            raise GitWriteError(f"Error accessing file '{file_path_str}' in commit '{commit.short_id}': {e}")
-
-    if not markdown_content_parts:
-        raise GitWriteError("No content found: All specified files were missing or could not be read from the commit.")
-
-    meaningful_content_exists = any(part.strip() for part in markdown_content_parts)
-    if not meaningful_content_exists:
-        raise GitWriteError("No content found to export: All specified files are empty or contain only whitespace.")
-
-    full_markdown_content = "\n\n---\n\n".join(markdown_content_parts)
-
-    output_path = pathlib.Path(output_docx_path_str)
-    try:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-    except OSError as e:
-        raise GitWriteError(f"Could not create output directory '{output_path.parent}': {e}")
-
-    # Set up default DOCX options
-    default_extra_args = ['--standalone']
-    
-    # Allow customization via pandoc_options
-    extra_args = pandoc_options.get('extra_args', default_extra_args)
-    if isinstance(extra_args, str):
-        extra_args = [extra_args]
-    
-    try:
-        pypandoc.convert_text(
-            source=full_markdown_content,
-            to='docx',
-            format='md',
-            outputfile=str(output_path.resolve()),
-            extra_args=extra_args
-        )
-        return {
-            "status": "success",
-            "message": f"DOCX successfully generated at '{output_docx_path_str}'.",
-        }
-    except RuntimeError as e:
-        if "pandoc document conversion failed" in str(e) and "No such file or directory" in str(e):
-            raise PandocError(f"Pandoc execution failed. It might indicate Pandoc is not installed correctly or missing dependencies: {e}")
-        raise PandocError(f"Pandoc DOCX conversion failed: {e}")
-    except Exception as e:
-        raise PandocError(f"An unexpected error occurred during DOCX conversion: {e}")
+    return run_export_pipeline(repo_path_str, commit_ish_str, file_list, output_docx_path_str, 'docx',
+                               artifact_cache=artifact_cache, pandoc_options=pandoc_options)
@@ -0,0 +1,190 @@
+"""Content-addressed cache of exported documents.
+
+An export is fully determined by the blobs it reads (in order), the output
+format, the pandoc arguments and the pandoc version, so finished artifacts
+are stored under a hash of exactly those inputs. Exporting a tag that has
+already been exported then costs a copy of the stored file instead of
+reading every blob and running pandoc again, whatever the commit-ish or the
+output filename of the request.
+
+Artifacts live in a single directory, fanned out by the first two hex digits
+of the key. The directory is bounded by a byte budget: whenever an artifact is
+added, the least recently used ones (by modification time, refreshed on every
+hit) are deleted until the total fits.
+
+The API writes each export request into its own ``exports/<uuid>``
+directory, a copy of the artifact even on a cache hit. `prune_export_dirs`
+keeps those directories within a byte budget of their own as well.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Sequence
+
+import pypandoc
+
+from .cache_utils import int_from_env, prune_lru_files
+
+# Bump when the way a document is assembled changes so artifacts built the old way are not reused.
+EXPORT_ASSEMBLY_VERSION = 2
+DEFAULT_EXPORT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_EXPORT_DIRS_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# Request directories younger than this (seconds) are never pruned, so a
+# conversion in progress or a result not yet downloaded is left alone.
+DEFAULT_EXPORT_DIR_MIN_AGE = 15 * 60
+_TMP_SUFFIX = ".tmp"
+
+
+def export_cache_key(blob_ids: Sequence[Any], export_format: str, extra_args: Sequence[str],
+                     pandoc_version: str) -> str:
+    """Builds the cache key of an export of `blob_ids` (in document order)."""
+    material = json.dumps(
+        [EXPORT_ASSEMBLY_VERSION, [str(blob_id) for blob_id in blob_ids], export_format, list(extra_args),
+         pandoc_version],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def get_pandoc_version() -> Optional[str]:
+    """Returns the version of the pandoc in use, or None if it cannot be determined."""
+    try:
+        return pypandoc.get_pandoc_version()
+    except (OSError, RuntimeError):
+        return None
+
+
+class ExportArtifactCache:
+    """Directory of exported documents keyed by `export_cache_key`, bounded by `max_bytes`."""
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_EXPORT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def artifact_path(self, key: str, export_format: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{export_format}")
+
+    def fetch(self, key: str, export_format: str, output_path: str) -> bool:
+        """Copies the cached artifact for `key` to `output_path`; returns False on a miss."""
+        path = self.artifact_path(key, export_format)
+        try:
+            _copy_atomically(path, output_path)
+        except OSError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return False
+        try:
+            os.utime(path)  # Keeps recently used artifacts when the directory is pruned
+        except OSError:
+            pass
+        with self._lock:
+            self._stats["hits"] += 1
+        return True
+
+    def store(self, key: str, export_format: str, source_path: str) -> None:
+        """Adds the export at `source_path` under `key`. Best effort: failures are ignored."""
+        try:
+            _copy_atomically(source_path, self.artifact_path(key, export_format))
+        except OSError:
+            return
+        with self._lock:
+            self._stats["stores"] += 1
+        self.prune()
+
+    def prune(self) -> None:
+        """Deletes least recently used artifacts until the directory fits its budget."""
+        evicted = prune_lru_files(self.cache_dir, self.max_bytes, lambda name: not name.endswith(_TMP_SUFFIX))
+        if evicted:
+            with self._lock:
+                self._stats["evictions"] += evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, max_bytes=self.max_bytes, cache_dir=self.cache_dir)
+
+
+def prune_export_dirs(base_dir: str, max_bytes: int, min_age: float = DEFAULT_EXPORT_DIR_MIN_AGE) -> int:
+    """Deletes least recently used per-request export directories under `base_dir` until they fit in `max_bytes`.
+
+    Only directories named by a UUID are considered, so the artifact cache
+    and the job store beside them are never touched. A directory's last use
+    is the newest modification time of it and its files. Directories used
+    within the last `min_age` seconds and empty ones (a queued job's) are
+    kept. Returns the number of directories deleted.
+    """
+    try:
+        entries = [entry for entry in os.scandir(base_dir) if entry.is_dir(follow_symlinks=False)]
+    except OSError:
+        return 0
+    dirs = []
+    for entry in entries:
+        try:
+            uuid.UUID(entry.name)
+        except ValueError:
+            continue
+        size = 0
+        last_used = 0.0
+        try:
+            last_used = entry.stat(follow_symlinks=False).st_mtime
+            for root, _, names in os.walk(entry.path):
+                for name in names:
+                    info = os.stat(os.path.join(root, name))
+                    size += info.st_size
+                    last_used = max(last_used, info.st_mtime)
+        except OSError:
+            continue
+        dirs.append((last_used, size, entry.path))
+    total = sum(size for _, size, _ in dirs)
+    cutoff = time.time() - min_age
+    removed = 0
+    for last_used, size, path in sorted(dirs):
+        if total <= max_bytes or last_used >= cutoff:
+            break
+        if not size:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def _copy_atomically(source_path: str, destination_path: str) -> None:
+    """Copies a file so that readers of `destination_path` never see a partial copy."""
+    directory = os.path.dirname(os.path.abspath(destination_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=_TMP_SUFFIX)
+    os.close(fd)
+    try:
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, destination_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+_caches: Dict[str, ExportArtifactCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_export_artifact_cache(cache_dir: str) -> ExportArtifactCache:
+    """Returns the shared cache for `cache_dir`, sized by ``GITWRITE_EXPORT_CACHE_MAX_BYTES``."""
+    cache_dir = os.path.abspath(cache_dir)
+    with _caches_lock:
+        cache = _caches.get(cache_dir)
+        if cache is None:
+            cache = ExportArtifactCache(
+                cache_dir,
+                max_bytes=int_from_env("GITWRITE_EXPORT_CACHE_MAX_BYTES", DEFAULT_EXPORT_CACHE_MAX_BYTES),
+            )
+            _caches[cache_dir] = cache
+        return cache
@@ -0,0 +1,440 @@
+"""Asynchronous export jobs with a persistent job store.
+
+Exports run pandoc (and for PDF a LaTeX engine) and can take minutes, so
+instead of running them inside a request they can be submitted as jobs:
+`ExportJobQueue.submit` records the job and returns at once, a bounded pool
+of worker threads runs the export, and callers poll `get` for its state.
+
+A job moves through ``queued -> running -> done | failed``, or to
+``cancelled`` when `cancel` is called. Queued jobs are cancelled right away;
+a running conversion cannot be interrupted, so it is marked cancelled and
+its output discarded when it finishes. When only some formats of a
+multi-format job fail, the job fails but keeps the files that were written;
+their paths are recorded in its params under 'written_outputs'. A job
+cancelled while it ran is cancelled and its files removed either way.
+
+Jobs are kept in a SQLite database, so their state survives restarts, and
+several processes (API workers) may share one store. Each job is owned by
+the queue that scheduled it, which renews a lease on its unfinished jobs
+every few seconds. A queue on the same store adopts and requeues a job whose
+lease has not been renewed for `lease_timeout` seconds, because its owner
+stopped or crashed; jobs of live queues are never run twice. A queue adopts
+only as many jobs as it has room for; the rest wait for a later check or
+another queue.
+
+On a POSIX host, jobs whose owner ran on the same host (by hostname) in a
+process that no longer exists are adopted at once, so a restarted API picks
+up its own unfinished jobs when its queue starts. Otherwise, for example
+when the restarted process reuses the old pid, as is common in containers,
+they are adopted once the lease expires: after at most `lease_timeout` plus
+one renewal period (about 80 seconds with the defaults).
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .exceptions import GitWriteError, PartialExportError
+from .export_cache import ExportArtifactCache
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINAL_JOB_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+EXPORT_FORMATS = ("epub", "pdf", "docx")
+SCHEMA_VERSION = 2
+DEFAULT_EXPORT_WORKERS = 2
+DEFAULT_EXPORT_QUEUE_DEPTH = 16
+DEFAULT_LEASE_TIMEOUT = 60.0  # Seconds without a lease renewal after which a job's owner is presumed gone
+_CONNECT_TIMEOUT = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    format TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    output_path TEXT NOT NULL,
+    error TEXT,
+    requested_by TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status);
+"""
+
+# Columns added by schema version 2, for stores created by version 1.
+_SCHEMA_V2_COLUMNS = ("owner TEXT", "heartbeat_at REAL")
+_ANY_OWNER = object()
+
+# Runs one export: (repo_path, commit_ish, file_list, output_path, options) -> core result dict.
+Exporter = Callable[[str, str, List[str], str, Dict[str, Any]], Dict[str, Any]]
+# Runs a multi-format export: (repo_path, commit_ish, file_list, outputs, options per format) -> core result dict.
+MultiExporter = Callable[[str, str, List[str], Dict[str, str], Dict[str, Dict[str, Any]]], Dict[str, Any]]
+
+
+class ExportJobError(GitWriteError):
+    """Raised for invalid export job requests."""
+    pass
+
+
+class ExportJobNotFoundError(ExportJobError):
+    """Raised when an export job ID is unknown."""
+    pass
+
+
+class ExportQueueFullError(ExportJobError):
+    """Raised when too many export jobs are already queued or running."""
+    pass
+
+
+def _default_exporters(artifact_cache: Optional[ExportArtifactCache] = None) -> Dict[str, Exporter]:
+    from .export import run_export_pipeline
+
+    def exporter_for(export_format: str) -> Exporter:
+        def export(repo_path: str, commit_ish: str, file_list: List[str], output_path: str, options: Dict[str, Any]):
+            return run_export_pipeline(repo_path, commit_ish, file_list, output_path, export_format,
+                                       artifact_cache=artifact_cache, pandoc_options=options)
+        return export
+
+    return {export_format: exporter_for(export_format) for export_format in EXPORT_FORMATS}
+
+
+def _default_multi_exporter(artifact_cache: Optional[ExportArtifactCache] = None) -> MultiExporter:
+    from .export import export_formats
+
+    def export(repo_path: str, commit_ish: str, file_list: List[str], outputs: Dict[str, str],
+               options: Dict[str, Dict[str, Any]]):
+        return export_formats(repo_path, commit_ish, file_list, outputs,
+                              artifact_cache=artifact_cache, pandoc_options=options)
+    return export
+
+
+def _owner_process_exited(owner: Optional[str]) -> bool:
+    """Returns whether `owner` (``host:pid:token``) ran on this host in a process that no longer exists.
+
+    Only answered on POSIX hosts; anywhere else, and for other hosts or this
+    very process, the lease alone decides.
+    """
+    if not owner or os.name != "posix" or owner.count(":") < 2:
+        return False
+    host, pid_text, _ = owner.rsplit(":", 2)
+    if host != socket.gethostname() or not pid_text.isdigit() or int(pid_text) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid_text), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass  # e.g. EPERM: the process exists but belongs to another user
+    return False
+
+
+class ExportJobStore:
+    """SQLite-backed record of export jobs, safe to share between threads."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, timeout=_CONNECT_TIMEOUT, isolation_level=None,
+                                         check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is None:
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+            elif row['value'] == "1":
+                for column in _SCHEMA_V2_COLUMNS:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+                self._conn.execute("UPDATE meta SET value = ? WHERE key = 'schema_version'", (str(SCHEMA_VERSION),))
+            elif row['value'] != str(SCHEMA_VERSION):
+                raise ExportJobError(f"Unsupported export job store schema version {row['value']}.")
+        except (OSError, sqlite3.Error) as e:
+            raise ExportJobError(f"Cannot open export job store '{db_path}': {e}") from e
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def create(self, export_format: str, params: Dict[str, Any], output_path: str,
+               requested_by: Optional[str] = None, owner: Optional[str] = None) -> Dict[str, Any]:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, format, params, status, output_path, requested_by, created_at, owner, "
+                "heartbeat_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, export_format, json.dumps(params), JOB_QUEUED, output_path, requested_by, now, owner, now),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise ExportJobNotFoundError(f"Export job '{job_id}' not found.")
+        return _row_to_job(row)
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def transition(self, job_id: str, from_states: tuple, expected_owner: Any = _ANY_OWNER, **fields: Any) -> bool:
+        """Updates the job only if it is in one of `from_states` (and owned by `expected_owner`, if given).
+
+        Returns whether it was updated.
+        """
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        placeholders = ", ".join("?" for _ in from_states)
+        condition = f"id = ? AND status IN ({placeholders})"
+        arguments = [job_id, *from_states]
+        if expected_owner is not _ANY_OWNER:
+            condition += " AND owner IS ?"
+            arguments.append(expected_owner)
+        with self._lock:
+            cursor = self._conn.execute(f"UPDATE jobs SET {assignments} WHERE {condition}",
+                                        (*fields.values(), *arguments))
+        return cursor.rowcount == 1
+
+    def renew_leases(self, owner: str) -> None:
+        """Marks `owner` as alive for all of its unfinished jobs."""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN (?, ?)",
+                               (time.time(), owner, JOB_QUEUED, JOB_RUNNING))
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job['params'] = json.loads(job['params'])
+    job['cancel_requested'] = bool(job['cancel_requested'])
+    return job
+
+
+class ExportJobQueue:
+    """Runs export jobs on a bounded pool of worker threads.
+
+    At most `max_workers` exports run at once, and at most `max_queue_depth`
+    more wait for a worker; further submissions raise `ExportQueueFullError`.
+    The default exporters reuse finished artifacts from `artifact_cache`.
+    A multi-format job (see `submit_formats`) takes a single worker.
+
+    A background thread renews the leases of this queue's jobs every third of
+    `lease_timeout` and adopts jobs whose owner has let its lease expire.
+    """
+
+    def __init__(self, store_path: str, max_workers: int = DEFAULT_EXPORT_WORKERS,
+                 max_queue_depth: int = DEFAULT_EXPORT_QUEUE_DEPTH,
+                 exporters: Optional[Dict[str, Exporter]] = None,
+                 artifact_cache: Optional[ExportArtifactCache] = None,
+                 multi_exporter: Optional[MultiExporter] = None,
+                 lease_timeout: float = DEFAULT_LEASE_TIMEOUT):
+        self.store = ExportJobStore(store_path)
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self.lease_timeout = lease_timeout
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.exporters = exporters if exporters is not None else _default_exporters(artifact_cache)
+        self.multi_exporter = multi_exporter if multi_exporter is not None else _default_multi_exporter(artifact_cache)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gitwrite-export")
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.RLock()  # Re-entrant: done callbacks of finished futures run inline
+        self._stopping = threading.Event()
+        self._resume()
+        self._lease_thread = threading.Thread(target=self._keep_leases, name="gitwrite-export-leases", daemon=True)
+        self._lease_thread.start()
+
+    def _resume(self) -> None:
+        """Adopts and queues again the unfinished jobs whose owner is gone, as far as capacity allows."""
+        stale_before = time.time() - self.lease_timeout
+        for job in self.store.unfinished():
+            if job['owner'] == self.owner_id:
+                continue
+            if (job['heartbeat_at'] or 0) >= stale_before and not _owner_process_exited(job['owner']):
+                continue
+            with self._lock:
+                if len(self._futures) >= self.max_workers + self.max_queue_depth:
+                    return  # Left for a later check, or for a queue with room
+                # Claiming by the previous owner makes sure only one queue adopts the job.
+                if self.store.transition(job['id'], (JOB_QUEUED, JOB_RUNNING), expected_owner=job['owner'],
+                                         status=JOB_QUEUED, owner=self.owner_id, heartbeat_at=time.time(),
+                                         progress=0.0, started_at=None, message="Requeued after a restart."):
+                    self._schedule_locked(job['id'])
+
+    def _keep_leases(self) -> None:
+        while not self._stopping.wait(self.lease_timeout / 3):
+            try:
+                self.store.renew_leases(self.owner_id)
+                self._resume()
+            except sqlite3.Error:
+                pass  # Retried on the next tick; a busy store must not stop the renewals
+
+    def submit(self, export_format: str, repo_path: str, commit_ish: str, file_list: List[str],
+               output_path: str, options: Optional[Dict[str, Any]] = None,
+               requested_by: Optional[str] = None) -> Dict[str, Any]:
+        """Records an export job and schedules it; returns the queued job.
+
+        Raises:
+            ExportJobError: If the format is unknown.
+            ExportQueueFullError: If the queue is at capacity.
+        """
+        if export_format not in self.exporters:
+            raise ExportJobError(f"Unsupported export format '{export_format}'.")
+        params = {'repo_path': repo_path, 'commit_ish': commit_ish, 'file_list': list(file_list),
+                  'options': options or {}}
+        return self._submit(export_format, params, output_path, requested_by)
+
+    def submit_formats(self, outputs: Dict[str, str], repo_path: str, commit_ish: str, file_list: List[str],
+                       output_dir: str, options: Optional[Dict[str, Dict[str, Any]]] = None,
+                       requested_by: Optional[str] = None) -> Dict[str, Any]:
+        """Records one job exporting several formats (``outputs`` maps format to path) and schedules it.
+
+        The job's format is the comma-separated list of formats and its output
+        path is `output_dir`; the per-format paths are in its params.
+
+        Raises:
+            ExportJobError: If a format is unknown or none is given.
+            ExportQueueFullError: If the queue is at capacity.
+        """
+        if not outputs:
+            raise ExportJobError("At least one export format must be specified.")
+        for export_format in outputs:
+            if export_format not in EXPORT_FORMATS:
+                raise ExportJobError(f"Unsupported export format '{export_format}'.")
+        params = {'repo_path': repo_path, 'commit_ish': commit_ish, 'file_list': list(file_list),
+                  'options': options or {}, 'outputs': dict(outputs)}
+        return self._submit(",".join(outputs), params, output_dir, requested_by)
+
+    def _submit(self, job_format: str, params: Dict[str, Any], output_path: str,
+                requested_by: Optional[str]) -> Dict[str, Any]:
+        with self._lock:
+            if len(self._futures) >= self.max_workers + self.max_queue_depth:
+                raise ExportQueueFullError("Too many export jobs are queued. Please retry shortly.")
+            job = self.store.create(job_format, params, output_path, requested_by=requested_by, owner=self.owner_id)
+            self._schedule_locked(job['id'])
+        return job
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        """Returns the current state of a job.
+
+        Raises:
+            ExportJobNotFoundError: If the job does not exist.
+        """
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """Cancels a job and returns its state; finished jobs are left as they are.
+
+        Raises:
+            ExportJobNotFoundError: If the job does not exist.
+        """
+        self.store.get(job_id)
+        now = time.time()
+        if self.store.transition(job_id, (JOB_QUEUED,), status=JOB_CANCELLED, cancel_requested=1,
+                                 finished_at=now, message="Cancelled before it started."):
+            with self._lock:
+                future = self._futures.pop(job_id, None)
+            if future is not None:
+                future.cancel()
+        else:
+            self.store.transition(job_id, (JOB_RUNNING,), cancel_requested=1,
+                                  message="Cancellation requested; the running conversion will be discarded.")
+        return self.store.get(job_id)
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = len(self._futures)
+        return {"in_flight": in_flight, "max_workers": self.max_workers, "max_queue_depth": self.max_queue_depth}
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._stopping.set()
+        self._lease_thread.join()
+        self._executor.shutdown(wait=wait)
+        self.store.close()
+
+    def _schedule(self, job_id: str) -> None:
+        with self._lock:
+            self._schedule_locked(job_id)
+
+    def _schedule_locked(self, job_id: str) -> None:
+        future = self._executor.submit(self._run, job_id)
+        self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+    def _forget(self, job_id: str) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _run(self, job_id: str) -> None:
+        if not self.store.transition(job_id, (JOB_QUEUED,), expected_owner=self.owner_id, status=JOB_RUNNING,
+                                     progress=0.1, started_at=time.time(), message="Export running."):
+            return  # Cancelled while it was waiting, or adopted by another queue
+        job = self.store.get(job_id)
+        params = job['params']
+        try:
+            if 'outputs' in params:
+                result = self.multi_exporter(params['repo_path'], params['commit_ish'], params['file_list'],
+                                             params['outputs'], params['options'])
+            else:
+                result = self.exporters[job['format']](params['repo_path'], params['commit_ish'], params['file_list'],
+                                                       job['output_path'], params['options'])
+        except PartialExportError as e:
+            written = {export_format: format_result['output_path'] for export_format, format_result in e.results.items()
+                       if format_result['status'] == 'success'}
+            if self.store.get(job_id)['cancel_requested']:
+                self._discard(job_id, written.values())
+                return
+            self.store.update(job_id, status=JOB_FAILED, error=str(e), message=f"Export failed: {e}",
+                              params=json.dumps(dict(params, written_outputs=written)), finished_at=time.time())
+            return
+        except Exception as e:
+            self.store.update(job_id, status=JOB_FAILED, error=str(e), message=f"Export failed: {e}",
+                              finished_at=time.time())
+            return
+
+        if self.store.get(job_id)['cancel_requested']:
+            self._discard(job_id, params.get('outputs', {}).values() or [job['output_path']])
+        elif result.get('status') == 'success':
+            self.store.update(job_id, status=JOB_DONE, progress=1.0, message=result.get('message'),
+                              finished_at=time.time())
+        else:
+            message = result.get('message', 'Export failed.')
+            self.store.update(job_id, status=JOB_FAILED, error=message, message=message, finished_at=time.time())
+
+    def _discard(self, job_id: str, output_paths: Iterable[str]) -> None:
+        """Removes the output of a job cancelled while it ran and marks it cancelled."""
+        for output_path in output_paths:
+            try:
+                os.remove(output_path)
+            except OSError:
+                pass
+        self.store.update(job_id, status=JOB_CANCELLED, message="Cancelled; the output was discarded.",
+                          finished_at=time.time())
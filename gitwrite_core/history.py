@@ -0,0 +1,372 @@
+"""Lazy, newest-first commit history with resumable cursors.
+
+`CommitWalker` yields commits reachable from a set of start points in
+descending commit-time order (like ``git log``) without materialising the
+whole history, so the cost of a page is proportional to the page size.
+
+A cursor captures where a walk stopped: the number of commits already
+returned (its position) and the commits that were queued but not yet
+emitted along with their sort keys (its frontier; a single oid for linear
+history). Resuming from a cursor continues the walk from that frontier, so
+later pages never re-walk earlier ones. With skewed commit times a commit can
+be emitted while one of its children is still on the frontier; such commits
+are recorded in the cursor as well (its seen set) so that a later page does
+not return them again.
+
+`changed_paths` reports which paths a commit touched relative to its first
+parent. Commits are immutable, so results are memoised by commit oid in a
+bounded process-wide cache and repeated history queries never re-diff the
+same trees.
+"""
+import base64
+import heapq
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import pygit2
+
+from .exceptions import CommitNotFoundError, InvalidCursorError
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_CHANGED_PATH_CACHE_SIZE = 50_000  # Commits
+DEFAULT_MERGE_BASE_CACHE_SIZE = 4_096  # Commit pairs
+_CURSOR_VERSION = "2"
+_LEGACY_CURSOR_VERSION = "1"  # No seen set
+
+
+def encode_history_cursor(position: int, frontier: List[Tuple[str, int]], seen: Iterable[str] = ()) -> str:
+    """Encodes a walk position, its pending (oid, sort key) pairs and its seen oids as an opaque token."""
+    entries = ",".join(f"{oid}.{key}" for oid, key in frontier)
+    raw = f"{_CURSOR_VERSION}:{position}:{entries}:{','.join(seen)}"
+    return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_history_cursor(cursor: str) -> Tuple[int, List[Tuple[str, int]], List[str]]:
+    """Decodes a token produced by `encode_history_cursor` into (position, frontier, seen).
+
+    Raises:
+        InvalidCursorError: If the token is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        fields = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii").split(":")
+        version = fields[0]
+        if version == _LEGACY_CURSOR_VERSION:
+            fields.append("")
+        _, position_str, entries, seen_str = fields
+        position = int(position_str)
+        frontier = []
+        for entry in filter(None, entries.split(",")):
+            oid, key = entry.split(".")
+            frontier.append((oid, int(key)))
+        seen = [oid for oid in seen_str.split(",") if oid]
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursorError(f"Malformed history cursor: {e}") from e
+    if version not in (_CURSOR_VERSION, _LEGACY_CURSOR_VERSION) or position < 0 or not frontier:
+        raise InvalidCursorError("Malformed history cursor.")
+    return position, frontier, seen
+
+
+class CommitWalker:
+    """Iterates commits reachable from `start_oids`, newest first.
+
+    Each queued commit is ordered by its commit time clamped to the key of the
+    child it was reached from, so skewed timestamps (rebased or imported
+    history) cannot pull a parent ahead of its children along a line of
+    history. Commits with equal keys are emitted in the order they were
+    reached, as ``git log`` does.
+    """
+
+    def __init__(self, repo: pygit2.Repository, start_oids: Iterable[pygit2.Oid], position: int = 0,
+                 start_keys: Optional[List[int]] = None, seen: Iterable[pygit2.Oid] = ()):
+        self._repo = repo
+        self._heap: List[Tuple[int, int, pygit2.Oid]] = []
+        self._pending: Dict[pygit2.Oid, Tuple[int, int, pygit2.Commit]] = {}
+        self._emitted: Set[pygit2.Oid] = set(seen)
+        self._sequence = itertools.count()
+        self.position = position
+        for index, oid in enumerate(start_oids):
+            self._push(oid, start_keys[index] if start_keys else None)
+
+    @classmethod
+    def from_cursor(cls, repo: pygit2.Repository, cursor: str) -> "CommitWalker":
+        """Resumes a walk from a cursor returned by `cursor()`.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed or refers to commits
+                that no longer exist (e.g. after history was rewritten).
+        """
+        position, frontier, seen = decode_history_cursor(cursor)
+        try:
+            oids = [pygit2.Oid(hex=oid) for oid, _ in frontier]
+            return cls(repo, oids, position=position, start_keys=[key for _, key in frontier],
+                       seen=[pygit2.Oid(hex=oid) for oid in seen])
+        except (ValueError, CommitNotFoundError) as e:
+            raise InvalidCursorError(f"History cursor no longer matches the repository: {e}") from e
+
+    def _push(self, oid: pygit2.Oid, key_limit: Optional[int] = None) -> None:
+        if oid in self._emitted:
+            return
+        queued = self._pending.get(oid)
+        if queued is not None:
+            if key_limit is None or key_limit >= queued[0]:
+                return
+            commit = queued[2]
+        else:
+            try:
+                commit = self._repo[oid]
+            except (KeyError, ValueError):
+                raise CommitNotFoundError(f"Commit '{oid}' not found.")
+            if not isinstance(commit, pygit2.Commit):
+                commit = commit.peel(pygit2.Commit)
+        key = commit.commit_time if key_limit is None else min(commit.commit_time, key_limit)
+        sequence = next(self._sequence)
+        # Re-queuing with a lower key leaves a stale heap entry behind; it is skipped on pop.
+        self._pending[oid] = (key, sequence, commit)
+        heapq.heappush(self._heap, (-key, sequence, oid))
+
+    def __iter__(self) -> Iterator[pygit2.Commit]:
+        return self
+
+    def __next__(self) -> pygit2.Commit:
+        while self._heap:
+            _, sequence, oid = heapq.heappop(self._heap)
+            queued = self._pending.get(oid)
+            if queued is None or queued[1] != sequence:
+                continue
+            del self._pending[oid]
+            self._emitted.add(oid)
+            key, _, commit = queued
+            for parent_id in commit.parent_ids:
+                self._push(parent_id, key)
+            self.position += 1
+            return commit
+        raise StopIteration
+
+    @property
+    def has_more(self) -> bool:
+        return bool(self._pending)
+
+    def cursor(self) -> Optional[str]:
+        """Returns a token for resuming after the last emitted commit, or None when exhausted."""
+        if not self._pending:
+            return None
+        ordered = sorted(self._pending.items(), key=lambda item: (-item[1][0], item[1][1]))
+        # Only emitted commits that the frontier can still reach need to be carried over.
+        seen = sorted(str(oid) for oid in self._emitted
+                      if any(self._repo.descendant_of(pending, oid) for pending in self._pending))
+        return encode_history_cursor(self.position, [(str(oid), key) for oid, (key, _, _) in ordered], seen)
+
+
+def take(walker: CommitWalker, limit: Optional[int]) -> List[pygit2.Commit]:
+    """Returns up to `limit` commits (all remaining if None) from `walker`."""
+    return list(itertools.islice(walker, limit))
+
+
+class ChangedPathCache:
+    """Thread-safe LRU of commit oid -> {path: status character} (see `changed_paths`)."""
+
+    def __init__(self, max_entries: int = DEFAULT_CHANGED_PATH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, oid: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            entry = self._entries.get(oid)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(oid)
+            self.hits += 1
+            return entry
+
+    def put(self, oid: str, paths: Dict[str, str]) -> None:
+        with self._lock:
+            self._entries[oid] = paths
+            self._entries.move_to_end(oid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_changed_path_cache = ChangedPathCache()
+
+
+def get_changed_path_cache() -> ChangedPathCache:
+    return _changed_path_cache
+
+
+class MergeBaseCache:
+    """Thread-safe LRU of (commit oid, commit oid) -> merge base oid ('' if the commits are unrelated).
+
+    Commits never change, so entries stay valid forever; the cache is only
+    bounded in size.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MERGE_BASE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple[str, str], base: str) -> None:
+        with self._lock:
+            self._entries[key] = base
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_merge_base_cache = MergeBaseCache()
+
+
+def get_merge_base_cache() -> MergeBaseCache:
+    return _merge_base_cache
+
+
+def merge_base(repo: pygit2.Repository, oid1: pygit2.Oid, oid2: pygit2.Oid) -> Optional[pygit2.Oid]:
+    """Returns the merge base of two commits (memoized), or None if they share no history."""
+    key = (str(oid1), str(oid2))
+    cached = _merge_base_cache.get(key)
+    if cached is None:
+        base = repo.merge_base(oid1, oid2)
+        cached = str(base) if base is not None else ""
+        _merge_base_cache.put(key, cached)
+    return pygit2.Oid(hex=cached) if cached else None
+
+
+def changed_paths(repo: pygit2.Repository, commit: pygit2.Commit) -> Dict[str, str]:
+    """Returns {path: status} for the paths `commit` changed relative to its first parent.
+
+    Statuses are git's single-letter codes ('A', 'D', 'M', 'T'); renames are
+    not detected here and appear as a deletion plus an addition. Root commits
+    report every path in their tree as added. The returned dict is shared
+    through the cache and must not be modified.
+    """
+    oid = str(commit.id)
+    cached = _changed_path_cache.get(oid)
+    if cached is not None:
+        return cached
+    if commit.parents:
+        diff = repo.diff(commit.parents[0].tree, commit.tree)
+    else:
+        diff = commit.tree.diff_to_tree(swap=True)
+    paths: Dict[str, str] = {}
+    for delta in diff.deltas:
+        status = delta.status_char()
+        paths[delta.new_file.path] = status
+        if delta.old_file.path != delta.new_file.path:
+            paths[delta.old_file.path] = "D"
+    _changed_path_cache.put(oid, paths)
+    return paths
+
+
+def find_rename_source(repo: pygit2.Repository, commit: pygit2.Commit, path: str) -> Optional[str]:
+    """Returns the path `path` was renamed from in `commit` (vs. its first parent), if any."""
+    if not commit.parents:
+        return None
+    diff = repo.diff(commit.parents[0].tree, commit.tree)
+    diff.find_similar()
+    for delta in diff.deltas:
+        if delta.status_char() == "R" and delta.new_file.path == path:
+            return delta.old_file.path
+    return None
+
+
+def encode_file_history_cursor(walker_cursor: str, path: str) -> str:
+    """Combines a `CommitWalker` cursor with the (possibly renamed) path being followed."""
+    encoded_path = base64.urlsafe_b64encode(path.encode("utf-8")).decode("ascii").rstrip("=")
+    return f"{walker_cursor}.{encoded_path}"
+
+
+def decode_file_history_cursor(cursor: str) -> Tuple[str, str]:
+    """Splits a token from `encode_file_history_cursor` into (walker cursor, path).
+
+    Raises:
+        InvalidCursorError: If the token is malformed.
+    """
+    walker_cursor, _, encoded_path = cursor.rpartition(".")
+    try:
+        padded = encoded_path + "=" * (-len(encoded_path) % 4)
+        path = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursorError(f"Malformed file history cursor: {e}") from e
+    if not walker_cursor or not path:
+        raise InvalidCursorError("Malformed file history cursor.")
+    return walker_cursor, path
+
+
+class FileFollower:
+    """Yields (commit, change) for each commit from `walker` that changed `path`.
+
+    `change` holds 'path' (the name at that commit), 'change_type' ('added',
+    'modified', 'deleted', 'renamed' or 'type_changed') and 'old_path' for
+    renames. When a commit turns out to have created the file by renaming
+    another one, older commits are matched against the previous name, as
+    ``git log --follow`` does; `path` always holds the name being followed.
+    """
+
+    _CHANGE_TYPES = {"A": "added", "D": "deleted", "M": "modified", "T": "type_changed"}
+
+    def __init__(self, repo: pygit2.Repository, walker: CommitWalker, path: str):
+        self.repo = repo
+        self.walker = walker
+        self.path = path.strip("/")
+
+    def __iter__(self) -> "FileFollower":
+        return self
+
+    def __next__(self) -> Tuple[pygit2.Commit, Dict[str, Optional[str]]]:
+        for commit in self.walker:
+            status = changed_paths(self.repo, commit).get(self.path)
+            if status is None:
+                continue
+            change: Dict[str, Optional[str]] = {
+                "path": self.path, "change_type": self._CHANGE_TYPES.get(status, "modified"), "old_path": None,
+            }
+            if status == "A":
+                source = find_rename_source(self.repo, commit, self.path)
+                if source is not None:
+                    change["change_type"] = "renamed"
+                    change["old_path"] = source
+                    self.path = source  # Older commits know the file by its previous name
+            return commit, change
+        raise StopIteration
+
+    def cursor(self) -> Optional[str]:
+        """Returns a token for resuming after the last yielded commit, or None when exhausted."""
+        walker_cursor = self.walker.cursor()
+        return encode_file_history_cursor(walker_cursor, self.path) if walker_cursor else None
@@ -0,0 +1,283 @@
+"""Per-repository reader/writer locks.
+
+Read-only core functions take a shared lock and mutations (commits, branch
+switches, merges, syncs, annotation commits) take an exclusive lock on the
+repository they operate on, keyed by its gitdir.
+
+Within a process the lock is fair: waiters are queued FIFO, readers only wait
+for writers (never for other readers) and a queued writer blocks readers that
+arrive after it, so writers cannot be starved. Across processes (e.g. several
+uvicorn workers) the holders of a repository additionally hold an ``flock`` on
+``<gitdir>/gitwrite-rw.lock``; where ``fcntl`` is unavailable or the lock file
+cannot be created, only in-process locking is performed.
+
+Locks are re-entrant per thread: a thread holding the exclusive lock may call
+other locked functions, and nested shared locks are granted immediately.
+Upgrading a shared lock to an exclusive one is not supported.
+"""
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+import pygit2
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from .exceptions import GitWriteError, RepositoryLockTimeoutError
+from .repository_cache import discover_repository
+
+DEFAULT_LOCK_TIMEOUT = 30.0  # Seconds
+LOCK_FILE_NAME = "gitwrite-rw.lock"
+_FILE_LOCK_POLL_INTERVAL = 0.01
+
+
+class _Waiter:
+    __slots__ = ("exclusive",)
+
+    def __init__(self, exclusive: bool):
+        self.exclusive = exclusive
+
+
+class _RepositoryLock:
+    """In-process fair RW lock for one repository plus its cross-process file lock."""
+
+    def __init__(self, gitdir: str):
+        self.gitdir = gitdir
+        self.cond = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.queue: Deque[_Waiter] = deque()
+        self.file_guard = threading.Lock()
+        self.file_fd: Optional[int] = None
+        self.file_mode: Optional[bool] = None  # True for exclusive, False for shared
+
+    def can_grant(self, waiter: _Waiter) -> bool:
+        if self.writer:
+            return False
+        if waiter.exclusive:
+            return self.readers == 0 and self.queue[0] is waiter
+        for queued in self.queue:
+            if queued is waiter:
+                return True
+            if queued.exclusive:
+                return False
+        return False
+
+    def acquire_file_lock(self, exclusive: bool, deadline: float) -> bool:
+        """Takes the flock matching `exclusive`; returns False on timeout."""
+        if fcntl is None:
+            return True
+        with self.file_guard:
+            if self.file_mode is not None:
+                return True  # Already held by another in-process holder of the same mode
+            try:
+                fd = os.open(os.path.join(self.gitdir, LOCK_FILE_NAME), os.O_RDWR | os.O_CREAT, 0o644)
+            except OSError:
+                return True  # Read-only or missing gitdir: fall back to in-process locking
+            operation = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB
+            while True:
+                try:
+                    fcntl.flock(fd, operation)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        os.close(fd)
+                        return False
+                    time.sleep(_FILE_LOCK_POLL_INTERVAL)
+            self.file_fd = fd
+            self.file_mode = exclusive
+            return True
+
+    def release_file_lock(self) -> None:
+        with self.file_guard:
+            if self.file_fd is not None:
+                fcntl.flock(self.file_fd, fcntl.LOCK_UN)
+                os.close(self.file_fd)
+            self.file_fd = None
+            self.file_mode = None
+
+
+class RepositoryLockManager:
+    """Hands out shared/exclusive locks per repository and records wait metrics."""
+
+    def __init__(self, timeout: float = DEFAULT_LOCK_TIMEOUT):
+        self.timeout = timeout
+        self._locks: Dict[str, _RepositoryLock] = {}
+        self._locks_guard = threading.Lock()
+        self._held = threading.local()
+        self._metrics_guard = threading.Lock()
+        self._metrics = {
+            mode: {"acquired": 0, "timeouts": 0, "waiting": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+            for mode in ("shared", "exclusive")
+        }
+
+    @contextmanager
+    def shared(self, repo_path: Any, timeout: Optional[float] = None) -> Iterator[None]:
+        with self.lock(repo_path, exclusive=False, timeout=timeout):
+            yield
+
+    @contextmanager
+    def exclusive(self, repo_path: Any, timeout: Optional[float] = None) -> Iterator[None]:
+        with self.lock(repo_path, exclusive=True, timeout=timeout):
+            yield
+
+    @contextmanager
+    def lock(self, repo_path: Any, exclusive: bool, timeout: Optional[float] = None) -> Iterator[None]:
+        """Holds the repository lock for the duration of the block.
+
+        Paths that do not resolve to a repository are not locked; the wrapped
+        operation is left to report that error itself.
+
+        Raises:
+            RepositoryLockTimeoutError: If the lock is not granted within `timeout` seconds.
+            GitWriteError: If the thread tries to upgrade a shared lock it holds.
+        """
+        gitdir = _resolve_gitdir(repo_path)
+        if gitdir is None:
+            yield
+            return
+
+        held = self._held_locks()
+        if gitdir in held:
+            held_exclusive, depth = held[gitdir]
+            if exclusive and not held_exclusive:
+                raise GitWriteError(f"Cannot upgrade a shared lock to an exclusive lock on '{gitdir}'.")
+            held[gitdir] = (held_exclusive, depth + 1)
+            try:
+                yield
+            finally:
+                held_exclusive, depth = held[gitdir]
+                held[gitdir] = (held_exclusive, depth - 1)
+            return
+
+        repo_lock = self._get_lock(gitdir)
+        self._acquire(repo_lock, exclusive, self.timeout if timeout is None else timeout)
+        held[gitdir] = (exclusive, 1)
+        try:
+            yield
+        finally:
+            del held[gitdir]
+            self._release(repo_lock, exclusive)
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        with self._metrics_guard:
+            return {mode: dict(values) for mode, values in self._metrics.items()}
+
+    def _held_locks(self) -> Dict[str, tuple]:
+        if not hasattr(self._held, "locks"):
+            self._held.locks = {}
+        return self._held.locks
+
+    def _get_lock(self, gitdir: str) -> _RepositoryLock:
+        with self._locks_guard:
+            repo_lock = self._locks.get(gitdir)
+            if repo_lock is None:
+                repo_lock = self._locks[gitdir] = _RepositoryLock(gitdir)
+            return repo_lock
+
+    def _acquire(self, repo_lock: _RepositoryLock, exclusive: bool, timeout: float) -> None:
+        mode = "exclusive" if exclusive else "shared"
+        started = time.monotonic()
+        deadline = started + timeout
+        waiter = _Waiter(exclusive)
+        with self._metrics_guard:
+            self._metrics[mode]["waiting"] += 1
+        try:
+            with repo_lock.cond:
+                repo_lock.queue.append(waiter)
+                while not repo_lock.can_grant(waiter):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        repo_lock.queue.remove(waiter)
+                        repo_lock.cond.notify_all()
+                        self._record_timeout(mode)
+                        raise RepositoryLockTimeoutError(
+                            f"Timed out after {timeout} seconds waiting for {mode} lock on '{repo_lock.gitdir}'."
+                        )
+                    repo_lock.cond.wait(remaining)
+                repo_lock.queue.remove(waiter)
+                if exclusive:
+                    repo_lock.writer = True
+                else:
+                    repo_lock.readers += 1
+                repo_lock.cond.notify_all()  # Readers queued behind this one may proceed too
+
+            if not repo_lock.acquire_file_lock(exclusive, deadline):
+                self._release(repo_lock, exclusive)
+                self._record_timeout(mode)
+                raise RepositoryLockTimeoutError(
+                    f"Timed out after {timeout} seconds waiting for {mode} lock on '{repo_lock.gitdir}' "
+                    f"(held by another process)."
+                )
+        finally:
+            with self._metrics_guard:
+                self._metrics[mode]["waiting"] -= 1
+
+        waited = time.monotonic() - started
+        with self._metrics_guard:
+            stats = self._metrics[mode]
+            stats["acquired"] += 1
+            stats["wait_seconds_total"] += waited
+            stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+
+    def _release(self, repo_lock: _RepositoryLock, exclusive: bool) -> None:
+        with repo_lock.cond:
+            # The file lock is dropped before the in-process slot is given up so
+            # that the next holder never shares the descriptor with a releaser.
+            if exclusive or repo_lock.readers == 1:
+                repo_lock.release_file_lock()
+            if exclusive:
+                repo_lock.writer = False
+            else:
+                repo_lock.readers -= 1
+            repo_lock.cond.notify_all()
+
+    def _record_timeout(self, mode: str) -> None:
+        with self._metrics_guard:
+            self._metrics[mode]["timeouts"] += 1
+
+
+def _resolve_gitdir(repo_path: Any) -> Optional[str]:
+    if repo_path is None:
+        return None
+    try:
+        discovered = discover_repository(repo_path)
+    except (pygit2.GitError, TypeError, ValueError, OSError):
+        return None
+    if not discovered:
+        return None
+    return os.path.normpath(os.path.abspath(discovered))
+
+
+_lock_manager = RepositoryLockManager()
+
+
+def get_lock_manager() -> RepositoryLockManager:
+    return _lock_manager
+
+
+def get_lock_metrics() -> Dict[str, Dict[str, float]]:
+    return _lock_manager.metrics()
+
+
+def repository_lock(exclusive: bool) -> Callable:
+    """Decorator that runs a core function under the repository's shared/exclusive lock.
+
+    The repository path is taken from the ``repo_path_str``/``repo_path``
+    keyword argument, or the first positional argument.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            repo_path = kwargs.get("repo_path_str", kwargs.get("repo_path", args[0] if args else None))
+            with _lock_manager.lock(repo_path, exclusive=exclusive):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,248 @@
+"""Per-chapter pandoc parsing with a cache of the parsed documents.
+
+Exports used to join all chapters into one markdown string and convert it in
+a single pandoc run, so editing one paragraph re-parsed the whole book.
+Instead, each chapter blob is read into pandoc's JSON AST on its own, the
+ASTs are cached by blob oid (and pandoc version, since the AST format follows
+it), and the book is assembled from them before the final writer run. After
+a one-chapter edit only that chapter is parsed again.
+
+The cache has two tiers: an in-memory LRU bounded by a byte budget, shared by
+every repository in the process, and an on-disk store per repository (under
+``<gitdir>/gitwrite/pandoc-ast``) that survives restarts and is used by the
+CLI as well. Blob oids identify content, so entries never go stale.
+"""
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+import pypandoc
+
+from .cache_utils import int_from_env, prune_lru_files
+
+AST_DIR_NAME = os.path.join("gitwrite", "pandoc-ast")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_MAX_BYTES = 256 * 1024 * 1024
+_DISK_SUFFIX = ".json"
+
+# Separates chapters in the assembled document, as the '---' between joined chapters did.
+CHAPTER_SEPARATOR = {"t": "HorizontalRule"}
+# Elements whose identifiers must be unique across the book, with the index of their Attr in "c".
+_IDENTIFIED_ELEMENTS = {"Header": 1, "Div": 0, "Span": 0}
+
+
+def chapter_ast_key(blob_id: object, pandoc_version: str) -> str:
+    return f"{blob_id}:{pandoc_version}"
+
+
+def ast_dir_for(repo_git_path: str) -> str:
+    """Returns the on-disk AST store of the repository whose git directory is `repo_git_path`."""
+    return os.path.join(repo_git_path, AST_DIR_NAME)
+
+
+class PandocAstCache:
+    """Two-tier (memory, per-repository disk) cache of chapter ASTs as JSON text."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._disk_written_since_prune: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str, disk_dir: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            ast_json = self._entries.get(key)
+            if ast_json is not None:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return ast_json
+        ast_json = self._read_disk(key, disk_dir) if disk_dir else None
+        with self._lock:
+            if ast_json is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._store_memory(key, ast_json)
+        return ast_json
+
+    def put(self, key: str, ast_json: str, disk_dir: Optional[str] = None) -> None:
+        with self._lock:
+            self._store_memory(key, ast_json)
+        if disk_dir:
+            self._write_disk(key, ast_json, disk_dir)
+
+    def clear(self) -> None:
+        """Empties the memory tier (disk stores are left alone) and resets statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+
+    def _store_memory(self, key: str, ast_json: str) -> None:
+        if len(ast_json) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = ast_json
+        self._bytes += len(ast_json)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._stats["evictions"] += 1
+
+    @staticmethod
+    def _disk_path(key: str, disk_dir: str) -> str:
+        file_name = key.replace(":", "-")
+        return os.path.join(disk_dir, file_name[:2], file_name + _DISK_SUFFIX)
+
+    def _read_disk(self, key: str, disk_dir: str) -> Optional[str]:
+        path = self._disk_path(key, disk_dir)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                ast_json = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)  # Keeps recently used entries when the store is pruned
+        except OSError:
+            pass
+        return ast_json
+
+    def _write_disk(self, key: str, ast_json: str, disk_dir: str) -> None:
+        path = self._disk_path(key, disk_dir)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(ast_json)
+            os.replace(tmp_path, path)
+        except OSError:
+            return  # The disk tier is best effort
+        with self._lock:
+            written = self._disk_written_since_prune.get(disk_dir, 0) + len(ast_json)
+            should_prune = written > self.disk_max_bytes // 10
+            self._disk_written_since_prune[disk_dir] = 0 if should_prune else written
+        if should_prune:
+            self._prune_disk(disk_dir)
+
+    def _prune_disk(self, disk_dir: str) -> None:
+        """Deletes least recently used files until the store fits its budget."""
+        prune_lru_files(disk_dir, self.disk_max_bytes, lambda name: name.endswith(_DISK_SUFFIX))
+
+
+def parse_chapter(markdown: str) -> str:
+    """Parses one chapter's markdown into pandoc's JSON AST (as JSON text)."""
+    return pypandoc.convert_text(markdown, to='json', format='md')
+
+
+def parse_chapters(
+    chapters: List[Tuple[object, str]],
+    pandoc_version: Optional[str],
+    disk_dir: Optional[str] = None,
+    cache: Optional["PandocAstCache"] = None,
+) -> Tuple[List[str], int]:
+    """Returns the ASTs of `chapters` ((blob id, markdown) pairs) and how many had to be parsed.
+
+    Cached ASTs are reused; without a known `pandoc_version` nothing is cached.
+    """
+    cache = cache if cache is not None else get_pandoc_ast_cache()
+    asts = []
+    parsed = 0
+    for blob_id, markdown in chapters:
+        key = chapter_ast_key(blob_id, pandoc_version) if pandoc_version else None
+        ast_json = cache.get(key, disk_dir) if key else None
+        if ast_json is None:
+            ast_json = parse_chapter(markdown)
+            parsed += 1
+            if key:
+                cache.put(key, ast_json, disk_dir)
+        asts.append(ast_json)
+    return asts, parsed
+
+
+def assemble_document(chapter_asts: List[str]) -> str:
+    """Joins chapter ASTs into one document, separating chapters with a horizontal rule.
+
+    Metadata blocks are merged with later chapters taking precedence, which is
+    how pandoc treats several metadata blocks in one document.
+
+    Each chapter was parsed alone, so its identifiers are only unique within
+    it. An identifier already used by an earlier chapter gets the first free
+    ``-1``, ``-2``... suffix, as pandoc numbers duplicate headings, and links
+    to it from the same chapter are pointed at the new identifier.
+    """
+    api_version = None
+    meta: Dict[str, object] = {}
+    blocks: List[object] = []
+    used_identifiers: Set[str] = set()
+    for index, ast_json in enumerate(chapter_asts):
+        ast = json.loads(ast_json)
+        if api_version is None:
+            api_version = ast.get("pandoc-api-version")
+        meta.update(ast.get("meta", {}))
+        if index:
+            blocks.append(CHAPTER_SEPARATOR)
+        chapter_blocks = ast.get("blocks", [])
+        renamed: Dict[str, str] = {}
+        _make_identifiers_unique(chapter_blocks, used_identifiers, renamed)
+        if renamed:
+            _retarget_links(chapter_blocks, renamed)
+        blocks.extend(chapter_blocks)
+    return json.dumps({"pandoc-api-version": api_version, "meta": meta, "blocks": blocks},
+                      ensure_ascii=False, separators=(",", ":"))
+
+
+def _make_identifiers_unique(node: object, used: Set[str], renamed: Dict[str, str]) -> None:
+    """Suffixes Header, Div and Span identifiers found in `used`, recording old -> new in `renamed`."""
+    if isinstance(node, list):
+        for child in node:
+            _make_identifiers_unique(child, used, renamed)
+    elif isinstance(node, dict):
+        attr_index = _IDENTIFIED_ELEMENTS.get(node.get("t"))
+        if attr_index is not None:
+            attr = node["c"][attr_index]
+            identifier = attr[0]
+            if identifier:
+                if identifier in used:
+                    suffix = 1
+                    while f"{identifier}-{suffix}" in used:
+                        suffix += 1
+                    attr[0] = f"{identifier}-{suffix}"
+                    renamed.setdefault(identifier, attr[0])
+                used.add(attr[0])
+        _make_identifiers_unique(node.get("c"), used, renamed)
+
+
+def _retarget_links(node: object, renamed: Dict[str, str]) -> None:
+    """Points internal links (``#identifier``) at the renamed identifiers."""
+    if isinstance(node, list):
+        for child in node:
+            _retarget_links(child, renamed)
+    elif isinstance(node, dict):
+        if node.get("t") == "Link":
+            target = node["c"][2]
+            if target[0].startswith("#") and target[0][1:] in renamed:
+                target[0] = "#" + renamed[target[0][1:]]
+        _retarget_links(node.get("c"), renamed)
+
+
+_pandoc_ast_cache = PandocAstCache(
+    max_bytes=int_from_env("GITWRITE_PANDOC_AST_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+    disk_max_bytes=int_from_env("GITWRITE_PANDOC_AST_CACHE_DISK_MAX_BYTES", DEFAULT_DISK_MAX_BYTES),
+)
+
+
+def get_pandoc_ast_cache() -> PandocAstCache:
+    return _pandoc_ast_cache
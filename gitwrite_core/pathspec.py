@@ -0,0 +1,112 @@
+"""Path-scoped diffs between two trees.
+
+pygit2 does not expose libgit2's diff pathspec option, so `scoped_patches`
+walks the two trees itself: it only descends into subtrees that differ and
+that a pathspec can reach, and generates patches for the matching blobs.
+Diffing one chapter therefore costs the depth of its path, not the size
+of the manuscript.
+
+Pathspecs follow git's default rules: a literal path selects a file or
+everything under a directory, and patterns containing ``*``, ``?`` or
+``[`` are matched against the whole path with ``*`` also matching ``/``.
+"""
+import fnmatch
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import pygit2
+
+_GLOB_CHARS = "*?["
+
+
+class Pathspec:
+    """A set of literal paths and glob patterns."""
+
+    def __init__(self, patterns: Iterable[str]):
+        normalized = set()
+        for pattern in patterns:
+            pattern = pattern.strip().replace("\\", "/")
+            while pattern.startswith("./"):
+                pattern = pattern[2:]
+            normalized.add(pattern.strip("/"))
+        normalized -= {"", "."}
+        self.patterns: List[str] = sorted(normalized)
+        self._literals = [p for p in self.patterns if not _is_glob(p)]
+        # (pattern, literal prefix before the first glob character)
+        self._globs = [(p, p[:min(p.find(c) for c in _GLOB_CHARS if c in p)]) for p in self.patterns if _is_glob(p)]
+
+    @classmethod
+    def from_paths(cls, paths: Optional[Iterable[str]]) -> Optional["Pathspec"]:
+        """Returns a Pathspec for `paths`, or None if they select everything."""
+        if not paths:
+            return None
+        spec = cls(paths)
+        return spec if spec.patterns else None
+
+    def key(self) -> str:
+        """A stable string identifying the pathspec (for cache keys)."""
+        return "\0".join(self.patterns)
+
+    def matches(self, path: str) -> bool:
+        """Whether the file at `path` is selected."""
+        for literal in self._literals:
+            if path == literal or path.startswith(literal + "/"):
+                return True
+        return any(fnmatch.fnmatchcase(path, pattern) for pattern, _ in self._globs)
+
+    def may_contain(self, directory: str) -> bool:
+        """Whether any file under `directory` could be selected."""
+        prefix = directory + "/"
+        for literal in self._literals:
+            if literal == directory or literal.startswith(prefix) or directory.startswith(literal + "/"):
+                return True
+        return any(prefix.startswith(literal) or literal.startswith(prefix) for _, literal in self._globs)
+
+
+def _is_glob(pattern: str) -> bool:
+    return any(c in pattern for c in _GLOB_CHARS)
+
+
+def scoped_patches(repo: pygit2.Repository, tree1: pygit2.Tree, tree2: pygit2.Tree, pathspec: Pathspec,
+                   context_lines: int = 3, interhunk_lines: int = 0) -> Iterator[pygit2.Patch]:
+    """Yields a patch for every file selected by `pathspec` that differs between the trees.
+
+    Patches come in the same order as in `tree1.diff_to_tree(tree2)`. Each
+    patch is only valid until the iterator advances (its blobs are released).
+    Renames are not detected, as in a plain tree diff, and file modes are not
+    compared.
+    """
+    for path, old_id, new_id in _changed_blobs(repo, tree1, tree2, "", pathspec):
+        old_blob = repo[old_id] if old_id is not None else None
+        new_blob = repo[new_id] if new_id is not None else None
+        yield pygit2.Patch.create_from(old_blob, new_blob, old_as_path=path, new_as_path=path,
+                                       context_lines=context_lines, interhunk_lines=interhunk_lines)
+
+
+def _changed_blobs(repo: pygit2.Repository, tree1: Optional[pygit2.Tree], tree2: Optional[pygit2.Tree], prefix: str,
+                   pathspec: Pathspec) -> Iterator[Tuple[str, Optional[pygit2.Oid], Optional[pygit2.Oid]]]:
+    old_entries = {entry.name: entry for entry in tree1} if tree1 is not None else {}
+    new_entries = {entry.name: entry for entry in tree2} if tree2 is not None else {}
+
+    # Git orders trees as if directory names ended in "/"; a name that is a file on
+    # one side and a directory on the other is handled as two separate entries.
+    items = []
+    for name in old_entries.keys() | new_entries.keys():
+        old, new = old_entries.get(name), new_entries.get(name)
+        old_is_tree = old is not None and old.type_str == "tree"
+        new_is_tree = new is not None and new.type_str == "tree"
+        if old is not None and new is not None and old_is_tree != new_is_tree:
+            items.append((name + "/", name, old if old_is_tree else None, new if new_is_tree else None))
+            items.append((name, name, None if old_is_tree else old, None if new_is_tree else new))
+        else:
+            items.append((name + "/" if old_is_tree or new_is_tree else name, name, old, new))
+
+    for _, name, old, new in sorted(items, key=lambda item: item[0]):
+        if old is not None and new is not None and old.id == new.id:
+            continue
+        path = prefix + name
+        if (old or new).type_str == "tree":
+            if pathspec.may_contain(path):
+                yield from _changed_blobs(repo, repo[old.id] if old is not None else None,
+                                          repo[new.id] if new is not None else None, path + "/", pathspec)
+        elif (old or new).type_str == "blob" and pathspec.matches(path):
+            yield path, old.id if old is not None else None, new.id if new is not None else None
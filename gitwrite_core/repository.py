@@ -6,6 +6,11 @@ from typing import Optional, Dict, List, Any
 from datetime import datetime, timezone, timedelta # For timezone.utc and timedelta
 import yaml # For reading metadata.yml
 
+from .repository_cache import discover_repository, open_repository
+from .locking import repository_lock
+from .history import CommitWalker, take
+from .exceptions import InvalidCursorError
+
 # Common ignore patterns for .gitignore
 COMMON_GITIGNORE_PATTERNS = [
     "*.pyc",
@@ -345,6 +350,7 @@ def get_conflicting_files(conflicts_iterator) -> List[str]: # Copied from versio
     return list(conflicting_paths)
 
 
+@repository_lock(exclusive=True)
 def sync_repository(repo_path_str: str, remote_name: str = "origin", branch_name_opt: Optional[str] = None, push: bool = True, allow_no_push: bool = False) -> dict:
     """
     Synchronizes a local repository branch with its remote counterpart.
@@ -368,10 +374,10 @@ def sync_repository(repo_path_str: str, remote_name: str = "origin", branch_name
     }
 
     try:
-        repo_discovered_path = pygit2.discover_repository(repo_path_str)
+        repo_discovered_path = discover_repository(repo_path_str)
         if repo_discovered_path is None:
             raise RepositoryNotFoundError(f"Repository not found at or above '{repo_path_str}'.")
-        repo = pygit2.Repository(repo_discovered_path)
+        repo = open_repository(repo_discovered_path)
     except pygit2.GitError as e:
         raise RepositoryNotFoundError(f"Error discovering repository at '{repo_path_str}': {e}")
 
@@ -602,6 +608,7 @@ def sync_repository(repo_path_str: str, remote_name: str = "origin", branch_name
     return result_summary
 
 
+@repository_lock(exclusive=False)
 def list_branches(repo_path_str: str) -> Dict[str, Any]:
     """
     Lists all local branches in the specified repository.
@@ -616,12 +623,12 @@ def list_branches(repo_path_str: str) -> Dict[str, Any]:
     try:
         # Attempt to discover the repository if repo_path_str is not the .git folder directly
         try:
-            repo_path = pygit2.discover_repository(repo_path_str)
+            repo_path = discover_repository(repo_path_str)
             if repo_path is None:
                 return {'status': 'error', 'branches': [], 'message': f"No Git repository found at or above '{repo_path_str}'."}
-            repo = pygit2.Repository(repo_path)
+            repo = open_repository(repo_path)
         except pygit2.GitError: # Fallback for cases where discover_repository might not be suitable e.g. bare repo
-             repo = pygit2.Repository(repo_path_str)
+             repo = open_repository(repo_path_str)
 
 
         if repo.is_bare:
@@ -644,6 +651,7 @@ def list_branches(repo_path_str: str) -> Dict[str, Any]:
         return {'status': 'error', 'branches': [], 'message': f"An unexpected error occurred: {e}"}
 
 
+@repository_lock(exclusive=False)
 def list_tags(repo_path_str: str) -> Dict[str, Any]:
     """
     Lists all tags in the specified repository.
@@ -657,12 +665,12 @@ def list_tags(repo_path_str: str) -> Dict[str, Any]:
     tags_list: List[str] = []
     try:
         try:
-            repo_path = pygit2.discover_repository(repo_path_str)
+            repo_path = discover_repository(repo_path_str)
             if repo_path is None:
                 return {'status': 'error', 'tags': [], 'message': f"No Git repository found at or above '{repo_path_str}'."}
-            repo = pygit2.Repository(repo_path)
+            repo = open_repository(repo_path)
         except pygit2.GitError:
-            repo = pygit2.Repository(repo_path_str)
+            repo = open_repository(repo_path_str)
 
         # repo.listall_tags() is deprecated, use repo.references.iterator with "refs/tags/"
         for ref in repo.references.iterator():
@@ -681,27 +689,33 @@ def list_tags(repo_path_str: str) -> Dict[str, Any]:
         return {'status': 'error', 'tags': [], 'message': f"An unexpected error occurred: {e}"}
 
 
-def list_commits(repo_path_str: str, branch_name: Optional[str] = None, max_count: Optional[int] = None) -> Dict[str, Any]:
+@repository_lock(exclusive=False)
+def list_commits(repo_path_str: str, branch_name: Optional[str] = None, max_count: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
     """
     Lists commits for a given branch, or the current branch if branch_name is not provided.
 
+    Commits are returned newest first and the walk stops after `max_count`
+    commits, so only the requested page of history is read.
+
     Args:
         repo_path_str: String path to the root of the repository.
         branch_name: Optional name of the branch. Defaults to the current branch (HEAD).
-        max_count: Optional maximum number of commits to return.
+        max_count: Optional maximum number of commits to return (the page size).
+        cursor: Optional 'next_cursor' from a previous call to continue from.
 
     Returns:
-        A dictionary with 'status', 'commits' (list of commit details), and 'message'.
+        A dictionary with 'status', 'commits' (list of commit details), 'message'
+        and 'next_cursor' (None when there are no more commits).
     """
     commits_data: List[Dict[str, Any]] = []
     try:
         try:
-            repo_path = pygit2.discover_repository(repo_path_str)
+            repo_path = discover_repository(repo_path_str)
             if repo_path is None:
                 return {'status': 'error', 'commits': [], 'message': f"No Git repository found at or above '{repo_path_str}'."}
-            repo = pygit2.Repository(repo_path)
+            repo = open_repository(repo_path)
         except pygit2.GitError:
-            repo = pygit2.Repository(repo_path_str)
+            repo = open_repository(repo_path_str)
 
         if repo.is_empty or repo.head_is_unborn:
             target_commit_oid = None
@@ -740,11 +754,12 @@ def list_commits(repo_path_str: str, branch_name: Optional[str] = None, max_coun
             return {'status': 'error', 'commits': [], 'message': f"Branch '{branch_name}' not found or repository is empty."}
 
 
-        count = 0
-        for commit in repo.walk(target_commit_oid, pygit2.GIT_SORT_TOPOLOGICAL | pygit2.GIT_SORT_TIME):
-            if max_count is not None and count >= max_count:
-                break
+        if cursor:
+            walker = CommitWalker.from_cursor(repo, cursor)
+        else:
+            walker = CommitWalker(repo, [target_commit_oid])
 
+        for commit in take(walker, max_count):
             author_sig = commit.author
             committer_sig = commit.committer
 
@@ -759,7 +774,6 @@ def list_commits(repo_path_str: str, branch_name: Optional[str] = None, max_coun
                 'committer_date': committer_sig.time, # Unix timestamp
                 'parents': [str(p) for p in commit.parent_ids]
             })
-            count += 1
 
         if not commits_data and (repo.is_empty or (branch_name and not commits_data)):
             # If we found a branch but it has no commits (e.g. orphaned branch or just initialized)
@@ -768,7 +782,9 @@ def list_commits(repo_path_str: str, branch_name: Optional[str] = None, max_coun
              return {'status': 'no_commits', 'commits': [], 'message': message}
 
 
-        return {'status': 'success', 'commits': commits_data, 'message': f'Successfully retrieved {len(commits_data)} commits.'}
+        return {'status': 'success', 'commits': commits_data, 'message': f'Successfully retrieved {len(commits_data)} commits.', 'next_cursor': walker.cursor()}
+    except InvalidCursorError as e:
+        return {'status': 'invalid_cursor', 'commits': [], 'message': str(e)}
     except pygit2.GitError as e:
         # Specific check for unborn head if no branch is specified
         if "unborn HEAD" in str(e).lower() and not branch_name:
@@ -778,6 +794,7 @@ def list_commits(repo_path_str: str, branch_name: Optional[str] = None, max_coun
         return {'status': 'error', 'commits': [], 'message': f"An unexpected error occurred: {e}"}
 
 
+@repository_lock(exclusive=True)
 def save_and_commit_file(repo_path_str: str, file_path: str, content: str, commit_message: str, author_name: Optional[str] = None, author_email: Optional[str] = None) -> Dict[str, Any]:
     """
     Saves a file's content to the specified path within a repository and commits it.
@@ -830,7 +847,7 @@ def save_and_commit_file(repo_path_str: str, file_path: str, content: str, commi
         # Open the repository
         try:
             # Use resolved path for consistency, though pygit2 usually handles it.
-            repo = pygit2.Repository(str(resolved_repo_path))
+            repo = open_repository(str(resolved_repo_path))
         except pygit2.GitError as e:
             return {'status': 'error', 'message': f"Repository not found or invalid: {e}", 'commit_id': None}
 
@@ -907,6 +924,7 @@ def save_and_commit_file(repo_path_str: str, file_path: str, content: str, commi
 #from datetime import datetime, timezone # For timezone.utc # Already imported at top
 #import yaml # For reading metadata.yml # Already imported at top
 
+@repository_lock(exclusive=False)
 def get_repository_metadata(repo_path: Path) -> Optional[Dict[str, Any]]:
     """
     Retrieves metadata for a given GitWrite repository path.
@@ -923,13 +941,13 @@ def get_repository_metadata(repo_path: Path) -> Optional[Dict[str, Any]]:
         return None
 
     # Step 2: Discover .git directory
-    repo_discovered_path_str = pygit2.discover_repository(str(repo_path))
+    repo_discovered_path_str = discover_repository(str(repo_path))
     if not repo_discovered_path_str:
         return None
 
     # Step 3: Open the repository
     try:
-        repo = pygit2.Repository(repo_discovered_path_str)
+        repo = open_repository(repo_discovered_path_str)
     except pygit2.GitError: # Catch only GitError for repository opening
         return None
 
@@ -972,6 +990,7 @@ def get_repository_metadata(repo_path: Path) -> Optional[Dict[str, Any]]:
     # Specific errors handled above should return None or allow specific issues to propagate if not caught.
 
 
+@repository_lock(exclusive=False)
 def list_repository_tree(repo_path_str: str, ref: str, path: str = "") -> Dict[str, Any]:
     """Lists files and folders in a repository at a specific reference and path.
     
@@ -986,14 +1005,14 @@ def list_repository_tree(repo_path_str: str, ref: str, path: str = "") -> Dict[s
     try:
         # Discover and open repository
         try:
-            repo_path = pygit2.discover_repository(repo_path_str)
+            repo_path = discover_repository(repo_path_str)
             if repo_path is None:
                 return {
                     'status': 'error',
                     'message': f"No Git repository found at or above '{repo_path_str}'.",
                     'entries': []
                 }
-            repo = pygit2.Repository(repo_path)
+            repo = open_repository(repo_path)
         except pygit2.GitError as e:
             return {
                 'status': 'error', 
@@ -1104,6 +1123,7 @@ def list_repository_tree(repo_path_str: str, ref: str, path: str = "") -> Dict[s
         }
 
 
+@repository_lock(exclusive=False)
 def get_file_content_at_commit(repo_path_str: str, file_path: str, commit_sha_str: str) -> Dict[str, Any]:
     """
     Retrieves the content and metadata of a specific file at a given commit.
@@ -1121,10 +1141,10 @@ def get_file_content_at_commit(repo_path_str: str, file_path: str, commit_sha_st
 
     try:
         try:
-            repo_path_discovered = pygit2.discover_repository(repo_path_str)
+            repo_path_discovered = discover_repository(repo_path_str)
             if repo_path_discovered is None:
                 raise RepositoryNotFoundError(f"No Git repository found at or above '{repo_path_str}'.")
-            repo = pygit2.Repository(repo_path_discovered) # Use discovered path
+            repo = open_repository(repo_path_discovered) # Use discovered path
         except pygit2.GitError as e:
             raise RepositoryNotFoundError(f"Error accessing repository at '{repo_path_str}': {e}")
 
@@ -1204,6 +1224,7 @@ def get_file_content_at_commit(repo_path_str: str, file_path: str, commit_sha_st
         raise GitWriteError(f"An unexpected error occurred in get_file_content_at_commit: {e}")
 
 
+@repository_lock(exclusive=True)
 def save_and_commit_multiple_files(repo_path_str: str, files_to_commit: Dict[str, str], commit_message: str, author_name: Optional[str] = None, author_email: Optional[str] = None) -> Dict[str, Any]:
     """
     Saves multiple files to the repository and creates a single commit with all changes.
@@ -1228,7 +1249,7 @@ def save_and_commit_multiple_files(repo_path_str: str, files_to_commit: Dict[str
         resolved_repo_path = repo_path.resolve()
 
         try:
-            repo = pygit2.Repository(str(resolved_repo_path))
+            repo = open_repository(str(resolved_repo_path))
         except pygit2.GitError as e:
             return {'status': 'error', 'message': f"Repository not found or invalid: {e}", 'commit_id': None}
 
@@ -0,0 +1,204 @@
+"""Process-wide cache of warm ``pygit2.Repository`` handles.
+
+Opening a repository with libgit2 is comparatively expensive: discovery walks
+the filesystem, and every fresh handle starts with an empty object cache, no
+pack index mmaps and a cold refdb. The core functions are called once per API
+request, so this module keeps opened handles around and hands them back out.
+
+Handles are keyed by ``(gitdir, thread id)``. libgit2 objects must not be used
+by two threads at the same time, so each thread (e.g. each API executor worker)
+gets its own warm handle per repository rather than sharing one.
+
+Entries are evicted least-recently-used once ``max_handles`` is exceeded, after
+``idle_timeout`` seconds without use, and whenever the repository on disk is
+removed or re-initialized (detected via the gitdir and ``config`` file stats).
+Paths that cannot be fingerprinted (non-existent paths, worktrees with a
+``.git`` file, sub-directories of a working tree) are opened without caching,
+so callers always get the same behaviour/exceptions as ``pygit2.Repository``.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import pygit2
+
+DEFAULT_MAX_HANDLES = 64
+DEFAULT_IDLE_TIMEOUT = 300.0  # Seconds
+
+_Fingerprint = Tuple[int, int, int, int]
+
+
+def _normalize(path: Any) -> str:
+    return os.path.normpath(os.path.abspath(os.fspath(path)))
+
+
+def _gitdir_for(path: str) -> Optional[str]:
+    """Returns the gitdir if `path` is a working tree root or a gitdir itself."""
+    dot_git = os.path.join(path, ".git")
+    if os.path.isdir(dot_git):
+        return dot_git
+    if os.path.isfile(os.path.join(path, "HEAD")) and os.path.isdir(os.path.join(path, "objects")):
+        return path
+    return None
+
+
+def _fingerprint(gitdir: str) -> Optional[_Fingerprint]:
+    """Identifies one incarnation of a repository on disk.
+
+    Re-initializing a repository at the same path creates a new gitdir and
+    writes a new ``config``, so the inode/mtime pair changes even if the
+    filesystem happens to reuse the directory inode.
+    """
+    try:
+        gitdir_stat = os.stat(gitdir)
+        config_stat = os.stat(os.path.join(gitdir, "config"))
+    except OSError:
+        return None
+    return (gitdir_stat.st_dev, gitdir_stat.st_ino, config_stat.st_ino, config_stat.st_mtime_ns)
+
+
+class _CacheEntry:
+    __slots__ = ("repo", "fingerprint", "last_used")
+
+    def __init__(self, repo: pygit2.Repository, fingerprint: _Fingerprint, last_used: float):
+        self.repo = repo
+        self.fingerprint = fingerprint
+        self.last_used = last_used
+
+
+class RepositoryCache:
+    """Thread-safe, bounded LRU registry of opened repositories."""
+
+    def __init__(self, max_handles: int = DEFAULT_MAX_HANDLES, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.max_handles = max_handles
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._handles: "OrderedDict[Tuple[str, int], _CacheEntry]" = OrderedDict()
+        self._discovered: Dict[str, str] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def discover(self, path: Any) -> Optional[str]:
+        """Cached equivalent of ``pygit2.discover_repository``.
+
+        Only results where `path` is the repository root (or the gitdir) are
+        cached; anything else is delegated to libgit2 on every call so that a
+        repository later created in a sub-directory is still picked up.
+        """
+        key = _normalize(path)
+        with self._lock:
+            cached = self._discovered.get(key)
+        if cached is not None and os.path.isdir(cached):
+            return cached
+
+        discovered = pygit2.discover_repository(os.fspath(path))
+        with self._lock:
+            if discovered and _gitdir_for(key) == _normalize(discovered):
+                self._discovered[key] = discovered
+            else:
+                self._discovered.pop(key, None)
+        return discovered
+
+    def open(self, path: Any) -> pygit2.Repository:
+        """Returns a warm handle for `path`, opening one if necessary.
+
+        Raises:
+            pygit2.GitError: If `path` is not a repository (as ``pygit2.Repository`` would).
+        """
+        path_str = os.fspath(path)
+        gitdir = _gitdir_for(_normalize(path_str))
+        fingerprint = _fingerprint(gitdir) if gitdir else None
+        if fingerprint is None:
+            return pygit2.Repository(path_str)
+
+        key = (gitdir, threading.get_ident())
+        now = time.monotonic()
+        with self._lock:
+            self._prune_idle(now)
+            entry = self._handles.get(key)
+            if entry is not None:
+                if entry.fingerprint == fingerprint:
+                    entry.last_used = now
+                    self._handles.move_to_end(key)
+                    self._stats["hits"] += 1
+                    repo = entry.repo
+                else:
+                    del self._handles[key]
+                    self._stats["invalidations"] += 1
+                    entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+
+        if entry is not None:
+            _refresh_index(repo)
+            return repo
+
+        repo = pygit2.Repository(path_str)
+        with self._lock:
+            self._handles[key] = _CacheEntry(repo, fingerprint, now)
+            self._handles.move_to_end(key)
+            while len(self._handles) > self.max_handles:
+                self._handles.popitem(last=False)
+                self._stats["evictions"] += 1
+        return repo
+
+    def invalidate(self, path: Any) -> None:
+        """Drops all cached handles (for every thread) of the repository at `path`."""
+        normalized = _normalize(path)
+        gitdir = _gitdir_for(normalized) or normalized
+        with self._lock:
+            for key in [k for k in self._handles if k[0] == gitdir]:
+                del self._handles[key]
+                self._stats["invalidations"] += 1
+            self._discovered.pop(normalized, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._handles.clear()
+            self._discovered.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, size=len(self._handles))
+
+    def _prune_idle(self, now: float) -> None:
+        # Entries are kept in last-used order, so idle ones are at the front.
+        while self._handles:
+            key, entry = next(iter(self._handles.items()))
+            if now - entry.last_used < self.idle_timeout:
+                break
+            del self._handles[key]
+            self._stats["evictions"] += 1
+
+
+def _refresh_index(repo: pygit2.Repository) -> None:
+    """Reloads the in-memory index from disk before the handle is handed out again.
+
+    The reload is forced: a non-forced read is skipped while the in-memory index
+    has unsaved changes, so a request that staged entries and then failed
+    before writing the index would leak them to the next request on the thread.
+    """
+    if repo.is_bare:
+        return
+    try:
+        repo.index.read(True)
+    except pygit2.GitError:
+        pass
+
+
+_repository_cache = RepositoryCache()
+
+
+def get_repository_cache() -> RepositoryCache:
+    return _repository_cache
+
+
+def discover_repository(path: Any) -> Optional[str]:
+    """Drop-in replacement for ``pygit2.discover_repository`` backed by the shared cache."""
+    return _repository_cache.discover(path)
+
+
+def open_repository(path: Any) -> pygit2.Repository:
+    """Drop-in replacement for ``pygit2.Repository(path)`` backed by the shared cache."""
+    return _repository_cache.open(path)
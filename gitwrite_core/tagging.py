@@ -1,6 +1,9 @@
 import pygit2
 from gitwrite_core.exceptions import RepositoryNotFoundError, CommitNotFoundError, TagAlreadyExistsError, GitWriteError
+from gitwrite_core.repository_cache import open_repository
+from gitwrite_core.locking import repository_lock
 
+@repository_lock(exclusive=True)
 def create_tag(repo_path_str: str, tag_name: str, target_commit_ish: str = 'HEAD', message: str = None, force: bool = False, tagger: pygit2.Signature = None):
     """
     Creates a new tag in the repository.
@@ -21,7 +24,7 @@ def create_tag(repo_path_str: str, tag_name: str, target_commit_ish: str = 'HEAD
         TagAlreadyExistsError: If the tag already exists and force is False.
     """
     try:
-        repo = pygit2.Repository(repo_path_str)
+        repo = open_repository(repo_path_str)
     except pygit2.GitError:
         raise RepositoryNotFoundError(f"Repository not found at '{repo_path_str}'")
 
@@ -64,6 +67,7 @@ def create_tag(repo_path_str: str, tag_name: str, target_commit_ish: str = 'HEAD
             raise GitWriteError(f"Failed to create lightweight tag '{tag_name}': {e}")
 
 
+@repository_lock(exclusive=False)
 def list_tags(repo_path_str: str):
     """
     Lists all tags in the repository.
@@ -80,7 +84,7 @@ def list_tags(repo_path_str: str):
         RepositoryNotFoundError: If the repository is not found at the given path.
     """
     try:
-        repo = pygit2.Repository(repo_path_str)
+        repo = open_repository(repo_path_str)
     except pygit2.GitError:
         raise RepositoryNotFoundError(f"Repository not found at '{repo_path_str}'")
 
@@ -3,23 +3,35 @@ import pygit2.enums # Added for MergeFavor
 # import pygit2.ops # ModuleNotFoundError with pygit2 1.18.0
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 import re # For get_word_level_diff
-import difflib # For get_word_level_diff
-
-from gitwrite_core.exceptions import RepositoryNotFoundError, CommitNotFoundError, NotEnoughHistoryError, MergeConflictError, GitWriteError
+import itertools
+
+from gitwrite_core.exceptions import RepositoryNotFoundError, CommitNotFoundError, NotEnoughHistoryError, MergeConflictError, GitWriteError, FileNotFoundInCommitError
+from gitwrite_core.repository_cache import discover_repository, open_repository
+from gitwrite_core.locking import repository_lock
+from gitwrite_core.diff_cache import diff_cache_key, get_diff_cache
+from gitwrite_core.word_diff import (
+    WORD_DIFF_FORMAT_VERSION, describe_delta, process_hunk_lines, word_diff_for_patch, word_diff_from_patches,
+    word_diff_settings
+)
+from gitwrite_core.pathspec import Pathspec, scoped_patches
+from gitwrite_core.word_diff_compact import COMPACT_FORMAT_VERSION, encode_compact_word_diff
+from gitwrite_core.history import CommitWalker, FileFollower, decode_file_history_cursor, take
+from gitwrite_core.history import merge_base as memoized_merge_base
 
 def _get_commit_summary(commit: pygit2.Commit) -> str:
     """Helper function to get the first line of a commit message."""
     return commit.message.splitlines()[0]
 
+@repository_lock(exclusive=False)
 def get_commit_history(repo_path_str: str, count: Optional[int] = None) -> List[Dict]:
     """
-    Retrieves the commit history for a Git repository.
+    Retrieves the commit history for a Git repository, newest first.
 
     Args:
         repo_path_str: Path to the repository.
-        count: Optional number of commits to return.
+        count: Optional number of most recent commits to return.
 
     Returns:
         A list of dictionaries, where each dictionary contains details of a commit.
@@ -29,11 +41,11 @@ def get_commit_history(repo_path_str: str, count: Optional[int] = None) -> List[
     """
     try:
         # Discover the repository path
-        repo_path = pygit2.discover_repository(repo_path_str)
+        repo_path = discover_repository(repo_path_str)
         if repo_path is None:
             raise RepositoryNotFoundError(f"No repository found at or above '{repo_path_str}'")
 
-        repo = pygit2.Repository(repo_path)
+        repo = open_repository(repo_path)
     except pygit2.GitError as e:
         raise RepositoryNotFoundError(f"Error opening repository at '{repo_path_str}': {e}")
 
@@ -43,15 +55,8 @@ def get_commit_history(repo_path_str: str, count: Optional[int] = None) -> List[
     if repo.is_empty or repo.head_is_unborn:
         return []
 
-    history = []
-    # commits_processed = 0 # This variable was unused
-
-    # Use GIT_SORT_TOPOLOGICAL in combination with GIT_SORT_REVERSE for oldest-first order
-    sort_mode = pygit2.GIT_SORT_TOPOLOGICAL | pygit2.GIT_SORT_REVERSE
-    walker = repo.walk(repo.head.target, sort_mode)
-
     history_data = []
-    for commit_obj in walker:
+    for commit_obj in take(CommitWalker(repo, [repo.head.target]), count):
         author_tz = timezone(timedelta(minutes=commit_obj.author.offset))
         committer_tz = timezone(timedelta(minutes=commit_obj.committer.offset))
         history_data.append({
@@ -67,20 +72,90 @@ def get_commit_history(repo_path_str: str, count: Optional[int] = None) -> List[
             "oid": str(commit_obj.id),
         })
 
-    # history_data is now oldest-first
-    if count is not None:
-        # Return the first 'count' elements, which are the oldest 'count' commits
-        return history_data[:count]
+    # Newest first; only the first 'count' commits are walked.
+    return history_data
+
+@repository_lock(exclusive=False)
+def get_file_history(repo_path_str: str, file_path: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Retrieves the commits that changed a single file, newest first, following renames.
+
+    A commit "changed" the file if the file differs from the commit's first
+    parent. When the file was created by renaming another file, older commits
+    are matched against the previous name. Changed paths per commit are cached
+    by commit oid, so repeated or paged queries do not re-diff trees.
+
+    Args:
+        repo_path_str: Path to the repository.
+        file_path: Repository-relative path of the file (its current name).
+        limit: Optional maximum number of commits to return (the page size).
+        cursor: Optional 'next_cursor' from a previous call to continue from.
+
+    Returns:
+        A dictionary with 'file_path', 'commits' (list_commits-style commit
+        details plus 'path', 'change_type' and 'old_path') and 'next_cursor'
+        (None when history is exhausted; a page may be empty if the remaining
+        history holds no further changes to the file).
+
+    Raises:
+        RepositoryNotFoundError: If the repository is not found at the given path.
+        InvalidCursorError: If the cursor is malformed or no longer matches the repository.
+    """
+    try:
+        repo_path = discover_repository(repo_path_str)
+        if repo_path is None:
+            raise RepositoryNotFoundError(f"No repository found at or above '{repo_path_str}'")
+        repo = open_repository(repo_path)
+    except pygit2.GitError as e:
+        raise RepositoryNotFoundError(f"Error opening repository at '{repo_path_str}': {e}")
+
+    normalized_path = file_path.replace("\\", "/").strip("/")
+    if repo.is_empty or repo.head_is_unborn:
+        return {"file_path": normalized_path, "commits": [], "next_cursor": None}
+
+    if cursor:
+        walker_cursor, followed_path = decode_file_history_cursor(cursor)
+        walker = CommitWalker.from_cursor(repo, walker_cursor)
     else:
-        # Return all commits, oldest-first
-        return history_data
+        walker, followed_path = CommitWalker(repo, [repo.head.target]), normalized_path
+
+    follower = FileFollower(repo, walker, followed_path)
+    commits_data = []
+    for commit, change in itertools.islice(follower, limit):
+        commits_data.append({
+            "sha": str(commit.id),
+            "message": commit.message.strip(),
+            "author_name": commit.author.name,
+            "author_email": commit.author.email,
+            "author_date": commit.author.time,
+            "committer_name": commit.committer.name,
+            "committer_email": commit.committer.email,
+            "committer_date": commit.committer.time,
+            "parents": [str(p) for p in commit.parent_ids],
+            **change,
+        })
+    return {"file_path": normalized_path, "commits": commits_data, "next_cursor": follower.cursor()}
 
-def get_diff(repo_path_str: str, ref1_str: Optional[str] = None, ref2_str: Optional[str] = None) -> Dict[str, Any]:
+_DIFF_OPTIONS = {"context_lines": 3, "interhunk_lines": 1}
+_STATS_DIFF_OPTIONS = {"context_lines": 0, "interhunk_lines": 0}
+
+
+def _resolve_compare(repo_path_str: str, ref1_str: Optional[str], ref2_str: Optional[str], merge_base: bool = False
+                     ) -> Tuple[pygit2.Repository, pygit2.Commit, pygit2.Commit, Dict[str, str]]:
+    """Opens the repository and resolves the two compare endpoints (see `get_diff` for the defaults).
+
+    With `merge_base`, the first endpoint becomes the merge base of the two
+    references ("three-dot" compare).
+
+    Returns:
+        The repository, both commits and a dictionary with 'ref1_oid',
+        'ref2_oid', 'ref1_display_name' and 'ref2_display_name'.
+    """
     try:
-        repo_discovered_path = pygit2.discover_repository(repo_path_str)
+        repo_discovered_path = discover_repository(repo_path_str)
         if repo_discovered_path is None:
             raise RepositoryNotFoundError(f"No repository found at or above '{repo_path_str}'")
-        repo = pygit2.Repository(repo_discovered_path)
+        repo = open_repository(repo_discovered_path)
     except pygit2.GitError as e:
         raise RepositoryNotFoundError(f"Error opening repository at '{repo_path_str}': {e}")
 
@@ -128,24 +203,303 @@ def get_diff(repo_path_str: str, ref1_str: Optional[str] = None, ref2_str: Optio
     if not commit1_obj or not commit2_obj:
         raise CommitNotFoundError("Could not resolve one or both references to commits.")
 
-    tree1 = commit1_obj.tree
-    tree2 = commit2_obj.tree
-    diff_obj = repo.diff(tree1, tree2, context_lines=3, interhunk_lines=1)
+    if merge_base:
+        name1 = ref1_resolved_name or str(commit1_obj.id)[:7]
+        name2 = ref2_resolved_name or str(commit2_obj.id)[:7]
+        base_oid = memoized_merge_base(repo, commit1_obj.id, commit2_obj.id)
+        if base_oid is None:
+            raise NotEnoughHistoryError(f"'{name1}' and '{name2}' have no common history to compare from.")
+        commit1_obj = repo[base_oid]
+        ref1_resolved_name = f"{str(base_oid)[:7]} (merge base of {name1} and {name2})"
 
-    return {
+    return repo, commit1_obj, commit2_obj, {
         "ref1_oid": str(commit1_obj.id),
         "ref2_oid": str(commit2_obj.id),
         "ref1_display_name": ref1_resolved_name if ref1_resolved_name else str(commit1_obj.id),
         "ref2_display_name": ref2_resolved_name if ref2_resolved_name else str(commit2_obj.id),
-        "patch_text": diff_obj.patch if diff_obj else ""
     }
 
+def _diff_patches(repo: pygit2.Repository, tree1: pygit2.Tree, tree2: pygit2.Tree, pathspec: Optional[Pathspec],
+                  options: Dict[str, int]) -> Iterator[pygit2.Patch]:
+    """Yields the patches of the diff between two trees, one at a time, limited to `pathspec` if given."""
+    if pathspec is not None:
+        yield from scoped_patches(repo, tree1, tree2, pathspec, **options)
+        return
+    diff_obj = repo.diff(tree1, tree2, **options)
+    for index in range(len(diff_obj)):
+        patch = diff_obj[index]
+        if patch is not None:
+            yield patch
+
+
+def _cache_mode(mode: str, pathspec: Optional[Pathspec]) -> str:
+    return f"{mode}:{pathspec.key()}" if pathspec is not None else mode
+
+
+@repository_lock(exclusive=False)
+def get_diff(repo_path_str: str, ref1_str: Optional[str] = None, ref2_str: Optional[str] = None,
+             include_word_diff: bool = False, paths: Optional[List[str]] = None,
+             merge_base: bool = False, compact_word_diff: bool = False) -> Dict[str, Any]:
+    """
+    Compares two commits (HEAD~1 and HEAD by default).
+
+    Results are cached by the pair of tree oids (see `gitwrite_core.diff_cache`),
+    so repeated comparisons of the same revisions skip the diff entirely.
+
+    Args:
+        repo_path_str: Path to the repository.
+        ref1_str: Optional first reference. Defaults to HEAD~1 (or compares against HEAD if only ref1 is given).
+        ref2_str: Optional second reference. Defaults to HEAD.
+        include_word_diff: Also return the structured word-level diff as 'word_diff'.
+        paths: Optional pathspecs (files, directories or globs, see
+            `gitwrite_core.pathspec`) to restrict the diff to. Subtrees they
+            cannot match are never read.
+        merge_base: Compare the merge base of ref1 and ref2 with ref2
+            ("three-dot" compare: only the changes made on ref2's side).
+            Merge bases are memoized per commit pair.
+        compact_word_diff: Return 'word_diff' in the compact wire encoding
+            (see `gitwrite_core.word_diff_compact`) instead of as nested dictionaries.
+
+    Returns:
+        A dictionary with 'ref1_oid', 'ref2_oid', 'ref1_display_name',
+        'ref2_display_name', 'patch_text' and, if requested, 'word_diff'.
+        Cached values are shared and must not be modified.
+
+    Raises:
+        RepositoryNotFoundError: If the repository is not found.
+        CommitNotFoundError: If a reference cannot be resolved to a commit.
+        NotEnoughHistoryError: If there is no history to compare by default, or
+            the references share no history when comparing from their merge base.
+        ValueError: If ref2 is given without ref1.
+    """
+    repo, commit1_obj, commit2_obj, refs = _resolve_compare(repo_path_str, ref1_str, ref2_str, merge_base)
+    tree1 = commit1_obj.tree
+    tree2 = commit2_obj.tree
+    pathspec = Pathspec.from_paths(paths)
+    diff_options = _DIFF_OPTIONS
+    cache = get_diff_cache()
+
+    def compute_patch() -> str:
+        if pathspec is not None:
+            return "".join(patch.text for patch in _diff_patches(repo, tree1, tree2, pathspec, diff_options))
+        diff_obj = repo.diff(tree1, tree2, **diff_options)
+        return (diff_obj.patch or "") if diff_obj else ""
+
+    patch_text = cache.get_or_compute(diff_cache_key(tree1.id, tree2.id, diff_options, _cache_mode("patch", pathspec)),
+                                      compute_patch)
+
+    result = dict(refs, patch_text=patch_text)
+    if include_word_diff:
+        word_options = dict(diff_options, **word_diff_settings())
+
+        def compute_word_diff() -> List[Dict[str, Any]]:
+            return cache.get_or_compute(
+                diff_cache_key(tree1.id, tree2.id, word_options, _cache_mode(f"word-v{WORD_DIFF_FORMAT_VERSION}", pathspec)),
+                lambda: word_diff_from_patches(_diff_patches(repo, tree1, tree2, pathspec, diff_options))
+            )
+
+        if compact_word_diff:
+            mode = f"word-v{WORD_DIFF_FORMAT_VERSION}-compact-v{COMPACT_FORMAT_VERSION}"
+            result["word_diff"] = cache.get_or_compute(
+                diff_cache_key(tree1.id, tree2.id, word_options, _cache_mode(mode, pathspec)),
+                lambda: encode_compact_word_diff(compute_word_diff())
+            )
+        else:
+            result["word_diff"] = compute_word_diff()
+    return result
+
+def diff_file_summary(patch: pygit2.Patch) -> Dict[str, Any]:
+    """Summarises one file of a diff without rendering it.
+
+    Returns:
+        The file's paths and 'change_type' (as in the word diff), 'is_binary',
+        'lines_added', 'lines_deleted', 'words_added' and 'words_deleted'.
+    """
+    summary = describe_delta(patch.delta)
+    summary["is_binary"] = patch.delta.is_binary
+    _, lines_added, lines_deleted = patch.line_stats
+    words_added = words_deleted = 0
+    if not patch.delta.is_binary and (lines_added or lines_deleted):
+        # Scanning the raw patch bytes is much cheaper than building Python objects for every hunk line
+        in_hunks = False
+        for line in patch.data.split(b"\n"):
+            if not in_hunks:
+                in_hunks = line.startswith(b"@@")
+            elif line.startswith(b"+"):
+                words_added += len(line[1:].split())
+            elif line.startswith(b"-"):
+                words_deleted += len(line[1:].split())
+    summary.update(lines_added=lines_added, lines_deleted=lines_deleted,
+                   words_added=words_added, words_deleted=words_deleted)
+    return summary
+
+
+def _file_diff(patch: pygit2.Patch, include_word_diff: bool) -> Dict[str, Any]:
+    result = diff_file_summary(patch)
+    if include_word_diff:
+        result["word_diff"] = word_diff_for_patch(patch)
+    else:
+        result["patch_text"] = patch.text
+    return result
+
+
+def _diff_summaries(repo: pygit2.Repository, tree1: pygit2.Tree, tree2: pygit2.Tree,
+                    pathspec: Optional[Pathspec] = None) -> List[Dict[str, Any]]:
+    """Returns `diff_file_summary` for each changed file (selected by `pathspec`), cached by tree oids.
+
+    The diff is generated without context lines and no patch text is built.
+    """
+    def compute_summaries() -> List[Dict[str, Any]]:
+        return [diff_file_summary(patch) for patch in _diff_patches(repo, tree1, tree2, pathspec, _STATS_DIFF_OPTIONS)]
+
+    key = diff_cache_key(tree1.id, tree2.id, _STATS_DIFF_OPTIONS, _cache_mode("stats-v1", pathspec))
+    return get_diff_cache().get_or_compute(key, compute_summaries)
+
+
+def _diff_totals(files: List[Dict[str, Any]]) -> Dict[str, int]:
+    totals = {"files_changed": len(files)}
+    for name in ("lines_added", "lines_deleted", "words_added", "words_deleted"):
+        totals[name] = sum(f[name] for f in files)
+    return totals
+
+
+@repository_lock(exclusive=False)
+def get_diff_stats(repo_path_str: str, ref1_str: Optional[str] = None, ref2_str: Optional[str] = None,
+                   paths: Optional[List[str]] = None, merge_base: bool = False) -> Dict[str, Any]:
+    """
+    Counts the files, lines and words changed between two commits without building the patch text.
+
+    Line counts come from libgit2's patch statistics; words are counted over
+    the added and removed lines only (the diff is generated without context).
+    References are resolved as in `get_diff`.
+
+    Args:
+        repo_path_str: Path to the repository.
+        ref1_str: Optional first reference.
+        ref2_str: Optional second reference.
+        paths: Optional pathspecs to restrict the statistics to (as for `get_diff`).
+        merge_base: Count the changes since the merge base (as for `get_diff`).
+
+    Returns:
+        A dictionary with the 'ref1_*'/'ref2_*' keys of `get_diff`, 'files' (a
+        list of `diff_file_summary` dictionaries in diff order) and 'totals'
+        ('files_changed', 'lines_added', 'lines_deleted', 'words_added' and
+        'words_deleted').
+
+    Raises:
+        RepositoryNotFoundError, CommitNotFoundError, NotEnoughHistoryError,
+        ValueError: As for `get_diff`.
+    """
+    repo, commit1_obj, commit2_obj, refs = _resolve_compare(repo_path_str, ref1_str, ref2_str, merge_base)
+    files = _diff_summaries(repo, commit1_obj.tree, commit2_obj.tree, Pathspec.from_paths(paths))
+    return dict(refs, files=files, totals=_diff_totals(files))
+
+
+def list_diff_files(repo_path_str: str, ref1_str: Optional[str] = None, ref2_str: Optional[str] = None,
+                    paths: Optional[List[str]] = None, merge_base: bool = False) -> Dict[str, Any]:
+    """
+    Lists the files changed between two commits with line and word counts, without rendering the diff.
+
+    This is `get_diff_stats` under the name the file-by-file compare uses;
+    each listed file's diff can then be fetched with `get_file_diff`.
+    """
+    return get_diff_stats(repo_path_str, ref1_str, ref2_str, paths=paths, merge_base=merge_base)
+
+
+@repository_lock(exclusive=False)
+def get_file_diff(repo_path_str: str, file_path: str, ref1_str: Optional[str] = None, ref2_str: Optional[str] = None,
+                  include_word_diff: bool = False, merge_base: bool = False) -> Dict[str, Any]:
+    """
+    Returns the diff of a single file between two commits.
+
+    Only the trees along the file's path are read and only its patch is
+    generated. References are resolved as in `get_diff`.
+
+    Args:
+        repo_path_str: Path to the repository.
+        file_path: Repository-relative path of the file.
+        ref1_str: Optional first reference.
+        ref2_str: Optional second reference.
+        include_word_diff: Return the structured word diff ('word_diff') instead of 'patch_text'.
+        merge_base: Diff from the merge base of the references (as for `get_diff`).
+
+    Returns:
+        A dictionary with the 'ref1_*'/'ref2_*' keys of `get_diff` and 'file':
+        the `diff_file_summary` of the file plus its 'patch_text' or 'word_diff'.
+
+    Raises:
+        FileNotFoundInCommitError: If the file is not changed between the two commits.
+        RepositoryNotFoundError, CommitNotFoundError, NotEnoughHistoryError,
+        ValueError: As for `get_diff`.
+    """
+    repo, commit1_obj, commit2_obj, refs = _resolve_compare(repo_path_str, ref1_str, ref2_str, merge_base)
+    tree1 = commit1_obj.tree
+    tree2 = commit2_obj.tree
+    file_path = file_path.strip("/")
+    pathspec = Pathspec([file_path])
+    options = dict(_DIFF_OPTIONS, **word_diff_settings()) if include_word_diff else _DIFF_OPTIONS
+    mode = f"file-word-v{WORD_DIFF_FORMAT_VERSION}:{file_path}" if include_word_diff else f"file-patch:{file_path}"
+
+    def compute_file() -> Dict[str, Any]:
+        for patch in _diff_patches(repo, tree1, tree2, pathspec, _DIFF_OPTIONS):
+            if patch.delta.new_file.path == file_path:
+                return _file_diff(patch, include_word_diff)
+        return {}  # Cached too: the file is unchanged
+
+    file_diff = get_diff_cache().get_or_compute(diff_cache_key(tree1.id, tree2.id, options, mode), compute_file)
+    if not file_diff:
+        raise FileNotFoundInCommitError(
+            f"File '{file_path}' is not changed between '{refs['ref1_display_name']}' and '{refs['ref2_display_name']}'."
+        )
+    return dict(refs, file=file_diff)
+
+
+@repository_lock(exclusive=False)
+def stream_diff_files(repo_path_str: str, ref1_str: Optional[str] = None, ref2_str: Optional[str] = None,
+                      include_word_diff: bool = False, paths: Optional[List[str]] = None, merge_base: bool = False
+                      ) -> Tuple[Dict[str, str], Iterator[Dict[str, Any]]]:
+    """
+    Resolves two references and returns an iterator that diffs their files one at a time.
+
+    `paths` and `merge_base` are handled as in `get_diff`.
+
+    Only one file's patch is held at a time, so memory stays bounded however
+    large the diff is. The references are resolved (and errors raised) under
+    the repository lock before this returns. The iterator outlives the call
+    and may be advanced from any thread, so it reads the two trees through a
+    private, uncached repository handle rather than this thread's shared one
+    (see `gitwrite_core.repository_cache`); it must not be advanced from two
+    threads at once. Trees are immutable, so iterating needs no lock.
+
+    Returns:
+        A tuple of the 'ref1_*'/'ref2_*' dictionary of `get_diff` and an
+        iterator of per-file dictionaries as returned in `get_file_diff`'s 'file'.
+
+    Raises:
+        RepositoryNotFoundError, CommitNotFoundError, NotEnoughHistoryError,
+        ValueError: As for `get_diff`.
+    """
+    repo, commit1_obj, commit2_obj, refs = _resolve_compare(repo_path_str, ref1_str, ref2_str, merge_base)
+    tree1_id = commit1_obj.tree_id
+    tree2_id = commit2_obj.tree_id
+    stream_repo_path = repo.path
+    pathspec = Pathspec.from_paths(paths)
+
+    def iter_files() -> Iterator[Dict[str, Any]]:
+        stream_repo = pygit2.Repository(stream_repo_path)
+        tree1, tree2 = stream_repo[tree1_id], stream_repo[tree2_id]
+        for patch in _diff_patches(stream_repo, tree1, tree2, pathspec, _DIFF_OPTIONS):
+            yield _file_diff(patch, include_word_diff)
+
+    return refs, iter_files()
+
+@repository_lock(exclusive=True)
 def revert_commit(repo_path_str: str, commit_ish_to_revert: str) -> dict:
     try:
-        repo_discovered_path = pygit2.discover_repository(repo_path_str)
+        repo_discovered_path = discover_repository(repo_path_str)
         if repo_discovered_path is None:
             raise RepositoryNotFoundError(f"No repository found at or above '{repo_path_str}'")
-        repo = pygit2.Repository(repo_discovered_path)
+        repo = open_repository(repo_discovered_path)
     except pygit2.GitError as e:
         raise RepositoryNotFoundError(f"Error opening repository at '{repo_path_str}': {e}")
 
@@ -264,15 +618,16 @@ def get_conflicting_files(conflicts_iterator):
                 conflicting_paths.append(ancestor_meta.path)
     return conflicting_paths
 
+@repository_lock(exclusive=True)
 def save_changes(repo_path_str: str, message: str, include_paths: Optional[List[str]] = None) -> Dict:
     import time
     from .exceptions import NoChangesToSaveError, RevertConflictError, RepositoryEmptyError
 
     try:
-        repo_discovered_path = pygit2.discover_repository(repo_path_str)
+        repo_discovered_path = discover_repository(repo_path_str)
         if repo_discovered_path is None:
             raise RepositoryNotFoundError(f"Repository not found at or above '{repo_path_str}'.")
-        repo = pygit2.Repository(repo_discovered_path)
+        repo = open_repository(repo_discovered_path)
     except pygit2.GitError as e:
         raise RepositoryNotFoundError(f"Error discovering or initializing repository at '{repo_path_str}': {e}")
 
@@ -494,12 +849,13 @@ def save_changes(repo_path_str: str, message: str, include_paths: Optional[List[
         'is_revert_commit': is_revert_commit,
     }
 
+@repository_lock(exclusive=True)
 def cherry_pick_commit(repo_path_str: str, commit_oid_to_pick: str, mainline: Optional[int] = None) -> Dict[str, Any]:
     try:
-        repo_discovered_path = pygit2.discover_repository(repo_path_str)
+        repo_discovered_path = discover_repository(repo_path_str)
         if repo_discovered_path is None:
             raise RepositoryNotFoundError(f"No repository found at or above '{repo_path_str}'")
-        repo = pygit2.Repository(repo_discovered_path)
+        repo = open_repository(repo_discovered_path)
     except pygit2.GitError as e:
         raise RepositoryNotFoundError(f"Error opening repository at '{repo_path_str}': {e}")
 
@@ -630,6 +986,7 @@ def cherry_pick_commit(repo_path_str: str, commit_oid_to_pick: str, mainline: Op
         raise GitWriteError(f"An unexpected error occurred during cherry-pick for commit '{commit_oid_to_pick}': {e}")
 
 
+@repository_lock(exclusive=False)
 def get_branch_review_commits(repo_path_str: str, branch_name_to_review: str, limit: Optional[int] = None) -> List[Dict]:
     """
     Retrieves commits present on branch_name_to_review but not on the current HEAD.
@@ -653,10 +1010,10 @@ def get_branch_review_commits(repo_path_str: str, branch_name_to_review: str, li
     import re # For get_word_level_diff
 
     try:
-        repo_discovered_path = pygit2.discover_repository(repo_path_str)
+        repo_discovered_path = discover_repository(repo_path_str)
         if repo_discovered_path is None:
             raise RepositoryNotFoundError(f"No repository found at or above '{repo_path_str}'")
-        repo = pygit2.Repository(repo_discovered_path)
+        repo = open_repository(repo_discovered_path)
     except pygit2.GitError as e:
         raise RepositoryNotFoundError(f"Error opening repository at '{repo_path_str}': {e}")
 
@@ -711,6 +1068,11 @@ def get_word_level_diff(patch_text: str) -> List[Dict[str, Any]]:
     Processes a standard diff patch string and returns a structured
     representation with word-level differences.
 
+    This text-parsing path is kept for callers that only have patch text
+    (such as the CLI). Code holding a `pygit2.Diff` should use
+    `gitwrite_core.word_diff.word_diff_from_diff`, which also reports line
+    numbers and hunk ranges.
+
     Args:
         patch_text: A string containing the diff output (e.g., from `git diff`).
 
@@ -913,108 +1275,7 @@ def get_word_level_diff(patch_text: str) -> List[Dict[str, Any]]:
 
 def _process_hunk_lines_for_structured_diff(hunk_lines: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
     """
-    Helper function to process lines within a hunk for word-level diffs
-    and return a structured list.
+    Helper function to process (origin, content) lines parsed from patch text
+    into structured lines. Line numbers are not known on this path.
     """
-    processed_lines: List[Dict[str, Any]] = []
-    i = 0
-    while i < len(hunk_lines):
-        origin, content = hunk_lines[i]
-
-        if origin == '-' and (i + 1 < len(hunk_lines)) and hunk_lines[i+1][0] == '+':
-            old_content_str = content
-            new_content_str = hunk_lines[i+1][1]
-            old_words_list = old_content_str.split()
-            new_words_list = new_content_str.split()
-            old_words_set = set(old_words_list)
-            new_words_set = set(new_words_list)
-
-            sm = difflib.SequenceMatcher(None, old_content_str, new_content_str)
-            similarity_ratio = sm.ratio()
-
-            # If lines are too dissimilar, or no common words at word level, treat as whole line changes
-            if similarity_ratio < 0.6 or not old_words_set.intersection(new_words_set):
-                del_words = [{"type": "removed", "content": old_content_str.strip()}] if old_content_str.strip() else []
-                add_words = [{"type": "added", "content": new_content_str.strip()}] if new_content_str.strip() else []
-                processed_lines.append({"type": "deletion", "content": old_content_str, "words": del_words})
-                processed_lines.append({"type": "addition", "content": new_content_str, "words": add_words})
-            else:
-                sm_word = difflib.SequenceMatcher(None, old_words_list, new_words_list)
-
-                temp_deleted_words_structured: List[Dict[str, str]] = []
-                temp_added_words_structured: List[Dict[str, str]] = []
-
-                for tag_op, i1, i2, j1, j2 in sm_word.get_opcodes():
-                    old_segment_list = old_words_list[i1:i2]
-                    new_segment_list = new_words_list[j1:j2]
-                    old_chunk = " ".join(old_segment_list)
-                    new_chunk = " ".join(new_segment_list)
-
-                    if tag_op == 'replace':
-                        if old_chunk: temp_deleted_words_structured.append({"type": "removed", "content": old_chunk})
-                        if new_chunk: temp_added_words_structured.append({"type": "added", "content": new_chunk})
-                    elif tag_op == 'delete':
-                        if old_chunk: temp_deleted_words_structured.append({"type": "removed", "content": old_chunk})
-                    elif tag_op == 'insert':
-                        if new_chunk: temp_added_words_structured.append({"type": "added", "content": new_chunk})
-                    elif tag_op == 'equal':
-                        if old_chunk: temp_deleted_words_structured.append({"type": "context", "content": old_chunk})
-                        if new_chunk: temp_added_words_structured.append({"type": "context", "content": new_chunk})
-
-                final_deleted_words = _condense_word_segments(temp_deleted_words_structured, old_words_list)
-                final_added_words = _condense_word_segments(temp_added_words_structured, new_words_list)
-
-                processed_lines.append({"type": "deletion", "content": old_content_str, "words": final_deleted_words})
-                processed_lines.append({"type": "addition", "content": new_content_str, "words": final_added_words})
-
-            i += 2
-            continue
-
-        if origin == '-':
-            word_list = [{"type": "removed", "content": content.strip()}] if content.strip() else []
-            processed_lines.append({"type": "deletion", "content": content, "words": word_list})
-        elif origin == '+':
-            word_list = [{"type": "added", "content": content.strip()}] if content.strip() else []
-            processed_lines.append({"type": "addition", "content": content, "words": word_list})
-        elif origin == ' ':
-            processed_lines.append({"type": "context", "content": content})
-
-        i += 1
-
-    return processed_lines
-
-
-def _condense_word_segments(segments: List[Dict[str, str]], original_words: List[str]) -> List[Dict[str, str]]:
-    """
-    Condenses adjacent word segments of the same type and ensures correct spacing.
-    This is a simplified version and might need more robust space handling based on original text.
-    """
-    if not segments:
-        return []
-
-    condensed: List[Dict[str, str]] = []
-    current_segment_content: List[str] = []
-    current_segment_type = ""
-
-    original_word_idx = 0
-
-    for i, segment in enumerate(segments):
-        num_words_in_segment = len(segment["content"].split())
-
-        if not current_segment_type or segment["type"] != current_segment_type:
-            if current_segment_content:
-                condensed.append({"type": current_segment_type, "content": " ".join(current_segment_content)})
-            current_segment_content = [segment["content"]]
-            current_segment_type = segment["type"]
-        else:
-            current_segment_content.append(segment["content"])
-
-        original_word_idx += num_words_in_segment
-
-    if current_segment_type and current_segment_content:
-        condensed.append({"type": current_segment_type, "content": " ".join(current_segment_content)})
-
-    for seg in condensed:
-        seg["content"] = seg["content"].strip()
-
-    return [s for s in condensed if s["content"]]
\ No newline at end of file
+    return process_hunk_lines([(origin, content, None, None) for origin, content in hunk_lines])
\ No newline at end of file
@@ -0,0 +1,527 @@
+"""Structured word-level diffs.
+
+`word_diff_from_diff` turns a `pygit2.Diff` into the structure the web
+viewer renders: one entry per changed file with its change type, paths and
+hunks, where every hunk line carries its old/new line numbers and changed
+lines carry word segments. Files, hunks and lines are read straight from
+libgit2's patch objects, so nothing is serialised to patch text and parsed
+back. `gitwrite_core.versioning.get_word_level_diff` keeps accepting patch
+text for callers (such as the CLI) that only have the text.
+"""
+import atexit
+import difflib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pygit2
+
+from .cache_utils import int_from_env
+
+# Bump when the output structure or algorithm changes so cached results are not reused.
+WORD_DIFF_FORMAT_VERSION = 3
+
+NO_NEWLINE_MARKER = "\\ No newline at end of file"
+
+
+# Edited lines less similar than this (0..1, roughly difflib's ratio) are shown as wholly replaced.
+SIMILARITY_THRESHOLD = 0.6
+# Edited lines sharing fewer than this fraction of distinct words are rewrites; no token diff is run.
+MIN_SHARED_WORDS = 0.2
+# Cut-offs for pathological lines: beyond these the changed middle of a line
+# (after its common prefix/suffix) is shown as one removed/added segment.
+MAX_LINE_TOKENS = int_from_env("GITWRITE_WORD_DIFF_MAX_TOKENS", 20_000)
+MAX_EDIT_COST = int_from_env("GITWRITE_WORD_DIFF_MAX_EDIT_COST", 2_000)
+# Largest block of consecutive deleted x added lines that is aligned pairwise.
+MAX_PAIRING_CELLS = int_from_env("GITWRITE_WORD_DIFF_MAX_PAIRING_CELLS", 4_096)
+# Replaced word runs up to this many characters (old x new) are compared
+# character by character when scoring similarity.
+_MAX_REGION_CHAR_PRODUCT = 4_096
+# Diffs whose changed lines total at least this many characters are processed
+# in a pool of GITWRITE_WORD_DIFF_WORKERS processes (1 disables the pool).
+PARALLEL_MIN_BYTES = int_from_env("GITWRITE_WORD_DIFF_PARALLEL_MIN_BYTES", 256 * 1024)
+WORD_DIFF_WORKERS = int_from_env("GITWRITE_WORD_DIFF_WORKERS", os.cpu_count() or 1)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def word_diff_settings() -> Dict[str, Any]:
+    """Returns the settings that affect word diff output (for cache keys)."""
+    return {
+        "similarity": SIMILARITY_THRESHOLD, "min_shared_words": MIN_SHARED_WORDS,
+        "max_tokens": MAX_LINE_TOKENS, "max_edit_cost": MAX_EDIT_COST, "max_pairing_cells": MAX_PAIRING_CELLS,
+    }
+
+
+_CHANGE_TYPES = {"A": "added", "D": "deleted", "M": "modified", "R": "renamed", "C": "copied", "T": "modified"}
+
+# (origin, content, old_lineno, new_lineno); line numbers are None when unknown.
+HunkLine = Tuple[str, str, Optional[int], Optional[int]]
+
+
+def word_diff_from_diff(diff: pygit2.Diff) -> List[Dict[str, Any]]:
+    """Builds the structured word diff for every file in `diff`.
+
+    Large diffs are processed hunk by hunk in a process pool (see
+    `PARALLEL_MIN_BYTES`); the result is the same, in the same order, as
+    processing them here.
+
+    Returns:
+        A list of file dictionaries with 'file_path', 'change_type'
+        ('added', 'deleted', 'modified', 'renamed' or 'copied'), 'old_file_path'
+        and 'new_file_path' for renames/copies, 'is_binary' for binary files and
+        'hunks'. Each hunk has 'header', 'old_start', 'old_lines', 'new_start',
+        'new_lines' and 'lines'; each line has 'type' ('context', 'deletion',
+        'addition' or 'no_newline'), 'content', 'old_lineno'/'new_lineno' and,
+        for changed lines, 'words'. Files without content changes (e.g. mode
+        only) are omitted.
+    """
+    return word_diff_from_patches(patch for patch in diff if patch is not None)
+
+
+def word_diff_from_patches(patches: Iterable[pygit2.Patch]) -> List[Dict[str, Any]]:
+    """Builds the structured word diff (as in `word_diff_from_diff`) for the given file patches."""
+    entries = [entry for entry in (_read_patch(patch) for patch in patches) if entry]
+    raw_hunks = [hunk for entry in entries for hunk in entry["hunks"]]
+    for hunk, lines in zip(raw_hunks, _process_all(hunk["lines"] for hunk in raw_hunks)):
+        hunk["lines"] = lines
+    return entries
+
+
+def word_diff_for_patch(patch: pygit2.Patch) -> Optional[Dict[str, Any]]:
+    """Builds the structured word diff for one file, or None if it has no content changes."""
+    entry = _read_patch(patch)
+    if entry:
+        for hunk in entry["hunks"]:
+            hunk["lines"] = process_hunk_lines(hunk["lines"])
+    return entry
+
+
+def describe_delta(delta: pygit2.DiffDelta) -> Dict[str, Any]:
+    """Returns 'file_path', 'change_type' and, for renames/copies, 'old_file_path'/'new_file_path'."""
+    change_type = _CHANGE_TYPES.get(delta.status_char(), "modified")
+    entry: Dict[str, Any] = {}
+    if change_type in ("renamed", "copied"):
+        entry["old_file_path"] = delta.old_file.path
+        entry["new_file_path"] = delta.new_file.path
+        entry["file_path"] = delta.new_file.path
+    elif change_type == "deleted":
+        entry["file_path"] = delta.old_file.path
+    else:
+        entry["file_path"] = delta.new_file.path
+    entry["change_type"] = change_type
+    return entry
+
+
+def _read_patch(patch: pygit2.Patch) -> Optional[Dict[str, Any]]:
+    """Copies a patch into a file entry whose hunks hold raw `HunkLine` tuples."""
+    delta = patch.delta
+    entry = describe_delta(delta)
+    if delta.is_binary:
+        entry["is_binary"] = True
+        entry["hunks"] = []
+        return entry
+
+    hunks = []
+    for hunk in patch.hunks:
+        hunk_lines: List[HunkLine] = []
+        for line in hunk.lines:
+            origin = line.origin
+            if origin in ("=", ">", "<"):  # End-of-file newline markers
+                hunk_lines.append(("\\", NO_NEWLINE_MARKER, None, None))
+                continue
+            content = line.content
+            if content.endswith("\n"):
+                content = content[:-1]
+            if content.endswith("\r"):
+                content = content[:-1]
+            hunk_lines.append((origin, content, _lineno(line.old_lineno), _lineno(line.new_lineno)))
+        hunks.append({
+            "header": hunk.header.rstrip("\n"),
+            "old_start": hunk.old_start,
+            "old_lines": hunk.old_lines,
+            "new_start": hunk.new_start,
+            "new_lines": hunk.new_lines,
+            "lines": hunk_lines,
+        })
+    if not hunks:
+        return None
+    entry["hunks"] = hunks
+    return entry
+
+
+def _process_all(hunks: Iterable[Sequence[HunkLine]]) -> List[List[Dict[str, Any]]]:
+    """Runs `process_hunk_lines` over every hunk, in a process pool when the diff is large."""
+    hunks = list(hunks)
+    changed_bytes = sum(len(line[1]) for hunk in hunks for line in hunk if line[0] in "+-")
+    if WORD_DIFF_WORKERS < 2 or len(hunks) < 2 or changed_bytes < PARALLEL_MIN_BYTES:
+        return [process_hunk_lines(hunk) for hunk in hunks]
+    chunksize = max(1, len(hunks) // (WORD_DIFF_WORKERS * 4))
+    try:
+        return list(_get_pool().map(process_hunk_lines, hunks, chunksize=chunksize))
+    except (BrokenProcessPool, OSError):
+        _shutdown_pool()  # Recreated on the next large diff
+        return [process_hunk_lines(hunk) for hunk in hunks]
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs server threads can copy held locks
+            _pool = ProcessPoolExecutor(max_workers=WORD_DIFF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(_shutdown_pool)
+
+
+def _lineno(value: int) -> Optional[int]:
+    return value if value >= 0 else None  # libgit2 reports -1 for "not on this side"
+
+
+def process_hunk_lines(hunk_lines: Sequence[HunkLine]) -> List[Dict[str, Any]]:
+    """Turns (origin, content, old_lineno, new_lineno) tuples into structured lines.
+
+    Each run of deleted lines followed by added lines is aligned: lines are
+    paired in order by word overlap, each pair is diffed word by word and
+    emitted as a deletion directly followed by its addition. Unpaired lines
+    are reported as wholly removed or added. Line numbers are included when
+    known.
+    """
+    processed: List[Dict[str, Any]] = []
+    i = 0
+    while i < len(hunk_lines):
+        origin = hunk_lines[i][0]
+        if origin == '-':
+            end_deleted = i
+            while end_deleted < len(hunk_lines) and hunk_lines[end_deleted][0] == '-':
+                end_deleted += 1
+            end_added = end_deleted
+            while end_added < len(hunk_lines) and hunk_lines[end_added][0] == '+':
+                end_added += 1
+            _emit_change_block(hunk_lines[i:end_deleted], hunk_lines[end_deleted:end_added], processed)
+            i = end_added
+            continue
+
+        _, content, old_lineno, new_lineno = hunk_lines[i]
+        if origin == '+':
+            processed.append(_line("addition", content, None, new_lineno, _whole_line("added", content)))
+        elif origin == ' ':
+            processed.append(_line("context", content, old_lineno, new_lineno))
+        elif origin == '\\':
+            processed.append({"type": "no_newline", "content": content})
+        i += 1
+    return processed
+
+
+def _emit_change_block(deleted: Sequence[HunkLine], added: Sequence[HunkLine], out: List[Dict[str, Any]]) -> None:
+    interner = _Interner()
+    deleted_tokens = [interner.tokens(line[1]) for line in deleted]
+    added_tokens = [interner.tokens(line[1]) for line in added]
+    pairs = _pair_lines(deleted_tokens, added_tokens)
+
+    next_deleted = next_added = 0
+    for d, a in pairs + [(len(deleted), len(added))]:
+        for _, content, old_lineno, _ in deleted[next_deleted:d]:
+            out.append(_line("deletion", content, old_lineno, None, _whole_line("removed", content)))
+        for _, content, _, new_lineno in added[next_added:a]:
+            out.append(_line("addition", content, None, new_lineno, _whole_line("added", content)))
+        if d < len(deleted):
+            deleted_words, added_words = _diff_tokens(deleted_tokens[d], added_tokens[a], deleted[d][1], added[a][1])
+            out.append(_line("deletion", deleted[d][1], deleted[d][2], None, deleted_words))
+            out.append(_line("addition", added[a][1], None, added[a][3], added_words))
+        next_deleted, next_added = d + 1, a + 1
+
+
+def _pair_lines(deleted: List["_Tokens"], added: List["_Tokens"]) -> List[Tuple[int, int]]:
+    """Chooses which deleted line each added line edits, preserving order.
+
+    A single deleted/added pair is always paired (as a one-line edit). Larger
+    blocks are aligned by maximising the total word overlap of pairs that
+    share enough words; blocks too large to align are paired positionally.
+    """
+    if not deleted or not added:
+        return []
+    if len(deleted) == 1 and len(added) == 1:
+        return [(0, 0)]
+    if len(deleted) * len(added) > MAX_PAIRING_CELLS:
+        return [(i, i) for i in range(min(len(deleted), len(added)))]
+
+    rows, cols = len(deleted), len(added)
+    score = [[0.0] * cols for _ in range(rows)]
+    for r in range(rows):
+        for c in range(cols):
+            overlap = deleted[r].shared_fraction(added[c])
+            score[r][c] = overlap if overlap >= MIN_SHARED_WORDS else 0.0
+    best = [[0.0] * (cols + 1) for _ in range(rows + 1)]
+    for r in range(rows - 1, -1, -1):
+        for c in range(cols - 1, -1, -1):
+            take = best[r + 1][c + 1] + score[r][c] if score[r][c] else 0.0
+            best[r][c] = max(best[r + 1][c], best[r][c + 1], take)
+    pairs = []
+    r = c = 0
+    while r < rows and c < cols:
+        if score[r][c] and best[r][c] == best[r + 1][c + 1] + score[r][c]:
+            pairs.append((r, c))
+            r, c = r + 1, c + 1
+        elif best[r][c] == best[r + 1][c]:
+            r += 1
+        else:
+            c += 1
+    return pairs
+
+
+class _Interner:
+    """Maps words to small integers so token comparisons are integer comparisons."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+
+    def tokens(self, content: str) -> "_Tokens":
+        words = content.split()
+        ids = [self._ids.setdefault(word, len(self._ids)) for word in words]
+        return _Tokens(words, ids)
+
+
+class _Tokens:
+    __slots__ = ("words", "ids", "_set")
+
+    def __init__(self, words: List[str], ids: List[int]):
+        self.words = words
+        self.ids = ids
+        self._set = None
+
+    @property
+    def id_set(self) -> set:
+        if self._set is None:
+            self._set = set(self.ids)
+        return self._set
+
+    def shared_fraction(self, other: "_Tokens") -> float:
+        """Dice coefficient of the two lines' distinct words."""
+        total = len(self.id_set) + len(other.id_set)
+        return 2 * len(self.id_set & other.id_set) / total if total else 1.0
+
+
+def diff_line_words(old_content: str, new_content: str) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """Returns the word segments for an edited line as (deleted line words, added line words).
+
+    Lines that are too dissimilar, or share no words, are reported as wholly
+    removed and added.
+    """
+    interner = _Interner()
+    return _diff_tokens(interner.tokens(old_content), interner.tokens(new_content), old_content, new_content)
+
+
+def _diff_tokens(old: "_Tokens", new: "_Tokens", old_content: str, new_content: str
+                 ) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    whole_line = (_whole_line("removed", old_content), _whole_line("added", new_content))
+    if not old.id_set & new.id_set or old.shared_fraction(new) < MIN_SHARED_WORDS:
+        return whole_line
+    old_length, new_length = _joined_length(old.words), _joined_length(new.words)
+    if 2 * min(old_length, new_length) / (old_length + new_length) < SIMILARITY_THRESHOLD:
+        return whole_line  # Upper bound: even a perfect match of the shorter line is not enough
+
+    opcodes = token_opcodes(old.ids, new.ids)
+    if _similarity(opcodes, old.words, new.words, old_length, new_length) < SIMILARITY_THRESHOLD:
+        return whole_line
+
+    deleted: List[Dict[str, str]] = []
+    added: List[Dict[str, str]] = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        old_chunk = " ".join(old.words[i1:i2])
+        new_chunk = " ".join(new.words[j1:j2])
+        if tag == 'equal':
+            deleted.append({"type": "context", "content": old_chunk})
+            added.append({"type": "context", "content": new_chunk})
+        else:
+            if old_chunk:
+                deleted.append({"type": "removed", "content": old_chunk})
+            if new_chunk:
+                added.append({"type": "added", "content": new_chunk})
+    return condense_word_segments(deleted), condense_word_segments(added)
+
+
+def _joined_length(words: List[str]) -> int:
+    return sum(len(word) for word in words) + max(len(words) - 1, 0)
+
+
+def _similarity(opcodes: List[Tuple[str, int, int, int, int]], old_words: List[str], new_words: List[str],
+                old_length: int, new_length: int) -> float:
+    """Approximates difflib's character ratio of the space-joined lines from a token alignment.
+
+    Equal words count fully, replaced runs are compared character by
+    character when small, and word separators count once per aligned word.
+    """
+    matched = max(min(len(old_words), len(new_words)) - 1, 0)
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            matched += sum(len(word) for word in old_words[i1:i2])
+        elif tag == 'replace':
+            old_chunk = " ".join(old_words[i1:i2])
+            new_chunk = " ".join(new_words[j1:j2])
+            if len(old_chunk) * len(new_chunk) <= _MAX_REGION_CHAR_PRODUCT:
+                blocks = difflib.SequenceMatcher(None, old_chunk, new_chunk, autojunk=False).get_matching_blocks()
+                matched += sum(block.size for block in blocks)
+    total = old_length + new_length
+    return 2 * matched / total if total else 1.0
+
+
+def token_opcodes(old: Sequence[int], new: Sequence[int]) -> List[Tuple[str, int, int, int, int]]:
+    """Diffs two token sequences; returns difflib-style (tag, i1, i2, j1, j2) opcodes.
+
+    The common prefix and suffix are stripped, then the middle is diffed
+    with Myers' O(ND) algorithm. If the middle exceeds `MAX_LINE_TOKENS` or
+    needs more than `MAX_EDIT_COST` edits it is reported as one replacement.
+    """
+    n, m = len(old), len(new)
+    prefix = 0
+    while prefix < n and prefix < m and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < n - prefix and suffix < m - prefix and old[n - 1 - suffix] == new[m - 1 - suffix]:
+        suffix += 1
+
+    middle_old = old[prefix:n - suffix]
+    middle_new = new[prefix:m - suffix]
+    edits = None
+    if len(middle_old) + len(middle_new) <= MAX_LINE_TOKENS:
+        edits = _myers_edits(middle_old, middle_new, MAX_EDIT_COST)
+    if edits is None:
+        edits = [("-", i) for i in range(len(middle_old))] + [("+", j) for j in range(len(middle_new))]
+
+    opcodes: List[Tuple[str, int, int, int, int]] = []
+    if prefix:
+        opcodes.append(("equal", 0, prefix, 0, prefix))
+    opcodes.extend(_edits_to_opcodes(edits, prefix, prefix, len(middle_old), len(middle_new)))
+    if suffix:
+        opcodes.append(("equal", n - suffix, n, m - suffix, m))
+    return opcodes
+
+
+def _myers_edits(a: Sequence[int], b: Sequence[int], max_cost: int) -> Optional[List[Tuple[str, int]]]:
+    """Returns the shortest edit script from `a` to `b` as ('=', i) / ('-', i) / ('+', j) steps.
+
+    Returns None if more than `max_cost` insertions and deletions are needed.
+    """
+    n, m = len(a), len(b)
+    if n == 0 or m == 0:
+        return [("-", i) for i in range(n)] + [("+", j) for j in range(m)]
+    offset = n + m + 1
+    v = [0] * (2 * offset + 1)
+    trace: List[List[int]] = []
+    for d in range(min(n + m, max_cost) + 1):
+        trace.append(v[offset - d - 1:offset + d + 2])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return None
+
+
+def _backtrack(trace: List[List[int]], n: int, m: int) -> List[Tuple[str, int]]:
+    edits: List[Tuple[str, int]] = []
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        snapshot = trace[d]  # v before step d, holding diagonals -d-1 .. d+1
+
+        def at(k: int) -> int:
+            return snapshot[k + d + 1]
+
+        k = x - y
+        if k == -d or (k != d and at(k - 1) < at(k + 1)):
+            previous_k = k + 1
+        else:
+            previous_k = k - 1
+        previous_x = at(previous_k)
+        previous_y = previous_x - previous_k
+        while x > previous_x and y > previous_y:
+            x -= 1
+            y -= 1
+            edits.append(("=", x))
+        if d > 0:
+            if x == previous_x:
+                edits.append(("+", y - 1))
+            else:
+                edits.append(("-", x - 1))
+        x, y = previous_x, previous_y
+    edits.reverse()
+    return edits
+
+
+def _edits_to_opcodes(edits: List[Tuple[str, int]], old_base: int, new_base: int, n: int, m: int
+                      ) -> List[Tuple[str, int, int, int, int]]:
+    """Groups an edit script into opcodes; runs between equal tokens become 'replace'/'delete'/'insert'."""
+    opcodes: List[Tuple[str, int, int, int, int]] = []
+    i = j = 0
+    index = 0
+    while index < len(edits):
+        kind = edits[index][0]
+        if kind == "=":
+            start_i, start_j = i, j
+            while index < len(edits) and edits[index][0] == "=":
+                i += 1
+                j += 1
+                index += 1
+            opcodes.append(("equal", old_base + start_i, old_base + i, new_base + start_j, new_base + j))
+            continue
+        start_i, start_j = i, j
+        while index < len(edits) and edits[index][0] != "=":
+            if edits[index][0] == "-":
+                i += 1
+            else:
+                j += 1
+            index += 1
+        tag = "replace" if i > start_i and j > start_j else ("delete" if i > start_i else "insert")
+        opcodes.append((tag, old_base + start_i, old_base + i, new_base + start_j, new_base + j))
+    return opcodes
+
+
+def _line(line_type: str, content: str, old_lineno: Optional[int], new_lineno: Optional[int],
+          words: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+    line: Dict[str, Any] = {"type": line_type, "content": content}
+    if words is not None:
+        line["words"] = words
+    if old_lineno is not None:
+        line["old_lineno"] = old_lineno
+    if new_lineno is not None:
+        line["new_lineno"] = new_lineno
+    return line
+
+
+def _whole_line(segment_type: str, content: str) -> List[Dict[str, str]]:
+    return [{"type": segment_type, "content": content.strip()}] if content.strip() else []
+
+
+def condense_word_segments(segments: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Merges adjacent segments of the same type and drops empty ones."""
+    condensed: List[Dict[str, str]] = []
+    for segment in segments:
+        if condensed and condensed[-1]["type"] == segment["type"]:
+            condensed[-1]["content"] += " " + segment["content"]
+        else:
+            condensed.append(dict(segment))
+    for segment in condensed:
+        segment["content"] = segment["content"].strip()
+    return [segment for segment in condensed if segment["content"]]
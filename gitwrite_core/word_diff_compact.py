@@ -0,0 +1,171 @@
+"""Compact wire encoding of structured word diffs.
+
+The structure built by `gitwrite_core.word_diff` repeats its keys for every
+line and segment and stores each changed line's text twice (as 'content' and
+again in its word segments). The compact encoding keeps the files and hunk
+headers as they are, but stores each hunk column-wise:
+
+* ``ops``: one character per line: ``" "`` context, ``"-"`` deletion,
+  ``"+"`` addition, ``"\\"`` no-newline marker.
+* ``text``: the content of every line except no-newline markers.
+* ``words``: one entry per deletion/addition line, in order. ``0`` means the
+  whole (stripped) line changed. A list of integers gives alternating runs of
+  word counts into the line's words, starting with an unchanged run (which
+  may be empty). A list of ``[type, content]`` pairs spells the segments out;
+  it is only used when a line's whitespace cannot be split the same way by
+  every decoder.
+* ``lineno``: ``[old, new]`` per line (null where absent). Omitted when the
+  numbers follow from ``old_start``/``new_start``, which is the usual case.
+
+Words are split on the whitespace characters matched by JavaScript's ``\\s``
+(`WORD_SEPARATOR`), so that clients can decode without knowing Python's
+``str.split`` rules.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+from .word_diff import NO_NEWLINE_MARKER
+
+COMPACT_FORMAT = "gitwrite-word-diff-compact"
+COMPACT_FORMAT_VERSION = 1
+
+# JavaScript's \s (what `String.prototype.trim` strips); lines whose whitespace Python treats
+# differently fall back to explicit segments.
+_JS_WHITESPACE = "\t\n\v\f\r \u00a0\u1680" + "".join(map(chr, range(0x2000, 0x200b))) + "\u2028\u2029\u202f\u205f\u3000\ufeff"
+WORD_SEPARATOR = re.compile(f"[{re.escape(_JS_WHITESPACE)}]+")
+
+_OPS = {"context": " ", "deletion": "-", "addition": "+", "no_newline": "\\"}
+_LINE_TYPES = {op: line_type for line_type, op in _OPS.items()}
+_CHANGED_SEGMENT = {"deletion": "removed", "addition": "added"}
+
+
+def encode_compact_word_diff(files: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Encodes the output of `word_diff_from_diff` in the compact form."""
+    return {"format": COMPACT_FORMAT, "version": COMPACT_FORMAT_VERSION, "files": [_encode_file(f) for f in files]}
+
+
+def decode_compact_word_diff(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rebuilds the structured word diff from `encode_compact_word_diff` output.
+
+    Raises:
+        ValueError: If the payload is not a compact word diff of a known version.
+    """
+    if payload.get("format") != COMPACT_FORMAT or payload.get("version") != COMPACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported word diff encoding: {payload.get('format')!r} version {payload.get('version')!r}")
+    return [_decode_file(f) for f in payload["files"]]
+
+
+def _encode_file(entry: Dict[str, Any]) -> Dict[str, Any]:
+    encoded = {key: value for key, value in entry.items() if key != "hunks"}
+    encoded["hunks"] = [_encode_hunk(hunk) for hunk in entry["hunks"]]
+    return encoded
+
+
+def _encode_hunk(hunk: Dict[str, Any]) -> Dict[str, Any]:
+    encoded = {key: value for key, value in hunk.items() if key != "lines"}
+    lines = hunk["lines"]
+    encoded["ops"] = "".join(_OPS[line["type"]] for line in lines)
+    encoded["text"] = [line["content"] for line in lines if line["type"] != "no_newline"]
+    encoded["words"] = [_encode_words(line) for line in lines if "words" in line]
+    numbers = [[line.get("old_lineno"), line.get("new_lineno")] for line in lines]
+    if numbers != _implied_line_numbers(encoded["ops"], hunk.get("old_start"), hunk.get("new_start")):
+        encoded["lineno"] = numbers
+    return encoded
+
+
+def _encode_words(line: Dict[str, Any]) -> Any:
+    segments = line["words"]
+    changed = _CHANGED_SEGMENT[line["type"]]
+    stripped = line["content"].strip()
+    if stripped == line["content"].strip(_JS_WHITESPACE) and \
+            segments == ([{"type": changed, "content": stripped}] if stripped else []):
+        return 0
+
+    runs: List[int] = []
+    words = _split_words(line["content"])
+    position = 0
+    for segment in segments:
+        kind = 0 if segment["type"] == "context" else 1
+        if len(runs) % 2 != kind:
+            runs.append(0)
+        count = len(_split_words(segment["content"]))
+        runs.append(count)
+        position += count
+    if _decode_runs(runs, line["type"], words) == segments and position == len(words):
+        return runs
+    return [[segment["type"], segment["content"]] for segment in segments]
+
+
+def _decode_file(encoded: Dict[str, Any]) -> Dict[str, Any]:
+    entry = {key: value for key, value in encoded.items() if key != "hunks"}
+    entry["hunks"] = [_decode_hunk(hunk) for hunk in encoded["hunks"]]
+    return entry
+
+
+def _decode_hunk(encoded: Dict[str, Any]) -> Dict[str, Any]:
+    hunk = {key: value for key, value in encoded.items() if key not in ("ops", "text", "words", "lineno")}
+    numbers = encoded.get("lineno") or _implied_line_numbers(encoded["ops"], encoded.get("old_start"),
+                                                             encoded.get("new_start"))
+    text = iter(encoded["text"])
+    words = iter(encoded["words"])
+    lines = []
+    for op, (old_lineno, new_lineno) in zip(encoded["ops"], numbers):
+        line_type = _LINE_TYPES[op]
+        if line_type == "no_newline":
+            lines.append({"type": line_type, "content": NO_NEWLINE_MARKER})
+            continue
+        line: Dict[str, Any] = {"type": line_type, "content": next(text)}
+        if line_type in _CHANGED_SEGMENT:
+            line["words"] = _decode_words(next(words), line_type, line["content"])
+        if old_lineno is not None:
+            line["old_lineno"] = old_lineno
+        if new_lineno is not None:
+            line["new_lineno"] = new_lineno
+        lines.append(line)
+    hunk["lines"] = lines
+    return hunk
+
+
+def _decode_words(encoded: Any, line_type: str, content: str) -> List[Dict[str, str]]:
+    if encoded == 0:
+        stripped = content.strip()
+        return [{"type": _CHANGED_SEGMENT[line_type], "content": stripped}] if stripped else []
+    if encoded and isinstance(encoded[0], list):
+        return [{"type": segment_type, "content": segment} for segment_type, segment in encoded]
+    return _decode_runs(encoded, line_type, _split_words(content))
+
+
+def _decode_runs(runs: List[int], line_type: str, words: List[str]) -> List[Dict[str, str]]:
+    segments = []
+    position = 0
+    for index, count in enumerate(runs):
+        if count:
+            segments.append({"type": "context" if index % 2 == 0 else _CHANGED_SEGMENT[line_type],
+                             "content": " ".join(words[position:position + count])})
+            position += count
+    return segments
+
+
+def _split_words(text: str) -> List[str]:
+    return [word for word in WORD_SEPARATOR.split(text) if word]
+
+
+def _implied_line_numbers(ops: str, old_start: Optional[int], new_start: Optional[int]) -> List[List[Optional[int]]]:
+    """The [old, new] line numbers of a hunk's lines, counting from its start lines."""
+    if old_start is None or new_start is None:
+        return [[None, None] for _ in ops]
+    old_lineno, new_lineno = old_start, new_start
+    numbers: List[List[Optional[int]]] = []
+    for op in ops:
+        if op == " ":
+            numbers.append([old_lineno, new_lineno])
+            old_lineno, new_lineno = old_lineno + 1, new_lineno + 1
+        elif op == "-":
+            numbers.append([old_lineno, None])
+            old_lineno += 1
+        elif op == "+":
+            numbers.append([None, new_lineno])
+            new_lineno += 1
+        else:
+            numbers.append([None, None])
+    return numbers
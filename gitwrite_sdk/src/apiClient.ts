@@ -4,6 +4,9 @@ import {
   RepositoryTagsResponse,
   RepositoryCommitsResponse,
   ListCommitsParams,
+  CommitSearchResponse,
+  SearchCommitsParams,
+  FileHistoryResponse,
   SaveFileRequestPayload,
   SaveFileResponseData,
   // Multi-part upload types
@@ -24,6 +27,10 @@ import {
   MergeBranchResponse,
   CompareRefsParams,
   CompareRefsResponse,
+  CompareFilesResponse,
+  CompareStatsResponse,
+  CompareFileResponse,
+  CompareStreamEvent,
   RevertCommitRequest,
   RevertCommitResponse,
   SyncRepositoryRequest,
@@ -39,6 +46,8 @@ import {
   CherryPickResponse,
   EPUBExportRequest,
   EPUBExportResponse,
+  ExportJobRequest,
+  ExportJobResponse,
   // Types for Task 11.3
   RepositoriesListResponse,
   RepositoryTreeResponse,
@@ -46,11 +55,16 @@ import {
   FileContentResponse,
   // Types for Task 11.6 (Annotations)
   AnnotationListResponse,
+  AnnotationQueryParams,
   AnnotationStatus,
   UpdateAnnotationStatusRequest,
   UpdateAnnotationStatusResponse,
   CreateAnnotationRequest,
   CreateAnnotationResponse,
+  BatchCreateAnnotationsRequest,
+  BatchCreateAnnotationsResponse,
+  BatchUpdateAnnotationStatusRequest,
+  BatchUpdateAnnotationStatusResponse,
   Annotation, // Base Annotation type
 } from './types';
 
@@ -71,6 +85,9 @@ export interface TokenResponse {
   token_type: string;
 }
 
+// The API reads repeated query parameters (path=a&path=b), not axios' default path[]=a
+const COMPARE_PARAMS_SERIALIZER = { indexes: null };
+
 export class GitWriteClient {
   private baseURL: string;
   private token: AuthToken = null;
@@ -193,7 +210,7 @@ export class GitWriteClient {
    * Lists commits for a given branch, or the current branch if branch_name is not provided.
    * Corresponds to API endpoint: GET /repository/{repo_name}/commits
    * @param repoName The name of the repository.
-   * @param params Optional parameters: branchName, maxCount.
+   * @param params Optional parameters: branchName, maxCount, limit (page size) and cursor (from a previous page's next_cursor).
    */
   public async listCommits(repoName: string, params?: ListCommitsParams): Promise<RepositoryCommitsResponse> {
     const queryParams: Record<string, string | number> = {};
@@ -203,6 +220,12 @@ export class GitWriteClient {
     if (params?.maxCount !== undefined) {
       queryParams['max_count'] = params.maxCount;
     }
+    if (params?.limit !== undefined) {
+      queryParams['limit'] = params.limit;
+    }
+    if (params?.cursor) {
+      queryParams['cursor'] = params.cursor;
+    }
 
     const response = await this.get<RepositoryCommitsResponse>(`/repository/${repoName}/commits`, {
       params: queryParams,
@@ -210,6 +233,67 @@ export class GitWriteClient {
     return response.data;
   }
 
+  /**
+   * Searches a branch's commits by author, date range, message text and changed path.
+   * Corresponds to API endpoint: GET /repository/{repo_name}/commits/search
+   * @param repoName The name of the repository.
+   * @param params Optional filters plus limit/offset (from a previous page's next_offset).
+   */
+  public async searchCommits(repoName: string, params?: SearchCommitsParams): Promise<CommitSearchResponse> {
+    const queryParams: Record<string, string | number> = {};
+    if (params?.branchName) {
+      queryParams['branch_name'] = params.branchName;
+    }
+    if (params?.author) {
+      queryParams['author'] = params.author;
+    }
+    if (params?.since) {
+      queryParams['since'] = params.since;
+    }
+    if (params?.until) {
+      queryParams['until'] = params.until;
+    }
+    if (params?.query) {
+      queryParams['q'] = params.query;
+    }
+    if (params?.path) {
+      queryParams['path'] = params.path;
+    }
+    if (params?.limit !== undefined) {
+      queryParams['limit'] = params.limit;
+    }
+    if (params?.offset !== undefined) {
+      queryParams['offset'] = params.offset;
+    }
+
+    const response = await this.get<CommitSearchResponse>(`/repository/${repoName}/commits/search`, {
+      params: queryParams,
+    });
+    return response.data;
+  }
+
+  /**
+   * Lists the commits that changed a file, newest first, following renames.
+   * Corresponds to API endpoint: GET /repository/{repo_name}/file-history
+   * @param repoName The name of the repository.
+   * @param filePath Repository-relative path of the file.
+   * @param params Optional page size (limit) and cursor (from a previous page's next_cursor).
+   */
+  public async getFileHistory(repoName: string, filePath: string, params?: { limit?: number; cursor?: string }): Promise<FileHistoryResponse> {
+    const queryParams: Record<string, string | number> = { file_path: filePath };
+    if (params?.limit !== undefined) {
+      queryParams['limit'] = params.limit;
+    }
+    if (params?.cursor) {
+      queryParams['cursor'] = params.cursor;
+    }
+
+    const response = await this.get<FileHistoryResponse>(`/repository/${repoName}/file-history`, {
+      params: queryParams,
+    });
+    return response.data;
+  }
+
   /**
    * Saves a file to the repository and commits the change.
    * Corresponds to API endpoint: POST /repository/{repo_name}/save
@@ -403,10 +487,89 @@ export class GitWriteClient {
   public async compareRefs(params?: CompareRefsParams): Promise<CompareRefsResponse> {
     // Ensure params is an object even if undefined is passed.
     const queryParams = { ...params };
-    const response = await this.get<CompareRefsResponse>('/repository/compare', { params: queryParams });
+    const response = await this.get<CompareRefsResponse>('/repository/compare', {
+      params: queryParams,
+      paramsSerializer: COMPARE_PARAMS_SERIALIZER,
+    });
+    return response.data;
+  }
+
+  /**
+   * Lists the files changed between two references with line/word counts, without their diffs.
+   * Corresponds to API endpoint: GET /repository/compare?mode=files
+   * @param params Optional ref1 and ref2. Defaults to HEAD~1 and HEAD.
+   */
+  public async listCompareFiles(params?: Omit<CompareRefsParams, 'diff_mode'>): Promise<CompareFilesResponse> {
+    const response = await this.get<CompareFilesResponse>('/repository/compare', {
+      params: { ...params, mode: 'files' },
+      paramsSerializer: COMPARE_PARAMS_SERIALIZER,
+    });
+    return response.data;
+  }
+
+  /**
+   * Counts the files, lines and words changed between two references, without generating the diff.
+   * Corresponds to API endpoint: GET /repository/compare?mode=stats
+   * @param params Optional ref1 and ref2. Defaults to HEAD~1 and HEAD.
+   */
+  public async getCompareStats(params?: Omit<CompareRefsParams, 'diff_mode'>): Promise<CompareStatsResponse> {
+    const response = await this.get<CompareStatsResponse>('/repository/compare', {
+      params: { ...params, mode: 'stats' },
+      paramsSerializer: COMPARE_PARAMS_SERIALIZER,
+    });
+    return response.data;
+  }
+
+  /**
+   * Fetches the diff of a single changed file, e.g. one listed by listCompareFiles.
+   * Corresponds to API endpoint: GET /repository/compare/file
+   * @param path Repository-relative path of the file.
+   * @param params Optional ref1, ref2 and diff_mode.
+   */
+  public async getCompareFile(path: string, params?: Omit<CompareRefsParams, 'path'>): Promise<CompareFileResponse> {
+    const response = await this.get<CompareFileResponse>('/repository/compare/file', {
+      params: { ...params, path },
+    });
     return response.data;
   }
 
+  /**
+   * Streams a compare file by file, calling onEvent as each NDJSON event arrives.
+   * Corresponds to API endpoint: GET /repository/compare?mode=stream
+   * @param params Optional ref1, ref2 and diff_mode.
+   * @param onEvent Called with the 'meta' event, each 'file' event and the final 'end' or 'error' event.
+   */
+  public async streamCompare(params: CompareRefsParams | undefined, onEvent: (event: CompareStreamEvent) => void): Promise<void> {
+    const query = new URLSearchParams({ mode: 'stream', stream_format: 'ndjson' });
+    Object.entries(params ?? {}).forEach(([key, value]) => {
+      if (Array.isArray(value)) {
+        value.forEach((item) => query.append(key, item));
+      } else if (value !== undefined && value !== null) {
+        query.set(key, String(value));
+      }
+    });
+    const response = await fetch(`${this.baseURL}/repository/compare?${query.toString()}`, {
+      headers: this.token ? { Authorization: `Bearer ${this.token}` } : {},
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Compare stream failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      buffered += decoder.decode(value, { stream: !done });
+      const lines = buffered.split('\n');
+      buffered = lines.pop() ?? '';
+      lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line) as CompareStreamEvent));
+      if (done) {
+        break;
+      }
+    }
+  }
+
   /**
    * Reverts a specified commit.
    * Corresponds to API endpoint: POST /repository/revert
@@ -508,6 +671,39 @@ export class GitWriteClient {
     return response.data;
   }
 
+  /**
+   * Queues an EPUB, PDF or DOCX export and returns the job without waiting for it.
+   * Corresponds to API endpoint: POST /repository/export/jobs
+   * @param payload Format, commit-ish, file list and optional output filename.
+   */
+  public async submitExportJob(payload: ExportJobRequest): Promise<ExportJobResponse> {
+    const response = await this.post<ExportJobResponse, AxiosResponse<ExportJobResponse>, ExportJobRequest>(
+      '/repository/export/jobs',
+      payload
+    );
+    return response.data;
+  }
+
+  /**
+   * Retrieves the state and progress of an export job.
+   * Corresponds to API endpoint: GET /repository/export/jobs/{job_id}
+   * @param jobId The ID returned by submitExportJob.
+   */
+  public async getExportJob(jobId: string): Promise<ExportJobResponse> {
+    const response = await this.get<ExportJobResponse>(`/repository/export/jobs/${encodeURIComponent(jobId)}`);
+    return response.data;
+  }
+
+  /**
+   * Cancels an export job. Finished jobs are returned unchanged.
+   * Corresponds to API endpoint: DELETE /repository/export/jobs/{job_id}
+   * @param jobId The ID returned by submitExportJob.
+   */
+  public async cancelExportJob(jobId: string): Promise<ExportJobResponse> {
+    const response = await this.delete<ExportJobResponse>(`/repository/export/jobs/${encodeURIComponent(jobId)}`);
+    return response.data;
+  }
+
   // --- Methods for Commit History and File Content Viewer (Task 11.4) ---
 
   /**
@@ -537,18 +733,25 @@ export class GitWriteClient {
   // --- Methods for Annotation Handling (Task 11.6) ---
 
   /**
-   * Lists all annotations from a specified feedback branch.
+   * Lists annotations from a specified feedback branch.
    * Corresponds to API endpoint: GET /repository/annotations
    * @param repoName The name of the repository (currently for consistency, not used in API path).
    * @param feedbackBranch The name of the feedback branch.
+   * @param filters Optional filters by file, status, author and overlapping line range.
    */
   public async listAnnotations(
     repoName: string, // Included for consistency, though API endpoint doesn't use it in path
-    feedbackBranch: string
+    feedbackBranch: string,
+    filters: AnnotationQueryParams = {}
   ): Promise<AnnotationListResponse> {
     const queryParams = new URLSearchParams({
       feedback_branch: feedbackBranch,
     });
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value !== undefined && value !== null) {
+        queryParams.append(key, String(value));
+      }
+    });
     const response = await this.get<AnnotationListResponse>(`/repository/annotations?${queryParams.toString()}`);
     return response.data;
   }
@@ -587,6 +790,38 @@ export class GitWriteClient {
     );
     return response.data;
   }
+
+  /**
+   * Creates several annotations with one request and a single update of the feedback branch.
+   * Corresponds to API endpoint: POST /repository/annotations/batch
+   * @param repoName The name of the repository.
+   * @param payload The feedback branch and the annotations to create, in order.
+   */
+  public async createAnnotationsBatch(
+    repoName: string, // For consistency
+    payload: BatchCreateAnnotationsRequest
+  ): Promise<BatchCreateAnnotationsResponse> {
+    const response = await this.post<BatchCreateAnnotationsResponse, AxiosResponse<BatchCreateAnnotationsResponse>, BatchCreateAnnotationsRequest>(
+        `/repository/annotations/batch`,
+        payload
+    );
+    return response.data;
+  }
+
+  /**
+   * Updates the status of several annotations with a single update of the feedback branch.
+   * Corresponds to API endpoint: POST /repository/annotations/batch/status
+   * @param payload The feedback branch and the status changes, in order.
+   */
+  public async updateAnnotationStatusesBatch(
+    payload: BatchUpdateAnnotationStatusRequest
+  ): Promise<BatchUpdateAnnotationStatusResponse> {
+    const response = await this.post<BatchUpdateAnnotationStatusResponse, AxiosResponse<BatchUpdateAnnotationStatusResponse>, BatchUpdateAnnotationStatusRequest>(
+        `/repository/annotations/batch/status`,
+        payload
+    );
+    return response.data;
+  }
 }
 
 // Example usage (optional, for testing within this file)
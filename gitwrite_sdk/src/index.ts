@@ -1,5 +1,6 @@
 // SDK entry point
 export { GitWriteClient, type AuthToken, type LoginCredentials, type TokenResponse } from './apiClient';
+export { decodeCompactWordDiff, isCompactWordDiff, COMPACT_WORD_DIFF_FORMAT, COMPACT_WORD_DIFF_VERSION } from './wordDiff';
 
 // Import then export types to ensure they are part of the module's explicit interface
 import type {
@@ -10,6 +11,17 @@ import type {
   RepositoryTagsResponse,
   RepositoryCommitsResponse,
   ListCommitsParams,
+  CommitSearchResponse,
+  SearchCommitsParams,
+  FileHistoryCommit,
+  FileHistoryResponse,
+  CompareFileSummary,
+  CompareTotals,
+  CompareFilesResponse,
+  CompareStatsResponse,
+  CompareFileDiff,
+  CompareFileResponse,
+  CompareStreamEvent,
   ApiErrorResponse,
   SaveFileRequestPayload,
   SaveFileResponseData,
@@ -29,13 +41,25 @@ import type {
   WordDiffHunk,
   WordDiffLine,
   WordDiffSegment,
+  CompactWordDiff,
+  CompactWordDiffFile,
+  CompactWordDiffHunk,
   // Task 11.6 (Annotation Types)
   Annotation,
   AnnotationListResponse,
+  AnnotationQueryParams,
   UpdateAnnotationStatusRequest,
   UpdateAnnotationStatusResponse,
   CreateAnnotationRequest,
   CreateAnnotationResponse,
+  NewAnnotation,
+  BatchCreateAnnotationsRequest,
+  BatchCreateAnnotationsResponse,
+  BatchUpdateAnnotationStatusRequest,
+  BatchUpdateAnnotationStatusResponse,
+  ExportJobRequest,
+  ExportJobResponse,
+  ExportJobStatus,
 } from './types';
 
 // These are the types we need to ensure are exported for runtime checks or direct use by JS consumers
@@ -57,6 +81,17 @@ export type {
   RepositoryTagsResponse,
   RepositoryCommitsResponse,
   ListCommitsParams,
+  CommitSearchResponse,
+  SearchCommitsParams,
+  FileHistoryCommit,
+  FileHistoryResponse,
+  CompareFileSummary,
+  CompareTotals,
+  CompareFilesResponse,
+  CompareStatsResponse,
+  CompareFileDiff,
+  CompareFileResponse,
+  CompareStreamEvent,
   ApiErrorResponse,
   SaveFileRequestPayload,
   SaveFileResponseData,
@@ -76,13 +111,22 @@ export type {
   WordDiffHunk,
   WordDiffLine,
   WordDiffSegment,
+  CompactWordDiff,
+  CompactWordDiffFile,
+  CompactWordDiffHunk,
   // Task 11.6 (Annotation Types)
   Annotation,
   AnnotationListResponse,
+  AnnotationQueryParams,
   UpdateAnnotationStatusRequest,
   UpdateAnnotationStatusResponse,
   CreateAnnotationRequest,
   CreateAnnotationResponse,
+  NewAnnotation,
+  BatchCreateAnnotationsRequest,
+  BatchCreateAnnotationsResponse,
+  BatchUpdateAnnotationStatusRequest,
+  BatchUpdateAnnotationStatusResponse,
 };
 
 export {
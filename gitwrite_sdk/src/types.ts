@@ -58,14 +58,58 @@ export interface RepositoryCommitsResponse {
   status: string;
   commits: CommitDetail[];
   message: string;
+  next_cursor?: string | null; // Pass back as `cursor` to fetch the next (older) page; null when exhausted
 }
 
 /**
  * Represents parameters for listing commits.
+ * Commits are returned newest first; use `limit` and `cursor` to page through history.
  */
 export interface ListCommitsParams {
   branchName?: string;
   maxCount?: number;
+  limit?: number;
+  cursor?: string;
+}
+
+/**
+ * Response of the commit search endpoint (GET /repository/{repo_name}/commits/search).
+ */
+export interface CommitSearchResponse {
+  status: string;
+  commits: CommitDetail[];
+  message: string;
+  next_offset?: number | null; // Pass back as `offset` to fetch the next page; null when exhausted
+  source?: 'index' | 'walk' | null;
+}
+
+/**
+ * Filters for searching commits. Dates are ISO 8601 strings.
+ */
+export interface SearchCommitsParams {
+  branchName?: string;
+  author?: string;
+  since?: string;
+  until?: string;
+  query?: string;
+  path?: string;
+  limit?: number;
+  offset?: number;
+}
+
+/**
+ * A commit that changed a file, as returned by GET /repository/{repo_name}/file-history.
+ */
+export interface FileHistoryCommit extends CommitDetail {
+  path: string; // Name of the file at this commit
+  change_type: 'added' | 'modified' | 'deleted' | 'renamed' | 'type_changed';
+  old_path?: string | null; // Previous name when change_type is 'renamed'
+}
+
+export interface FileHistoryResponse {
+  file_path: string;
+  commits: FileHistoryCommit[];
+  next_cursor?: string | null; // Pass back as `cursor` to fetch older changes; null when exhausted
 }
 
 // General API error structure, if common
@@ -131,6 +175,18 @@ export interface AnnotationListResponse {
   count: number;
 }
 
+/**
+ * Optional filters for listing annotations (query parameters of GET /repository/annotations).
+ * start_line/end_line select the annotations overlapping that line range.
+ */
+export interface AnnotationQueryParams {
+  file_path?: string;
+  status?: AnnotationStatus;
+  author?: string;
+  start_line?: number;
+  end_line?: number;
+}
+
 /**
  * Represents the request payload for updating an annotation's status.
  * Mirrors UpdateAnnotationStatusRequest Pydantic model in gitwrite_api/models.py.
@@ -169,6 +225,47 @@ export interface CreateAnnotationRequest {
  */
 export interface CreateAnnotationResponse extends Annotation {}
 
+/**
+ * One annotation in a batch creation request (CreateAnnotationRequest without the branch).
+ * Mirrors NewAnnotation Pydantic model in gitwrite_api/models.py.
+ */
+export type NewAnnotation = Omit<CreateAnnotationRequest, 'feedback_branch'>;
+
+/**
+ * Request payload for POST /repository/annotations/batch.
+ * Mirrors BatchCreateAnnotationsRequest Pydantic model in gitwrite_api/models.py.
+ */
+export interface BatchCreateAnnotationsRequest {
+  feedback_branch: string;
+  annotations: NewAnnotation[];
+}
+
+/**
+ * Mirrors BatchCreateAnnotationsResponse Pydantic model in gitwrite_api/models.py.
+ */
+export interface BatchCreateAnnotationsResponse {
+  annotations: CreateAnnotationResponse[];
+  count: number;
+}
+
+/**
+ * Request payload for POST /repository/annotations/batch/status.
+ * Mirrors BatchUpdateAnnotationStatusRequest Pydantic model in gitwrite_api/models.py.
+ */
+export interface BatchUpdateAnnotationStatusRequest {
+  feedback_branch: string;
+  updates: Array<{ annotation_id: string; new_status: AnnotationStatus }>;
+}
+
+/**
+ * Mirrors BatchUpdateAnnotationStatusResponse Pydantic model in gitwrite_api/models.py.
+ */
+export interface BatchUpdateAnnotationStatusResponse {
+  commit_ids: string[];
+  annotations: Annotation[];
+  message: string;
+}
+
 
 // --- End of Types for Annotation Handling ---
 
@@ -308,8 +405,90 @@ export interface CompareRefsParams {
   ref1?: string | null;
   ref2?: string | null;
   diff_mode?: 'text' | 'word'; // Added for word-level diff
+  path?: string[]; // Restrict the comparison to these files, directories or globs
+  merge_base?: boolean; // Compare from the merge base of ref1 and ref2 ("three-dot" compare)
+  word_format?: 'full' | 'compact'; // 'compact' returns the word diff as a CompactWordDiff (decode with decodeCompactWordDiff)
+}
+
+/**
+ * One changed file in a compare, without its diff.
+ * Maps to CompareFileSummary in API.
+ */
+export interface CompareFileSummary {
+  file_path: string;
+  change_type: 'modified' | 'added' | 'deleted' | 'renamed' | 'copied';
+  old_file_path?: string | null;
+  new_file_path?: string | null;
+  is_binary: boolean;
+  lines_added: number;
+  lines_deleted: number;
+  words_added: number;
+  words_deleted: number;
+}
+
+export interface CompareTotals {
+  files_changed: number;
+  lines_added: number;
+  lines_deleted: number;
+  words_added: number;
+  words_deleted: number;
 }
 
+/**
+ * Response data for GET /repository/compare?mode=files.
+ * Maps to CompareFilesResponse in API.
+ */
+export interface CompareFilesResponse {
+  ref1_oid: string;
+  ref2_oid: string;
+  ref1_display_name: string;
+  ref2_display_name: string;
+  files: CompareFileSummary[];
+  totals: CompareTotals;
+}
+
+/**
+ * Response data for GET /repository/compare?mode=stats.
+ * Maps to CompareStatsResponse in API.
+ */
+export interface CompareStatsResponse {
+  ref1_oid: string;
+  ref2_oid: string;
+  ref1_display_name: string;
+  ref2_display_name: string;
+  totals: CompareTotals;
+}
+
+/**
+ * A changed file with its diff: patch_text in text mode, word_diff in word mode.
+ */
+export interface CompareFileDiff extends CompareFileSummary {
+  patch_text?: string | null;
+  word_diff?: StructuredDiffFile | null;
+}
+
+/**
+ * Response data for GET /repository/compare/file.
+ * Maps to CompareFileResponse in API.
+ */
+export interface CompareFileResponse {
+  ref1_oid: string;
+  ref2_oid: string;
+  ref1_display_name: string;
+  ref2_display_name: string;
+  file: CompareFileDiff;
+}
+
+/**
+ * An event of GET /repository/compare?mode=stream: 'meta' (the resolved refs), one 'file'
+ * per changed file, then 'end' or 'error'.
+ */
+export type CompareStreamEvent =
+  | { event: 'meta'; data: Omit<CompareFileResponse, 'file'> }
+  | { event: 'file'; data: CompareFileDiff }
+  | { event: 'end'; data: { files_sent: number } }
+  | { event: 'error'; data: { message: string; files_sent: number } };
+
 /**
  * Response data for comparing references.
  * Maps to CompareRefsResponse in API.
@@ -319,7 +498,7 @@ export interface CompareRefsResponse {
   ref2_oid: string;
   ref1_display_name: string;
   ref2_display_name: string;
-  patch_data: string | StructuredDiffFile[]; // Updated for word-level diff
+  patch_data: string | StructuredDiffFile[] | CompactWordDiff; // Updated for word-level diff
 }
 
 /**
@@ -337,6 +516,8 @@ export interface WordDiffLine {
   type: 'context' | 'deletion' | 'addition' | 'no_newline';
   content: string;
   words?: WordDiffSegment[]; // Present for 'deletion' and 'addition' lines
+  old_lineno?: number; // Line number in the old file (context and deletion lines)
+  new_lineno?: number; // Line number in the new file (context and addition lines)
 }
 
 /**
@@ -344,6 +525,11 @@ export interface WordDiffLine {
  */
 export interface WordDiffHunk {
   lines: WordDiffLine[];
+  header?: string; // e.g. "@@ -10,7 +10,8 @@"
+  old_start?: number;
+  old_lines?: number;
+  new_start?: number;
+  new_lines?: number;
 }
 
 /**
@@ -359,6 +545,35 @@ export interface StructuredDiffFile {
   hunks: WordDiffHunk[];
 }
 
+/**
+ * A hunk in the compact word diff encoding: its lines stored column-wise.
+ * See gitwrite_core/word_diff_compact.py for the format.
+ */
+export interface CompactWordDiffHunk extends Omit<WordDiffHunk, 'lines'> {
+  ops: string; // One character per line: ' ' context, '-' deletion, '+' addition, '\\' no-newline marker
+  text: string[]; // Content of every line except no-newline markers
+  // Per deletion/addition line: 0 (whole line changed), alternating word-count runs starting with
+  // an unchanged run, or explicit [type, content] segments.
+  words: Array<0 | number[] | Array<[WordDiffSegment['type'], string]>>;
+  lineno?: Array<[number | null, number | null]>; // Only present when not implied by old_start/new_start
+}
+
+/**
+ * One file in the compact word diff encoding.
+ */
+export interface CompactWordDiffFile extends Omit<StructuredDiffFile, 'hunks'> {
+  hunks: CompactWordDiffHunk[];
+}
+
+/**
+ * Word diff returned by GET /repository/compare?diff_mode=word&word_format=compact.
+ */
+export interface CompactWordDiff {
+  format: 'gitwrite-word-diff-compact';
+  version: number;
+  files: CompactWordDiffFile[];
+}
+
 
 /**
  * Request payload for reverting a commit.
@@ -558,6 +773,41 @@ export interface EPUBExportResponse {
   status: string;
   message: string;
   server_file_path?: string | null;
+  cached?: boolean; // True when the EPUB was served from the server's export cache
+}
+
+/**
+ * Request payload for queueing an asynchronous export job.
+ * Maps to ExportJobRequest in API (from gitwrite_api/models.py).
+ */
+export interface ExportJobRequest {
+  /** Exactly one of `format` and `formats` must be given. */
+  format?: 'epub' | 'pdf' | 'docx';
+  formats?: Array<'epub' | 'pdf' | 'docx'>;
+  commit_ish?: string;
+  file_list: string[];
+  output_filename?: string;
+  pdf_engine?: string;
+}
+
+export type ExportJobStatus = 'queued' | 'running' | 'done' | 'failed' | 'cancelled';
+
+/**
+ * State of an asynchronous export job.
+ * Maps to ExportJobResponse in API (from gitwrite_api/models.py).
+ */
+export interface ExportJobResponse {
+  job_id: string;
+  format: string;
+  status: ExportJobStatus;
+  progress: number;
+  message?: string | null;
+  error?: string | null;
+  server_file_path?: string | null;
+  server_file_paths?: Record<string, string> | null;
+  created_at: number;
+  started_at?: number | null;
+  finished_at?: number | null;
 }
 
 // Interfaces for Multi-Part Upload (Task 6.5)
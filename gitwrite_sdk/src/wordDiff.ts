@@ -0,0 +1,103 @@
+import type {
+  CompactWordDiff,
+  CompactWordDiffFile,
+  CompactWordDiffHunk,
+  StructuredDiffFile,
+  WordDiffHunk,
+  WordDiffLine,
+  WordDiffSegment,
+} from './types';
+
+export const COMPACT_WORD_DIFF_FORMAT = 'gitwrite-word-diff-compact';
+export const COMPACT_WORD_DIFF_VERSION = 1;
+
+const NO_NEWLINE_MARKER = '\\ No newline at end of file';
+const LINE_TYPES: Record<string, WordDiffLine['type']> = { ' ': 'context', '-': 'deletion', '+': 'addition', '\\': 'no_newline' };
+// Matches the server's word separator (gitwrite_core.word_diff_compact.WORD_SEPARATOR).
+const WORD_SEPARATOR = /\s+/;
+
+/**
+ * Whether a word diff payload uses the compact encoding (word_format=compact).
+ */
+export function isCompactWordDiff(data: unknown): data is CompactWordDiff {
+  return typeof data === 'object' && data !== null && !Array.isArray(data)
+    && (data as CompactWordDiff).format === COMPACT_WORD_DIFF_FORMAT;
+}
+
+/**
+ * Expands a compact word diff into the StructuredDiffFile[] form returned without word_format=compact.
+ * @throws Error if the payload uses an unknown encoding version.
+ */
+export function decodeCompactWordDiff(data: CompactWordDiff): StructuredDiffFile[] {
+  if (data.format !== COMPACT_WORD_DIFF_FORMAT || data.version !== COMPACT_WORD_DIFF_VERSION) {
+    throw new Error(`Unsupported word diff encoding: ${data.format} version ${data.version}`);
+  }
+  return data.files.map(decodeFile);
+}
+
+function decodeFile(file: CompactWordDiffFile): StructuredDiffFile {
+  const { hunks, ...rest } = file;
+  return { ...rest, hunks: hunks.map(decodeHunk) };
+}
+
+function decodeHunk(hunk: CompactWordDiffHunk): WordDiffHunk {
+  const { ops, text, words, lineno, ...rest } = hunk;
+  const numbers = lineno ?? impliedLineNumbers(ops, hunk.old_start, hunk.new_start);
+  const lines: WordDiffLine[] = [];
+  let textIndex = 0;
+  let wordsIndex = 0;
+  for (let i = 0; i < ops.length; i++) {
+    const type = LINE_TYPES[ops[i]];
+    if (type === 'no_newline') {
+      lines.push({ type, content: NO_NEWLINE_MARKER });
+      continue;
+    }
+    const line: WordDiffLine = { type, content: text[textIndex++] };
+    if (type === 'deletion' || type === 'addition') {
+      line.words = decodeWords(words[wordsIndex++], type === 'deletion' ? 'removed' : 'added', line.content);
+    }
+    const [oldLineno, newLineno] = numbers[i];
+    if (oldLineno !== null) line.old_lineno = oldLineno;
+    if (newLineno !== null) line.new_lineno = newLineno;
+    lines.push(line);
+  }
+  return { ...rest, lines };
+}
+
+function decodeWords(
+  encoded: CompactWordDiffHunk['words'][number],
+  changed: 'added' | 'removed',
+  content: string,
+): WordDiffSegment[] {
+  if (encoded === 0) {
+    const stripped = content.trim();
+    return stripped ? [{ type: changed, content: stripped }] : [];
+  }
+  if (encoded.length > 0 && Array.isArray(encoded[0])) {
+    return (encoded as Array<[WordDiffSegment['type'], string]>).map(([type, segment]) => ({ type, content: segment }));
+  }
+  const lineWords = content.split(WORD_SEPARATOR).filter(Boolean);
+  const segments: WordDiffSegment[] = [];
+  let position = 0;
+  (encoded as number[]).forEach((count, index) => {
+    if (count) {
+      segments.push({ type: index % 2 === 0 ? 'context' : changed, content: lineWords.slice(position, position + count).join(' ') });
+      position += count;
+    }
+  });
+  return segments;
+}
+
+function impliedLineNumbers(ops: string, oldStart?: number, newStart?: number): Array<[number | null, number | null]> {
+  if (oldStart === undefined || newStart === undefined) {
+    return Array.from(ops, () => [null, null] as [null, null]);
+  }
+  let oldLineno = oldStart;
+  let newLineno = newStart;
+  return Array.from(ops, (op): [number | null, number | null] => {
+    if (op === ' ') return [oldLineno++, newLineno++];
+    if (op === '-') return [oldLineno++, null];
+    if (op === '+') return [null, newLineno++];
+    return [null, null];
+  });
+}
@@ -0,0 +1,79 @@
+import { decodeCompactWordDiff, isCompactWordDiff } from '../src/wordDiff';
+import { CompactWordDiff, CompactWordDiffHunk, StructuredDiffFile } from '../src/types';
+
+describe('decodeCompactWordDiff', () => {
+  const compact: CompactWordDiff = {
+    format: 'gitwrite-word-diff-compact',
+    version: 1,
+    files: [
+      {
+        file_path: 'chapter1.md',
+        change_type: 'modified',
+        hunks: [
+          {
+            header: '@@ -4,2 +4,3 @@',
+            old_start: 4,
+            old_lines: 2,
+            new_start: 4,
+            new_lines: 3,
+            ops: ' +-+\\',
+            text: ['Nobody came.', 'A new line.', 'The old  house stood.', 'The old  house stood silent.'],
+            words: [0, [4], [4, 1]],
+          },
+        ],
+      },
+    ],
+  };
+
+  const expected: StructuredDiffFile[] = [
+    {
+      file_path: 'chapter1.md',
+      change_type: 'modified',
+      hunks: [
+        {
+          header: '@@ -4,2 +4,3 @@',
+          old_start: 4,
+          old_lines: 2,
+          new_start: 4,
+          new_lines: 3,
+          lines: [
+            { type: 'context', content: 'Nobody came.', old_lineno: 4, new_lineno: 4 },
+            { type: 'addition', content: 'A new line.', new_lineno: 5, words: [{ type: 'added', content: 'A new line.' }] },
+            { type: 'deletion', content: 'The old  house stood.', old_lineno: 5, words: [{ type: 'context', content: 'The old house stood.' }] },
+            {
+              type: 'addition',
+              content: 'The old  house stood silent.',
+              new_lineno: 6,
+              words: [{ type: 'context', content: 'The old house stood' }, { type: 'added', content: 'silent.' }],
+            },
+            { type: 'no_newline', content: '\\ No newline at end of file' },
+          ],
+        },
+      ],
+    },
+  ];
+
+  it('expands runs, whole-line changes and implied line numbers', () => {
+    expect(isCompactWordDiff(compact)).toBe(true);
+    expect(isCompactWordDiff(expected)).toBe(false);
+    expect(decodeCompactWordDiff(compact)).toEqual(expected);
+  });
+
+  it('uses explicit segments and line numbers when given', () => {
+    const hunk: CompactWordDiffHunk = {
+      ...compact.files[0].hunks[0],
+      ops: '-',
+      text: ['\ufeffodd text'],
+      words: [[['context', '\ufeffodd'], ['removed', 'text']]],
+      lineno: [[9, null]],
+    };
+    const [file] = decodeCompactWordDiff({ ...compact, files: [{ ...compact.files[0], hunks: [hunk] }] });
+    expect(file.hunks[0].lines).toEqual([
+      { type: 'deletion', content: '\ufeffodd text', old_lineno: 9, words: [{ type: 'context', content: '\ufeffodd' }, { type: 'removed', content: 'text' }] },
+    ]);
+  });
+
+  it('rejects unknown versions', () => {
+    expect(() => decodeCompactWordDiff({ ...compact, version: 2 })).toThrow('Unsupported word diff encoding');
+  });
+});
@@ -159,6 +159,30 @@ def test_list_annotations_success(mock_core_list, mock_active_user):
     app.dependency_overrides.clear() # Clean up overrides
 
 
+@patch("gitwrite_api.routers.annotations.core_list_annotations")
+def test_list_annotations_with_filters(mock_core_list, mock_active_user):
+    app.dependency_overrides[get_current_active_user] = lambda: mock_active_user
+    mock_core_list.return_value = []
+
+    response = client.get(
+        "/repository/annotations?feedback_branch=fb-test&file_path=ch1.md&status=new&start_line=10&end_line=40",
+        headers=get_auth_headers([UserRole.BETA_READER]),
+    )
+
+    assert response.status_code == 200
+    assert response.json()["count"] == 0
+    mock_core_list.assert_called_once_with(
+        repo_path="/tmp/gitwrite_repos_api", feedback_branch="fb-test",
+        file_path="ch1.md", status=AnnotationStatus.NEW, start_line=10, end_line=40,
+    )
+
+    response = client.get("/repository/annotations?feedback_branch=fb-test&start_line=5&end_line=4",
+                          headers=get_auth_headers([UserRole.BETA_READER]))
+    assert response.status_code == 400
+    assert mock_core_list.call_count == 1
+    app.dependency_overrides.clear() # Clean up overrides
+
+
 @patch("gitwrite_api.routers.annotations.core_list_annotations")
 def test_list_annotations_branch_not_found(mock_core_list, mock_active_user):
     app.dependency_overrides[get_current_active_user] = lambda: mock_active_user
@@ -418,3 +442,69 @@ def mock_auth(request): # request is a pytest fixture
 # - `get_auth_headers` is symbolic and could be removed if tests don't need it.
 # - This provides clear, per-test setup for dependencies.
 # I will proceed with creating the file with this refined structure.Tool output for `create_file_with_block`:
+
+
+# Test POST /repository/annotations/batch and /repository/annotations/batch/status
+@patch("gitwrite_api.routers.annotations.core_create_annotation_commits")
+def test_create_annotations_batch_success(mock_core_create_many, mock_active_user):
+    app.dependency_overrides[get_current_active_user] = lambda: mock_active_user
+
+    def fake_create(repo_path, feedback_branch, annotations):
+        for index, annotation in enumerate(annotations):
+            annotation.id = annotation.commit_id = f"sha{index}"
+        return [annotation.id for annotation in annotations]
+
+    mock_core_create_many.side_effect = fake_create
+    items = [{"file_path": "ch1.md", "highlighted_text": f"t{i}", "start_line": i, "end_line": i,
+              "comment": f"c{i}", "author": "reader"} for i in range(3)]
+    response = client.post("/repository/annotations/batch", json={"feedback_branch": "fb", "annotations": items},
+                           headers=get_auth_headers([UserRole.BETA_READER]))
+
+    assert response.status_code == 201
+    data = response.json()
+    assert data["count"] == 3
+    assert [(a["id"], a["comment"], a["status"]) for a in data["annotations"]] == [
+        ("sha0", "c0", "new"), ("sha1", "c1", "new"), ("sha2", "c2", "new")]
+    mock_core_create_many.assert_called_once()
+    assert mock_core_create_many.call_args.kwargs["feedback_branch"] == "fb"
+
+    response = client.post("/repository/annotations/batch", json={"feedback_branch": "fb", "annotations": []},
+                           headers=get_auth_headers([UserRole.BETA_READER]))
+    assert response.status_code == 422
+    app.dependency_overrides.clear()
+
+
+@patch("gitwrite_api.routers.annotations.core_list_annotations")
+@patch("gitwrite_api.routers.annotations.core_update_annotation_statuses")
+def test_update_annotation_statuses_batch(mock_core_update_many, mock_core_list, mock_active_editor_user):
+    app.dependency_overrides[get_current_active_user] = lambda: mock_active_editor_user
+
+    mock_core_update_many.return_value = ["u1", "u2"]
+    mock_core_list.return_value = [
+        Annotation(id="a1", file_path="a.md", highlighted_text="t", start_line=0, end_line=0, comment="c",
+                   author="x", status=AnnotationStatus.ACCEPTED, commit_id="u1", original_annotation_id="a1"),
+        Annotation(id="a2", file_path="a.md", highlighted_text="t", start_line=1, end_line=1, comment="c",
+                   author="x", status=AnnotationStatus.REJECTED, commit_id="u2", original_annotation_id="a2"),
+        Annotation(id="a3", file_path="a.md", highlighted_text="t", start_line=2, end_line=2, comment="c",
+                   author="x", status=AnnotationStatus.NEW, commit_id="a3"),
+    ]
+    payload = {"feedback_branch": "fb", "updates": [
+        {"annotation_id": "a1", "new_status": "accepted"}, {"annotation_id": "a2", "new_status": "rejected"}]}
+    response = client.post("/repository/annotations/batch/status", json=payload,
+                           headers=get_auth_headers([UserRole.EDITOR]))
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["commit_ids"] == ["u1", "u2"]
+    assert [(a["id"], a["status"]) for a in data["annotations"]] == [("a1", "accepted"), ("a2", "rejected")]
+    mock_core_update_many.assert_called_once_with(
+        repo_path="/tmp/gitwrite_repos_api", feedback_branch="fb",
+        updates=[("a1", AnnotationStatus.ACCEPTED), ("a2", AnnotationStatus.REJECTED)],
+    )
+
+    mock_core_update_many.side_effect = RepositoryOperationError("Original annotation commit 'zz' not found on branch 'fb'")
+    response = client.post("/repository/annotations/batch/status", json=payload,
+                           headers=get_auth_headers([UserRole.EDITOR]))
+    assert response.status_code == 404
+    app.dependency_overrides.clear()
+
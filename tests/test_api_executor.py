@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from gitwrite_api.executor import BoundedExecutor
+from gitwrite_api.main import app
+
+
+@pytest.fixture
+def executor():
+    pool = BoundedExecutor("test", max_workers=1, max_queue_depth=1, timeout=5)
+    yield pool
+    pool.shutdown()
+
+
+def test_run_returns_result_off_event_loop_thread(executor):
+    loop_thread = threading.get_ident()
+    result = asyncio.run(executor.run(lambda: threading.get_ident()))
+    assert result != loop_thread
+    metrics = executor.metrics()
+    assert metrics["submitted"] == 1
+    assert metrics["completed"] == 1
+    assert metrics["in_flight"] == 0
+
+
+def test_run_reraises_function_errors(executor):
+    def boom():
+        raise ValueError("bad ref")
+
+    with pytest.raises(ValueError, match="bad ref"):
+        asyncio.run(executor.run(boom))
+    assert executor.metrics()["failed"] == 1
+
+
+def test_saturated_pool_rejects_with_503(executor):
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        try:
+            with pytest.raises(HTTPException) as exc_info:
+                await executor.run(lambda: None)
+            return exc_info.value
+        finally:
+            release.set()
+            await asyncio.gather(running, queued)
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert executor.metrics()["rejected"] == 1
+
+
+def test_timeout_returns_504():
+    pool = BoundedExecutor("slow", max_workers=1, max_queue_depth=0, timeout=0.05)
+    try:
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(pool.run(time.sleep, 0.5))
+        assert exc_info.value.status_code == 504
+        assert pool.metrics()["timed_out"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_health_reports_executor_metrics():
+    response = TestClient(app).get("/health")
+    assert response.status_code == 200
+    assert set(response.json()["executors"]) == {"io", "cpu"}
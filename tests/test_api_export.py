@@ -1,13 +1,13 @@
 import uuid
 from pathlib import Path
-from unittest.mock import patch, MagicMock
+from unittest.mock import ANY, patch, MagicMock
 
 import pytest
 from fastapi.testclient import TestClient
 
 from gitwrite_api.main import app
 from gitwrite_api.models import User # Corrected import
-from gitwrite_core.exceptions import RepositoryNotFoundError, CommitNotFoundError, FileNotFoundInCommitError, PandocError # Corrected import
+from gitwrite_core.exceptions import RepositoryNotFoundError, CommitNotFoundError, FileNotFoundInCommitError, PandocError, PartialExportError # Corrected import
 
 from gitwrite_api.models import UserRole # Import UserRole
 
@@ -101,7 +101,8 @@ def test_export_epub_success(client, mock_authenticated_user):
             repo_path_str="/tmp/gitwrite_repos_api", # PLACEHOLDER_REPO_PATH
             commit_ish_str="test_commit_id",
             file_list=["file1.md", "file2.md"],
-            output_epub_path_str=str(expected_core_output_path.resolve())
+            output_epub_path_str=str(expected_core_output_path.resolve()),
+            artifact_cache=ANY
         )
         # The response from API is now JSON
         assert response.json()["status"] == "success"
@@ -146,7 +147,8 @@ def test_export_epub_success_default_filename(client, mock_authenticated_user):
             repo_path_str="/tmp/gitwrite_repos_api",
             commit_ish_str="test_commit_id",
             file_list=["file1.md"],
-            output_epub_path_str=str(Path(f"/tmp/gitwrite_repos_api/exports/{expected_job_id}/{default_filename}").resolve())
+            output_epub_path_str=str(Path(f"/tmp/gitwrite_repos_api/exports/{expected_job_id}/{default_filename}").resolve()),
+            artifact_cache=ANY
         )
 
 
@@ -312,3 +314,130 @@ def ensure_tmp_exports_directory():
     tmp_exports_path = Path("/tmp/gitwrite_repos_api/exports")
     if not tmp_exports_path.exists():
         tmp_exports_path.mkdir(parents=True, exist_ok=True)
+
+
+# --- Asynchronous export jobs ---
+
+@pytest.fixture
+def export_job_queue(tmp_path):
+    """A real job queue on a temporary store, with a fake exporter instead of pandoc."""
+    from gitwrite_core.export_jobs import ExportJobQueue
+
+    calls = []
+
+    def fake_epub(repo_path, commit_ish, file_list, output_path, options):
+        calls.append((commit_ish, file_list, options))
+        Path(output_path).write_text("epub")
+        return {"status": "success", "message": "EPUB generated."}
+
+    def failing_pdf(repo_path, commit_ish, file_list, output_path, options):
+        calls.append((commit_ish, file_list, options))
+        raise PandocError("pdflatex not found")
+
+    def fake_multi(repo_path, commit_ish, file_list, outputs, options):
+        calls.append((commit_ish, file_list, outputs, options))
+        written = {fmt: path for fmt, path in outputs.items() if fmt != "docx"}  # DOCX always fails
+        for output_path in written.values():
+            Path(output_path).write_text("book")
+        if "docx" in outputs:
+            raise PartialExportError("DOCX export failed (EPUB written): bad reference doc", results={
+                fmt: {"status": "success" if fmt in written else "error", "message": fmt, "output_path": path}
+                for fmt, path in outputs.items()
+            })
+        return {"status": "success", "message": "Generated all formats."}
+
+    queue = ExportJobQueue(str(tmp_path / "export-jobs.sqlite3"), exporters={"epub": fake_epub, "pdf": failing_pdf},
+                           multi_exporter=fake_multi)
+    queue.calls = calls
+    with patch("gitwrite_api.routers.repository._export_job_queue", return_value=queue):
+        yield queue
+    queue.shutdown()
+
+
+def _poll_job(client, job_id):
+    import time
+    for _ in range(200):
+        job = client.get(f"/repository/export/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed", "cancelled"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"export job {job_id} did not finish")
+
+
+def test_export_job_submit_and_poll(client, export_job_queue):
+    response = client.post("/repository/export/jobs", json={"format": "epub", "file_list": ["ch1.md"], "commit_ish": "v1"})
+    assert response.status_code == 202
+    submitted = response.json()
+    assert submitted["status"] in ("queued", "running", "done") and submitted["format"] == "epub"
+
+    job = _poll_job(client, submitted["job_id"])
+    assert job["status"] == "done" and job["progress"] == 1.0
+    assert job["server_file_path"].endswith("/export.epub")
+    assert export_job_queue.calls == [("v1", ["ch1.md"], {})]
+
+    events = client.get(f"/repository/export/jobs/{submitted['job_id']}/events")
+    assert events.headers["content-type"].startswith("text/event-stream")
+    assert events.text.startswith("event: job\ndata: ") and '"status":"done"' in events.text
+
+    assert client.get("/repository/export/jobs/unknown").status_code == 404
+
+
+def test_export_job_failure_and_validation(client, export_job_queue):
+    response = client.post("/repository/export/jobs", json={"format": "pdf", "file_list": ["ch1.md"], "pdf_engine": "xelatex"})
+    job = _poll_job(client, response.json()["job_id"])
+    assert job["status"] == "failed" and "pdflatex not found" in job["error"]
+    assert job["server_file_path"] is None
+    assert export_job_queue.calls == [("HEAD", ["ch1.md"], {"extra_args": ["--standalone", "--pdf-engine=xelatex"]})]
+
+    bad_extension = client.post("/repository/export/jobs", json={"format": "epub", "file_list": ["a.md"], "output_filename": "book.pdf"})
+    assert bad_extension.status_code == 400
+    assert client.post("/repository/export/jobs", json={"format": "odt", "file_list": ["a.md"]}).status_code == 422
+
+    cancelled = client.delete(f"/repository/export/jobs/{job['job_id']}")
+    assert cancelled.status_code == 200 and cancelled.json()["status"] == "failed"  # Finished jobs are unchanged
+
+
+def test_export_job_with_several_formats(client, export_job_queue):
+    response = client.post("/repository/export/jobs", json={
+        "formats": ["epub", "pdf"], "file_list": ["ch1.md"], "output_filename": "novel", "pdf_engine": "xelatex",
+    })
+    assert response.status_code == 202 and response.json()["format"] == "epub,pdf"
+
+    job = _poll_job(client, response.json()["job_id"])
+    assert job["status"] == "done"
+    paths = job["server_file_paths"]
+    assert sorted(paths) == ["epub", "pdf"]
+    assert paths["epub"].endswith("/novel.epub") and paths["pdf"].endswith("/novel.pdf")
+    assert all(Path(path).parent == Path(job["server_file_path"]) for path in paths.values())
+    assert export_job_queue.calls == [
+        ("HEAD", ["ch1.md"], paths, {"pdf": {"extra_args": ["--standalone", "--pdf-engine=xelatex"]}}),
+    ]
+
+    partial = client.post("/repository/export/jobs", json={"formats": ["epub", "docx"], "file_list": ["ch1.md"]})
+    failed = _poll_job(client, partial.json()["job_id"])
+    assert failed["status"] == "failed" and "bad reference doc" in failed["error"]
+    assert list(failed["server_file_paths"]) == ["epub"] and Path(failed["server_file_paths"]["epub"]).exists()
+
+    both = client.post("/repository/export/jobs", json={"format": "epub", "formats": ["pdf"], "file_list": ["a.md"]})
+    assert both.status_code == 422
+    assert client.post("/repository/export/jobs", json={"file_list": ["a.md"]}).status_code == 422
+    assert client.post("/repository/export/jobs", json={"formats": ["epub", "epub"], "file_list": ["a.md"]}).status_code == 422
+
+
+def test_export_job_is_visible_only_to_its_requester_and_editors(client, export_job_queue):
+    from gitwrite_api.routers.repository import get_current_active_user as gau_repository
+    reader = User(username="reader", email="r@example.com", full_name="Reader", disabled=False, roles=[UserRole.BETA_READER])
+    other = User(username="other", email="o@example.com", full_name="Other", disabled=False, roles=[UserRole.BETA_READER])
+    editor = User(username="editor", email="e@example.com", full_name="Editor", disabled=False, roles=[UserRole.EDITOR])
+
+    app.dependency_overrides[gau_repository] = lambda: reader
+    job_id = client.post("/repository/export/jobs", json={"format": "epub", "file_list": ["ch1.md"]}).json()["job_id"]
+    assert _poll_job(client, job_id)["status"] == "done"
+
+    app.dependency_overrides[gau_repository] = lambda: other
+    assert client.get(f"/repository/export/jobs/{job_id}").status_code == 404
+    assert client.get(f"/repository/export/jobs/{job_id}/events").status_code == 404
+    assert client.delete(f"/repository/export/jobs/{job_id}").status_code == 404
+
+    app.dependency_overrides[gau_repository] = lambda: editor
+    assert client.get(f"/repository/export/jobs/{job_id}").json()["status"] == "done"
@@ -2,6 +2,7 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 import datetime
+import json
 from http import HTTPStatus # For status codes
 import uuid # For tests that involve UUID generation
 
@@ -300,6 +301,39 @@ def test_list_tags_success(mock_list_tags): # Example of a non-RBAC protected en
     assert data["tags"] == ["v1.0", "v1.1"]
     app.dependency_overrides = {}
 
+# --- Tests for /repository/{repo_name}/commits ---
+@patch('gitwrite_api.routers.repository.list_commits')
+def test_list_commits_paginated(mock_list_commits):
+    mock_list_commits.return_value = {
+        "status": "success",
+        "commits": [{
+            "sha": "a" * 40, "message": "Chapter 3 draft",
+            "author_name": "Author", "author_email": "author@example.com", "author_date": 946684800,
+            "committer_name": "Author", "committer_email": "author@example.com", "committer_date": 946684800,
+            "parents": ["b" * 40],
+        }],
+        "message": "Successfully retrieved 1 commits.",
+        "next_cursor": "opaque-next",
+    }
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+    response = client.get(f"/repository/{TEST_REPO_NAME}/commits", params={"cursor": "opaque", "limit": 1})
+    assert response.status_code == 200
+    assert response.json()["next_cursor"] == "opaque-next"
+    mock_list_commits.assert_called_once_with(
+        repo_path_str=f"{MOCK_REPO_PATH}/gitwrite_user_repos/{TEST_REPO_NAME}",
+        branch_name=None, max_count=1, cursor="opaque"
+    )
+    app.dependency_overrides = {}
+
+@patch('gitwrite_api.routers.repository.list_commits')
+def test_list_commits_invalid_cursor(mock_list_commits):
+    mock_list_commits.return_value = {"status": "invalid_cursor", "commits": [], "message": "Malformed history cursor."}
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+    response = client.get(f"/repository/{TEST_REPO_NAME}/commits", params={"cursor": "garbage"})
+    assert response.status_code == 400
+    assert mock_list_commits.call_args.kwargs["max_count"] == 50 # Default page size when only a cursor is given
+    app.dependency_overrides = {}
+
 @patch('gitwrite_api.routers.repository.save_and_commit_file')
 def test_api_save_file_success_original_style(mock_core_save_file): # Original test, now using MOCK_OWNER_USER
     mock_core_save_file.return_value = {
@@ -352,8 +386,7 @@ def test_api_initialize_repository_with_project_name_success_original_style(mock
 
 # --- Tests for /repository/compare ---
 @patch('gitwrite_api.routers.repository.core_get_diff')
-@patch('gitwrite_api.routers.repository.core_get_word_level_diff')
-def test_api_compare_refs_default_mode(mock_get_word_diff, mock_get_diff):
+def test_api_compare_refs_default_mode(mock_get_diff):
     mock_get_diff.return_value = {
         "ref1_oid": "abc", "ref2_oid": "def",
         "ref1_display_name": "HEAD~1", "ref2_display_name": "HEAD",
@@ -367,25 +400,23 @@ def test_api_compare_refs_default_mode(mock_get_word_diff, mock_get_diff):
     assert data["patch_text"] == "--- a/file.txt\n+++ b/file.txt\n@@ -1 +1 @@\n-old\n+new"
     assert isinstance(data["patch_text"], str)
     mock_get_diff.assert_called_once_with(repo_path_str=MOCK_REPO_PATH, ref1_str="HEAD~1", ref2_str="HEAD")
-    mock_get_word_diff.assert_not_called()
     app.dependency_overrides = {}
 
 @patch('gitwrite_api.routers.repository.core_get_diff')
-@patch('gitwrite_api.routers.repository.core_get_word_level_diff')
-def test_api_compare_refs_word_mode(mock_get_word_diff, mock_get_diff):
+def test_api_compare_refs_word_mode(mock_get_diff):
     raw_patch_text = "--- a/file.txt\n+++ b/file.txt\n@@ -1 +1 @@\n-old content\n+new content"
-    mock_get_diff.return_value = {
-        "ref1_oid": "abc", "ref2_oid": "def",
-        "ref1_display_name": "HEAD~1", "ref2_display_name": "HEAD",
-        "patch_text": raw_patch_text
-    }
     structured_diff_expected = [
         {"file_path": "file.txt", "hunks": [{"lines": [
             {"type": "deletion", "content": "old content", "words": [{"type": "removed", "content": "old content"}]},
             {"type": "addition", "content": "new content", "words": [{"type": "added", "content": "new content"}]}
         ]}]}
     ]
-    mock_get_word_diff.return_value = structured_diff_expected
+    mock_get_diff.return_value = {
+        "ref1_oid": "abc", "ref2_oid": "def",
+        "ref1_display_name": "HEAD~1", "ref2_display_name": "HEAD",
+        "patch_text": raw_patch_text,
+        "word_diff": structured_diff_expected
+    }
 
     app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
 
@@ -395,20 +426,17 @@ def test_api_compare_refs_word_mode(mock_get_word_diff, mock_get_diff):
 
     assert data["patch_text"] == structured_diff_expected
     assert isinstance(data["patch_text"], list)
-    mock_get_diff.assert_called_once_with(repo_path_str=MOCK_REPO_PATH, ref1_str="HEAD~1", ref2_str="HEAD")
-    mock_get_word_diff.assert_called_once_with(raw_patch_text)
+    mock_get_diff.assert_called_once_with(repo_path_str=MOCK_REPO_PATH, ref1_str="HEAD~1", ref2_str="HEAD", include_word_diff=True)
     app.dependency_overrides = {}
 
 @patch('gitwrite_api.routers.repository.core_get_diff')
-@patch('gitwrite_api.routers.repository.core_get_word_level_diff')
-def test_api_compare_refs_word_mode_no_diff(mock_get_word_diff, mock_get_diff):
+def test_api_compare_refs_word_mode_no_diff(mock_get_diff):
     mock_get_diff.return_value = {
         "ref1_oid": "abc", "ref2_oid": "def",
         "ref1_display_name": "HEAD~1", "ref2_display_name": "HEAD",
-        "patch_text": "" # No textual diff
+        "patch_text": "", # No textual diff
+        "word_diff": []
     }
-    # core_get_word_level_diff should return [] if patch_text is empty
-    mock_get_word_diff.return_value = []
 
     app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
 
@@ -418,9 +446,30 @@ def test_api_compare_refs_word_mode_no_diff(mock_get_word_diff, mock_get_diff):
 
     assert data["patch_text"] == [] # Expect empty list for structured diff of no changes
     assert isinstance(data["patch_text"], list)
-    mock_get_diff.assert_called_once_with(repo_path_str=MOCK_REPO_PATH, ref1_str=None, ref2_str=None)
-    # core_get_word_level_diff is NOT called if patch_text is empty
-    mock_get_word_diff.assert_not_called()
+    mock_get_diff.assert_called_once_with(repo_path_str=MOCK_REPO_PATH, ref1_str=None, ref2_str=None, include_word_diff=True)
+    app.dependency_overrides = {}
+
+@patch('gitwrite_api.routers.repository.core_get_diff')
+def test_api_compare_refs_compact_word_format(mock_get_diff):
+    compact = {"format": "gitwrite-word-diff-compact", "version": 1, "files": [
+        {"file_path": "a.md", "change_type": "modified", "hunks": [
+            {"header": "@@ -1 +1 @@", "old_start": 1, "old_lines": 1, "new_start": 1, "new_lines": 1,
+             "ops": "-+", "text": ["old", "new"], "words": [0, 0]}]}]}
+    mock_get_diff.return_value = {
+        "ref1_oid": "abc", "ref2_oid": "def",
+        "ref1_display_name": "HEAD~1", "ref2_display_name": "HEAD",
+        "patch_text": "diff --git a/a.md b/a.md\n", "word_diff": compact
+    }
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+
+    response = client.get("/repository/compare?diff_mode=word&word_format=compact")
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["patch_text"] == compact
+    mock_get_diff.assert_called_once_with(repo_path_str=MOCK_REPO_PATH, ref1_str=None, ref2_str=None,
+                                          include_word_diff=True, compact_word_diff=True)
+
+    response = client.get("/repository/compare?diff_mode=word&word_format=msgpack")
+    assert response.status_code == HTTPStatus.BAD_REQUEST
     app.dependency_overrides = {}
 
 @patch('gitwrite_api.routers.repository.core_get_diff')
@@ -441,6 +490,175 @@ def test_api_compare_refs_invalid_diff_mode(mock_get_diff):
     app.dependency_overrides = {}
 
 
+COMPARE_REFS = {"ref1_oid": "abc", "ref2_oid": "def", "ref1_display_name": "HEAD~1", "ref2_display_name": "HEAD"}
+COMPARE_FILE = {"file_path": "chapter1.md", "change_type": "modified", "is_binary": False,
+                "lines_added": 1, "lines_deleted": 1, "words_added": 7, "words_deleted": 5}
+
+@patch('gitwrite_api.routers.repository.core_list_diff_files')
+def test_api_compare_refs_files_mode(mock_list_diff_files):
+    totals = {"files_changed": 1, "lines_added": 1, "lines_deleted": 1, "words_added": 7, "words_deleted": 5}
+    mock_list_diff_files.return_value = dict(COMPARE_REFS, files=[COMPARE_FILE], totals=totals)
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+
+    response = client.get("/repository/compare?ref1=HEAD~1&ref2=HEAD&mode=files")
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data["files"][0]["words_added"] == 7
+    assert data["totals"] == totals
+    assert "patch_text" not in data
+    mock_list_diff_files.assert_called_once_with(repo_path_str=MOCK_REPO_PATH, ref1_str="HEAD~1", ref2_str="HEAD")
+    app.dependency_overrides = {}
+
+@patch('gitwrite_api.routers.repository.core_get_diff_stats')
+def test_api_compare_refs_stats_mode(mock_get_diff_stats):
+    totals = {"files_changed": 1, "lines_added": 1, "lines_deleted": 1, "words_added": 7, "words_deleted": 5}
+    mock_get_diff_stats.return_value = dict(COMPARE_REFS, files=[COMPARE_FILE], totals=totals)
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+
+    response = client.get("/repository/compare?mode=stats&ref1=main")
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == dict(COMPARE_REFS, totals=totals)
+    mock_get_diff_stats.assert_called_once_with(repo_path_str=MOCK_REPO_PATH, ref1_str="main", ref2_str=None)
+    app.dependency_overrides = {}
+
+@patch('gitwrite_api.routers.repository.core_get_diff')
+@patch('gitwrite_api.routers.repository.core_get_diff_stats')
+def test_api_compare_refs_with_paths(mock_get_diff_stats, mock_get_diff):
+    mock_get_diff.return_value = dict(COMPARE_REFS, patch_text="diff --git a/drafts/ch1.md b/drafts/ch1.md\n")
+    totals = {"files_changed": 0, "lines_added": 0, "lines_deleted": 0, "words_added": 0, "words_deleted": 0}
+    mock_get_diff_stats.return_value = dict(COMPARE_REFS, files=[], totals=totals)
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+
+    response = client.get("/repository/compare?path=drafts/&path=*.txt")
+    assert response.status_code == HTTPStatus.OK
+    mock_get_diff.assert_called_once_with(repo_path_str=MOCK_REPO_PATH, ref1_str=None, ref2_str=None, paths=["drafts/", "*.txt"])
+    client.get("/repository/compare?mode=stats&path=notes")
+    mock_get_diff_stats.assert_called_once_with(repo_path_str=MOCK_REPO_PATH, ref1_str=None, ref2_str=None, paths=["notes"])
+    app.dependency_overrides = {}
+
+@patch('gitwrite_api.routers.repository.core_get_file_diff')
+@patch('gitwrite_api.routers.repository.core_get_diff')
+def test_api_compare_refs_merge_base(mock_get_diff, mock_get_file_diff):
+    mock_get_diff.return_value = dict(COMPARE_REFS, patch_text="diff --git a/chapter1.md b/chapter1.md\n")
+    mock_get_file_diff.return_value = dict(COMPARE_REFS, file=dict(COMPARE_FILE, patch_text="diff --git a/chapter1.md b/chapter1.md\n"))
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+
+    response = client.get("/repository/compare?ref1=main&ref2=edits&merge_base=true")
+    assert response.status_code == HTTPStatus.OK
+    mock_get_diff.assert_called_once_with(repo_path_str=MOCK_REPO_PATH, ref1_str="main", ref2_str="edits", merge_base=True)
+    client.get("/repository/compare/file?path=chapter1.md&ref1=main&ref2=edits&merge_base=true")
+    mock_get_file_diff.assert_called_once_with(repo_path_str=MOCK_REPO_PATH, file_path="chapter1.md", ref1_str="main",
+                                               ref2_str="edits", include_word_diff=False, merge_base=True)
+
+    from gitwrite_core.exceptions import NotEnoughHistoryError
+    mock_get_diff.side_effect = NotEnoughHistoryError("'main' and 'orphan' have no common history to compare from.")
+    response = client.get("/repository/compare?ref1=main&ref2=orphan&merge_base=true")
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    app.dependency_overrides = {}
+
+@patch('gitwrite_api.routers.repository.core_get_file_diff')
+def test_api_compare_file(mock_get_file_diff):
+    mock_get_file_diff.return_value = dict(COMPARE_REFS, file=dict(COMPARE_FILE, patch_text="diff --git a/chapter1.md b/chapter1.md\n"))
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+
+    response = client.get("/repository/compare/file?path=chapter1.md&ref1=HEAD~1")
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["file"]["patch_text"].startswith("diff --git")
+    mock_get_file_diff.assert_called_once_with(repo_path_str=MOCK_REPO_PATH, file_path="chapter1.md",
+                                               ref1_str="HEAD~1", ref2_str=None, include_word_diff=False)
+
+    from gitwrite_core.exceptions import FileNotFoundInCommitError
+    mock_get_file_diff.side_effect = FileNotFoundInCommitError("File 'x.md' is not changed")
+    response = client.get("/repository/compare/file?path=x.md")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    app.dependency_overrides = {}
+
+@patch('gitwrite_api.routers.repository.core_stream_diff_files')
+def test_api_compare_refs_stream_mode(mock_stream_diff_files):
+    files = [dict(COMPARE_FILE, patch_text="diff one\n"), dict(COMPARE_FILE, file_path="chapter2.md", patch_text="diff two\n")]
+    mock_stream_diff_files.return_value = (COMPARE_REFS, iter(files))
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+
+    response = client.get("/repository/compare?mode=stream")
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["event"] for event in events] == ["meta", "file", "file", "end"]
+    assert events[0]["data"] == COMPARE_REFS
+    assert [event["data"]["file_path"] for event in events[1:3]] == ["chapter1.md", "chapter2.md"]
+    assert events[3]["data"] == {"files_sent": 2}
+
+    mock_stream_diff_files.return_value = (COMPARE_REFS, iter(files))
+    response = client.get("/repository/compare?mode=stream&stream_format=sse&diff_mode=word")
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("event: meta\ndata: {")
+    assert response.text.count("event: file\n") == 2
+    assert mock_stream_diff_files.call_args.kwargs["include_word_diff"] is True
+    app.dependency_overrides = {}
+
+@patch('gitwrite_api.routers.repository.core_stream_diff_files')
+def test_api_compare_refs_stream_mode_is_not_buffered_by_gzip(mock_stream_diff_files):
+    """Clients accepting gzip still get each streamed event as soon as it is produced."""
+    import asyncio
+    import threading
+    first_delivered = threading.Event()
+    waited = []
+
+    def files():
+        yield dict(COMPARE_FILE, patch_text="diff one\n" * 200)  # Well over the gzip minimum size
+        waited.append(first_delivered.wait(5))
+        yield dict(COMPARE_FILE, file_path="chapter2.md", patch_text="diff two\n")
+
+    mock_stream_diff_files.return_value = (COMPARE_REFS, files())
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+    scope = {"type": "http", "http_version": "1.1", "method": "GET", "scheme": "http", "path": "/repository/compare",
+             "raw_path": b"/repository/compare", "root_path": "", "query_string": b"mode=stream",
+             "headers": [(b"host", b"testserver"), (b"accept-encoding", b"gzip, deflate")],
+             "client": ("testclient", 50000), "server": ("testserver", 80)}
+    messages, requests = [], []
+
+    async def receive():
+        if not requests:
+            requests.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # The client never disconnects
+
+    async def send(message):
+        messages.append(message)
+        if b"chapter1.md" in message.get("body", b""):
+            first_delivered.set()
+
+    try:
+        asyncio.run(app(scope, receive, send))
+    finally:
+        app.dependency_overrides = {}
+
+    assert waited == [True]
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-type"].startswith(b"application/x-ndjson") and b"content-encoding" not in headers
+    events = [json.loads(line) for line in b"".join(m.get("body", b"") for m in messages[1:]).splitlines()]
+    assert [event["event"] for event in events] == ["meta", "file", "file", "end"]
+
+@patch('gitwrite_api.routers.repository.core_stream_diff_files')
+def test_api_compare_refs_stream_mode_errors(mock_stream_diff_files):
+    from gitwrite_core.exceptions import CommitNotFoundError, GitWriteError
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+    mock_stream_diff_files.side_effect = CommitNotFoundError("Reference 'nope' not found")
+    assert client.get("/repository/compare?mode=stream&ref1=nope").status_code == HTTPStatus.NOT_FOUND
+
+    def failing_files():
+        yield dict(COMPARE_FILE, patch_text="diff one\n")
+        raise GitWriteError("object missing")
+
+    mock_stream_diff_files.side_effect = None
+    mock_stream_diff_files.return_value = (COMPARE_REFS, failing_files())
+    events = [json.loads(line) for line in client.get("/repository/compare?mode=stream").text.splitlines()]
+    assert [event["event"] for event in events] == ["meta", "file", "error"]
+    assert events[-1]["data"]["files_sent"] == 1
+    assert client.get("/repository/compare?mode=bogus").status_code == HTTPStatus.BAD_REQUEST
+    app.dependency_overrides = {}
+
+
 # --- Tests for /repository/file-content ---
 
 @patch('gitwrite_api.routers.repository.core_get_file_content_at_commit')
@@ -753,3 +971,63 @@ def test_api_list_repositories_metadata_parse_failure(mock_is_dir, mock_listdir,
     assert data["repositories"][0]["name"] == "repo_good"
 
     app.dependency_overrides = {}
+
+@patch('gitwrite_api.routers.repository.core_search_commits')
+def test_search_commits_passes_filters(mock_search_commits):
+    mock_search_commits.return_value = {
+        "status": "success", "commits": [], "message": "Found 0 matching commits.",
+        "next_offset": None, "source": "index",
+    }
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+    response = client.get(f"/repository/{TEST_REPO_NAME}/commits/search", params={
+        "author": "ada", "since": "2001-09-09T01:46:40Z", "q": "chapter", "path": "chapters/", "limit": 10, "offset": 20,
+    })
+    assert response.status_code == 200
+    assert response.json()["source"] == "index"
+    mock_search_commits.assert_called_once_with(
+        repo_path_str=f"{MOCK_REPO_PATH}/gitwrite_user_repos/{TEST_REPO_NAME}",
+        branch_name=None, author="ada", since=1_000_000_000, until=None,
+        message_contains="chapter", path="chapters/", limit=10, offset=20
+    )
+    app.dependency_overrides = {}
+
+@patch('gitwrite_api.routers.repository.core_search_commits')
+def test_search_commits_unknown_branch(mock_search_commits):
+    mock_search_commits.return_value = {"status": "not_found", "commits": [], "message": "Branch 'nope' not found."}
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+    response = client.get(f"/repository/{TEST_REPO_NAME}/commits/search", params={"branch_name": "nope"})
+    assert response.status_code == 404
+    app.dependency_overrides = {}
+
+@patch('gitwrite_api.routers.repository.core_get_file_history')
+def test_get_file_history(mock_get_file_history):
+    mock_get_file_history.return_value = {
+        "file_path": "chapter-03.md",
+        "commits": [{
+            "sha": "a" * 40, "message": "Promote draft", "author_name": "Author", "author_email": "author@example.com",
+            "author_date": 946684800, "committer_name": "Author", "committer_email": "author@example.com",
+            "committer_date": 946684800, "parents": ["b" * 40],
+            "path": "chapter-03.md", "change_type": "renamed", "old_path": "draft.md",
+        }],
+        "next_cursor": "opaque-next",
+    }
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+    response = client.get(f"/repository/{TEST_REPO_NAME}/file-history", params={"file_path": "chapter-03.md", "limit": 1})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["commits"][0]["old_path"] == "draft.md"
+    assert data["next_cursor"] == "opaque-next"
+    mock_get_file_history.assert_called_once_with(
+        repo_path_str=f"{MOCK_REPO_PATH}/gitwrite_user_repos/{TEST_REPO_NAME}",
+        file_path="chapter-03.md", limit=1, cursor=None
+    )
+    app.dependency_overrides = {}
+
+@patch('gitwrite_api.routers.repository.core_get_file_history')
+def test_get_file_history_invalid_cursor(mock_get_file_history):
+    from gitwrite_core.exceptions import InvalidCursorError
+    mock_get_file_history.side_effect = InvalidCursorError("Malformed file history cursor.")
+    app.dependency_overrides[actual_repo_auth_dependency] = mock_get_current_active_user
+    response = client.get(f"/repository/{TEST_REPO_NAME}/file-history", params={"file_path": "a.md", "cursor": "bad"})
+    assert response.status_code == 400
+    app.dependency_overrides = {}
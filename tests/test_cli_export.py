@@ -5,7 +5,7 @@ import pytest
 from click.testing import CliRunner # Changed from typer.testing
 
 from gitwrite_cli.main import cli as app # app is the click.Group instance
-from gitwrite_core.exceptions import RepositoryNotFoundError, CommitNotFoundError, FileNotFoundInCommitError, PandocError
+from gitwrite_core.exceptions import RepositoryNotFoundError, CommitNotFoundError, FileNotFoundInCommitError, PandocError, PartialExportError
 
 runner = CliRunner()
 
@@ -256,3 +256,62 @@ def test_cli_basic_invocation(runner: CliRunner): # Added runner type hint
     result = runner.invoke(app, ['--help'])
     assert result.exit_code == 0
     assert "Usage: cli [OPTIONS] COMMAND [ARGS]..." in result.stdout
+
+
+def test_export_all_success():
+    with runner.isolated_filesystem():
+        Path("test_repo").mkdir()
+        with patch("gitwrite_core.export.export_formats") as mock_export_core:
+            mock_export_core.return_value = {
+                "status": "success",
+                "message": "Generated EPUB, DOCX from 'v1'.",
+                "results": {
+                    "epub": {"status": "success", "message": "EPUB successfully generated at 'out/Novel.epub'."},
+                    "docx": {"status": "success", "message": "DOCX successfully generated at 'out/Novel.docx'."},
+                },
+                "metrics": {"stages": {}, "total_seconds": 1.25},
+            }
+            result = runner.invoke(
+                app,
+                ["export", "all", "test_repo", "c1.md", "c2.md", "-o", "out", "-n", "Novel",
+                 "-f", "epub", "-f", "docx", "--commit", "v1"],
+            )
+
+        assert result.exit_code == 0, result.output
+        assert "EPUB successfully generated at 'out/Novel.epub'." in result.stdout
+        assert "DOCX successfully generated at 'out/Novel.docx'." in result.stdout
+        assert Path("out").is_dir()
+        mock_export_core.assert_called_once_with(
+            repo_path_str="test_repo",
+            commit_ish_str="v1",
+            file_list=["c1.md", "c2.md"],
+            outputs={"epub": str(Path("out") / "Novel.epub"), "docx": str(Path("out") / "Novel.docx")},
+            pandoc_options={"pdf": {"extra_args": ["--standalone", "--pdf-engine=pdflatex"]}},
+        )
+
+
+def test_export_all_pandoc_error():
+    with runner.isolated_filesystem():
+        Path("test_repo").mkdir()
+        with patch("gitwrite_core.export.export_formats", side_effect=PandocError("Pandoc not found. Please install it.")):
+            result = runner.invoke(app, ["export", "all", "test_repo", "c1.md", "-o", "out"])
+
+        assert result.exit_code == 1
+        assert "Error during export: Pandoc not found" in result.output
+        assert "Hint: Please ensure Pandoc is installed" in result.output
+
+
+def test_export_all_partial_failure_lists_written_formats():
+    error = PartialExportError("PDF export failed (EPUB written): PDF generation failed. Ensure that Pandoc and a LaTeX engine are installed", results={
+        "epub": {"status": "success", "message": "EPUB successfully generated at 'out/export.epub'."},
+        "pdf": {"status": "error", "message": "PDF generation failed."},
+    })
+    with runner.isolated_filesystem():
+        Path("test_repo").mkdir()
+        with patch("gitwrite_core.export.export_formats", side_effect=error):
+            result = runner.invoke(app, ["export", "all", "test_repo", "c1.md", "-o", "out", "-f", "epub", "-f", "pdf"])
+
+        assert result.exit_code == 1
+        assert "EPUB successfully generated at 'out/export.epub'." in result.output
+        assert "Error during export: PDF export failed (EPUB written)" in result.output
+        assert "Hint: Please ensure a LaTeX distribution is installed" in result.output
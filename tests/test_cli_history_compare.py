@@ -82,6 +82,41 @@ class TestCompareCommandCLI:
         assert "+++ b/new_file.txt" in result.output
         assert "+new content" in result.output
 
+    def test_compare_with_path_cli(self, runner: CliRunner, local_repo):
+        """Test `gitwrite compare commitA commitB --path` limits the diff to the given paths."""
+        repo = local_repo
+        os.chdir(repo.workdir)
+        commit_A_oid = str(repo.head.target)
+        make_commit(repo, "chapter1.md", "chapter one", "Add chapter one")
+        make_commit(repo, "notes.txt", "some notes", "Add notes")
+        commit_B_oid = str(repo.head.target)
+
+        result = runner.invoke(cli, ["compare", commit_A_oid, commit_B_oid, "--path", "*.md"])
+        assert result.exit_code == 0, f"CLI Error: {result.output}"
+        assert "+++ b/chapter1.md" in result.output
+        assert "notes.txt" not in result.output
+
+        result = runner.invoke(cli, ["compare", commit_A_oid, commit_B_oid, "-p", "drafts/"])
+        assert result.exit_code == 0, f"CLI Error: {result.output}"
+        assert "No differences found" in result.output
+
+    def test_compare_since_branch_cli(self, runner: CliRunner, local_repo):
+        """Test `gitwrite compare --since-branch` only shows the changes made since branching."""
+        repo = local_repo
+        os.chdir(repo.workdir)
+        main_branch = repo.head.shorthand
+        make_commit(repo, "chapter1.md", "draft one", "Draft on side branch", branch_name="side")
+        make_commit(repo, "notes.txt", "main notes", "Notes on main", branch_name=main_branch)
+
+        result = runner.invoke(cli, ["compare", "--since-branch", main_branch, "side"])
+        assert result.exit_code == 0, f"CLI Error: {result.output}"
+        assert "merge base of" in result.output
+        assert "+++ b/chapter1.md" in result.output
+        assert "notes.txt" not in result.output
+
+        result = runner.invoke(cli, ["compare", "--since-branch", main_branch, "side", "HEAD"])
+        assert "--since-branch takes at most one version" in result.output
+
     def test_compare_file_deletion_cli(self, runner: CliRunner, local_repo): # runner & local_repo from conftest
         """Test `gitwrite compare commitA commitB` for file deletion."""
         repo = local_repo
@@ -233,15 +268,15 @@ class TestHistoryCommandCLI:
 
         assert len(commit_lines) == 3, f"Expected 3 commits in history output, got {len(commit_lines)}"
 
-        # Check order and content (oldest first due to GIT_SORT_TOPOLOGICAL | GIT_SORT_REVERSE)
-        assert commit_lines[0]["short_hash"] == str(initial_commit_oid)[:7] # Initial
-        assert initial_commit_msg in commit_lines[0]["message"]
+        # Check order and content (newest first)
+        assert commit_lines[0]["short_hash"] == str(commit2_oid)[:7] # Beta
+        assert commit2_msg in commit_lines[0]["message"]
 
         assert commit_lines[1]["short_hash"] == str(commit1_oid)[:7] # Alpha
         assert commit1_msg in commit_lines[1]["message"]
 
-        assert commit_lines[2]["short_hash"] == str(commit2_oid)[:7] # Beta
-        assert commit2_msg in commit_lines[2]["message"]
+        assert commit_lines[2]["short_hash"] == str(initial_commit_oid)[:7] # Initial
+        assert initial_commit_msg in commit_lines[2]["message"]
 
     def test_history_with_limit_n_cli(self, runner: CliRunner, local_repo): # runner & local_repo from conftest
         """Test `gitwrite history -n <limit>`."""
@@ -263,19 +298,19 @@ class TestHistoryCommandCLI:
         result = runner.invoke(cli, ["history", "-n", "2"]) # runner from conftest
         assert result.exit_code == 0, f"CLI Error: {result.output}"
 
-        # Expecting oldest 2: Initial version and Commit A for limit test
+        # Expecting the most recent 2: Commit C and Commit B for limit test
         output_text = result.output
-        assert initial_commit_oid_str[:7] in output_text
-        assert initial_commit_msg in output_text
-        assert commitA_oid_str[:7] in output_text
-        assert commitA_msg in output_text
+        assert commitC_oid_str[:7] in output_text
+        assert commitC_msg in output_text
+        assert commitB_oid_str[:7] in output_text
+        assert commitB_msg in output_text
 
-        assert commitB_oid_str[:7] not in output_text
-        assert commitB_msg not in output_text
-        assert commitC_oid_str[:7] not in output_text
-        assert commitC_msg not in output_text
+        assert commitA_oid_str[:7] not in output_text
+        assert commitA_msg not in output_text
+        assert initial_commit_oid_str[:7] not in output_text
+        assert initial_commit_msg not in output_text
 
-        # Check order from parsed lines (oldest first)
+        # Check order from parsed lines (newest first)
         commit_lines = []
         for line in result.output.splitlines():
             if line.startswith("│ ") and "│" in line[2:]:
@@ -284,10 +319,10 @@ class TestHistoryCommandCLI:
                     commit_lines.append({"short_hash": columns[0], "message": columns[3]})
 
         assert len(commit_lines) == 2
-        assert commit_lines[0]["short_hash"] == initial_commit_oid_str[:7] # Initial
-        assert initial_commit_msg in commit_lines[0]["message"]
-        assert commit_lines[1]["short_hash"] == commitA_oid_str[:7] # Commit A
-        assert commitA_msg in commit_lines[1]["message"]
+        assert commit_lines[0]["short_hash"] == commitC_oid_str[:7] # Commit C
+        assert commitC_msg in commit_lines[0]["message"]
+        assert commit_lines[1]["short_hash"] == commitB_oid_str[:7] # Commit B
+        assert commitB_msg in commit_lines[1]["message"]
 
     def test_history_limit_n_greater_than_commits_cli(self, runner: CliRunner, local_repo): # runner & local_repo from conftest
         """Test `gitwrite history -n <limit>` where limit > available commits."""
@@ -328,6 +363,29 @@ class TestHistoryCommandCLI:
                  lines_with_short_hash +=1
         assert lines_with_short_hash == 2 # Expecting Initial version and Additional Entry A
 
+    def test_history_for_single_file_cli(self, runner: CliRunner, local_repo): # runner & local_repo from conftest
+        """Test `gitwrite history <file>` lists only saves that touched the file."""
+        repo = local_repo
+        os.chdir(repo.workdir)
+        make_commit(repo, "chapter-03.md", "It was a dark night.", "Draft")
+        make_commit(repo, "notes.md", "Remember the lighthouse.", "Notes")
+        make_commit(repo, "chapter-03.md", "It was a dark and stormy night.", "Polish")
+
+        result = runner.invoke(cli, ["history", "chapter-03.md"])
+        assert result.exit_code == 0, f"CLI Error: {result.output}"
+        assert "History of chapter-03.md" in result.output
+        assert "Polish" in result.output
+        assert "Draft" in result.output
+        assert "Notes" not in result.output
+        assert "added" in result.output
+
+    def test_history_for_untracked_file_cli(self, runner: CliRunner, local_repo): # runner & local_repo from conftest
+        """Test `gitwrite history <file>` for a file that was never saved."""
+        os.chdir(local_repo.workdir)
+        result = runner.invoke(cli, ["history", "missing.md"])
+        assert result.exit_code == 0, f"CLI Error: {result.output}"
+        assert "No history found for 'missing.md'." in result.output
+
     def test_history_not_a_git_repo_cli(self, runner: CliRunner, tmp_path: Path): # runner from conftest, tmp_path from pytest
         """Test `gitwrite history` in a directory that is not a Git repository."""
         non_repo_dir = tmp_path / "not_a_repo_for_history"
@@ -10,10 +10,15 @@ from gitwrite_core.annotations import (
     create_annotation_commit,
     list_annotations,
     update_annotation_status,
-    _run_git_command # For direct setup if needed, or use higher level funcs
 )
 from gitwrite_core.exceptions import RepositoryOperationError, AnnotationError
 
+
+def _run_git_command(repo_path: str, command: list, expect_stdout: bool = True) -> str:
+    """Runs a git command in `repo_path` for test setup and checks."""
+    process = subprocess.run(['git', '-C', repo_path] + command, capture_output=True, text=True, check=True)
+    return process.stdout.strip() if expect_stdout else ""
+
 # Pytest fixture for a temporary Git repository
 @pytest.fixture
 def temp_git_repo(tmp_path: Path) -> Path:
@@ -485,6 +490,208 @@ def test_list_annotations_handles_malformed_yaml_gracefully(temp_git_repo: Path)
     assert len(annotations) == 1
     assert annotations[0].file_path == "valid.txt"
 
+
+def test_annotations_do_not_touch_the_working_tree(temp_git_repo: Path, monkeypatch):
+    """Annotations are written in-process onto the branch ref: no checkout, no git processes."""
+    head_before = _run_git_command(str(temp_git_repo), ["rev-parse", "--abbrev-ref", "HEAD"])
+    (temp_git_repo / "draft.md").write_text("Unsaved work.\n")
+
+    def no_git(*args, **kwargs):
+        raise AssertionError("annotations should not run git")
+
+    monkeypatch.setattr(subprocess, "run", no_git)
+    ann_data = Annotation(file_path="draft.md", highlighted_text="Unsaved", start_line=1, end_line=1,
+                          comment="Keep this.", author="editor")
+    original_sha = create_annotation_commit(str(temp_git_repo), "feedback", ann_data)
+    update_sha = update_annotation_status(str(temp_git_repo), "feedback", original_sha, AnnotationStatus.ACCEPTED)
+    (listed,) = list_annotations(str(temp_git_repo), "feedback")
+    monkeypatch.undo()
+
+    assert (listed.id, listed.commit_id, listed.status) == (original_sha, update_sha, AnnotationStatus.ACCEPTED)
+    assert _run_git_command(str(temp_git_repo), ["rev-parse", "--abbrev-ref", "HEAD"]) == head_before
+    assert (temp_git_repo / "draft.md").read_text() == "Unsaved work.\n"
+    assert _run_git_command(str(temp_git_repo), ["rev-parse", "feedback"]) == update_sha
+    assert _run_git_command(str(temp_git_repo), ["rev-parse", f"{update_sha}^"]) == original_sha
+    # Annotation commits reuse their parent's tree
+    assert _run_git_command(str(temp_git_repo), ["rev-parse", f"{update_sha}^{{tree}}"]) == \
+        _run_git_command(str(temp_git_repo), ["rev-parse", "HEAD^{tree}"])
+
+
+def test_annotation_is_rebuilt_when_the_branch_moves(temp_git_repo: Path, monkeypatch):
+    """The branch ref is compare-and-swapped: a concurrent annotation is never overwritten."""
+    from gitwrite_core import annotations as annotations_module
+
+    first = create_annotation_commit(str(temp_git_repo), "feedback", Annotation(
+        file_path="a.md", highlighted_text="a", start_line=1, end_line=1, comment="First", author="a"))
+    real_swap = annotations_module._compare_and_swap_ref
+    calls = []
+
+    def racing_swap(repo, ref_name, expected, new_target, message):
+        if not calls:  # Another writer annotates just before our update
+            calls.append(None)
+            calls[0] = create_annotation_commit(str(temp_git_repo), "feedback", Annotation(
+                file_path="b.md", highlighted_text="b", start_line=2, end_line=2, comment="Racer", author="b"))
+        return real_swap(repo, ref_name, expected, new_target, message)
+
+    monkeypatch.setattr(annotations_module, "_compare_and_swap_ref", racing_swap)
+    third = create_annotation_commit(str(temp_git_repo), "feedback", Annotation(
+        file_path="c.md", highlighted_text="c", start_line=3, end_line=3, comment="Third", author="c"))
+
+    assert _run_git_command(str(temp_git_repo), ["rev-parse", f"{third}^"]) == calls[0]
+    assert _run_git_command(str(temp_git_repo), ["rev-parse", f"{calls[0]}^"]) == first
+    assert sorted(a.comment for a in list_annotations(str(temp_git_repo), "feedback")) == ["First", "Racer", "Third"]
+
+def test_annotation_index_reads_only_new_commits(temp_git_repo: Path):
+    """Listing brings the persistent index up to date by walking only the commits since the last call."""
+    import pygit2
+    from gitwrite_core.annotation_index import AnnotationIndex, annotation_index_path_for
+    from gitwrite_core.annotations import _annotation_fields
+
+    repo_path = str(temp_git_repo)
+    first = create_annotation_commit(repo_path, "feedback", Annotation(
+        file_path="a.md", highlighted_text="a", start_line=1, end_line=1, comment="First", author="a"))
+    assert [a.id for a in list_annotations(repo_path, "feedback")] == [first]
+
+    second = create_annotation_commit(repo_path, "feedback", Annotation(
+        file_path="b.md", highlighted_text="b", start_line=2, end_line=2, comment="Second", author="b"))
+    update = update_annotation_status(repo_path, "feedback", first, AnnotationStatus.REJECTED)
+
+    repo = pygit2.Repository(repo_path)
+    tip = repo.references["refs/heads/feedback"].target
+    with AnnotationIndex(repo, _annotation_fields) as index:
+        assert index.indexed_tip("refs/heads/feedback") != str(tip)
+        assert index.refresh("refs/heads/feedback", tip) == 2  # The new annotation and the update
+        assert index.refresh("refs/heads/feedback", tip) == 0
+    assert os.path.isfile(annotation_index_path_for(repo))
+
+    listed = list_annotations(repo_path, "feedback")
+    assert [(a.id, a.commit_id, a.status) for a in listed] == [
+        (first, update, AnnotationStatus.REJECTED), (second, second, AnnotationStatus.NEW)]
+
+    from gitwrite_core.annotations import get_annotation
+    assert get_annotation(repo_path, "feedback", first) == listed[0]
+    assert get_annotation(repo_path, "feedback", "0" * 40) is None
+    assert get_annotation(repo_path, "no-such-branch", first) is None
+
+
+def test_annotation_index_rebuilds_a_rewritten_branch(temp_git_repo: Path):
+    repo_path = str(temp_git_repo)
+    first = create_annotation_commit(repo_path, "feedback", Annotation(
+        file_path="a.md", highlighted_text="a", start_line=1, end_line=1, comment="First", author="a"))
+    create_annotation_commit(repo_path, "feedback", Annotation(
+        file_path="b.md", highlighted_text="b", start_line=2, end_line=2, comment="Dropped", author="b"))
+    assert len(list_annotations(repo_path, "feedback")) == 2
+
+    _run_git_command(repo_path, ["branch", "-f", "feedback", first])
+    replacement = create_annotation_commit(repo_path, "feedback", Annotation(
+        file_path="c.md", highlighted_text="c", start_line=3, end_line=3, comment="Replacement", author="c"))
+
+    assert [(a.id, a.comment) for a in list_annotations(repo_path, "feedback")] == [
+        (first, "First"), (replacement, "Replacement")]
+
+
+def test_annotations_are_listed_when_the_index_is_unavailable(temp_git_repo: Path, monkeypatch):
+    from gitwrite_core import annotation_index
+
+    repo_path = str(temp_git_repo)
+    first = create_annotation_commit(repo_path, "feedback", Annotation(
+        file_path="a.md", highlighted_text="a", start_line=1, end_line=1, comment="First", author="a"))
+    update = update_annotation_status(repo_path, "feedback", first, AnnotationStatus.ACCEPTED)
+    # A regular file where the index directory should be makes the on-disk index unusable
+    monkeypatch.setattr(annotation_index, "INDEX_DIR_NAME", "HEAD")
+
+    (listed,) = list_annotations(repo_path, "feedback")
+    assert (listed.id, listed.commit_id, listed.status) == (first, update, AnnotationStatus.ACCEPTED)
+
+
+def test_list_annotations_filters_by_file_lines_status_and_author(temp_git_repo: Path):
+    from gitwrite_core.annotation_index import get_interval_index_cache
+
+    repo_path = str(temp_git_repo)
+    spans = [("ch1.md", 1, 3, "ann"), ("ch1.md", 10, 30, "bob"), ("ch1.md", 12, 14, "ann"),
+             ("ch2.md", 5, 5, "ann"), ("ch1.md", 40, 41, "bob")]
+    ids = [create_annotation_commit(repo_path, "feedback", Annotation(
+        file_path=path, highlighted_text="x", start_line=start, end_line=end, comment=f"{path}:{start}", author=author))
+        for path, start, end, author in spans]
+    update_annotation_status(repo_path, "feedback", ids[1], AnnotationStatus.ACCEPTED)
+
+    def query(**filters):
+        return [a.comment for a in list_annotations(repo_path, "feedback", **filters)]
+
+    get_interval_index_cache().clear()
+    assert query(file_path="ch1.md", start_line=13, end_line=35) == ["ch1.md:10", "ch1.md:12"]
+    assert query(file_path="ch1.md", start_line=31, end_line=39) == []
+    assert query(file_path="ch1.md", start_line=41) == ["ch1.md:40"]
+    assert query(file_path="ch1.md", end_line=3) == ["ch1.md:1"]
+    assert query(start_line=4, end_line=12) == ["ch1.md:10", "ch1.md:12", "ch2.md:5"]
+    assert query(file_path="missing.md") == []
+    assert query(status=AnnotationStatus.ACCEPTED) == ["ch1.md:10"]
+    assert query(file_path="ch1.md", author="ann", status=AnnotationStatus.NEW) == ["ch1.md:1", "ch1.md:12"]
+    assert get_interval_index_cache().stats()["misses"] == 1  # Built once for the branch tip
+
+    update_annotation_status(repo_path, "feedback", ids[2], AnnotationStatus.REJECTED)
+    assert query(file_path="ch1.md", start_line=13, end_line=13, status=AnnotationStatus.NEW) == []
+
+
+def test_batch_annotations_are_published_with_one_ref_update(temp_git_repo: Path):
+    from gitwrite_core.annotations import create_annotation_commits, update_annotation_statuses
+
+    repo_path = str(temp_git_repo)
+    batch = [Annotation(file_path="ch1.md", highlighted_text=f"t{i}", start_line=i, end_line=i,
+                        comment=f"Comment {i}", author="reader") for i in range(3)]
+    shas = create_annotation_commits(repo_path, "feedback", batch)
+
+    assert [a.id for a in batch] == shas and len(set(shas)) == 3
+    assert _run_git_command(repo_path, ["rev-parse", "feedback"]) == shas[-1]
+    assert _run_git_command(repo_path, ["rev-list", "--reverse", "HEAD..feedback"]).split() == shas
+    assert len(_run_git_command(repo_path, ["reflog", "show", "--format=%H", "refs/heads/feedback"]).split()) == 1
+
+    update_shas = update_annotation_statuses(repo_path, "feedback", [
+        (shas[0], AnnotationStatus.ACCEPTED), (shas[2], AnnotationStatus.REJECTED)])
+    assert _run_git_command(repo_path, ["rev-parse", "feedback"]) == update_shas[-1]
+    assert [(a.id, a.commit_id, a.status) for a in list_annotations(repo_path, "feedback")] == [
+        (shas[0], update_shas[0], AnnotationStatus.ACCEPTED), (shas[1], shas[1], AnnotationStatus.NEW),
+        (shas[2], update_shas[1], AnnotationStatus.REJECTED)]
+    assert create_annotation_commits(repo_path, "feedback", []) == []
+
+
+def test_batch_status_update_is_all_or_nothing(temp_git_repo: Path):
+    from gitwrite_core.annotations import update_annotation_statuses
+
+    repo_path = str(temp_git_repo)
+    sha = create_annotation_commit(repo_path, "feedback", Annotation(
+        file_path="a.md", highlighted_text="a", start_line=1, end_line=1, comment="First", author="a"))
+    with pytest.raises(RepositoryOperationError, match="not found"):
+        update_annotation_statuses(repo_path, "feedback", [
+            (sha, AnnotationStatus.ACCEPTED), ("0" * 40, AnnotationStatus.REJECTED)])
+    assert _run_git_command(repo_path, ["rev-parse", "feedback"]) == sha
+
+
+def test_new_annotations_use_the_json_payload_and_legacy_yaml_still_reads(temp_git_repo: Path):
+    import json
+    from gitwrite_core.annotation_payload import ANNOTATION_PAYLOAD_FORMAT, decode_annotation_payload
+
+    repo_path = str(temp_git_repo)
+    sha = create_annotation_commit(repo_path, "feedback", Annotation(
+        file_path="ch1.md", highlighted_text="Ünïcode: yes", start_line=1, end_line=2, comment="New", author="a"))
+    body = _run_git_command(repo_path, ["log", "-1", "--pretty=%b", sha])
+    assert json.loads(body)["format"] == ANNOTATION_PAYLOAD_FORMAT
+    assert "Ünïcode" in body and "\n" not in body
+
+    # A commit written in the legacy YAML format, as older versions did
+    legacy = yaml.dump({"file_path": "ch2.md", "highlighted_text": "old: text", "start_line": 3, "end_line": 3,
+                        "comment": "Legacy", "author": "b", "status": "new"}, sort_keys=False, allow_unicode=True)
+    _run_git_command(repo_path, ["update-ref", "refs/heads/feedback", _run_git_command(repo_path, [
+        "commit-tree", "feedback^{tree}", "-p", "feedback", "-m", f"Annotation: ch2.md (Lines 3-3)\n\n{legacy}"])])
+    legacy_sha = _run_git_command(repo_path, ["rev-parse", "feedback"])
+    update_annotation_status(repo_path, "feedback", legacy_sha, AnnotationStatus.ACCEPTED)
+
+    assert [(a.comment, a.highlighted_text, a.status) for a in list_annotations(repo_path, "feedback")] == [
+        ("New", "Ünïcode: yes", AnnotationStatus.NEW), ("Legacy", "old: text", AnnotationStatus.ACCEPTED)]
+    with pytest.raises(ValueError, match="version"):
+        decode_annotation_payload('{"format": "gitwrite-annotation", "version": 99}')
+
+
 # Test that `original_annotation_id` is correctly set in the YAML of an update commit
 # This was implicitly tested by `test_update_annotation_yaml_content_in_commit`
 # and `test_list_annotations_populates_original_id_correctly`, but an explicit check on the
@@ -0,0 +1,32 @@
+import os
+
+from gitwrite_core.cache_utils import float_from_env, int_from_env, prune_lru_files
+
+
+def _write(path, size, mtime):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    os.utime(path, (mtime, mtime))
+
+
+def test_prune_removes_least_recently_used_selected_files(tmp_path):
+    _write(tmp_path / "ab" / "oldest.json", 40, 1_000)
+    _write(tmp_path / "cd" / "older.json", 40, 2_000)
+    _write(tmp_path / "cd" / "newest.json", 40, 3_000)
+    _write(tmp_path / "ab" / "partial.tmp", 500, 500)
+
+    removed = prune_lru_files(str(tmp_path), 80, lambda name: name.endswith(".json"))
+
+    assert removed == 1
+    assert not (tmp_path / "ab" / "oldest.json").exists()
+    assert (tmp_path / "cd" / "older.json").exists() and (tmp_path / "cd" / "newest.json").exists()
+    assert (tmp_path / "ab" / "partial.tmp").exists()  # Not selected, so neither counted nor removed
+    assert prune_lru_files(str(tmp_path / "missing"), 0) == 0
+
+
+def test_numbers_from_env(monkeypatch):
+    monkeypatch.setenv("GITWRITE_TEST_INT", "12")
+    monkeypatch.setenv("GITWRITE_TEST_FLOAT", "not-a-number")
+    assert int_from_env("GITWRITE_TEST_INT", 3) == 12
+    assert int_from_env("GITWRITE_TEST_UNSET", 3) == 3
+    assert float_from_env("GITWRITE_TEST_FLOAT", 2.5) == 2.5
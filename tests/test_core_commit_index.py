@@ -0,0 +1,146 @@
+import os
+import sqlite3
+from pathlib import Path
+
+import pygit2
+import pytest
+
+from gitwrite_core.commit_index import commit_changed_paths, index_path_for, search_commits, update_commit_index
+
+
+def _commit(repo, files, message, timestamp, author=("Ada Writer", "ada@example.com"), parents=None, ref="HEAD"):
+    for name, content in files.items():
+        path = Path(repo.workdir) / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        repo.index.add(name)
+    repo.index.write()
+    signature = pygit2.Signature(author[0], author[1], timestamp, 0)
+    if parents is None:
+        parents = [] if repo.head_is_unborn else [repo.head.target]
+    return repo.create_commit(ref, signature, signature, message, repo.index.write_tree(), parents)
+
+
+@pytest.fixture
+def book_repo(tmp_path):
+    repo = pygit2.init_repository(str(tmp_path / "book"))
+    oids = [
+        _commit(repo, {"chapters/one.md": "It began."}, "Draft chapter one", 1_000_000),
+        _commit(repo, {"notes.md": "Ideas"}, "Add notes", 1_000_100, author=("Bo Editor", "bo@example.com")),
+        _commit(repo, {"chapters/two.md": "It went on."}, "Draft chapter two", 1_000_200),
+        _commit(repo, {"chapters/one.md": "It began again."}, "Revise chapter one", 1_000_300,
+                author=("Bo Editor", "bo@example.com")),
+    ]
+    return repo, oids
+
+
+def _shas(result):
+    return [c["sha"] for c in result["commits"]]
+
+
+class TestSearchCommits:
+    def test_all_commits_newest_first(self, book_repo):
+        repo, oids = book_repo
+        result = search_commits(repo.workdir)
+        assert result["status"] == "success"
+        assert result["source"] == "index"
+        assert _shas(result) == [str(o) for o in reversed(oids)]
+        assert result["commits"][0]["parents"] == [str(oids[2])]
+
+    def test_filters(self, book_repo):
+        repo, oids = book_repo
+        assert _shas(search_commits(repo.workdir, author="BO@example")) == [str(oids[3]), str(oids[1])]
+        assert _shas(search_commits(repo.workdir, message_contains="chapter one")) == [str(oids[3]), str(oids[0])]
+        assert _shas(search_commits(repo.workdir, since=1_000_100, until=1_000_200)) == [str(oids[2]), str(oids[1])]
+        assert _shas(search_commits(repo.workdir, path="chapters/one.md")) == [str(oids[3]), str(oids[0])]
+        assert _shas(search_commits(repo.workdir, path="chapters")) == [str(oids[3]), str(oids[2]), str(oids[0])]
+        assert _shas(search_commits(repo.workdir, path="chap")) == []
+        assert _shas(search_commits(repo.workdir, author="Bo", path="chapters/")) == [str(oids[3])]
+
+    def test_like_wildcards_are_literal(self, book_repo):
+        repo, _ = book_repo
+        assert search_commits(repo.workdir, message_contains="%")["commits"] == []
+
+    def test_offset_pagination(self, book_repo):
+        repo, oids = book_repo
+        first = search_commits(repo.workdir, limit=3)
+        assert _shas(first) == [str(o) for o in reversed(oids[1:])]
+        assert first["next_offset"] == 3
+        second = search_commits(repo.workdir, limit=3, offset=first["next_offset"])
+        assert _shas(second) == [str(oids[0])]
+        assert second["next_offset"] is None
+
+    def test_incremental_update_reads_only_new_commits(self, book_repo):
+        repo, oids = book_repo
+        head_ref = repo.head.name
+        assert update_commit_index(repo.workdir)["indexed"] == {head_ref: 4}
+        new_oid = _commit(repo, {"chapters/three.md": "The end."}, "Draft chapter three", 1_000_400)
+        assert update_commit_index(repo.workdir)["indexed"] == {head_ref: 1}
+        assert update_commit_index(repo.workdir)["indexed"] == {head_ref: 0}
+        assert _shas(search_commits(repo.workdir, limit=1)) == [str(new_oid)]
+
+    def test_rewritten_history_is_pruned(self, book_repo):
+        repo, oids = book_repo
+        search_commits(repo.workdir)
+        # Amend the tip: the old tip is no longer reachable from the branch.
+        amended = _commit(repo, {"chapters/one.md": "It began anew."}, "Revise chapter one (amended)",
+                          1_000_300, parents=[oids[2]], ref=None)
+        repo.references[repo.head.name].set_target(amended)
+
+        assert _shas(search_commits(repo.workdir, message_contains="revise")) == [str(amended)]
+        with sqlite3.connect(index_path_for(repo)) as conn:
+            remaining = {row[0] for row in conn.execute("SELECT oid FROM commits")}
+        assert str(oids[3]) not in remaining
+
+    def test_branches_are_scoped(self, book_repo):
+        repo, oids = book_repo
+        repo.branches.local.create("side", repo[oids[1]])
+        side_oid = _commit(repo, {"side.md": "aside"}, "Side note", 1_000_500, parents=[oids[1]], ref="refs/heads/side")
+        assert _shas(search_commits(repo.workdir, branch_name="side")) == [str(side_oid), str(oids[1]), str(oids[0])]
+        assert str(side_oid) not in _shas(search_commits(repo.workdir))
+        assert search_commits(repo.workdir, branch_name="missing")["status"] == "not_found"
+
+    def test_deleted_branch_is_forgotten(self, book_repo):
+        repo, oids = book_repo
+        repo.branches.local.create("side", repo[oids[3]])
+        side_oid = _commit(repo, {"side.md": "aside"}, "Side note", 1_000_500, parents=[oids[3]], ref="refs/heads/side")
+        update_commit_index(repo.workdir)
+        repo.branches.local.delete("side")
+        update_commit_index(repo.workdir)
+        with sqlite3.connect(index_path_for(repo)) as conn:
+            refs = [row[0] for row in conn.execute("SELECT name FROM refs")]
+            assert conn.execute("SELECT 1 FROM commits WHERE oid = ?", (str(side_oid),)).fetchone() is None
+        assert refs == [repo.head.name]
+
+    def test_corrupt_index_is_rebuilt(self, book_repo):
+        repo, oids = book_repo
+        search_commits(repo.workdir)
+        db_path = index_path_for(repo)
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        Path(db_path).write_bytes(b"not a sqlite database" * 100)
+        result = search_commits(repo.workdir)
+        assert result["source"] == "index"
+        assert len(result["commits"]) == 4
+
+    def test_falls_back_to_walk_when_index_unavailable(self, book_repo, monkeypatch):
+        repo, oids = book_repo
+        monkeypatch.setattr("gitwrite_core.commit_index.index_path_for",
+                            lambda _repo: str(Path(repo.workdir) / "notes.md" / "index.sqlite3"))
+        result = search_commits(repo.workdir, path="chapters", limit=2)
+        assert result["source"] == "walk"
+        assert _shas(result) == [str(oids[3]), str(oids[2])]
+        assert result["next_offset"] == 2
+
+    def test_empty_repository(self, tmp_path):
+        repo = pygit2.init_repository(str(tmp_path / "empty"))
+        assert search_commits(repo.workdir)["status"] == "empty_repo"
+
+
+def test_changed_paths_include_both_sides_of_a_rename(book_repo):
+    repo, _ = book_repo
+    repo.index.remove("notes.md")
+    os.remove(Path(repo.workdir) / "notes.md")
+    oid = _commit(repo, {"research.md": "Ideas"}, "Rename notes", 1_000_400)
+    assert commit_changed_paths(repo, repo[oid]) == ["notes.md", "research.md"]
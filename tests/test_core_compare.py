@@ -0,0 +1,182 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pygit2
+import pytest
+
+from gitwrite_core import versioning
+from gitwrite_core.exceptions import CommitNotFoundError, FileNotFoundInCommitError, NotEnoughHistoryError
+from gitwrite_core.history import get_merge_base_cache
+from gitwrite_core.repository_cache import open_repository
+from gitwrite_core.versioning import get_diff, get_diff_stats, get_file_diff, list_diff_files, stream_diff_files
+from .conftest import make_commit
+
+
+@pytest.fixture
+def manuscript(tmp_path: Path):
+    repo = pygit2.init_repository(str(tmp_path / "compare_repo"))
+    make_commit(repo, "chapter1.md", "The old house stood alone.\nNobody came.\n", "Chapter one")
+    make_commit(repo, "chapter2.md", "Rain fell.\n", "Chapter two")
+    (Path(repo.workdir) / "chapter1.md").write_text("The old house stood silent and alone.\nNobody came.\n")
+    (Path(repo.workdir) / "chapter2.md").unlink()
+    (Path(repo.workdir) / "chapter3.md").write_text("A new day.\nThe end.\n")
+    repo.index.add_all()
+    repo.index.write()
+    signature = pygit2.Signature("Test Author", "test@example.com", 946684800, 0)
+    repo.create_commit("HEAD", signature, signature, "Revise", repo.index.write_tree(), [repo.head.target])
+    return repo
+
+
+def _commit_on(repo, ref, files, parents, message):
+    builder = repo.TreeBuilder(repo[parents[0]].tree) if parents else repo.TreeBuilder()
+    for name, content in files.items():
+        builder.insert(name, repo.create_blob(content.encode()), pygit2.GIT_FILEMODE_BLOB)
+    signature = pygit2.Signature("Test Author", "test@example.com", 946684800, 0)
+    return repo.create_commit(ref, signature, signature, message, builder.write(), parents)
+
+
+@pytest.fixture
+def branched(tmp_path: Path):
+    """'main' and 'edits' both move on after 'edits' branches off."""
+    repo = pygit2.init_repository(str(tmp_path / "branch_repo"), bare=True)
+    base = _commit_on(repo, "refs/heads/main", {"chapter1.md": "The old house.\n"}, [], "Draft")
+    _commit_on(repo, "refs/heads/edits", {"chapter1.md": "The old grey house.\n"}, [base], "Edit")
+    _commit_on(repo, "refs/heads/main", {"chapter2.md": "Rain fell.\n"}, [base], "Chapter two")
+    return repo, base
+
+
+class TestListDiffFiles:
+    def test_files_and_totals(self, manuscript):
+        result = list_diff_files(manuscript.workdir, "HEAD~1", "HEAD")
+        files = {f["file_path"]: f for f in result["files"]}
+        assert files["chapter1.md"] == {
+            "file_path": "chapter1.md", "change_type": "modified", "is_binary": False,
+            "lines_added": 1, "lines_deleted": 1, "words_added": 7, "words_deleted": 5,
+        }
+        assert files["chapter2.md"]["change_type"] == "deleted"
+        assert (files["chapter3.md"]["change_type"], files["chapter3.md"]["words_added"]) == ("added", 5)
+        assert result["totals"] == {"files_changed": 3, "lines_added": 3, "lines_deleted": 2,
+                                    "words_added": 12, "words_deleted": 7}
+        assert result["ref2_oid"] == str(manuscript.head.target)
+
+
+class TestGetDiffStats:
+    def test_counts_match_the_full_diff(self, manuscript):
+        stats = get_diff_stats(manuscript.workdir, "HEAD~1", "HEAD")
+        patch_text = get_diff(manuscript.workdir, "HEAD~1", "HEAD")["patch_text"]
+        changed = [line for line in patch_text.splitlines() if line[:1] in "+-" and line[:3] not in ("+++", "---")]
+        assert stats["totals"]["lines_added"] == sum(1 for line in changed if line.startswith("+"))
+        assert stats["totals"]["lines_deleted"] == sum(1 for line in changed if line.startswith("-"))
+        assert stats["totals"]["words_added"] == sum(len(line[1:].split()) for line in changed if line.startswith("+"))
+        assert stats["files"] == list_diff_files(manuscript.workdir, "HEAD~1", "HEAD")["files"]
+
+    def test_paths_restrict_the_statistics(self, manuscript):
+        stats = get_diff_stats(manuscript.workdir, "HEAD~1", "HEAD", paths=["./chapter3.md", "drafts/"])
+        assert [f["file_path"] for f in stats["files"]] == ["chapter3.md"]
+        assert stats["totals"] == {"files_changed": 1, "lines_added": 2, "lines_deleted": 0,
+                                   "words_added": 5, "words_deleted": 0}
+        assert get_diff_stats(manuscript.workdir, "HEAD~1", "HEAD", paths=["."])["totals"]["files_changed"] == 3
+
+
+class TestPathScopedCompare:
+    def test_get_diff_with_paths(self, manuscript):
+        scoped = get_diff(manuscript.workdir, "HEAD~1", "HEAD", include_word_diff=True, paths=["chapter3.md"])
+        assert scoped["patch_text"] == get_file_diff(manuscript.workdir, "chapter3.md", "HEAD~1", "HEAD")["file"]["patch_text"]
+        assert [f["file_path"] for f in scoped["word_diff"]] == ["chapter3.md"]
+        assert get_diff(manuscript.workdir, "HEAD~1", "HEAD", paths=["chapter[12].md"])["patch_text"] == \
+            get_diff(manuscript.workdir, "HEAD~1", "HEAD", paths=["chapter1.md", "chapter2.md"])["patch_text"]
+        assert get_diff(manuscript.workdir, "HEAD~1", "HEAD", paths=["drafts"])["patch_text"] == ""
+
+    def test_stream_with_paths(self, manuscript):
+        _, files = stream_diff_files(manuscript.workdir, "HEAD~1", "HEAD", paths=["*.md"])
+        assert [f["file_path"] for f in files] == ["chapter1.md", "chapter2.md", "chapter3.md"]
+        listed = list_diff_files(manuscript.workdir, "HEAD~1", "HEAD", paths=["chapter2.md"])
+        assert [f["change_type"] for f in listed["files"]] == ["deleted"]
+
+
+class TestGetFileDiff:
+    def test_single_file_patch_matches_full_diff(self, manuscript):
+        full = get_diff(manuscript.workdir, "HEAD~1", "HEAD")["patch_text"]
+        result = get_file_diff(manuscript.workdir, "chapter1.md", "HEAD~1", "HEAD")
+        assert result["file"]["patch_text"] in full
+        assert result["file"]["patch_text"].startswith("diff --git a/chapter1.md b/chapter1.md")
+        assert "word_diff" not in result["file"]
+
+    def test_word_mode(self, manuscript):
+        result = get_file_diff(manuscript.workdir, "chapter1.md", "HEAD~1", "HEAD", include_word_diff=True)
+        word_diff = result["file"]["word_diff"]
+        assert word_diff["file_path"] == "chapter1.md"
+        addition = next(line for line in word_diff["hunks"][0]["lines"] if line["type"] == "addition")
+        assert {"type": "added", "content": "silent and"} in addition["words"]
+
+    def test_unchanged_file_is_not_found(self, manuscript):
+        with pytest.raises(FileNotFoundInCommitError):
+            get_file_diff(manuscript.workdir, "missing.md", "HEAD~1", "HEAD")
+
+
+class TestStreamDiffFiles:
+    def test_streams_every_file_in_diff_order(self, manuscript):
+        refs, files = stream_diff_files(manuscript.workdir, "HEAD~1", "HEAD")
+        assert refs["ref1_oid"] == str(manuscript.head.peel(pygit2.Commit).parents[0].id)
+        streamed = list(files)
+        listed = list_diff_files(manuscript.workdir, "HEAD~1", "HEAD")["files"]
+        assert [f["file_path"] for f in streamed] == [f["file_path"] for f in listed]
+        assert "".join(f["patch_text"] for f in streamed) == get_diff(manuscript.workdir, "HEAD~1", "HEAD")["patch_text"]
+
+    def test_stream_interleaved_with_other_compares(self, manuscript, monkeypatch):
+        stream_repos = []
+        original_diff_patches = versioning._diff_patches
+
+        def recording_diff_patches(repo, *args):
+            stream_repos.append(repo)
+            return original_diff_patches(repo, *args)
+
+        expected = list_diff_files(manuscript.workdir, "HEAD~1", "HEAD")["files"]
+        refs, files = stream_diff_files(manuscript.workdir, "HEAD~1", "HEAD")
+        monkeypatch.setattr(versioning, "_diff_patches", recording_diff_patches)
+        streamed, shared_handles = [], []
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            # Each file is diffed on whichever worker is free, between compares that use its cached handle.
+            for index in range(len(expected) + 1):
+                pool.submit(get_diff, manuscript.workdir, "HEAD~2", "HEAD").result()
+                shared_handles.append(pool.submit(open_repository, manuscript.workdir).result())
+                streamed.append(pool.submit(next, files, None).result())
+                assert pool.submit(get_diff_stats, manuscript.workdir, "HEAD~1", "HEAD").result()["totals"]
+        assert streamed[-1] is None
+        assert [f["file_path"] for f in streamed[:-1]] == [f["file_path"] for f in expected]
+        assert len(stream_repos) == 1
+        assert all(stream_repos[0] is not handle for handle in shared_handles + [open_repository(manuscript.workdir)])
+
+    def test_bad_reference_raises_before_streaming(self, manuscript):
+        with pytest.raises(CommitNotFoundError):
+            stream_diff_files(manuscript.workdir, "no-such-ref", "HEAD")
+
+
+class TestMergeBaseCompare:
+    def test_only_the_branch_changes_are_shown(self, branched):
+        repo, base = branched
+        two_dot = list_diff_files(repo.path, "main", "edits")
+        assert [f["file_path"] for f in two_dot["files"]] == ["chapter1.md", "chapter2.md"]
+
+        three_dot = get_diff(repo.path, "main", "edits", merge_base=True)
+        assert three_dot["ref1_oid"] == str(base)
+        assert three_dot["ref1_display_name"] == f"{str(base)[:7]} (merge base of main and edits)"
+        assert "+The old grey house." in three_dot["patch_text"]
+        assert "chapter2.md" not in three_dot["patch_text"]
+        stats = get_diff_stats(repo.path, "main", "edits", merge_base=True)
+        assert [f["file_path"] for f in stats["files"]] == ["chapter1.md"]
+        with pytest.raises(FileNotFoundInCommitError):
+            get_file_diff(repo.path, "chapter2.md", "main", "edits", merge_base=True)
+
+    def test_merge_bases_are_memoized(self, branched):
+        repo, _ = branched
+        get_merge_base_cache().clear()
+        list_diff_files(repo.path, "main", "edits", merge_base=True)
+        list_diff_files(repo.path, "main", "edits", merge_base=True)
+        assert get_merge_base_cache().stats() == {"size": 1, "hits": 1, "misses": 1}
+
+    def test_unrelated_histories_raise(self, branched):
+        repo, _ = branched
+        _commit_on(repo, "refs/heads/orphan", {"notes.md": "Notes.\n"}, [], "Unrelated")
+        with pytest.raises(NotEnoughHistoryError, match="no common history"):
+            get_diff(repo.path, "main", "orphan", merge_base=True)
@@ -0,0 +1,81 @@
+from pathlib import Path
+
+import pygit2
+import pytest
+
+from gitwrite_core.diff_cache import DiffCache, diff_cache_key, get_diff_cache
+from gitwrite_core.versioning import get_diff
+from .conftest import make_commit
+
+
+@pytest.fixture
+def repo_with_edit(tmp_path: Path):
+    repo = pygit2.init_repository(str(tmp_path / "diff_repo"))
+    make_commit(repo, "chapter1.md", "The old house stood alone.\n", "Draft")
+    make_commit(repo, "chapter1.md", "The old house stood silent and alone.\n", "Revise")
+    return repo
+
+
+class TestDiffCache:
+    def test_key_includes_trees_options_and_mode(self):
+        base = diff_cache_key("a" * 40, "b" * 40, {"context_lines": 3, "interhunk_lines": 1}, "patch")
+        assert base == diff_cache_key("a" * 40, "b" * 40, {"interhunk_lines": 1, "context_lines": 3}, "patch")
+        assert base != diff_cache_key("b" * 40, "a" * 40, {"context_lines": 3, "interhunk_lines": 1}, "patch")
+        assert base != diff_cache_key("a" * 40, "b" * 40, {"context_lines": 5, "interhunk_lines": 1}, "patch")
+        assert base != diff_cache_key("a" * 40, "b" * 40, {"context_lines": 3, "interhunk_lines": 1}, "word")
+
+    def test_memory_tier_respects_byte_budget(self):
+        cache = DiffCache(max_bytes=10)
+        cache.put("first", "12345")
+        cache.put("second", "12345")
+        assert cache.get("first") == "12345"  # Now most recently used
+        cache.put("third", "12345")
+        assert cache.get("second") is None
+        assert cache.get("first") == "12345"
+        assert cache.stats()["evictions"] == 1
+        cache.put("huge", "x" * 11)  # Larger than the whole budget: not kept in memory
+        assert cache.get("huge") is None
+
+    def test_disk_tier_survives_a_new_instance(self, tmp_path):
+        disk_dir = str(tmp_path / "diff-cache")
+        DiffCache(disk_dir=disk_dir).put("key", [{"file_path": "a.md", "hunks": []}])
+        fresh = DiffCache(disk_dir=disk_dir)
+        assert fresh.get("key") == [{"file_path": "a.md", "hunks": []}]
+        assert fresh.stats()["disk_hits"] == 1
+        assert fresh.get("key") == [{"file_path": "a.md", "hunks": []}]
+        assert fresh.stats()["memory_hits"] == 1
+
+    def test_disk_tier_is_pruned_to_budget(self, tmp_path):
+        disk_dir = tmp_path / "diff-cache"
+        cache = DiffCache(disk_dir=str(disk_dir), disk_max_bytes=200)
+        for i in range(10):
+            cache.put(f"key-{i}", "x" * 50)
+        stored = sum(f.stat().st_size for f in disk_dir.rglob("*.json"))
+        assert 0 < stored <= 200
+
+    def test_empty_values_are_cached(self):
+        cache = DiffCache()
+        calls = []
+        assert cache.get_or_compute("empty", lambda: calls.append(1) or "") == ""
+        assert cache.get_or_compute("empty", lambda: calls.append(1) or "") == ""
+        assert calls == [1]
+
+
+class TestGetDiffCaching:
+    def test_repeated_diff_is_served_from_cache(self, repo_with_edit, monkeypatch):
+        get_diff_cache().clear()
+        first = get_diff(str(repo_with_edit.workdir), include_word_diff=True)
+        assert "silent and" in first["patch_text"]
+        assert first["word_diff"][0]["file_path"] == "chapter1.md"
+
+        def fail(*args, **kwargs):
+            raise AssertionError("diff should have been served from the cache")
+
+        monkeypatch.setattr(pygit2.Repository, "diff", fail)
+        second = get_diff(str(repo_with_edit.workdir), include_word_diff=True)
+        assert second["patch_text"] == first["patch_text"]
+        assert second["word_diff"] == first["word_diff"]
+        assert get_diff_cache().stats()["memory_hits"] >= 2
+
+    def test_word_diff_only_when_requested(self, repo_with_edit):
+        assert "word_diff" not in get_diff(str(repo_with_edit.workdir))
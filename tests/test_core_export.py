@@ -1,3 +1,4 @@
+import json
 import pytest
 import pygit2
 import pypandoc
@@ -8,6 +9,7 @@ import time
 from unittest import mock
 
 from gitwrite_core.export import export_to_epub, export_to_pdf, export_to_docx
+from gitwrite_core.pandoc_ast import get_pandoc_ast_cache
 from gitwrite_core.exceptions import (
     PandocError,
     RepositoryNotFoundError,
@@ -65,10 +67,51 @@ def mock_pypandoc_path_found(monkeypatch):
     monkeypatch.setattr(pypandoc, "get_pandoc_path", mock_get_path)
     return mock_get_path
 
+def _fake_ast(markdown):
+    """AST the fake pandoc reader returns for a chapter: one paragraph holding its source."""
+    blocks = [{"t": "Para", "c": [{"t": "Str", "c": markdown}]}] if markdown.strip() else []
+    return json.dumps({"pandoc-api-version": [1, 23], "meta": {}, "blocks": blocks})
+
+def _book(*chapters):
+    """The document the exporters should hand to the pandoc writer for `chapters`."""
+    blocks = []
+    for index, markdown in enumerate(chapters):
+        if index:
+            blocks.append({"t": "HorizontalRule"})
+        blocks.extend(json.loads(_fake_ast(markdown))["blocks"])
+    return {"pandoc-api-version": [1, 23], "meta": {}, "blocks": blocks}
+
+def _fake_convert_text(source, to, format, outputfile=None, extra_args=None):
+    return _fake_ast(source) if to == 'json' else None
+
+def _failing_writer(message):
+    """Fake pandoc whose readers work but whose writers fail with `message`."""
+    def convert_text(source, to, format, outputfile=None, extra_args=None):
+        if to == 'json':
+            return _fake_ast(source)
+        raise RuntimeError(message)
+    return convert_text
+
+def _writer_calls(mock_convert):
+    return [c for c in mock_convert.call_args_list if c.kwargs.get('to') != 'json']
+
+def assert_written(mock_convert, chapters, **kwargs):
+    """Checks the single writer call: the assembled `chapters` as pandoc JSON plus `kwargs`."""
+    (writer_call,) = _writer_calls(mock_convert)
+    assert json.loads(writer_call.kwargs['source']) == _book(*chapters)
+    assert writer_call == mock.call(source=writer_call.kwargs['source'], format='json', **kwargs)
+
+@pytest.fixture(autouse=True)
+def clear_pandoc_ast_cache():
+    get_pandoc_ast_cache().clear()
+    yield
+    get_pandoc_ast_cache().clear()
+
 @pytest.fixture
 def mock_pypandoc_convert_text(monkeypatch):
-    mock_convert = mock.Mock()
+    mock_convert = mock.Mock(side_effect=_fake_convert_text)
     monkeypatch.setattr(pypandoc, "convert_text", mock_convert)
+    monkeypatch.setattr(pypandoc, "get_pandoc_version", mock.Mock(side_effect=OSError("No pandoc was found")))
     return mock_convert
 
 def test_export_to_epub_success(temp_git_repo_path, mock_pypandoc_path_found, mock_pypandoc_convert_text):
@@ -79,11 +122,8 @@ def test_export_to_epub_success(temp_git_repo_path, mock_pypandoc_path_found, mo
     result = export_to_epub(str(temp_git_repo_path), "HEAD", file_list, str(output_epub))
     assert result["status"] == "success"
     assert "EPUB successfully generated" in result["message"]
-    expected_combined_content = "# Chapter 1\nHello\n\n---\n\n# Chapter 2\nWorld"
-    mock_pypandoc_convert_text.assert_called_once_with(
-        source=expected_combined_content, to='epub', format='md',
-        outputfile=str(output_epub.resolve()), extra_args=['--standalone']
-    )
+    assert_written(mock_pypandoc_convert_text, ["# Chapter 1\nHello", "# Chapter 2\nWorld"],
+                   to='epub', outputfile=str(output_epub.resolve()), extra_args=['--standalone'])
     mock_pypandoc_path_found.assert_called_once()
 
 def test_export_to_epub_pandoc_not_found(temp_git_repo_path, monkeypatch):
@@ -142,7 +182,7 @@ def test_export_to_epub_non_utf8_file(temp_git_repo_path, mock_pypandoc_path_fou
         export_to_epub(str(temp_git_repo_path), "HEAD", ["non_utf8.md"], str(output_epub))
 
 def test_export_to_epub_pandoc_conversion_error(temp_git_repo_path, mock_pypandoc_path_found, mock_pypandoc_convert_text):
-    mock_pypandoc_convert_text.side_effect = RuntimeError("Pandoc conversion failed badly")
+    mock_pypandoc_convert_text.side_effect = _failing_writer("Pandoc conversion failed badly")
     init_test_repo_corrected(temp_git_repo_path, {"file1.md": "content"}, "Initial")
     output_epub = temp_git_repo_path / "output.epub"
     with pytest.raises(PandocError, match="Pandoc conversion failed: Pandoc conversion failed badly"):
@@ -167,8 +207,8 @@ def test_export_to_epub_tag_resolves_to_commit(temp_git_repo_path, mock_pypandoc
     output_epub = temp_git_repo_path / "output_tagged.epub"
     result = export_to_epub(str(temp_git_repo_path), "v1.0", ["file1.md"], str(output_epub))
     assert result["status"] == "success"
-    mock_pypandoc_convert_text.assert_called_once()
-    assert mock_pypandoc_convert_text.call_args.kwargs['source'] == "# Tagged Content"
+    assert len(_writer_calls(mock_pypandoc_convert_text)) == 1
+    assert json.loads(mock_pypandoc_convert_text.call_args.kwargs['source']) == _book("# Tagged Content")
 
 def test_export_to_epub_branch_name_commit_ish(temp_git_repo_path, mock_pypandoc_path_found, mock_pypandoc_convert_text):
     repo = init_test_repo_corrected(temp_git_repo_path, {"main.md": "# Main"}, "Commit on main")
@@ -178,8 +218,8 @@ def test_export_to_epub_branch_name_commit_ish(temp_git_repo_path, mock_pypandoc
     output_epub = temp_git_repo_path / "output_feature.epub"
     result = export_to_epub(str(temp_git_repo_path), "feature/new-export", ["feature.md"], str(output_epub))
     assert result["status"] == "success"
-    mock_pypandoc_convert_text.assert_called_once()
-    assert mock_pypandoc_convert_text.call_args.kwargs['source'] == "# Feature"
+    assert len(_writer_calls(mock_pypandoc_convert_text)) == 1
+    assert json.loads(mock_pypandoc_convert_text.call_args.kwargs['source']) == _book("# Feature")
 
 def test_export_to_epub_empty_file_in_list_success(temp_git_repo_path, mock_pypandoc_path_found, mock_pypandoc_convert_text):
     files_content = {"file1.md": "# C1", "empty.md": "", "file2.md": "# C2"}
@@ -187,11 +227,9 @@ def test_export_to_epub_empty_file_in_list_success(temp_git_repo_path, mock_pypa
     output_epub = temp_git_repo_path / "output_empty_included.epub"
     result = export_to_epub(str(temp_git_repo_path), "HEAD", ["file1.md", "empty.md", "file2.md"], str(output_epub))
     assert result["status"] == "success"
-    expected_content = "# C1\n\n---\n\n\n\n---\n\n# C2"
-    mock_pypandoc_convert_text.assert_called_once_with(
-        source=expected_content, to='epub', format='md',
-        outputfile=str(output_epub.resolve()), extra_args=['--standalone']
-    )
+    # The empty chapter still gets its separator, as with the joined markdown ("# C1\n\n---\n\n\n\n---\n\n# C2")
+    assert_written(mock_pypandoc_convert_text, ["# C1", "", "# C2"],
+                   to='epub', outputfile=str(output_epub.resolve()), extra_args=['--standalone'])
 
 def test_export_to_epub_all_files_empty_error(temp_git_repo_path, mock_pypandoc_path_found):
     init_test_repo_corrected(temp_git_repo_path, {"e1.md": "", "e2.md": ""}, "Add only empty files")
@@ -212,11 +250,8 @@ def test_export_to_pdf_success(temp_git_repo_path, mock_pypandoc_path_found, moc
     result = export_to_pdf(str(temp_git_repo_path), "HEAD", file_list, str(output_pdf))
     assert result["status"] == "success"
     assert "PDF successfully generated" in result["message"]
-    expected_combined_content = "# Chapter 1\nHello\n\n---\n\n# Chapter 2\nWorld"
-    mock_pypandoc_convert_text.assert_called_once_with(
-        source=expected_combined_content, to='pdf', format='md',
-        outputfile=str(output_pdf.resolve()), extra_args=['--standalone', '--pdf-engine=pdflatex']
-    )
+    assert_written(mock_pypandoc_convert_text, ["# Chapter 1\nHello", "# Chapter 2\nWorld"],
+                   to='pdf', outputfile=str(output_pdf.resolve()), extra_args=['--standalone', '--pdf-engine=pdflatex'])
     mock_pypandoc_path_found.assert_called_once()
 
 def test_export_to_pdf_custom_engine(temp_git_repo_path, mock_pypandoc_path_found, mock_pypandoc_convert_text):
@@ -227,10 +262,8 @@ def test_export_to_pdf_custom_engine(temp_git_repo_path, mock_pypandoc_path_foun
     result = export_to_pdf(str(temp_git_repo_path), "HEAD", file_list, str(output_pdf), 
                           extra_args=['--standalone', '--pdf-engine=xelatex'])
     assert result["status"] == "success"
-    mock_pypandoc_convert_text.assert_called_once_with(
-        source="# Chapter 1\nHello", to='pdf', format='md',
-        outputfile=str(output_pdf.resolve()), extra_args=['--standalone', '--pdf-engine=xelatex']
-    )
+    assert_written(mock_pypandoc_convert_text, ["# Chapter 1\nHello"],
+                   to='pdf', outputfile=str(output_pdf.resolve()), extra_args=['--standalone', '--pdf-engine=xelatex'])
 
 def test_export_to_pdf_pandoc_not_found(temp_git_repo_path, monkeypatch):
     monkeypatch.setattr(pypandoc, "get_pandoc_path", mock.Mock(side_effect=OSError("Pandoc not found simulation")))
@@ -253,7 +286,7 @@ def test_export_to_pdf_file_not_found(temp_git_repo_path, mock_pypandoc_path_fou
         export_to_pdf(str(temp_git_repo_path), "HEAD", ["missing.md"], str(output_pdf))
 
 def test_export_to_pdf_pandoc_latex_error(temp_git_repo_path, mock_pypandoc_path_found, mock_pypandoc_convert_text):
-    mock_pypandoc_convert_text.side_effect = RuntimeError("pandoc document conversion failed pdflatex not found")
+    mock_pypandoc_convert_text.side_effect = _failing_writer("pandoc document conversion failed pdflatex not found")
     init_test_repo_corrected(temp_git_repo_path, {"file1.md": "content"}, "Initial")
     output_pdf = temp_git_repo_path / "output.pdf"
     with pytest.raises(PandocError, match="PDF generation failed. Ensure that Pandoc and a LaTeX engine"):
@@ -272,11 +305,8 @@ def test_export_to_docx_success(temp_git_repo_path, mock_pypandoc_path_found, mo
     result = export_to_docx(str(temp_git_repo_path), "HEAD", file_list, str(output_docx))
     assert result["status"] == "success"
     assert "DOCX successfully generated" in result["message"]
-    expected_combined_content = "# Chapter 1\nHello\n\n---\n\n# Chapter 2\nWorld"
-    mock_pypandoc_convert_text.assert_called_once_with(
-        source=expected_combined_content, to='docx', format='md',
-        outputfile=str(output_docx.resolve()), extra_args=['--standalone']
-    )
+    assert_written(mock_pypandoc_convert_text, ["# Chapter 1\nHello", "# Chapter 2\nWorld"],
+                   to='docx', outputfile=str(output_docx.resolve()), extra_args=['--standalone'])
     mock_pypandoc_path_found.assert_called_once()
 
 def test_export_to_docx_pandoc_not_found(temp_git_repo_path, monkeypatch):
@@ -300,7 +330,7 @@ def test_export_to_docx_file_not_found(temp_git_repo_path, mock_pypandoc_path_fo
         export_to_docx(str(temp_git_repo_path), "HEAD", ["missing.md"], str(output_docx))
 
 def test_export_to_docx_pandoc_conversion_error(temp_git_repo_path, mock_pypandoc_path_found, mock_pypandoc_convert_text):
-    mock_pypandoc_convert_text.side_effect = RuntimeError("Pandoc DOCX conversion failed badly")
+    mock_pypandoc_convert_text.side_effect = _failing_writer("Pandoc DOCX conversion failed badly")
     init_test_repo_corrected(temp_git_repo_path, {"file1.md": "content"}, "Initial")
     output_docx = temp_git_repo_path / "output.docx"
     with pytest.raises(PandocError, match="Pandoc DOCX conversion failed: Pandoc DOCX conversion failed badly"):
@@ -347,3 +377,283 @@ def test_export_to_epub_annotated_tag_to_blob_error(temp_git_repo_path, mock_pyp
     output_epub = temp_git_repo_path / "output.epub"
     with pytest.raises(CommitNotFoundError, match=f"Tag '{tag_name}' does not point to a valid commit."):
         export_to_epub(str(temp_git_repo_path), tag_name, ["f.md"], str(output_epub))
+
+
+# ============================================================================
+# Export Artifact Cache Tests
+# ============================================================================
+
+@pytest.fixture
+def fake_pandoc(monkeypatch, mock_pypandoc_path_found):
+    """Pandoc stand-in that writes the converted source to the output file."""
+    def convert_text(source, to, format, outputfile=None, extra_args=None):
+        if to == 'json':
+            return _fake_ast(source)
+        pathlib.Path(outputfile).write_text(f"{to}:{source}", encoding="utf-8")
+
+    mock_convert = mock.Mock(side_effect=convert_text)
+    monkeypatch.setattr(pypandoc, "convert_text", mock_convert)
+    monkeypatch.setattr(pypandoc, "get_pandoc_version", mock.Mock(return_value="3.1.9"))
+    return mock_convert
+
+def test_export_artifact_cache_reuses_unchanged_content(temp_git_repo_path, tmp_path, fake_pandoc):
+    from gitwrite_core.export_cache import ExportArtifactCache
+    init_test_repo_corrected(temp_git_repo_path, {"c1.md": "# One", "c2.md": "# Two"})
+    repo = pygit2.Repository(str(temp_git_repo_path))
+    repo.create_reference("refs/tags/v1", repo.head.target)
+    cache = ExportArtifactCache(str(tmp_path / "artifacts"))
+
+    first = export_to_epub(str(temp_git_repo_path), "HEAD", ["c1.md", "c2.md"], str(tmp_path / "a" / "book.epub"),
+                           artifact_cache=cache)
+    # Another commit-ish and output name for the same blobs is served from the cache
+    second = export_to_epub(str(temp_git_repo_path), "v1", ["c1.md", "c2.md"], str(tmp_path / "b" / "other.epub"),
+                            artifact_cache=cache)
+    assert first["cached"] is False and second["cached"] is True
+    assert len(_writer_calls(fake_pandoc)) == 1
+    assert (tmp_path / "b" / "other.epub").read_text() == (tmp_path / "a" / "book.epub").read_text()
+
+    # Order, format and pandoc options are all part of the key
+    export_to_epub(str(temp_git_repo_path), "HEAD", ["c2.md", "c1.md"], str(tmp_path / "c.epub"), artifact_cache=cache)
+    export_to_docx(str(temp_git_repo_path), "HEAD", ["c1.md", "c2.md"], str(tmp_path / "d.docx"), artifact_cache=cache)
+    export_to_pdf(str(temp_git_repo_path), "HEAD", ["c1.md", "c2.md"], str(tmp_path / "e.pdf"), artifact_cache=cache,
+                  extra_args=['--standalone', '--pdf-engine=xelatex'])
+    assert len(_writer_calls(fake_pandoc)) == 4
+
+    init_test_repo_corrected(temp_git_repo_path, {"c2.md": "# Two, revised"}, "Edit")
+    export_to_epub(str(temp_git_repo_path), "HEAD", ["c1.md", "c2.md"], str(tmp_path / "f.epub"), artifact_cache=cache)
+    assert len(_writer_calls(fake_pandoc)) == 5
+    assert cache.stats()["hits"] == 1
+
+def test_export_artifact_cache_evicts_least_recently_used(tmp_path):
+    from gitwrite_core.export_cache import ExportArtifactCache
+    cache = ExportArtifactCache(str(tmp_path / "artifacts"), max_bytes=250)
+    source = tmp_path / "source.epub"
+    source.write_bytes(b"x" * 100)
+    cache.store("aa" * 32, "epub", str(source))
+    cache.store("bb" * 32, "epub", str(source))
+    old = time.time() - 60
+    os.utime(cache.artifact_path("aa" * 32, "epub"), (old, old))
+    os.utime(cache.artifact_path("bb" * 32, "epub"), (old - 60, old - 60))
+    assert cache.fetch("bb" * 32, "epub", str(tmp_path / "out.epub"))  # Refreshes 'bb'
+
+    cache.store("cc" * 32, "epub", str(source))
+    assert not os.path.exists(cache.artifact_path("aa" * 32, "epub"))
+    assert os.path.exists(cache.artifact_path("bb" * 32, "epub"))
+    assert os.path.exists(cache.artifact_path("cc" * 32, "epub"))
+    assert cache.stats()["evictions"] == 1
+
+def test_prune_export_dirs_keeps_recent_and_foreign_directories(tmp_path):
+    from gitwrite_core.export_cache import prune_export_dirs
+
+    def request_dir(name, age, size):
+        directory = tmp_path / name
+        directory.mkdir()
+        if size:
+            (directory / "export.epub").write_bytes(b"x" * size)
+        stamp = time.time() - age
+        for path in [*directory.iterdir(), directory]:
+            os.utime(path, (stamp, stamp))
+        return directory
+
+    oldest = request_dir("11111111-1111-1111-1111-111111111111", 3_600, 100)
+    older = request_dir("22222222-2222-2222-2222-222222222222", 1_800, 100)
+    queued = request_dir("33333333-3333-3333-3333-333333333333", 7_200, 0)
+    recent = request_dir("44444444-4444-4444-4444-444444444444", 10, 100)
+    artifacts = request_dir("artifacts", 9_000, 500)
+
+    assert prune_export_dirs(str(tmp_path), max_bytes=150, min_age=60) == 2
+    assert not oldest.exists() and not older.exists()
+    assert queued.exists() and recent.exists() and artifacts.exists()
+    assert prune_export_dirs(str(tmp_path / "missing"), max_bytes=0) == 0
+
+
+# ============================================================================
+# Per-chapter AST Cache Tests
+# ============================================================================
+
+def test_export_reparses_only_changed_chapters(temp_git_repo_path, tmp_path, fake_pandoc):
+    def parsed_chapters():
+        return [c.args[0] for c in fake_pandoc.call_args_list if c.kwargs.get('to') == 'json']
+
+    init_test_repo_corrected(temp_git_repo_path, {"c1.md": "# One", "c2.md": "# Two", "c3.md": "# Three"})
+    files = ["c1.md", "c2.md", "c3.md"]
+    export_to_docx(str(temp_git_repo_path), "HEAD", files, str(tmp_path / "first.docx"))
+    assert parsed_chapters() == ["# One", "# Two", "# Three"]
+
+    init_test_repo_corrected(temp_git_repo_path, {"c2.md": "# Two, revised"}, "Edit chapter two")
+    export_to_epub(str(temp_git_repo_path), "HEAD", files, str(tmp_path / "second.epub"))
+    assert parsed_chapters()[3:] == ["# Two, revised"]
+    written = json.loads(fake_pandoc.call_args.kwargs['source'])
+    assert written == _book("# One", "# Two, revised", "# Three")
+
+    # The repository's on-disk store outlives the in-memory tier
+    get_pandoc_ast_cache().clear()
+    export_to_pdf(str(temp_git_repo_path), "HEAD", files, str(tmp_path / "third.pdf"))
+    assert len(parsed_chapters()) == 4
+    assert get_pandoc_ast_cache().stats()["disk_hits"] == 3
+
+def test_assemble_document_merges_chapter_metadata():
+    from gitwrite_core.pandoc_ast import assemble_document
+    chapter = lambda meta, text: json.dumps({
+        "pandoc-api-version": [1, 23], "meta": meta, "blocks": [{"t": "Para", "c": [{"t": "Str", "c": text}]}],
+    })
+    title = lambda value: {"t": "MetaInlines", "c": [{"t": "Str", "c": value}]}
+    document = json.loads(assemble_document([
+        chapter({"title": title("Draft"), "author": title("Ann")}, "one"),
+        chapter({"title": title("Final")}, "two"),
+    ]))
+    assert document["meta"] == {"title": title("Final"), "author": title("Ann")}
+    assert [block["t"] for block in document["blocks"]] == ["Para", "HorizontalRule", "Para"]
+
+def test_assemble_document_renumbers_headings_shared_by_chapters():
+    from gitwrite_core.pandoc_ast import assemble_document
+    header = lambda identifier: {"t": "Header", "c": [1, [identifier, [], []], [{"t": "Str", "c": "Introduction"}]]}
+    link = {"t": "Para", "c": [{"t": "Link", "c": [["", [], []], [{"t": "Str", "c": "back"}], ["#introduction", ""]]}]}
+    chapter = lambda *blocks: json.dumps({"pandoc-api-version": [1, 23], "meta": {}, "blocks": list(blocks)})
+
+    document = json.loads(assemble_document([
+        chapter(header("introduction"), header("introduction-1")),
+        chapter(header("introduction"), link),
+        chapter(header("introduction")),
+    ]))
+    headers = [block["c"][1][0] for block in document["blocks"] if block["t"] == "Header"]
+    assert headers == ["introduction", "introduction-1", "introduction-2", "introduction-3"]
+    # The second chapter's own link follows its renamed heading
+    assert document["blocks"][4]["c"][0]["c"][2][0] == "#introduction-2"
+
+
+# ============================================================================
+# Export Pipeline Tests
+# ============================================================================
+
+def test_export_pipeline_reports_stage_metrics(temp_git_repo_path, tmp_path, fake_pandoc):
+    from gitwrite_core.export_cache import ExportArtifactCache
+    init_test_repo_corrected(temp_git_repo_path, {"c1.md": "# One", "c2.md": "# Two"})
+    cache = ExportArtifactCache(str(tmp_path / "artifacts"))
+
+    result = export_to_docx(str(temp_git_repo_path), "HEAD", ["c1.md", "c2.md"], str(tmp_path / "book.docx"),
+                            artifact_cache=cache)
+    stages = result["metrics"]["stages"]
+    assert list(stages) == ["resolve", "collect", "assemble", "convert", "finalize"]
+    assert all(stage["seconds"] >= 0 for stage in stages.values())
+    assert (stages["collect"]["files"], stages["collect"]["bytes"]) == (2, len("# One") + len("# Two"))
+    assert stages["assemble"]["chapters_parsed"] == 2
+    assert stages["finalize"]["bytes"] == {"docx": (tmp_path / "book.docx").stat().st_size}
+
+    # A cache hit skips the assemble and convert stages
+    cached = export_to_docx(str(temp_git_repo_path), "HEAD", ["c1.md", "c2.md"], str(tmp_path / "again.docx"),
+                            artifact_cache=cache)
+    assert list(cached["metrics"]["stages"]) == ["resolve", "collect", "finalize"]
+
+def test_export_pipeline_uses_registered_format_writers(temp_git_repo_path, tmp_path, fake_pandoc, monkeypatch):
+    from gitwrite_core import export as export_module
+    monkeypatch.setattr(export_module, "_format_writers", dict(export_module._format_writers))
+    export_module.register_format_writer(export_module.FormatWriter('odt', 'ODT', ['--standalone']))
+    init_test_repo_corrected(temp_git_repo_path, {"c1.md": "# One"})
+
+    result = export_module.run_export_pipeline(str(temp_git_repo_path), "HEAD", ["c1.md"], str(tmp_path / "book.odt"), 'odt')
+    assert result["message"] == f"ODT successfully generated at '{tmp_path / 'book.odt'}'."
+    assert fake_pandoc.call_args.kwargs['to'] == 'odt'
+    with pytest.raises(GitWriteError, match="Unsupported export format 'rtf'"):
+        export_module.run_export_pipeline(str(temp_git_repo_path), "HEAD", ["c1.md"], str(tmp_path / "book.rtf"), 'rtf')
+
+
+def test_export_pipeline_releases_the_repository_lock_before_pandoc(temp_git_repo_path, tmp_path, fake_pandoc):
+    import threading
+    from gitwrite_core.locking import get_lock_manager
+    init_test_repo_corrected(temp_git_repo_path, {"c1.md": "# One"})
+    write = fake_pandoc.side_effect
+    writers_admitted = []
+
+    def convert_while_a_writer_commits(source, to, format, outputfile=None, extra_args=None):
+        # A commit (exclusive lock) from another thread must not wait for pandoc
+        def commit():
+            with get_lock_manager().exclusive(str(temp_git_repo_path), timeout=1):
+                writers_admitted.append(to)
+        committer = threading.Thread(target=commit)
+        committer.start()
+        committer.join()
+        return write(source, to, format, outputfile, extra_args)
+    fake_pandoc.side_effect = convert_while_a_writer_commits
+
+    export_to_pdf(str(temp_git_repo_path), "HEAD", ["c1.md"], str(tmp_path / "book.pdf"))
+    assert writers_admitted == ["json", "pdf"]
+
+
+# ============================================================================
+# Multi-format Export Tests
+# ============================================================================
+
+def test_export_formats_assembles_once_and_converts_concurrently(temp_git_repo_path, tmp_path, fake_pandoc, monkeypatch):
+    import threading
+    from gitwrite_core.export import export_formats
+    from gitwrite_core.export_cache import ExportArtifactCache
+    from gitwrite_core.pandoc_ast import ast_dir_for
+    init_test_repo_corrected(temp_git_repo_path, {"c1.md": "# One", "c2.md": "# Two"})
+    cache = ExportArtifactCache(str(tmp_path / "artifacts"))
+    export_to_pdf(str(temp_git_repo_path), "HEAD", ["c1.md", "c2.md"], str(tmp_path / "warm.pdf"), artifact_cache=cache)
+
+    # Each writer waits for the others, so this only finishes if the conversions overlap
+    all_writing = threading.Barrier(2, timeout=5)
+    write = fake_pandoc.side_effect
+    def concurrent_write(source, to, format, outputfile=None, extra_args=None):
+        if to != 'json':
+            all_writing.wait()
+        return write(source, to, format, outputfile, extra_args)
+    fake_pandoc.side_effect = concurrent_write
+    fake_pandoc.reset_mock()
+    get_pandoc_ast_cache().clear()
+    shutil.rmtree(ast_dir_for(pygit2.Repository(str(temp_git_repo_path)).path))
+
+    outputs = {fmt: str(tmp_path / "out" / f"book.{fmt}") for fmt in ("epub", "pdf", "docx")}
+    result = export_formats(str(temp_git_repo_path), "HEAD", ["c1.md", "c2.md"], outputs, artifact_cache=cache,
+                            pandoc_options={"docx": {"extra_args": ["--toc"]}})
+
+    assert result["status"] == "success"
+    assert {fmt: r["cached"] for fmt, r in result["results"].items()} == {"epub": False, "pdf": True, "docx": False}
+    assert all(os.path.exists(path) for path in outputs.values())
+    reader_calls = [c for c in fake_pandoc.call_args_list if c.kwargs.get('to') == 'json']
+    assert len(reader_calls) == 2  # Each chapter is parsed once for all formats
+    writer_calls = {c.kwargs['to']: c.kwargs for c in _writer_calls(fake_pandoc)}
+    assert set(writer_calls) == {"epub", "docx"} and writer_calls["docx"]["extra_args"] == ["--toc"]
+    assert writer_calls["epub"]["source"] == writer_calls["docx"]["source"]
+    assert set(result["metrics"]["stages"]["convert"]["formats"]) == {"epub", "docx"}
+
+def test_export_formats_keeps_the_formats_that_converted(temp_git_repo_path, tmp_path, fake_pandoc):
+    from gitwrite_core.exceptions import PartialExportError
+    from gitwrite_core.export import export_formats
+    from gitwrite_core.export_cache import ExportArtifactCache
+    init_test_repo_corrected(temp_git_repo_path, {"c1.md": "# One"})
+    cache = ExportArtifactCache(str(tmp_path / "artifacts"))
+    write = fake_pandoc.side_effect
+    def failing_pdf(source, to, format, outputfile=None, extra_args=None):
+        if to == 'pdf':
+            raise RuntimeError("pandoc document conversion failed pdflatex not found")
+        return write(source, to, format, outputfile, extra_args)
+    fake_pandoc.side_effect = failing_pdf
+
+    outputs = {fmt: str(tmp_path / f"book.{fmt}") for fmt in ("pdf", "epub")}
+    with pytest.raises(PartialExportError, match="PDF export failed \\(EPUB written\\).*Ensure that Pandoc and a LaTeX engine") as excinfo:
+        export_formats(str(temp_git_repo_path), "HEAD", ["c1.md"], outputs, artifact_cache=cache)
+    results = excinfo.value.results
+    assert {fmt: r["status"] for fmt, r in results.items()} == {"pdf": "error", "epub": "success"}
+    assert results["epub"]["output_path"] == outputs["epub"] and (tmp_path / "book.epub").exists()
+    assert cache.stats()["stores"] == 1  # The EPUB was finalized despite the PDF failure
+
+    # With every conversion failing the first failure is raised as such
+    with pytest.raises(PandocError, match="Ensure that Pandoc and a LaTeX engine") as excinfo:
+        export_formats(str(temp_git_repo_path), "HEAD", ["c1.md"], {"pdf": outputs["pdf"]})
+    assert not isinstance(excinfo.value, PartialExportError)
+    with pytest.raises(GitWriteError, match="Unsupported export format 'odt'"):
+        export_formats(str(temp_git_repo_path), "HEAD", ["c1.md"], {"odt": str(tmp_path / "book.odt")})
+
+def test_markdown_parse_failure_is_not_blamed_on_a_format(temp_git_repo_path, tmp_path, fake_pandoc):
+    from gitwrite_core.export import export_formats
+    init_test_repo_corrected(temp_git_repo_path, {"c1.md": "# One"})
+    fake_pandoc.side_effect = RuntimeError("Unexpected end of input")
+
+    outputs = {fmt: str(tmp_path / f"book.{fmt}") for fmt in ("pdf", "epub")}
+    with pytest.raises(PandocError) as excinfo:
+        export_formats(str(temp_git_repo_path), "HEAD", ["c1.md"], outputs)
+    assert str(excinfo.value) == "Pandoc could not parse the markdown files: Unexpected end of input"
+    assert not _writer_calls(fake_pandoc)
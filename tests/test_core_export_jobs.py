@@ -0,0 +1,273 @@
+import threading
+import time
+
+import pytest
+
+from gitwrite_core.export_jobs import (
+    ExportJobError,
+    ExportJobNotFoundError,
+    ExportJobQueue,
+    ExportQueueFullError,
+    JOB_CANCELLED,
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    FINAL_JOB_STATES,
+)
+
+
+def _wait_for(queue, job_id, states=FINAL_JOB_STATES, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in states:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not reach {states}: {queue.get(job_id)}")
+
+
+class BlockingExporter:
+    """Fake exporter that writes the output file once released."""
+
+    def __init__(self, fail=False):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, repo_path, commit_ish, file_list, output_path, options):
+        self.calls.append((repo_path, commit_ish, list(file_list), output_path, options))
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("pandoc exploded")
+        with open(output_path, "w") as f:
+            f.write("book")
+        return {"status": "success", "message": f"Generated '{output_path}'."}
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "jobs" / "export-jobs.sqlite3")
+
+
+def test_job_runs_to_done(store_path, tmp_path):
+    exporter = BlockingExporter()
+    queue = ExportJobQueue(store_path, max_workers=1, exporters={"epub": exporter})
+    try:
+        output = str(tmp_path / "book.epub")
+        job = queue.submit("epub", "/repo", "v1", ["a.md"], output, requested_by="ann")
+        assert job['status'] in (JOB_QUEUED, JOB_RUNNING) and job['requested_by'] == "ann"
+        exporter.release.set()
+        done = _wait_for(queue, job['id'])
+        assert (done['status'], done['progress']) == (JOB_DONE, 1.0)
+        assert done['finished_at'] >= done['started_at'] >= done['created_at']
+        assert exporter.calls == [("/repo", "v1", ["a.md"], output, {})]
+    finally:
+        queue.shutdown()
+
+
+def test_failed_export_records_the_error(store_path, tmp_path):
+    exporter = BlockingExporter(fail=True)
+    exporter.release.set()
+    queue = ExportJobQueue(store_path, exporters={"pdf": exporter})
+    try:
+        job = queue.submit("pdf", "/repo", "HEAD", ["a.md"], str(tmp_path / "book.pdf"))
+        failed = _wait_for(queue, job['id'])
+        assert failed['status'] == JOB_FAILED and failed['error'] == "pandoc exploded"
+        with pytest.raises(ExportJobNotFoundError):
+            queue.get("no-such-job")
+    finally:
+        queue.shutdown()
+
+
+def test_cancel_queued_and_running_jobs(store_path, tmp_path):
+    exporter = BlockingExporter()
+    queue = ExportJobQueue(store_path, max_workers=1, max_queue_depth=1, exporters={"docx": exporter})
+    try:
+        running = queue.submit("docx", "/repo", "HEAD", ["a.md"], str(tmp_path / "one.docx"))
+        assert exporter.started.wait(5)
+        waiting = queue.submit("docx", "/repo", "HEAD", ["a.md"], str(tmp_path / "two.docx"))
+        with pytest.raises(ExportQueueFullError):
+            queue.submit("docx", "/repo", "HEAD", ["a.md"], str(tmp_path / "three.docx"))
+
+        assert queue.cancel(waiting['id'])['status'] == JOB_CANCELLED
+        assert queue.cancel(running['id'])['cancel_requested'] is True
+        exporter.release.set()
+        assert _wait_for(queue, running['id'])['status'] == JOB_CANCELLED
+        assert not (tmp_path / "one.docx").exists()  # The discarded output is removed
+        assert len(exporter.calls) == 1
+    finally:
+        queue.shutdown()
+
+
+def test_unfinished_jobs_resume_after_a_restart(store_path, tmp_path):
+    stalled = BlockingExporter()
+    first = ExportJobQueue(store_path, max_workers=1, exporters={"epub": stalled})
+    running = first.submit("epub", "/repo", "HEAD", ["a.md"], str(tmp_path / "one.epub"))
+    queued = first.submit("epub", "/repo", "HEAD", ["b.md"], str(tmp_path / "two.epub"))
+    assert stalled.started.wait(5)
+    # Simulate the process dying: its leases stop being renewed and the jobs stay running/queued in the store.
+    first._stopping.set()
+    first._executor.shutdown(wait=False, cancel_futures=True)
+
+    resumed = BlockingExporter()
+    resumed.release.set()
+    second = ExportJobQueue(store_path, max_workers=1, exporters={"epub": resumed}, lease_timeout=0.3)
+    try:
+        assert _wait_for(second, running['id'])['status'] == JOB_DONE
+        assert _wait_for(second, queued['id'])['status'] == JOB_DONE
+        assert [call[2] for call in resumed.calls] == [["a.md"], ["b.md"]]
+        assert second.get(running['id'])['owner'] == second.owner_id
+    finally:
+        stalled.release.set()
+        second.shutdown()
+
+
+def test_jobs_of_an_exited_process_on_this_host_are_adopted_at_once(store_path, tmp_path):
+    import socket
+    import subprocess
+    import sys
+    from gitwrite_core.export_jobs import ExportJobStore
+
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    store = ExportJobStore(store_path)
+    orphan = store.create("epub", {'repo_path': "/repo", 'commit_ish': "HEAD", 'file_list': ["a.md"], 'options': {}},
+                          str(tmp_path / "one.epub"), owner=f"{socket.gethostname()}:{exited.pid}:old")
+    store.update(orphan['id'], status=JOB_RUNNING)  # With a fresh lease
+    store.close()
+
+    exporter = BlockingExporter()
+    exporter.release.set()
+    queue = ExportJobQueue(store_path, max_workers=1, exporters={"epub": exporter})  # Default 60s lease
+    try:
+        assert _wait_for(queue, orphan['id'], timeout=2.0)['status'] == JOB_DONE
+    finally:
+        queue.shutdown()
+
+
+def test_adopted_jobs_respect_the_queue_capacity(store_path, tmp_path):
+    from gitwrite_core.export_jobs import ExportJobStore
+
+    store = ExportJobStore(store_path)
+    params = {'repo_path': "/repo", 'commit_ish': "HEAD", 'file_list': ["a.md"], 'options': {}}
+    orphans = [store.create("epub", params, str(tmp_path / f"{n}.epub"), owner="gone:1:old") for n in range(3)]
+    for orphan in orphans:
+        store.update(orphan['id'], heartbeat_at=0.0)
+    store.close()
+
+    exporter = BlockingExporter()
+    queue = ExportJobQueue(store_path, max_workers=1, max_queue_depth=0, exporters={"epub": exporter},
+                           lease_timeout=0.3)
+    try:
+        assert exporter.started.wait(5)
+        time.sleep(0.5)  # Lease checks happen meanwhile, but the queue is full
+        assert [queue.get(orphan['id'])['owner'] for orphan in orphans].count(queue.owner_id) == 1
+        with pytest.raises(ExportQueueFullError):
+            queue.submit("epub", "/repo", "HEAD", ["b.md"], str(tmp_path / "new.epub"))
+        exporter.release.set()
+        for orphan in orphans:  # Adopted one by one as room frees up
+            assert _wait_for(queue, orphan['id'])['status'] == JOB_DONE
+    finally:
+        exporter.release.set()
+        queue.shutdown()
+
+
+def test_jobs_of_a_live_queue_are_not_adopted(store_path, tmp_path):
+    busy = BlockingExporter()
+    first = ExportJobQueue(store_path, max_workers=1, exporters={"epub": busy}, lease_timeout=0.3)
+    running = first.submit("epub", "/repo", "HEAD", ["a.md"], str(tmp_path / "one.epub"))
+    assert busy.started.wait(5)
+
+    idle = BlockingExporter()
+    idle.release.set()
+    second = ExportJobQueue(store_path, max_workers=1, exporters={"epub": idle}, lease_timeout=0.3)
+    try:
+        time.sleep(1.0)  # Several lease periods: the first queue keeps renewing its lease
+        assert idle.calls == []
+        assert first.get(running['id'])['owner'] == first.owner_id
+        busy.release.set()
+        assert _wait_for(first, running['id'])['status'] == JOB_DONE
+        assert len(busy.calls) == 1
+    finally:
+        busy.release.set()
+        second.shutdown()
+        first.shutdown()
+
+
+def test_multi_format_job_writes_every_format(store_path, tmp_path):
+    calls = []
+
+    def multi(repo_path, commit_ish, file_list, outputs, options):
+        calls.append((commit_ish, file_list, outputs, options))
+        for path in outputs.values():
+            with open(path, "w") as f:
+                f.write("book")
+        return {"status": "success", "message": "Generated EPUB, DOCX."}
+
+    queue = ExportJobQueue(store_path, exporters={}, multi_exporter=multi)
+    try:
+        outputs = {"epub": str(tmp_path / "book.epub"), "docx": str(tmp_path / "book.docx")}
+        job = queue.submit_formats(outputs, "/repo", "v2", ["a.md"], str(tmp_path), options={"docx": {"extra_args": ["--toc"]}})
+        assert job['format'] == "epub,docx" and job['output_path'] == str(tmp_path)
+        done = _wait_for(queue, job['id'])
+        assert done['status'] == JOB_DONE and done['params']['outputs'] == outputs
+        assert calls == [("v2", ["a.md"], outputs, {"docx": {"extra_args": ["--toc"]}})]
+        with pytest.raises(ExportJobError, match="Unsupported export format 'odt'"):
+            queue.submit_formats({"odt": str(tmp_path / "book.odt")}, "/repo", "HEAD", ["a.md"], str(tmp_path))
+    finally:
+        queue.shutdown()
+
+
+def test_multi_format_job_keeps_the_formats_that_were_written(store_path, tmp_path):
+    from gitwrite_core.exceptions import PartialExportError
+
+    def multi(repo_path, commit_ish, file_list, outputs, options):
+        with open(outputs["epub"], "w") as f:
+            f.write("book")
+        raise PartialExportError("PDF export failed (EPUB written): no LaTeX", results={
+            "epub": {"status": "success", "message": "EPUB generated.", "output_path": outputs["epub"]},
+            "pdf": {"status": "error", "message": "no LaTeX", "output_path": outputs["pdf"]},
+        })
+
+    queue = ExportJobQueue(store_path, exporters={}, multi_exporter=multi)
+    try:
+        outputs = {"epub": str(tmp_path / "book.epub"), "pdf": str(tmp_path / "book.pdf")}
+        job = queue.submit_formats(outputs, "/repo", "HEAD", ["a.md"], str(tmp_path))
+        failed = _wait_for(queue, job['id'])
+        assert failed['status'] == JOB_FAILED and "no LaTeX" in failed['error']
+        assert failed['params']['written_outputs'] == {"epub": outputs["epub"]}
+        assert (tmp_path / "book.epub").exists()
+    finally:
+        queue.shutdown()
+
+
+def test_cancelled_multi_format_job_discards_the_formats_that_were_written(store_path, tmp_path):
+    from gitwrite_core.exceptions import PartialExportError
+    started, release = threading.Event(), threading.Event()
+
+    def multi(repo_path, commit_ish, file_list, outputs, options):
+        with open(outputs["epub"], "w") as f:
+            f.write("book")
+        started.set()
+        release.wait(5)
+        raise PartialExportError("PDF export failed (EPUB written): no LaTeX", results={
+            "epub": {"status": "success", "message": "EPUB generated.", "output_path": outputs["epub"]},
+            "pdf": {"status": "error", "message": "no LaTeX", "output_path": outputs["pdf"]},
+        })
+
+    queue = ExportJobQueue(store_path, exporters={}, multi_exporter=multi)
+    try:
+        outputs = {"epub": str(tmp_path / "book.epub"), "pdf": str(tmp_path / "book.pdf")}
+        job = queue.submit_formats(outputs, "/repo", "HEAD", ["a.md"], str(tmp_path))
+        assert started.wait(5)
+        queue.cancel(job['id'])
+        release.set()
+        cancelled = _wait_for(queue, job['id'])
+        assert cancelled['status'] == JOB_CANCELLED and 'written_outputs' not in cancelled['params']
+        assert not (tmp_path / "book.epub").exists()
+    finally:
+        release.set()
+        queue.shutdown()
@@ -0,0 +1,200 @@
+import base64
+from pathlib import Path
+
+import pygit2
+import pytest
+
+from gitwrite_core.exceptions import InvalidCursorError
+from gitwrite_core.history import (
+    CommitWalker, changed_paths, decode_history_cursor, encode_history_cursor, get_changed_path_cache, take,
+)
+from gitwrite_core.repository import list_commits
+from gitwrite_core.versioning import get_commit_history, get_file_history
+
+
+def _commit(repo, filename, content, message, parents, timestamp, ref="HEAD"):
+    (Path(repo.workdir) / filename).write_text(content)
+    repo.index.add(filename)
+    repo.index.write()
+    signature = pygit2.Signature("Test Author", "test@example.com", timestamp, 0)
+    return repo.create_commit(ref, signature, signature, message, repo.index.write_tree(), parents)
+
+
+@pytest.fixture
+def linear_repo(tmp_path):
+    repo = pygit2.init_repository(str(tmp_path / "linear"))
+    oids = []
+    for i in range(7):
+        oids.append(_commit(repo, f"ch{i}.md", f"text {i}", f"Save {i}", oids[-1:], 1_000_000 + i * 60))
+    return repo, oids
+
+
+@pytest.fixture
+def merged_repo(tmp_path):
+    """main: base - m1 - m2 - merge; feature: base - f1 - f2 (merged)."""
+    repo = pygit2.init_repository(str(tmp_path / "merged"))
+    base = _commit(repo, "base.md", "base", "Base", [], 1_000_000)
+    feature_ref = "refs/heads/feature"
+    repo.references.create(feature_ref, base)
+    m1 = _commit(repo, "main1.md", "m1", "Main 1", [base], 1_000_100)
+    f1 = _commit(repo, "feat1.md", "f1", "Feature 1", [base], 1_000_150, ref=feature_ref)
+    m2 = _commit(repo, "main2.md", "m2", "Main 2", [m1], 1_000_200)
+    f2 = _commit(repo, "feat2.md", "f2", "Feature 2", [f1], 1_000_250, ref=feature_ref)
+    merge = _commit(repo, "merge.md", "merge", "Merge feature", [m2, f2], 1_000_300)
+    return repo, {"base": base, "m1": m1, "f1": f1, "m2": m2, "f2": f2, "merge": merge}
+
+
+class TestCommitWalker:
+    def test_newest_first(self, linear_repo):
+        repo, oids = linear_repo
+        assert [c.id for c in CommitWalker(repo, [oids[-1]])] == list(reversed(oids))
+
+    def test_take_only_walks_requested_commits(self, linear_repo):
+        repo, oids = linear_repo
+        walker = CommitWalker(repo, [oids[-1]])
+        assert [c.id for c in take(walker, 2)] == [oids[6], oids[5]]
+        assert walker.position == 2
+        assert walker.has_more
+
+    def test_paging_with_cursor_covers_history_once(self, merged_repo):
+        repo, named = merged_repo
+        full = [c.id for c in CommitWalker(repo, [named["merge"]])]
+
+        paged, cursor = [], None
+        while True:
+            walker = CommitWalker.from_cursor(repo, cursor) if cursor else CommitWalker(repo, [named["merge"]])
+            paged.extend(c.id for c in take(walker, 2))
+            cursor = walker.cursor()
+            if cursor is None:
+                break
+        assert paged == full
+        assert len(paged) == len(set(paged)) == 6
+        assert paged[0] == named["merge"]
+        assert paged[-1] == named["base"]
+
+    def test_skewed_timestamps_keep_children_first(self, tmp_path):
+        repo = pygit2.init_repository(str(tmp_path / "skewed"))
+        first = _commit(repo, "a.md", "a", "Newer clock", [], 2_000_000)
+        second = _commit(repo, "b.md", "b", "Older clock", [first], 1_000_000)
+        assert [c.id for c in CommitWalker(repo, [second])] == [second, first]
+
+    def test_paging_with_skewed_merge_never_repeats_a_commit(self, tmp_path):
+        # 'shared' has a newer clock than its child 'late', so it is emitted while 'late' is pending.
+        repo = pygit2.init_repository(str(tmp_path / "skewed_merge"))
+        root = _commit(repo, "root.md", "root", "Root", [], 1_000_000)
+        shared = _commit(repo, "shared.md", "shared", "Shared", [root], 1_000_150)
+        side_ref = "refs/heads/side"
+        repo.references.create(side_ref, shared)
+        early = _commit(repo, "early.md", "early", "Early", [shared], 1_000_200)
+        late = _commit(repo, "late.md", "late", "Late clock", [shared], 1_000_050, ref=side_ref)
+        merge = _commit(repo, "merge.md", "merge", "Merge", [early, late], 1_000_300)
+        full = [c.id for c in CommitWalker(repo, [merge])]
+        assert full == [merge, early, shared, late, root]
+
+        for page_size in (1, 2, 3):
+            paged, cursor = [], None
+            while True:
+                walker = CommitWalker.from_cursor(repo, cursor) if cursor else CommitWalker(repo, [merge])
+                paged.extend(c.id for c in take(walker, page_size))
+                cursor = walker.cursor()
+                if cursor is None:
+                    break
+            assert paged == full
+
+    def test_legacy_cursor_without_seen_set(self):
+        raw = f"1:4:{'a' * 40}.123"
+        token = base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii").rstrip("=")
+        assert decode_history_cursor(token) == (4, [("a" * 40, 123)], [])
+
+    def test_cursor_position_round_trips(self):
+        token = encode_history_cursor(40, [("a" * 40, 123), ("b" * 40, 100)], ["c" * 40])
+        assert decode_history_cursor(token) == (40, [("a" * 40, 123), ("b" * 40, 100)], ["c" * 40])
+
+    @pytest.mark.parametrize("token", ["", "not-base64!", encode_history_cursor(3, [])])
+    def test_malformed_cursor(self, token):
+        with pytest.raises(InvalidCursorError):
+            decode_history_cursor(token)
+
+    def test_cursor_for_unknown_commit(self, linear_repo):
+        repo, _ = linear_repo
+        with pytest.raises(InvalidCursorError):
+            CommitWalker.from_cursor(repo, encode_history_cursor(1, [("f" * 40, 1)]))
+
+
+class TestPaginatedHistory:
+    def test_list_commits_pages(self, linear_repo):
+        repo, oids = linear_repo
+        first_page = list_commits(repo.workdir, max_count=3)
+        assert first_page["status"] == "success"
+        assert [c["sha"] for c in first_page["commits"]] == [str(o) for o in reversed(oids[4:])]
+        assert first_page["next_cursor"]
+
+        second_page = list_commits(repo.workdir, max_count=10, cursor=first_page["next_cursor"])
+        assert [c["sha"] for c in second_page["commits"]] == [str(o) for o in reversed(oids[:4])]
+        assert second_page["next_cursor"] is None
+
+    def test_list_commits_invalid_cursor(self, linear_repo):
+        repo, _ = linear_repo
+        result = list_commits(repo.workdir, max_count=3, cursor="bogus")
+        assert result["status"] == "invalid_cursor"
+
+    def test_get_commit_history_returns_most_recent(self, linear_repo):
+        repo, oids = linear_repo
+        history = get_commit_history(repo.workdir, count=2)
+        assert [entry["oid"] for entry in history] == [str(oids[6]), str(oids[5])]
+
+
+CHAPTER_TEXT = "".join(f"Line {i} of the chapter about the lighthouse keeper.\n" for i in range(20))
+
+
+@pytest.fixture
+def renamed_repo(tmp_path):
+    """draft.md is added, edited, renamed to chapter-03.md and edited again."""
+    repo = pygit2.init_repository(str(tmp_path / "renamed"))
+    added = _commit(repo, "draft.md", CHAPTER_TEXT, "Start draft", [], 1_000_000)
+    other = _commit(repo, "notes.md", "notes", "Add notes", [added], 1_000_100)
+    edited = _commit(repo, "draft.md", CHAPTER_TEXT + "More.\n", "Extend draft", [other], 1_000_200)
+    repo.index.remove("draft.md")
+    (Path(repo.workdir) / "draft.md").unlink()
+    renamed = _commit(repo, "chapter-03.md", CHAPTER_TEXT + "More.\n", "Promote draft to chapter 3", [edited], 1_000_300)
+    polished = _commit(repo, "chapter-03.md", CHAPTER_TEXT + "More!\n", "Polish chapter 3", [renamed], 1_000_400)
+    return repo, {"added": added, "other": other, "edited": edited, "renamed": renamed, "polished": polished}
+
+
+class TestFileHistory:
+    def test_follows_renames(self, renamed_repo):
+        repo, named = renamed_repo
+        result = get_file_history(repo.workdir, "chapter-03.md")
+        assert [c["sha"] for c in result["commits"]] == [
+            str(named["polished"]), str(named["renamed"]), str(named["edited"]), str(named["added"]),
+        ]
+        assert [(c["path"], c["change_type"], c["old_path"]) for c in result["commits"]] == [
+            ("chapter-03.md", "modified", None),
+            ("chapter-03.md", "renamed", "draft.md"),
+            ("draft.md", "modified", None),
+            ("draft.md", "added", None),
+        ]
+        assert result["next_cursor"] is None
+
+    def test_paging_keeps_following_the_old_name(self, renamed_repo):
+        repo, named = renamed_repo
+        first = get_file_history(repo.workdir, "chapter-03.md", limit=2)
+        assert [c["sha"] for c in first["commits"]] == [str(named["polished"]), str(named["renamed"])]
+        second = get_file_history(repo.workdir, "chapter-03.md", limit=2, cursor=first["next_cursor"])
+        assert [c["path"] for c in second["commits"]] == ["draft.md", "draft.md"]
+        assert second["next_cursor"] is None
+
+    def test_changed_paths_are_cached_by_oid(self, renamed_repo):
+        repo, named = renamed_repo
+        cache = get_changed_path_cache()
+        cache.clear()
+        get_file_history(repo.workdir, "notes.md")
+        misses = cache.stats()["misses"]
+        get_file_history(repo.workdir, "notes.md")
+        assert cache.stats()["misses"] == misses
+        assert changed_paths(repo, repo[named["renamed"]]) == {"chapter-03.md": "A", "draft.md": "D"}
+
+    def test_invalid_cursor(self, renamed_repo):
+        repo, _ = renamed_repo
+        with pytest.raises(InvalidCursorError):
+            get_file_history(repo.workdir, "chapter-03.md", cursor="nonsense")
@@ -0,0 +1,179 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pygit2
+import pytest
+
+from gitwrite_core.exceptions import GitWriteError, RepositoryLockTimeoutError
+from gitwrite_core.locking import LOCK_FILE_NAME, RepositoryLockManager, repository_lock
+
+
+@pytest.fixture
+def repo_dir(tmp_path: Path) -> Path:
+    repo_path = tmp_path / "locked_repo"
+    pygit2.init_repository(str(repo_path))
+    return repo_path
+
+
+@pytest.fixture
+def manager():
+    return RepositoryLockManager(timeout=2)
+
+
+def _run_in_thread(target):
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+class TestRepositoryLockManager:
+    def test_readers_do_not_block_each_other(self, manager, repo_dir):
+        inside = threading.Barrier(2, timeout=2)
+
+        def reader():
+            with manager.shared(str(repo_dir)):
+                inside.wait()  # Both readers must be inside at the same time
+
+        threads = [_run_in_thread(reader) for _ in range(2)]
+        for thread in threads:
+            thread.join()
+        assert manager.metrics()["shared"]["acquired"] == 2
+
+    def test_writer_excludes_readers(self, manager, repo_dir):
+        events = []
+        writer_inside = threading.Event()
+
+        def writer():
+            with manager.exclusive(str(repo_dir)):
+                writer_inside.set()
+                time.sleep(0.1)
+                events.append("writer_done")
+
+        def reader():
+            writer_inside.wait()
+            with manager.shared(str(repo_dir)):
+                events.append("reader")
+
+        threads = [_run_in_thread(writer), _run_in_thread(reader)]
+        for thread in threads:
+            thread.join()
+        assert events == ["writer_done", "reader"]
+
+    def test_queued_writer_is_not_starved_by_new_readers(self, manager, repo_dir):
+        order = []
+        first_reader_inside = threading.Event()
+        release_first_reader = threading.Event()
+
+        def first_reader():
+            with manager.shared(str(repo_dir)):
+                first_reader_inside.set()
+                release_first_reader.wait()
+
+        def writer():
+            with manager.exclusive(str(repo_dir)):
+                order.append("writer")
+
+        def late_reader():
+            with manager.shared(str(repo_dir)):
+                order.append("late_reader")
+
+        threads = [_run_in_thread(first_reader)]
+        first_reader_inside.wait()
+        threads.append(_run_in_thread(writer))
+        time.sleep(0.05)  # Let the writer queue up
+        threads.append(_run_in_thread(late_reader))
+        time.sleep(0.05)
+        release_first_reader.set()
+        for thread in threads:
+            thread.join()
+        assert order == ["writer", "late_reader"]
+
+    def test_timeout_raises_and_is_counted(self, repo_dir):
+        manager = RepositoryLockManager(timeout=0.05)
+        holding = threading.Event()
+        release = threading.Event()
+
+        def holder():
+            with manager.exclusive(str(repo_dir)):
+                holding.set()
+                release.wait()
+
+        thread = _run_in_thread(holder)
+        holding.wait()
+        try:
+            with pytest.raises(RepositoryLockTimeoutError):
+                with manager.shared(str(repo_dir)):
+                    pass
+        finally:
+            release.set()
+            thread.join()
+        assert manager.metrics()["shared"]["timeouts"] == 1
+        # The lock is usable again once the holder is gone.
+        with manager.exclusive(str(repo_dir)):
+            pass
+
+    def test_reentrant_within_thread(self, manager, repo_dir):
+        with manager.exclusive(str(repo_dir)):
+            with manager.shared(str(repo_dir)):
+                with manager.exclusive(str(repo_dir)):
+                    pass
+
+    def test_shared_to_exclusive_upgrade_is_rejected(self, manager, repo_dir):
+        with manager.shared(str(repo_dir)):
+            with pytest.raises(GitWriteError):
+                with manager.exclusive(str(repo_dir)):
+                    pass
+
+    def test_workdir_and_gitdir_share_a_lock(self, repo_dir):
+        manager = RepositoryLockManager(timeout=0.05)
+        with manager.exclusive(str(repo_dir)):
+            result = {}
+
+            def other():
+                try:
+                    with manager.shared(str(repo_dir / ".git")):
+                        result["acquired"] = True
+                except RepositoryLockTimeoutError:
+                    result["acquired"] = False
+
+            _run_in_thread(other).join()
+        assert result == {"acquired": False}
+
+    def test_non_repository_paths_are_not_locked(self, manager, tmp_path):
+        with manager.exclusive(str(tmp_path / "missing")):
+            pass
+        assert manager.metrics()["exclusive"]["acquired"] == 0
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="flock is POSIX only")
+    def test_exclusive_lock_blocks_other_processes(self, manager, repo_dir):
+        script = (
+            "import fcntl, os, sys\n"
+            "fd = os.open(sys.argv[1], os.O_RDWR | os.O_CREAT)\n"
+            "try:\n"
+            "    fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)\n"
+            "    print('acquired')\n"
+            "except BlockingIOError:\n"
+            "    print('blocked')\n"
+        )
+        lock_file = str(repo_dir / ".git" / LOCK_FILE_NAME)
+        with manager.exclusive(str(repo_dir)):
+            during = subprocess.run([sys.executable, "-c", script, lock_file], capture_output=True, text=True)
+        after = subprocess.run([sys.executable, "-c", script, lock_file], capture_output=True, text=True)
+        assert during.stdout.strip() == "blocked"
+        assert after.stdout.strip() == "acquired"
+
+
+def test_repository_lock_decorator_uses_repo_path_argument(repo_dir):
+    seen = {}
+
+    @repository_lock(exclusive=True)
+    def mutate(repo_path_str):
+        seen["lock_file_exists"] = os.path.exists(os.path.join(repo_path_str, ".git", LOCK_FILE_NAME))
+        return "done"
+
+    assert mutate(repo_path_str=str(repo_dir)) == "done"
+    assert seen["lock_file_exists"] is True
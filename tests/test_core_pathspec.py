@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import pygit2
+import pytest
+
+from gitwrite_core.pathspec import Pathspec, scoped_patches
+
+
+def _commit(repo, files, removed=()):
+    for name in removed:
+        repo.index.remove(name)
+    for name, content in files.items():
+        path = Path(repo.workdir) / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        repo.index.add(name)
+    repo.index.write()
+    signature = pygit2.Signature("Test Author", "test@example.com", 946684800, 0)
+    parents = [] if repo.head_is_unborn else [repo.head.target]
+    oid = repo.create_commit("HEAD", signature, signature, "Save", repo.index.write_tree(), parents)
+    return repo[oid].tree
+
+
+@pytest.fixture
+def trees(tmp_path):
+    repo = pygit2.init_repository(str(tmp_path / "pathspec_repo"))
+    tree1 = _commit(repo, {"a.md": "A\n", "a/x.md": "X\n", "drafts/ch1.md": "One\n", "drafts/old/ch0.md": "Zero\n",
+                           "notes/todo.txt": "Todo\n", "z.md": "Z\n"})
+    tree2 = _commit(repo, {"a.md": "A2\n", "a/x.md": "X2\n", "drafts/ch1.md": "One more\n", "drafts/ch2.md": "Two\n",
+                           "notes/todo.txt": "Done\n"}, removed=["drafts/old/ch0.md", "z.md"])
+    return repo, tree1, tree2
+
+
+class TestPathspec:
+    def test_literal_and_glob_matching(self):
+        spec = Pathspec(["./drafts/", "*.txt", "a.md"])
+        assert spec.patterns == ["*.txt", "a.md", "drafts"]
+        assert spec.matches("drafts/old/ch0.md") and spec.matches("notes/todo.txt") and spec.matches("a.md")
+        assert not spec.matches("a.mdx") and not spec.matches("draftsman.md")
+        assert spec.may_contain("drafts/old") and spec.may_contain("notes")  # Globs can match anywhere
+        assert not Pathspec(["drafts/ch1.md"]).may_contain("notes")
+        assert Pathspec(["drafts/ch*.md"]).may_contain("drafts") and not Pathspec(["drafts/ch*.md"]).may_contain("a")
+
+    def test_empty_pathspecs_select_everything(self):
+        assert Pathspec.from_paths(None) is None
+        assert Pathspec.from_paths(["", ".", "/"]) is None
+
+
+class TestScopedPatches:
+    def test_matches_the_full_diff(self, trees):
+        repo, tree1, tree2 = trees
+        full = repo.diff(tree1, tree2, context_lines=3, interhunk_lines=1)
+        scoped = [p.text for p in scoped_patches(repo, tree1, tree2, Pathspec(["*"]), context_lines=3, interhunk_lines=1)]
+        assert "".join(scoped) == full.patch
+
+    def test_directory_and_glob(self, trees):
+        repo, tree1, tree2 = trees
+        paths = [p.delta.new_file.path for p in scoped_patches(repo, tree1, tree2, Pathspec(["drafts"]))]
+        assert paths == ["drafts/ch1.md", "drafts/ch2.md", "drafts/old/ch0.md"]
+        statuses = {p.delta.new_file.path: p.delta.status_char() for p in scoped_patches(repo, tree1, tree2, Pathspec(["drafts"]))}
+        assert statuses == {"drafts/ch1.md": "M", "drafts/ch2.md": "A", "drafts/old/ch0.md": "D"}
+        assert [p.delta.new_file.path for p in scoped_patches(repo, tree1, tree2, Pathspec(["*.txt"]))] == ["notes/todo.txt"]
+
+    def test_unrelated_subtrees_are_not_read(self, trees):
+        repo, tree1, tree2 = trees
+        read = []
+
+        class CountingRepo:
+            def __getitem__(self, oid):
+                read.append(oid)
+                return repo[oid]
+
+        patches = list(scoped_patches(CountingRepo(), tree1, tree2, Pathspec(["drafts/ch1.md"])))
+        assert [p.delta.new_file.path for p in patches] == ["drafts/ch1.md"]
+        # The two 'drafts' trees and the two versions of the chapter; 'a', 'notes' and 'drafts/old' are skipped
+        assert len(read) == 4
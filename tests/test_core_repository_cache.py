@@ -0,0 +1,108 @@
+import shutil
+import threading
+from pathlib import Path
+
+import pygit2
+import pytest
+
+from gitwrite_core.repository_cache import RepositoryCache
+from .conftest import make_commit
+
+
+@pytest.fixture
+def cache():
+    return RepositoryCache(max_handles=4, idle_timeout=60)
+
+
+@pytest.fixture
+def repo_dir(tmp_path: Path) -> Path:
+    repo_path = tmp_path / "cached_repo"
+    repo = pygit2.init_repository(str(repo_path))
+    make_commit(repo, "chapter1.md", "Once upon a time.", "Initial commit")
+    return repo_path
+
+
+class TestRepositoryCache:
+    def test_reuses_handle_within_thread(self, cache, repo_dir):
+        first = cache.open(str(repo_dir))
+        second = cache.open(repo_dir)
+        assert first is second
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_gitdir_and_workdir_share_entry(self, cache, repo_dir):
+        assert cache.open(str(repo_dir)) is cache.open(str(repo_dir / ".git"))
+
+    def test_separate_handle_per_thread(self, cache, repo_dir):
+        main_handle = cache.open(str(repo_dir))
+        other = {}
+        worker = threading.Thread(target=lambda: other.setdefault("repo", cache.open(str(repo_dir))))
+        worker.start()
+        worker.join()
+        assert other["repo"] is not main_handle
+        assert cache.stats()["size"] == 2
+
+    def test_sees_commits_made_through_other_handles(self, cache, repo_dir):
+        cached = cache.open(str(repo_dir))
+        writer = pygit2.Repository(str(repo_dir))
+        new_oid = make_commit(writer, "chapter2.md", "It was a dark night.", "Second commit")
+        assert cache.open(str(repo_dir)).head.target == new_oid
+        assert cache.open(str(repo_dir)) is cached
+
+    def test_unsaved_index_changes_are_discarded(self, cache, repo_dir):
+        dirty = cache.open(str(repo_dir))
+        (repo_dir / "draft.md").write_text("Unfinished.")
+        dirty.index.add("draft.md")  # A failed write never calls index.write()
+        reopened = cache.open(str(repo_dir))
+        assert reopened is dirty
+        assert "draft.md" not in reopened.index
+        assert "chapter1.md" in reopened.index
+
+    def test_reinitialized_repository_invalidates(self, cache, repo_dir):
+        stale = cache.open(str(repo_dir))
+        shutil.rmtree(repo_dir)
+        pygit2.init_repository(str(repo_dir))
+        fresh = cache.open(str(repo_dir))
+        assert fresh is not stale
+        assert fresh.head_is_unborn
+        assert cache.stats()["invalidations"] == 1
+
+    def test_removed_repository_raises_like_pygit2(self, cache, repo_dir):
+        cache.open(str(repo_dir))
+        shutil.rmtree(repo_dir)
+        with pytest.raises(pygit2.GitError):
+            cache.open(str(repo_dir))
+        assert cache.discover(str(repo_dir)) is None
+
+    def test_lru_eviction_bounds_size(self, cache, tmp_path):
+        paths = []
+        for i in range(6):
+            path = tmp_path / f"repo_{i}"
+            pygit2.init_repository(str(path))
+            paths.append(path)
+            cache.open(str(path))
+        stats = cache.stats()
+        assert stats["size"] == 4
+        assert stats["evictions"] == 2
+        cache.open(str(paths[0]))  # Evicted first, so this is a miss again
+        assert cache.stats()["misses"] == 7
+
+    def test_idle_entries_expire(self, repo_dir):
+        cache = RepositoryCache(max_handles=4, idle_timeout=0)
+        first = cache.open(str(repo_dir))
+        assert cache.open(str(repo_dir)) is not first
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidate_drops_handles(self, cache, repo_dir):
+        first = cache.open(str(repo_dir))
+        cache.invalidate(str(repo_dir))
+        assert cache.open(str(repo_dir)) is not first
+
+    def test_discover_from_subdirectory_is_not_cached(self, cache, repo_dir):
+        subdir = repo_dir / "drafts"
+        subdir.mkdir()
+        assert Path(cache.discover(str(subdir))).resolve() == (repo_dir / ".git").resolve()
+        # A repository created later inside the sub-directory must be found.
+        pygit2.init_repository(str(subdir))
+        assert Path(cache.discover(str(subdir))).resolve() == (subdir / ".git").resolve()
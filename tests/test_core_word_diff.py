@@ -0,0 +1,222 @@
+from pathlib import Path
+
+import pygit2
+import pytest
+
+from gitwrite_core.versioning import get_word_level_diff
+from gitwrite_core import word_diff
+from gitwrite_core.word_diff import diff_line_words, process_hunk_lines, token_opcodes, word_diff_from_diff
+from gitwrite_core.word_diff_compact import decode_compact_word_diff, encode_compact_word_diff
+
+
+def _commit_tree(repo, files, removed=()):
+    for name in removed:
+        repo.index.remove(name)
+        (Path(repo.workdir) / name).unlink()
+    for name, content in files.items():
+        path = Path(repo.workdir) / name
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content)
+        repo.index.add(name)
+    repo.index.write()
+    signature = pygit2.Signature("Test Author", "test@example.com", 946684800, 0)
+    parents = [] if repo.head_is_unborn else [repo.head.target]
+    oid = repo.create_commit("HEAD", signature, signature, "Save", repo.index.write_tree(), parents)
+    return repo[oid].tree
+
+
+@pytest.fixture
+def repo(tmp_path):
+    return pygit2.init_repository(str(tmp_path / "word_diff_repo"))
+
+
+def _strip_positions(files):
+    """Drops the fields only the Patch-based engine can provide."""
+    stripped = []
+    for entry in files:
+        entry = dict(entry)
+        entry["hunks"] = [
+            {"lines": [{k: v for k, v in line.items() if k not in ("old_lineno", "new_lineno")} for line in hunk["lines"]]}
+            for hunk in entry["hunks"]
+        ]
+        stripped.append(entry)
+    return stripped
+
+
+def test_matches_text_path_and_adds_line_numbers(repo):
+    old_text = "Title\n\nThe old house stood alone.\nNobody came.\nThe end.\n"
+    new_text = "Title\n\nThe old house stood silent and alone.\nNobody came.\nThe end.\nEpilogue.\n"
+    tree1 = _commit_tree(repo, {"chapter1.md": old_text, "notes.md": "keep"})
+    tree2 = _commit_tree(repo, {"chapter1.md": new_text, "appendix.md": "New appendix.\n"})
+    diff = repo.diff(tree1, tree2, context_lines=3, interhunk_lines=1)
+
+    structured = word_diff_from_diff(diff)
+    assert _strip_positions(structured) == get_word_level_diff(diff.patch)
+
+    chapter = next(f for f in structured if f["file_path"] == "chapter1.md")
+    hunk = chapter["hunks"][0]
+    assert (hunk["old_start"], hunk["old_lines"], hunk["new_start"], hunk["new_lines"]) == (1, 5, 1, 6)
+    assert hunk["header"].startswith("@@ -1,5 +1,6 @@")
+    deletion, addition = [line for line in hunk["lines"] if line["type"] in ("deletion", "addition")][:2]
+    assert deletion == {"type": "deletion", "content": "The old house stood alone.", "old_lineno": 3,
+                        "words": [{"type": "context", "content": "The old house stood alone."}]}
+    assert addition["new_lineno"] == 3
+    assert addition["words"] == [{"type": "context", "content": "The old house stood"},
+                                 {"type": "added", "content": "silent and"},
+                                 {"type": "context", "content": "alone."}]
+    context = next(line for line in hunk["lines"] if line["content"] == "Nobody came.")
+    assert (context["old_lineno"], context["new_lineno"]) == (4, 4)
+
+    appendix = next(f for f in structured if f["file_path"] == "appendix.md")
+    assert appendix["change_type"] == "added"
+
+
+def test_deleted_binary_and_no_newline(repo):
+    tree1 = _commit_tree(repo, {"old.md": "gone\n", "cover.png": b"\x89PNG\x00\x01", "end.md": "last line"})
+    tree2 = _commit_tree(repo, {"cover.png": b"\x89PNG\x00\x02", "end.md": "last line!"}, removed=["old.md"])
+    structured = {f["file_path"]: f for f in word_diff_from_diff(repo.diff(tree1, tree2))}
+
+    assert structured["old.md"]["change_type"] == "deleted"
+    assert structured["cover.png"] == {"file_path": "cover.png", "change_type": "modified", "is_binary": True, "hunks": []}
+    end_lines = structured["end.md"]["hunks"][0]["lines"]
+    assert {"type": "no_newline", "content": "\\ No newline at end of file"} in end_lines
+
+
+def test_renames_are_reported_when_detected(repo):
+    text = "".join(f"Line {i} of a long chapter.\n" for i in range(20))
+    tree1 = _commit_tree(repo, {"draft.md": text})
+    tree2 = _commit_tree(repo, {"chapter-03.md": text + "One more line.\n"}, removed=["draft.md"])
+    diff = repo.diff(tree1, tree2)
+    diff.find_similar()
+    (entry,) = word_diff_from_diff(diff)
+    assert entry["change_type"] == "renamed"
+    assert (entry["old_file_path"], entry["new_file_path"], entry["file_path"]) == ("draft.md", "chapter-03.md", "chapter-03.md")
+    assert entry["hunks"][0]["lines"][-1]["new_lineno"] == 21
+
+
+class TestTokenDiff:
+    def test_token_opcodes_are_a_minimal_alignment(self):
+        import difflib
+        import random
+
+        rng = random.Random(7)
+        for _ in range(300):
+            old = [rng.randint(0, 5) for _ in range(rng.randint(0, 15))]
+            new = [rng.randint(0, 5) for _ in range(rng.randint(0, 15))]
+            opcodes = token_opcodes(old, new)
+            rebuilt = []
+            for tag, i1, i2, j1, j2 in opcodes:
+                if tag == "equal":
+                    assert old[i1:i2] == new[j1:j2]
+                rebuilt.extend(new[j1:j2])
+            assert rebuilt == new
+            equal = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == "equal")
+            longest = sum(b.size for b in difflib.SequenceMatcher(None, old, new, autojunk=False).get_matching_blocks())
+            assert equal >= longest
+
+    def test_edit_cost_cut_off_reports_one_replacement(self, monkeypatch):
+        monkeypatch.setattr(word_diff, "MAX_EDIT_COST", 2)
+        assert token_opcodes([0, 1, 2, 3, 4], [0, 5, 2, 6, 4]) == [
+            ("equal", 0, 1, 0, 1), ("replace", 1, 4, 1, 4), ("equal", 4, 5, 4, 5)]
+
+    def test_long_paragraph_edit(self):
+        words = [f"word{i}" for i in range(20_000)]
+        edited = list(words)
+        edited[10_000] = "changed"
+        old_words, new_words = diff_line_words(" ".join(words), " ".join(edited))
+        assert [segment["type"] for segment in new_words] == ["context", "added", "context"]
+        assert new_words[1]["content"] == "changed"
+        assert old_words[1] == {"type": "removed", "content": "word10000"}
+
+    def test_dissimilar_lines_are_whole_line_changes(self):
+        assert diff_line_words("final word", "final change") == (
+            [{"type": "removed", "content": "final word"}], [{"type": "added", "content": "final change"}])
+        assert diff_line_words("line two", "line 2") == (
+            [{"type": "context", "content": "line"}, {"type": "removed", "content": "two"}],
+            [{"type": "context", "content": "line"}, {"type": "added", "content": "2"}])
+
+
+def test_consecutive_edited_lines_are_paired_by_content():
+    lines = [
+        ("-", "The rain fell all night.", 1, None),
+        ("-", "Morning came slowly over the hills.", 2, None),
+        ("+", "A short new opening line.", None, 1),
+        ("+", "The rain fell all through the night.", None, 2),
+        ("+", "Morning came slowly over the grey hills.", None, 3),
+    ]
+    processed = process_hunk_lines(lines)
+    assert [(line["type"], line["content"]) for line in processed] == [
+        ("addition", "A short new opening line."),
+        ("deletion", "The rain fell all night."),
+        ("addition", "The rain fell all through the night."),
+        ("deletion", "Morning came slowly over the hills."),
+        ("addition", "Morning came slowly over the grey hills."),
+    ]
+    assert processed[0]["words"] == [{"type": "added", "content": "A short new opening line."}]
+    assert processed[2]["words"] == [{"type": "context", "content": "The rain fell all"},
+                                     {"type": "added", "content": "through the"},
+                                     {"type": "context", "content": "night."}]
+    assert processed[4]["new_lineno"] == 3
+
+
+def test_large_diffs_use_the_process_pool_with_the_same_result(repo, monkeypatch):
+    chapters = {f"chapter{i:02}.md": "".join(f"Line {j} of chapter {i} reads well.\n" for j in range(30))
+                for i in range(6)}
+    tree1 = _commit_tree(repo, chapters)
+    tree2 = _commit_tree(repo, {name: text.replace("reads well", "reads rather well") for name, text in chapters.items()})
+    diff = repo.diff(tree1, tree2)
+
+    monkeypatch.setattr(word_diff, "WORD_DIFF_WORKERS", 1)
+    serial = word_diff_from_diff(diff)
+    monkeypatch.setattr(word_diff, "WORD_DIFF_WORKERS", 2)
+    monkeypatch.setattr(word_diff, "PARALLEL_MIN_BYTES", 0)
+    try:
+        parallel = word_diff_from_diff(diff)
+        assert word_diff._pool is not None
+    finally:
+        word_diff._shutdown_pool()
+    assert parallel == serial
+    assert [entry["file_path"] for entry in parallel] == sorted(chapters)
+
+
+class TestCompactEncoding:
+    def test_round_trip(self, repo):
+        old_text = "".join(f"Line {i} of the  chapter reads well.\n" for i in range(12)) + "\ufeffOdd start here.\n"
+        new_text = ("A new opening line.\n" + old_text.replace("reads well", "reads rather well")
+                    .replace("Odd start", "Odd beginning"))
+        tree1 = _commit_tree(repo, {"chapter1.md": old_text, "end.md": "last", "gone.md": "Bye.\n",
+                                    "cover.png": b"\x89PNG\x00\x01"})
+        tree2 = _commit_tree(repo, {"chapter1.md": new_text, "end.md": "last line", "cover.png": b"\x89PNG\x00\x02"},
+                             removed=["gone.md"])
+        structured = word_diff_from_diff(repo.diff(tree1, tree2, context_lines=3, interhunk_lines=1))
+
+        compact = encode_compact_word_diff(structured)
+        assert decode_compact_word_diff(compact) == structured
+        (hunk,) = next(f for f in compact["files"] if f["file_path"] == "chapter1.md")["hunks"]
+        assert "lineno" not in hunk
+        assert hunk["ops"].startswith("+-+-+")
+        # "Line 0 of the  chapter reads" | "rather" | "well.", and the old line is unchanged context
+        assert hunk["words"][:3] == [0, [7], [6, 1, 1]]
+        # Split differently by JavaScript, so spelled out
+        assert hunk["words"][-1] == [["context", "\ufeffOdd"], ["added", "beginning"], ["context", "here."]]
+
+    def test_compact_is_smaller_and_cached(self, repo, tmp_path):
+        import json
+        from gitwrite_core.diff_cache import get_diff_cache
+        from gitwrite_core.versioning import get_diff
+
+        text = "".join(f"Sentence {i} of a long and winding chapter.\n" for i in range(200))
+        _commit_tree(repo, {"chapter1.md": text})
+        _commit_tree(repo, {"chapter1.md": text.replace("winding", "twisting")})
+        get_diff_cache().clear()
+        full = get_diff(repo.workdir, include_word_diff=True)["word_diff"]
+        compact = get_diff(repo.workdir, include_word_diff=True, compact_word_diff=True)["word_diff"]
+        assert decode_compact_word_diff(compact) == full
+        assert len(json.dumps(compact)) * 2 < len(json.dumps(full))
+        assert get_diff(repo.workdir, include_word_diff=True, compact_word_diff=True)["word_diff"] is compact
+
+    def test_unknown_version_is_rejected(self):
+        with pytest.raises(ValueError):
+            decode_compact_word_diff({"format": "gitwrite-word-diff-compact", "version": 99, "files": []})